@@ -1,10 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
 
+from utils.startup import startup
+
 app = FastAPI(title="Secretary AI API", docs_url=None, redoc_url=None)
 
+
+@app.middleware("http")
+async def readiness_gate(request: Request, call_next):
+    """起動直後（DB 復元・Cog 読み込み中）の /api/* 要求は準備が済むまで待たせる（utils/startup.py）。"""
+    if request.url.path.startswith("/api/") and not startup.is_ready("api"):
+        if not await startup.wait_ready("api"):
+            return JSONResponse(
+                {"detail": "起動処理中です。少し待ってから再試行してください。"},
+                status_code=503,
+                headers={"Retry-After": "5"},
+            )
+    return await call_next(request)
+
 # 静的ファイルの配信設定
 static_dir = Path(__file__).parent.parent / "static"
 if static_dir.exists():
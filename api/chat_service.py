@@ -5,7 +5,7 @@ import re
 
 from google.genai import types
 from config import JST
-from prompts import get_system_prompt
+from prompts import current_time_note, get_system_prompt
 from api.database import get_history, save_message, get_todays_log
 from utils.obsidian_utils import update_section
 
@@ -252,7 +252,8 @@ class ChatService:
         history = await get_history(limit=10)
         now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
         user_manual = await self._get_user_manual()
-        system_prompt = get_system_prompt(self.user_name, now_str, user_manual)
+        # 時刻を抜いた固定文面にしてコンテキストキャッシュ（services/prompt_cache.py）に載せる
+        system_prompt = get_system_prompt(self.user_name, None, user_manual)
 
         # マネージャー会話のモデルを設定から取得（デフォルト Pro）
         try:
@@ -265,16 +266,20 @@ class ChatService:
         for msg in history:
             role = "user" if msg["role"] == "user" else "model"
             contents.append(types.Content(role=role, parts=[types.Part.from_text(text=msg["content"])]))
-        contents.append(types.Content(role="user", parts=[types.Part.from_text(text=user_message)]))
+        contents.append(types.Content(role="user", parts=[
+            types.Part.from_text(text=current_time_note(now_str)),
+            types.Part.from_text(text=user_message),
+        ]))
 
         function_tools = self._build_function_tools()
 
         try:
+            from services.prompt_cache import prompt_cache
             response = await self.gemini_client.aio.models.generate_content(
                 model=chat_model,
                 contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt, tools=function_tools
+                config=await prompt_cache.config(
+                    self.gemini_client, chat_model, "chat_service:tools", system_prompt, tools=function_tools
                 ),
             )
 
@@ -332,7 +337,7 @@ class ChatService:
                 follow_up = await self.gemini_client.aio.models.generate_content(
                     model=chat_model,
                     contents=contents,
-                    config=types.GenerateContentConfig(system_instruction=system_prompt),
+                    config=await prompt_cache.config(self.gemini_client, chat_model, "partner_persona", system_prompt),
                 )
                 return follow_up.text.strip()
 
@@ -3,6 +3,7 @@ import datetime
 import json
 import logging
 import re
+import time
 from pathlib import Path
 from typing import Optional
 from config import JST
@@ -30,8 +31,8 @@ async def restore_db_from_drive(drive_service, drive_folder_id):
 
     起動毎に無条件で上書きすると、直近のバックアップが間に合っていない場合に
     ローカルの新しいメッセージが「古いDrive版」で潰され、チャットからメッセージが
-    消える事故が起きる。これを防ぐため、ローカルが存在する場合は Drive 版を一時
-    ファイルに落として「最新メッセージが新しい方」を採用する。"""
+    消える事故が起きる。これを防ぐため、Drive 版は一時ファイルに落とし、ローカルが
+    存在する場合は「最新メッセージが新しい方」を採用する。"""
     import os
     try:
         service = drive_service.get_service()
@@ -43,26 +44,32 @@ async def restore_db_from_drive(drive_service, drive_folder_id):
         file_id = await drive_service.find_file(service, bot_folder_id, "chat_history.db")
         if not file_id: return
 
-        # ローカルDBが無ければ無条件で復元（ホストのディスクが揮発した直後など）
-        if not DB_PATH.exists():
-            await drive_service.download_file(service, file_id, str(DB_PATH))
-            logging.info("[Database] chat_history.dbをGoogle Driveから復元しました（ローカル無し）。")
-            return
-
-        # ローカルがある場合は新旧比較してから採否を決める
+        # いったん一時ファイルに落とし、最後まで読めてから置き換える（途中で失敗・中断しても
+        # chat_history.db が書きかけのまま残らないように）
         tmp_path = str(DB_PATH) + ".drive_tmp"
-        await drive_service.download_file(service, file_id, tmp_path)
-        local_ts = _latest_message_ts(DB_PATH)
-        drive_ts = _latest_message_ts(tmp_path)
-        if drive_ts > local_ts:
-            os.replace(tmp_path, str(DB_PATH))
-            logging.info(f"[Database] Drive版が新しいため復元しました（local={local_ts!r} < drive={drive_ts!r}）。")
-        else:
+        try:
+            if not await drive_service.download_file(service, file_id, tmp_path):
+                logging.error("[Database] Drive版のダウンロードに失敗したため復元をスキップしました。")
+                return
+            # ローカルDBが無ければ無条件で復元（ホストのディスクが揮発した直後など）
+            if not DB_PATH.exists():
+                os.replace(tmp_path, str(DB_PATH))
+                logging.info("[Database] chat_history.dbをGoogle Driveから復元しました（ローカル無し）。")
+                return
+
+            # ローカルがある場合は新旧比較してから採否を決める
+            local_ts = _latest_message_ts(DB_PATH)
+            drive_ts = _latest_message_ts(tmp_path)
+            if drive_ts > local_ts:
+                os.replace(tmp_path, str(DB_PATH))
+                logging.info(f"[Database] Drive版が新しいため復元しました（local={local_ts!r} < drive={drive_ts!r}）。")
+            else:
+                logging.info(f"[Database] ローカルの方が新しいため復元をスキップしました（local={local_ts!r} >= drive={drive_ts!r}）。")
+        finally:
             try:
                 os.remove(tmp_path)
             except OSError:
                 pass
-            logging.info(f"[Database] ローカルの方が新しいため復元をスキップしました（local={local_ts!r} >= drive={drive_ts!r}）。")
     except Exception as e:
         logging.error(f"[Database] リストアに失敗しました: {e}")
 
@@ -98,6 +105,10 @@ async def init_db():
                 timestamp TEXT NOT NULL
             )
         """)
+        # 日付範囲での取得（get_messages_between）用。timestamp は JST の ISO 文字列なので範囲比較できる
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp)"
+        )
         await db.execute("""
             CREATE TABLE IF NOT EXISTS stocked_links (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -117,6 +128,24 @@ async def init_db():
                 created_at TEXT NOT NULL
             )
         """)
+        # Web Push の送信待ち・再送キュー（1 行 = 1 購読への 1 通知）
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS push_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                endpoint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TEXT NOT NULL,
+                last_status INTEGER,
+                latency_ms INTEGER,
+                delivered_at TEXT DEFAULT ''
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_push_outbox_due ON push_outbox(status, next_attempt_at)"
+        )
         await db.execute("""
             CREATE TABLE IF NOT EXISTS proactive_alerts_sent (
                 key TEXT PRIMARY KEY,
@@ -165,6 +194,11 @@ async def init_db():
         await db.execute(
             "CREATE INDEX IF NOT EXISTS idx_api_usage_model ON api_usage(model)"
         )
+        # in_tokens のうちコンテキストキャッシュから読まれた分（割安な単価で計算する）
+        try:
+            await db.execute("ALTER TABLE api_usage ADD COLUMN cached_tokens INTEGER DEFAULT 0")
+        except Exception:
+            pass  # 列がすでに存在
 
         # アプリ全体の設定（key-value）
         await db.execute("""
@@ -235,6 +269,67 @@ async def init_db():
             "CREATE INDEX IF NOT EXISTS idx_gmail_received ON gmail_inbox(received_at)"
         )
 
+        # Google Tasks のローカルミラー（services/google_tasks_service.py）。
+        # リスト名→ID の対応と、リストごとの最終同期時刻（updatedMin の起点）を持つ。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS gtasks_lists (
+                list_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL DEFAULT '',
+                synced_at TEXT DEFAULT '',
+                full_synced_at TEXT DEFAULT ''
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS gtasks_items (
+                list_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                title TEXT DEFAULT '',
+                notes TEXT DEFAULT '',
+                status TEXT DEFAULT 'needsAction',
+                due TEXT DEFAULT '',
+                completed TEXT DEFAULT '',
+                parent TEXT DEFAULT '',
+                position TEXT DEFAULT '',
+                hidden INTEGER DEFAULT 0,
+                updated TEXT DEFAULT '',
+                PRIMARY KEY (list_id, task_id)
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_gtasks_items_status ON gtasks_items(list_id, status)"
+        )
+
+        # Google カレンダーのローカルストア（services/google_calendar_service.py）。
+        # 予定は開始/終了を epoch 秒で持ち、日・時間窓の問い合わせを索引で引く。
+        # gcal_sync はカレンダーごとの syncToken と、全件同期で取り込んだ期間。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS gcal_events (
+                calendar_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                status TEXT DEFAULT '',
+                summary TEXT DEFAULT '',
+                description TEXT DEFAULT '',
+                location TEXT DEFAULT '',
+                start_epoch REAL NOT NULL,
+                end_epoch REAL NOT NULL,
+                all_day INTEGER DEFAULT 0,
+                raw TEXT NOT NULL,
+                PRIMARY KEY (calendar_id, event_id)
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_gcal_events_start ON gcal_events(calendar_id, start_epoch)"
+        )
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS gcal_sync (
+                calendar_id TEXT PRIMARY KEY,
+                sync_token TEXT DEFAULT '',
+                window_start REAL DEFAULT 0,
+                window_end REAL DEFAULT 0,
+                synced_at TEXT DEFAULT ''
+            )
+        """)
+
         # YouTube 登録チャンネル（subscriptions.list の結果をキャッシュ）
         await db.execute("""
             CREATE TABLE IF NOT EXISTS youtube_channels (
@@ -358,6 +453,247 @@ async def init_db():
             "CREATE INDEX IF NOT EXISTS idx_ohlcv_code_date ON stock_ohlcv(code, date)"
         )
 
+        # ファンダの型付きスナップショット（1 行 = 銘柄×項目）。項目ごとに取得時刻を持ち、
+        # 価格連動の指標は当日限り・決算由来は数日…と項目単位で鮮度を判定する。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS fundamentals_snapshot (
+                code TEXT NOT NULL,
+                field TEXT NOT NULL,
+                num_value REAL,
+                text_value TEXT,
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (code, field)
+            )
+        """)
+
+        # 投資アラートの発火状態（services/alert_engine.py）。条件を満たしている間は active=1 で、
+        # 満たさない→満たすへ変わった時だけ通知する（1 回の越境で 1 回）。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS alert_rule_state (
+                state_key TEXT PRIMARY KEY,
+                active INTEGER NOT NULL DEFAULT 0,
+                last_value REAL,
+                changed_at TEXT NOT NULL,
+                fired_at TEXT DEFAULT ''
+            )
+        """)
+
+        # 投資データ（保有・ロット・取引・日記・アラート）。正本は SQLite で、Drive の
+        # Investment/ 以下の JSON / Markdown は services/investment_store.py が遅延で書き出す写し。
+        # 列に無い項目は extra（JSON）に入れて往復させる。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_holdings (
+                code TEXT PRIMARY KEY,
+                ticker TEXT DEFAULT '',
+                market TEXT DEFAULT '',
+                name TEXT DEFAULT '',
+                sector TEXT DEFAULT '',
+                shares REAL NOT NULL DEFAULT 0,
+                avg_cost REAL NOT NULL DEFAULT 0,
+                account TEXT DEFAULT 'taxable',
+                currency TEXT DEFAULT '',
+                opened_at TEXT DEFAULT '',
+                updated_at TEXT DEFAULT '',
+                notes TEXT DEFAULT '',
+                preferred_method TEXT DEFAULT '',
+                extra TEXT DEFAULT '{}'
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_lots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                code TEXT NOT NULL,
+                opened_at TEXT NOT NULL,
+                shares REAL NOT NULL,
+                price REAL NOT NULL,
+                remaining REAL NOT NULL
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_lots_code ON inv_lots(code, opened_at)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                action TEXT NOT NULL,
+                code TEXT DEFAULT '',
+                name TEXT DEFAULT '',
+                shares REAL,
+                price REAL,
+                avg_cost REAL,
+                realized_pnl REAL,
+                realized_pnl_pct REAL,
+                notes TEXT DEFAULT '',
+                extra TEXT DEFAULT '{}'
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_tx_ts ON inv_transactions(ts)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_tx_action ON inv_transactions(action, ts)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_tx_code ON inv_transactions(code, ts)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_journal (
+                filename TEXT PRIMARY KEY,
+                date TEXT NOT NULL,
+                time TEXT DEFAULT '',
+                title TEXT DEFAULT '',
+                ticker TEXT DEFAULT '',
+                action TEXT DEFAULT '',
+                emotion TEXT DEFAULT '',
+                content TEXT,
+                updated_at TEXT DEFAULT '',
+                extra TEXT DEFAULT '{}'
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_journal_date ON inv_journal(date, time)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_journal_ticker ON inv_journal(ticker, date)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_alert_rules (
+                id INTEGER PRIMARY KEY,
+                ticker TEXT DEFAULT '',
+                code TEXT DEFAULT '',
+                market TEXT DEFAULT '',
+                type TEXT NOT NULL,
+                threshold REAL NOT NULL DEFAULT 0,
+                enabled INTEGER NOT NULL DEFAULT 1,
+                memo TEXT DEFAULT '',
+                created_at TEXT DEFAULT '',
+                extra TEXT DEFAULT '{}'
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_alert_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                rule_id INTEGER,
+                code TEXT DEFAULT '',
+                payload TEXT NOT NULL
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_alert_events_ts ON inv_alert_events(ts)")
+        # 銘柄リサーチ（スナップショット・審査・同業比較・配当・決算・CEO 検証）の結果キャッシュ。
+        # (種別, 銘柄, 営業日, プロンプト版, 追加パラメータ) ごとに 1 件（services/research_cache.py）
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS research_artifacts (
+                kind TEXT NOT NULL,
+                code TEXT NOT NULL,
+                trading_day TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                params_key TEXT NOT NULL DEFAULT '',
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (kind, code, trading_day, prompt_version, params_key)
+            )
+        """)
+        # Gemini 応答キャッシュ（services/gemini_gateway.py）。key は (モデル, contents, config) のハッシュ
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS gemini_response_cache (
+                key TEXT PRIMARY KEY,
+                feature TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                in_tokens INTEGER DEFAULT 0,
+                out_tokens INTEGER DEFAULT 0,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_gemini_response_cache_exp ON gemini_response_cache(expires_at)"
+        )
+        # Gemini のコンテキストキャッシュ（services/prompt_cache.py）。key はモデル＋固定プレフィックスのハッシュ、
+        # name は API 側のキャッシュ名（cachedContents/...）。再起動後も期限まで使い回す
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS gemini_context_caches (
+                key TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                model TEXT NOT NULL,
+                name TEXT NOT NULL,
+                token_count INTEGER DEFAULT 0,
+                expires_at REAL NOT NULL
+            )
+        """)
+        # 機能ごと・日ごとのキャッシュ効果（コストダッシュボード用）
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS gemini_cache_stats (
+                date TEXT NOT NULL,
+                feature TEXT NOT NULL,
+                hits INTEGER DEFAULT 0,
+                misses INTEGER DEFAULT 0,
+                coalesced INTEGER DEFAULT 0,
+                saved_in_tokens INTEGER DEFAULT 0,
+                saved_out_tokens INTEGER DEFAULT 0,
+                saved_usd REAL DEFAULT 0,
+                PRIMARY KEY (date, feature)
+            )
+        """)
+        # Investment/ 以下に保存した Markdown の索引（list_history / read_history_item 用）。
+        # content が NULL の行は Drive 上にしか本文が無い（初回閲覧時に取り込む）
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_notes (
+                subfolder TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                modified_at TEXT NOT NULL,
+                content TEXT,
+                PRIMARY KEY (subfolder, filename)
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_notes_recent ON inv_notes(subfolder, modified_at)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_inv_notes_file ON inv_notes(file_id)")
+        # Drive への書き出しが済んでいない項目（再起動をまたいで残す）
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS inv_export_dirty (
+                key TEXT PRIMARY KEY,
+                marked_at TEXT NOT NULL
+            )
+        """)
+
+        # 保有銘柄ニュース（services/news_pipeline.py）。レポートは (銘柄, 営業日, プロンプト版) ごとに
+        # 1 件キャッシュし、ニュース項目は見出しの正規化ハッシュで重複を判定する。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS news_reports (
+                code TEXT NOT NULL,
+                trading_day TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                market TEXT DEFAULT '',
+                report TEXT NOT NULL,
+                saved_as TEXT DEFAULT '',
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (code, trading_day, prompt_version)
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_news_reports_day ON news_reports(trading_day)"
+        )
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS news_items (
+                code TEXT NOT NULL,
+                item_hash TEXT NOT NULL,
+                headline TEXT NOT NULL,
+                section TEXT DEFAULT '',
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                notified_on TEXT DEFAULT '',
+                PRIMARY KEY (code, item_hash)
+            )
+        """)
+        # 配信で初めて差分に出した暦日（週末は金曜のレポートを使い回すので、営業日だけでは再送してしまう）
+        try:
+            await db.execute("ALTER TABLE news_items ADD COLUMN notified_on TEXT DEFAULT ''")
+        except Exception:
+            pass  # 列がすでに存在
+
+        # テクニカル指標の逐次状態（services/indicator_state.py）。OHLCV 追記時に O(1) で前進。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS indicator_state (
+                code TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                last_date TEXT NOT NULL,
+                bars INTEGER DEFAULT 0,
+                state TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
         # スクリーナーの非同期ジョブ管理
         await db.execute("""
             CREATE TABLE IF NOT EXISTS screener_jobs (
@@ -379,6 +715,97 @@ async def init_db():
             "CREATE INDEX IF NOT EXISTS idx_screener_jobs_status ON screener_jobs(status)"
         )
 
+        # ストックリンクの一括補完（タグ・サムネイル）ジョブ。pending_json は未処理の
+        # link_id（{"tags": [...], "thumbnails": [...]}）で、再起動後はここから再開する。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS link_enrich_jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                options_json TEXT DEFAULT '{}',
+                pending_json TEXT DEFAULT '{}',
+                progress_current INTEGER DEFAULT 0,
+                progress_total INTEGER DEFAULT 0,
+                tagged INTEGER DEFAULT 0,
+                thumbnails INTEGER DEFAULT 0,
+                error TEXT DEFAULT '',
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        # URL 単位のサムネイル取得結果（同じ URL のリンク・再実行で取り直さない）
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS link_url_cache (
+                url TEXT PRIMARY KEY,
+                thumbnail TEXT DEFAULT '',
+                fetched_at TEXT NOT NULL
+            )
+        """)
+
+        # 定時ジョブ（services/job_scheduler.py）の実行履歴。scheduled_for は本来の実行枠
+        # （ジッタ前の時刻）で、再起動後の取りこぼし判定（catch-up）と同じ枠の二重実行防止に使う。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS scheduled_job_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_key TEXT NOT NULL,
+                scheduled_for TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                finished_at TEXT DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'running',
+                error TEXT DEFAULT '',
+                duration_ms INTEGER DEFAULT 0
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_job_runs_key "
+            "ON scheduled_job_runs(job_key, scheduled_for)"
+        )
+
+        # 起動ごとのフェーズ別所要時間（utils/startup.py の report）。コールドスタートの悪化を比べる用
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS startup_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL,
+                total_sec REAL NOT NULL DEFAULT 0,
+                report TEXT NOT NULL DEFAULT '{}'
+            )
+        """)
+
+        # デイリーノート（DailyNotes/YYYY-MM-DD.md）の見出し（## ）単位の索引。
+        # 書き込み・読み込み・差分同期のたびに更新し、期間レビュー等は Drive を読まずにここを引く。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS note_sections (
+                note_date TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                heading TEXT NOT NULL,
+                body TEXT NOT NULL DEFAULT '',
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (note_date, position)
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_note_sections_heading ON note_sections(heading, note_date)"
+        )
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS note_index_files (
+                note_date TEXT PRIMARY KEY,
+                file_id TEXT DEFAULT '',
+                note_hash TEXT NOT NULL,
+                modified_time TEXT DEFAULT '',
+                indexed_at TEXT NOT NULL
+            )
+        """)
+
+        # Daily Log の時間帯別要約のキャッシュ。発言集合のハッシュが同じなら再生成しない
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS timeline_summaries (
+                date TEXT PRIMARY KEY,
+                msg_hash TEXT NOT NULL,
+                summaries TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+
         await db.execute("""
             CREATE TABLE IF NOT EXISTS watchlist (
                 code TEXT PRIMARY KEY,
@@ -436,6 +863,28 @@ async def init_db():
         await db.execute(
             "CREATE INDEX IF NOT EXISTS idx_decision_reviews_status ON decision_reviews(status, decided_at)"
         )
+        # 答え合わせ結果の集計用（1 判断 × 1 期日 = 1 行）。decision_reviews.checkpoints の
+        # JSON を毎回全件展開しなくても、的中率レポートを期日ごとの索引付き集計で出せる。
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS decision_outcomes (
+                review_id INTEGER NOT NULL,
+                horizon TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                return_pct REAL,
+                benchmark_return_pct REAL,
+                excess_pct REAL,
+                is_exit INTEGER DEFAULT 0,
+                trend_state TEXT DEFAULT '',
+                rec_action TEXT DEFAULT '',
+                style TEXT DEFAULT '',
+                true_signals TEXT DEFAULT '[]',
+                verified_at TEXT,
+                PRIMARY KEY (review_id, horizon)
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_decision_outcomes_horizon ON decision_outcomes(horizon, outcome)"
+        )
 
         # マネージャー通知ログ（長文の自動通知をチャットから分離して保存）
         await db.execute("""
@@ -524,6 +973,28 @@ async def init_db():
             except aiosqlite.OperationalError:
                 pass
 
+        # 一度きりの移行: decision_outcomes 導入前に答え合わせ済みの判断を集計表へ写す。
+        cur = await db.execute(
+            "SELECT value FROM app_settings WHERE key = ?", ("decision_outcomes_v1",)
+        )
+        if not await cur.fetchone():
+            try:
+                db.row_factory = aiosqlite.Row
+                cur = await db.execute("SELECT * FROM decision_reviews WHERE checkpoints != '{}'")
+                reviews = [_decision_row_to_dict(r) for r in await cur.fetchall()]
+                db.row_factory = None
+                await db.executemany(
+                    _DECISION_OUTCOME_UPSERT,
+                    [t for r in reviews for t in _decision_outcome_tuples(r, r["checkpoints"])],
+                )
+                await db.execute(
+                    "INSERT OR REPLACE INTO app_settings (key, value, updated_at) VALUES (?, ?, ?)",
+                    ("decision_outcomes_v1", "1", datetime.datetime.now(JST).isoformat()),
+                )
+            except aiosqlite.OperationalError as e:
+                db.row_factory = None
+                logging.debug(f"decision_outcomes 移行失敗: {e}")
+
         await db.commit()
 
 
@@ -695,6 +1166,20 @@ async def mark_message_action_consumed(message_id: int, action_payload: str) ->
         return True
 
 
+async def get_messages_between(start: str, end: str, role: str | None = None) -> list[dict]:
+    """timestamp が [start, end) の発言を古い順に返す（start/end は 'YYYY-MM-DD' 等の ISO 文字列）。"""
+    sql = "SELECT id, role, content, timestamp FROM messages WHERE timestamp >= ? AND timestamp < ?"
+    params: list = [start, end]
+    if role:
+        sql += " AND role = ?"
+        params.append(role)
+    sql += " ORDER BY id"
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, params)
+        return [dict(r) for r in await cursor.fetchall()]
+
+
 async def get_todays_log():
     """今日の会話ログをテキスト形式で取得"""
     today = datetime.datetime.now(JST).strftime("%Y-%m-%d")
@@ -921,6 +1406,129 @@ async def get_all_push_subscriptions() -> list[dict]:
         return [dict(row) for row in rows]
 
 
+# --- Push Outbox ---
+
+_PUSH_CLAIM_LEASE_SEC = 300  # 積んだ直後・送信中（'sending'）のまま落ちた行は、この秒数を過ぎたら拾い直す
+
+
+async def push_outbox_enqueue(endpoints: list[str], payload: str) -> list[int]:
+    """同じ payload を購読ごとに 1 行ずつ積み、行 ID を返す。
+    すぐ後に呼び出し側が ids で送るので、再送（時刻が来た行の取り出し）は猶予が過ぎるまで拾わない。"""
+    now_dt = datetime.datetime.now(JST)
+    now = now_dt.isoformat()
+    retry_from = (now_dt + datetime.timedelta(seconds=_PUSH_CLAIM_LEASE_SEC)).isoformat()
+    ids = []
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        for endpoint in endpoints:
+            cursor = await db.execute(
+                "INSERT INTO push_outbox (endpoint, payload, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (endpoint, payload, now, retry_from),
+            )
+            ids.append(cursor.lastrowid)
+        await db.commit()
+    return ids
+
+
+async def push_outbox_claim(ids: list[int] | None = None, limit: int = 200) -> list[dict]:
+    """送信待ちの行を 'sending' にして取り出し、購読キー付きで返す。ids 指定時はその行だけ、
+    無指定なら再送時刻が来た行（送信中のまま期限が切れた行を含む）。
+    取り出しは 1 トランザクションで行うので、即時送信と再送・再送同士が同じ行を二重に送らない。
+    購読が消えている行は 'orphaned' にして返さない。"""
+    now = datetime.datetime.now(JST)
+    now_iso = now.isoformat()
+    lease_until = (now + datetime.timedelta(seconds=_PUSH_CLAIM_LEASE_SEC)).isoformat()
+    sql = (
+        "SELECT o.id, o.endpoint, o.payload, o.created_at, o.attempts, s.p256dh, s.auth "
+        "FROM push_outbox o LEFT JOIN push_subscriptions s ON s.endpoint = o.endpoint "
+    )
+    params: list = []
+    if ids is not None:
+        if not ids:
+            return []
+        sql += f"WHERE o.status = 'pending' AND o.id IN ({','.join('?' for _ in ids)})"
+        params += list(ids)
+    else:
+        sql += "WHERE o.status IN ('pending', 'sending') AND o.next_attempt_at <= ?"
+        params.append(now_iso)
+    sql += " ORDER BY o.id LIMIT ?"
+    params.append(limit)
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        await db.execute("BEGIN IMMEDIATE")  # 読んでから印を付けるまで他の取り出しを待たせる
+        cursor = await db.execute(sql, params)
+        rows = [dict(r) for r in await cursor.fetchall()]
+        orphans = [r["id"] for r in rows if r["p256dh"] is None]
+        claimed = [r for r in rows if r["p256dh"] is not None]
+        if orphans:
+            await db.execute(
+                f"UPDATE push_outbox SET status = 'orphaned' WHERE id IN ({','.join('?' for _ in orphans)})",
+                orphans,
+            )
+        if claimed:
+            await db.execute(
+                f"UPDATE push_outbox SET status = 'sending', next_attempt_at = ? "
+                f"WHERE id IN ({','.join('?' for _ in claimed)})",
+                [lease_until, *(r["id"] for r in claimed)],
+            )
+        await db.commit()
+    return claimed
+
+
+async def push_outbox_update(results: list[dict]) -> None:
+    """送信結果をまとめて書き戻す。各要素は id / status / attempts / last_status / latency_ms /
+    next_attempt_at（再送時）を持つ。"""
+    if not results:
+        return
+    now = datetime.datetime.now(JST).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            "UPDATE push_outbox SET status = ?, attempts = ?, last_status = ?, latency_ms = ?, "
+            "next_attempt_at = COALESCE(?, next_attempt_at), "
+            "delivered_at = CASE WHEN ? = 'sent' THEN ? ELSE delivered_at END WHERE id = ?",
+            [
+                (
+                    r["status"], r["attempts"], r.get("last_status"), r.get("latency_ms"),
+                    r.get("next_attempt_at"), r["status"], now, r["id"],
+                )
+                for r in results
+            ],
+        )
+        await db.commit()
+
+
+async def push_outbox_prune(days: int = 7) -> int:
+    """送信済み・破棄済みの古い行を消す。"""
+    cutoff = (datetime.datetime.now(JST) - datetime.timedelta(days=days)).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "DELETE FROM push_outbox WHERE status NOT IN ('pending', 'sending') AND created_at < ?", (cutoff,)
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+async def push_delivery_stats(hours: int = 24) -> dict:
+    """直近 hours 時間の状態別件数と、送信成功分の往復時間（ms）の平均・最大・p95。"""
+    since = (datetime.datetime.now(JST) - datetime.timedelta(hours=hours)).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT status, COUNT(*) FROM push_outbox WHERE created_at >= ? GROUP BY status", (since,)
+        )
+        counts = {row[0]: row[1] for row in await cursor.fetchall()}
+        cursor = await db.execute(
+            "SELECT latency_ms FROM push_outbox WHERE status = 'sent' AND created_at >= ? "
+            "AND latency_ms IS NOT NULL ORDER BY latency_ms",
+            (since,),
+        )
+        latencies = [row[0] for row in await cursor.fetchall()]
+    out = {"counts": counts, "sent": len(latencies)}
+    if latencies:
+        out["avg_ms"] = round(sum(latencies) / len(latencies), 1)
+        out["p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        out["max_ms"] = latencies[-1]
+    return out
+
+
 # --- Proactive Alerts dedup ---
 
 async def mark_alert_sent(key: str) -> bool:
@@ -1128,21 +1736,25 @@ async def delete_daily_questions_by_date(date: str, scopes: list[str] | None = N
 
 # --- API Usage (コストメーター) ---
 
-async def record_api_usage(model: str, in_tokens: int, out_tokens: int, source: str = "") -> None:
-    """Gemini API 呼び出し 1 回分の使用量を記録する。"""
+async def record_api_usage(
+    model: str, in_tokens: int, out_tokens: int, source: str = "", cached_tokens: int = 0
+) -> None:
+    """Gemini API 呼び出し 1 回分の使用量を記録する。cached_tokens は in_tokens のうちキャッシュ読み出し分。"""
     if not model:
         return
     in_tokens = max(0, int(in_tokens or 0))
     out_tokens = max(0, int(out_tokens or 0))
+    cached_tokens = min(max(0, int(cached_tokens or 0)), in_tokens)
     if in_tokens == 0 and out_tokens == 0:
         return  # メタ情報が無い呼び出しは記録しない（誤計測を避ける）
     now = datetime.datetime.now(JST)
     date_str = now.strftime("%Y-%m-%d")
     async with aiosqlite.connect(str(DB_PATH)) as db:
         await db.execute(
-            "INSERT INTO api_usage (date, model, source, in_tokens, out_tokens, request_count, created_at) "
-            "VALUES (?, ?, ?, ?, ?, 1, ?)",
-            (date_str, model, source or "", in_tokens, out_tokens, now.isoformat()),
+            "INSERT INTO api_usage "
+            "(date, model, source, in_tokens, out_tokens, cached_tokens, request_count, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 1, ?)",
+            (date_str, model, source or "", in_tokens, out_tokens, cached_tokens, now.isoformat()),
         )
         await db.commit()
 
@@ -1153,7 +1765,7 @@ async def get_api_usage_by_day(start_date: str, end_date: str) -> list[dict]:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT date, model, SUM(in_tokens) AS in_tokens, SUM(out_tokens) AS out_tokens, "
-            "SUM(request_count) AS request_count "
+            "COALESCE(SUM(cached_tokens), 0) AS cached_tokens, SUM(request_count) AS request_count "
             "FROM api_usage WHERE date BETWEEN ? AND ? "
             "GROUP BY date, model ORDER BY date ASC",
             (start_date, end_date),
@@ -1168,7 +1780,7 @@ async def get_api_usage_by_model(start_date: str, end_date: str) -> list[dict]:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT model, SUM(in_tokens) AS in_tokens, SUM(out_tokens) AS out_tokens, "
-            "SUM(request_count) AS request_count "
+            "COALESCE(SUM(cached_tokens), 0) AS cached_tokens, SUM(request_count) AS request_count "
             "FROM api_usage WHERE date BETWEEN ? AND ? "
             "GROUP BY model ORDER BY SUM(out_tokens) DESC",
             (start_date, end_date),
@@ -1197,6 +1809,15 @@ async def set_app_setting(key: str, value: str) -> None:
         await db.commit()
 
 
+async def get_app_settings_prefix(prefix: str) -> dict:
+    """prefix で始まるキーの設定をまとめて返す（{key: value}）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT key, value FROM app_settings WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        )
+        return {k: v for k, v in await cursor.fetchall()}
+
+
 # --- Manager Notices (長文自動通知のログ) ---
 
 async def add_manager_notice(category: str, title: str, body: str) -> int:
@@ -1607,10 +2228,15 @@ async def gmail_list(state: str = "pending", limit: int = 50) -> list[dict]:
 # --- Stock OHLCV Cache (日本株スクリーナー用) ---
 
 async def upsert_ohlcv_rows(code: str, rows: list[dict]) -> int:
-    """OHLCV 行群を upsert する。rows は {date, open, high, low, close, volume} のリスト。"""
+    """OHLCV 行群を upsert する。rows は {date, open, high, low, close, volume} のリスト。
+
+    同じ接続内で指標の逐次状態（indicator_state）も更新する。新しい日付の追記だけなら
+    状態を 1 本ずつ前進させ、既存日付の値が変わった（遡及調整）ときだけ全履歴から作り直す。"""
     if not rows:
         return 0
     async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        revised = await _ohlcv_rows_revise_history(db, code, rows)
         await db.executemany(
             "INSERT INTO stock_ohlcv (code, date, open, high, low, close, volume) "
             "VALUES (?, ?, ?, ?, ?, ?, ?) "
@@ -1630,22 +2256,104 @@ async def upsert_ohlcv_rows(code: str, rows: list[dict]) -> int:
                 for r in rows
             ],
         )
+        try:
+            await _advance_indicator_state(db, code, rows, rebuild=revised)
+        except Exception as e:
+            # 状態は派生データなので、失敗しても OHLCV 本体の保存は止めない（次回作り直す）
+            logging.debug(f"indicator_state 更新失敗 {code}: {e}")
+            await db.execute("DELETE FROM indicator_state WHERE code = ?", (code,))
         await db.commit()
         return len(rows)
 
 
-async def get_ohlcv_range(code: str, start_date: str | None = None, end_date: str | None = None) -> list[dict]:
-    """code の OHLCV を [start_date, end_date] で日付昇順に取得。"""
-    async with aiosqlite.connect(str(DB_PATH)) as db:
-        db.row_factory = aiosqlite.Row
-        query = "SELECT date, open, high, low, close, volume FROM stock_ohlcv WHERE code = ?"
-        params: list = [code]
-        if start_date:
-            query += " AND date >= ?"
-            params.append(start_date)
-        if end_date:
-            query += " AND date <= ?"
-            params.append(end_date)
+async def _ohlcv_rows_revise_history(db, code: str, rows: list[dict]) -> bool:
+    """upsert 前に呼び、rows が既存履歴を書き換える（＝追記ではない）かを判定する。
+
+    指標状態の最終日以前に「値の違う行」か「新しく差し込まれる行」があれば True。"""
+    from services.indicator_state import rows_differ
+
+    cursor = await db.execute("SELECT last_date FROM indicator_state WHERE code = ?", (code,))
+    st = await cursor.fetchone()
+    if not st:
+        return False
+    last_date = st["last_date"]
+    overlap = {r.get("date"): r for r in rows if r.get("date") and r.get("date") <= last_date}
+    if not overlap:
+        return False
+    cursor = await db.execute(
+        "SELECT date, open, high, low, close, volume FROM stock_ohlcv "
+        "WHERE code = ? AND date >= ? AND date <= ?",
+        (code, min(overlap), last_date),
+    )
+    existing = {r["date"]: dict(r) for r in await cursor.fetchall()}
+    for date, r in overlap.items():
+        old = existing.get(date)
+        if old is None or rows_differ(old, r):
+            return True
+    return False
+
+
+async def _advance_indicator_state(db, code: str, rows: list[dict], *, rebuild: bool = False) -> None:
+    """indicator_state を新しい足のぶんだけ前進させる（rebuild=True なら全履歴から再構築）。"""
+    from services.indicator_state import IndicatorState, STATE_VERSION
+
+    state = None
+    if not rebuild:
+        cursor = await db.execute("SELECT state FROM indicator_state WHERE code = ?", (code,))
+        row = await cursor.fetchone()
+        state = IndicatorState.from_json(row["state"]) if row else None
+    if state is None:
+        cursor = await db.execute(
+            "SELECT date, open, high, low, close, volume FROM stock_ohlcv "
+            "WHERE code = ? ORDER BY date ASC",
+            (code,),
+        )
+        state = IndicatorState.from_rows(dict(r) for r in await cursor.fetchall())
+    else:
+        fresh = sorted(
+            (r for r in rows if r.get("date") and r["date"] > state.last_date),
+            key=lambda r: r["date"],
+        )
+        if not fresh:
+            return
+        state.extend(fresh)
+    if not state.last_date:
+        return
+    await db.execute(
+        "INSERT INTO indicator_state (code, version, last_date, bars, state, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(code) DO UPDATE SET version=excluded.version, last_date=excluded.last_date, "
+        "bars=excluded.bars, state=excluded.state, updated_at=excluded.updated_at",
+        (code, STATE_VERSION, state.last_date, state.bars, state.to_json(),
+         datetime.datetime.now(JST).isoformat()),
+    )
+
+
+async def get_indicator_snapshot(code: str) -> dict | None:
+    """code の指標状態から現在値のスナップショットを返す。状態が無い/版違いなら None。"""
+    from services.indicator_state import IndicatorState
+
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute("SELECT state FROM indicator_state WHERE code = ?", (code,))
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    state = IndicatorState.from_json(row[0])
+    return state.snapshot() if state else None
+
+
+async def get_ohlcv_range(code: str, start_date: str | None = None, end_date: str | None = None) -> list[dict]:
+    """code の OHLCV を [start_date, end_date] で日付昇順に取得。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        query = "SELECT date, open, high, low, close, volume FROM stock_ohlcv WHERE code = ?"
+        params: list = [code]
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
         query += " ORDER BY date ASC"
         cursor = await db.execute(query, tuple(params))
         rows = await cursor.fetchall()
@@ -1662,6 +2370,116 @@ async def get_ohlcv_latest_date(code: str) -> str | None:
         return row[0] if row and row[0] else None
 
 
+# --- Fundamentals Snapshot (項目別の鮮度つきファンダ) ---
+
+async def fundamentals_snapshot_get(code: str) -> dict:
+    """{field: {"num": float|None, "text": str|None, "fetched_at": iso}} を返す（無ければ {}）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT field, num_value, text_value, fetched_at FROM fundamentals_snapshot WHERE code = ?",
+            (code,),
+        )
+        rows = await cursor.fetchall()
+    return {
+        r["field"]: {"num": r["num_value"], "text": r["text_value"], "fetched_at": r["fetched_at"]}
+        for r in rows
+    }
+
+
+async def fundamentals_snapshot_many(codes: list[str], fields: list[str]) -> dict:
+    """複数銘柄の指定項目を 1 クエリで {code: {field: {"num", "text", "fetched_at"}}} として返す。"""
+    if not codes or not fields:
+        return {}
+    out: dict = {}
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT code, field, num_value, text_value, fetched_at FROM fundamentals_snapshot "
+            f"WHERE code IN ({','.join('?' for _ in codes)}) AND field IN ({','.join('?' for _ in fields)})",
+            [*codes, *fields],
+        )
+        for code, field, num, text, fetched_at in await cursor.fetchall():
+            out.setdefault(code, {})[field] = {"num": num, "text": text, "fetched_at": fetched_at}
+    return out
+
+
+async def get_ohlcv_closes_many(codes: list[str], start_date: str) -> dict:
+    """複数銘柄の start_date 以降の終値を 1 クエリで {code: [(date, close), ...]}（日付昇順）として返す。"""
+    if not codes:
+        return {}
+    out: dict = {}
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT code, date, close FROM stock_ohlcv "
+            f"WHERE code IN ({','.join('?' for _ in codes)}) AND date >= ? AND close IS NOT NULL "
+            "ORDER BY code, date",
+            [*codes, start_date],
+        )
+        for code, date, close in await cursor.fetchall():
+            out.setdefault(code, []).append((date, close))
+    return out
+
+
+async def alert_states_get() -> dict:
+    """{state_key: {"active": bool, "last_value", "changed_at", "fired_at"}}"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT state_key, active, last_value, changed_at, fired_at FROM alert_rule_state"
+        )
+        return {
+            r["state_key"]: {
+                "active": bool(r["active"]), "last_value": r["last_value"],
+                "changed_at": r["changed_at"], "fired_at": r["fired_at"],
+            }
+            for r in await cursor.fetchall()
+        }
+
+
+async def alert_states_put(rows: list[dict], drop_except: list[str] | None = None) -> None:
+    """状態を upsert する。drop_except を渡すと、それ以外のキー（削除されたルール分）を消す。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        if rows:
+            await db.executemany(
+                "INSERT INTO alert_rule_state (state_key, active, last_value, changed_at, fired_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(state_key) DO UPDATE SET "
+                "active = excluded.active, last_value = excluded.last_value, "
+                "changed_at = excluded.changed_at, fired_at = excluded.fired_at",
+                [
+                    (r["state_key"], 1 if r["active"] else 0, r.get("last_value"),
+                     r["changed_at"], r.get("fired_at") or "")
+                    for r in rows
+                ],
+            )
+        if drop_except is not None:
+            if drop_except:
+                await db.execute(
+                    f"DELETE FROM alert_rule_state WHERE state_key NOT IN ({','.join('?' for _ in drop_except)})",
+                    drop_except,
+                )
+            else:
+                await db.execute("DELETE FROM alert_rule_state")
+        await db.commit()
+
+
+async def fundamentals_snapshot_put(code: str, fields: dict) -> None:
+    """fields = {field: {"num", "text", "fetched_at"}} を upsert する。"""
+    if not fields:
+        return
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            "INSERT INTO fundamentals_snapshot (code, field, num_value, text_value, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(code, field) DO UPDATE SET num_value=excluded.num_value, "
+            "text_value=excluded.text_value, fetched_at=excluded.fetched_at",
+            [
+                (code, k, v.get("num"), v.get("text"), v.get("fetched_at"))
+                for k, v in fields.items()
+            ],
+        )
+        await db.commit()
+
+
 # --- Screener Jobs ---
 
 async def screener_job_create(job_id: str, style: str, total: int) -> None:
@@ -1748,6 +2566,284 @@ async def screener_job_latest_done(style: str) -> dict | None:
         return dict(row) if row else None
 
 
+# --- Link Enrich Jobs ---
+
+async def link_enrich_job_create(job_id: str, kind: str, pending: dict, options: dict | None = None) -> None:
+    now = datetime.datetime.now(JST).isoformat()
+    total = sum(len(v) for v in pending.values())
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT INTO link_enrich_jobs (job_id, kind, status, options_json, pending_json, "
+            "progress_total, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(options or {}), json.dumps(pending), total, now, now),
+        )
+        await db.commit()
+
+
+async def link_enrich_job_update(job_id: str, **fields) -> bool:
+    """ジョブの列を更新する。pending は dict のまま渡せば JSON にして保存する。"""
+    allowed = {"status", "pending", "progress_current", "progress_total", "tagged", "thumbnails", "error"}
+    sets = []
+    values = []
+    for k, v in fields.items():
+        if k not in allowed:
+            continue
+        if k == "pending":
+            k, v = "pending_json", json.dumps(v)
+        sets.append(f"{k} = ?")
+        values.append(v)
+    if not sets:
+        return False
+    sets.append("updated_at = ?")
+    values.append(datetime.datetime.now(JST).isoformat())
+    values.append(job_id)
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            f"UPDATE link_enrich_jobs SET {', '.join(sets)} WHERE job_id = ?", tuple(values)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+def _link_enrich_row(row) -> dict:
+    d = dict(row)
+    d["options"] = json.loads(d.pop("options_json") or "{}")
+    d["pending"] = json.loads(d.pop("pending_json") or "{}")
+    return d
+
+
+async def link_enrich_job_get(job_id: str) -> dict | None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM link_enrich_jobs WHERE job_id = ?", (job_id,))
+        row = await cursor.fetchone()
+        return _link_enrich_row(row) if row else None
+
+
+async def link_enrich_jobs_unfinished() -> list[dict]:
+    """queued/running のジョブ（再起動で中断されたものを含む）を古い順に返す。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM link_enrich_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        )
+        return [_link_enrich_row(r) for r in await cursor.fetchall()]
+
+
+async def link_url_cache_get_many(urls: list[str], max_age_days: int = 30) -> dict:
+    """URL → キャッシュ済みサムネイル（取得失敗は '__none__'）。max_age_days より古いものは除く。"""
+    if not urls:
+        return {}
+    since = (datetime.datetime.now(JST) - datetime.timedelta(days=max_age_days)).isoformat()
+    out: dict = {}
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            cursor = await db.execute(
+                f"SELECT url, thumbnail FROM link_url_cache WHERE url IN ({','.join('?' for _ in chunk)}) "
+                "AND fetched_at >= ?",
+                (*chunk, since),
+            )
+            out.update({r[0]: r[1] for r in await cursor.fetchall()})
+    return out
+
+
+async def link_url_cache_put(url: str, thumbnail: str) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO link_url_cache (url, thumbnail, fetched_at) VALUES (?, ?, ?)",
+            (url, thumbnail, datetime.datetime.now(JST).isoformat()),
+        )
+        await db.commit()
+
+
+# --- Scheduled Job Runs ---
+
+async def job_run_start(job_key: str, scheduled_for: str, status: str = "running") -> int:
+    now = datetime.datetime.now(JST).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "INSERT INTO scheduled_job_runs (job_key, scheduled_for, started_at, status, finished_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (job_key, scheduled_for, now, status, "" if status == "running" else now),
+        )
+        await db.commit()
+        return cursor.lastrowid
+
+
+async def job_run_finish(run_id: int, status: str, error: str = "", duration_ms: int = 0) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "UPDATE scheduled_job_runs SET status = ?, error = ?, duration_ms = ?, finished_at = ? "
+            "WHERE id = ?",
+            (status, error[:500], duration_ms, datetime.datetime.now(JST).isoformat(), run_id),
+        )
+        await db.commit()
+
+
+async def job_run_last_slots() -> dict:
+    """ジョブごとの最後に処理した実行枠（{job_key: scheduled_for}）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT job_key, MAX(scheduled_for) FROM scheduled_job_runs GROUP BY job_key"
+        )
+        return {k: v for k, v in await cursor.fetchall()}
+
+
+_STARTUP_RUNS_KEEP = 200
+
+
+async def startup_run_add(started_at: str, total_sec: float, report: dict) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT INTO startup_runs (started_at, total_sec, report) VALUES (?, ?, ?)",
+            (started_at, float(total_sec), json.dumps(report, ensure_ascii=False)),
+        )
+        await db.execute(
+            "DELETE FROM startup_runs WHERE id NOT IN "
+            "(SELECT id FROM startup_runs ORDER BY id DESC LIMIT ?)",
+            (_STARTUP_RUNS_KEEP,),
+        )
+        await db.commit()
+
+
+async def startup_runs_recent(limit: int = 20) -> list[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT started_at, total_sec, report FROM startup_runs ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+        rows = await cursor.fetchall()
+    result = []
+    for r in rows:
+        try:
+            report = json.loads(r["report"] or "{}")
+        except ValueError:
+            report = {}
+        result.append({"started_at": r["started_at"], "total_sec": r["total_sec"], "report": report})
+    return result
+
+
+async def job_runs_recent(job_key: str | None = None, limit: int = 50) -> list[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        if job_key:
+            cursor = await db.execute(
+                "SELECT * FROM scheduled_job_runs WHERE job_key = ? ORDER BY id DESC LIMIT ?",
+                (job_key, limit),
+            )
+        else:
+            cursor = await db.execute(
+                "SELECT * FROM scheduled_job_runs ORDER BY id DESC LIMIT ?", (limit,)
+            )
+        return [dict(r) for r in await cursor.fetchall()]
+
+
+async def job_runs_prune(older_than_days: int = 90) -> int:
+    cutoff = (datetime.datetime.now(JST) - datetime.timedelta(days=older_than_days)).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute("DELETE FROM scheduled_job_runs WHERE started_at < ?", (cutoff,))
+        await db.commit()
+        return cursor.rowcount
+
+
+# --- Daily Note Section Index ---
+
+async def note_index_get(note_date: str) -> dict | None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM note_index_files WHERE note_date = ?", (note_date,))
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+async def note_index_modified_times() -> dict:
+    """{note_date: modified_time}（差分同期で読み直しが要るかの判定用）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute("SELECT note_date, modified_time FROM note_index_files")
+        return {d: m for d, m in await cursor.fetchall()}
+
+
+async def note_index_put(
+    note_date: str, note_hash: str, sections: list[tuple], *, file_id: str = "", modified_time: str = ""
+) -> None:
+    """1 日分の見出しを入れ替える。sections は [(heading, body, content_hash), ...]（出現順）。"""
+    now = datetime.datetime.now(JST).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute("DELETE FROM note_sections WHERE note_date = ?", (note_date,))
+        await db.executemany(
+            "INSERT INTO note_sections (note_date, position, heading, body, content_hash) VALUES (?, ?, ?, ?, ?)",
+            [(note_date, i, h, b, ch) for i, (h, b, ch) in enumerate(sections)],
+        )
+        await db.execute(
+            "INSERT INTO note_index_files (note_date, file_id, note_hash, modified_time, indexed_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(note_date) DO UPDATE SET "
+            "file_id = CASE WHEN excluded.file_id != '' THEN excluded.file_id ELSE note_index_files.file_id END, "
+            "note_hash = excluded.note_hash, "
+            "modified_time = CASE WHEN excluded.modified_time != '' THEN excluded.modified_time "
+            "ELSE note_index_files.modified_time END, "
+            "indexed_at = excluded.indexed_at",
+            (note_date, file_id, note_hash, modified_time, now),
+        )
+        await db.commit()
+
+
+async def note_index_touch(note_date: str, *, file_id: str = "", modified_time: str = "") -> None:
+    """内容は変わらず Drive 側の更新時刻だけ進んだときに記録する。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "UPDATE note_index_files SET "
+            "file_id = CASE WHEN ? != '' THEN ? ELSE file_id END, "
+            "modified_time = CASE WHEN ? != '' THEN ? ELSE modified_time END "
+            "WHERE note_date = ?",
+            (file_id, file_id, modified_time, modified_time, note_date),
+        )
+        await db.commit()
+
+
+async def note_sections_range(start_date: str, end_date: str, headings: list[str] | None = None) -> list[dict]:
+    """期間 [start_date, end_date] の見出しを日付・出現順で返す。headings で絞り込める。"""
+    sql = "SELECT note_date, heading, body FROM note_sections WHERE note_date BETWEEN ? AND ?"
+    params: list = [start_date, end_date]
+    if headings:
+        sql += f" AND heading IN ({','.join('?' for _ in headings)})"
+        params += list(headings)
+    sql += " ORDER BY note_date, position"
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, params)
+        return [dict(r) for r in await cursor.fetchall()]
+
+
+async def timeline_summary_get(date: str, msg_hash: str):
+    """発言集合のハッシュが一致するキャッシュ済み要約（JSON をデコードした値）。無ければ None。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT summaries FROM timeline_summaries WHERE date = ? AND msg_hash = ?",
+            (date, msg_hash),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    try:
+        return json.loads(row[0])
+    except (ValueError, TypeError):
+        return None
+
+
+async def timeline_summary_put(date: str, msg_hash: str, summaries) -> None:
+    now = datetime.datetime.now(JST).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT INTO timeline_summaries (date, msg_hash, summaries, created_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(date) DO UPDATE SET msg_hash = excluded.msg_hash, "
+            "summaries = excluded.summaries, created_at = excluded.created_at",
+            (date, msg_hash, json.dumps(summaries, ensure_ascii=False), now),
+        )
+        await db.commit()
+
+
 # =========================================================
 # Watchlist (注目銘柄)
 # =========================================================
@@ -1988,21 +3084,121 @@ async def decision_review_list_pending() -> list[dict]:
         return [_decision_row_to_dict(r) for r in rows]
 
 
-async def decision_review_update_checkpoints(review_id: int, checkpoints: dict, status: str) -> bool:
+_DECISION_OUTCOME_UPSERT = """
+    INSERT OR REPLACE INTO decision_outcomes
+    (review_id, horizon, outcome, return_pct, benchmark_return_pct, excess_pct, is_exit,
+     trend_state, rec_action, style, true_signals, verified_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _decision_outcome_tuples(review: dict, checkpoints: dict) -> list[tuple]:
+    """判断 1 件の checkpoints を decision_outcomes の行（期日ごと）に展開する。"""
+    import json as _json
+    ta = (review.get("trade_action") or "").lower()
+    ra = (review.get("rec_action") or "").upper()
+    is_exit = 1 if (ta == "sell" or ra in ("SELL", "TRIM")) else 0
+    true_signals = [s.get("label") or s.get("key") for s in (review.get("signals") or [])
+                    if isinstance(s, dict) and s.get("value") is True]
+    out = []
+    for horizon, cp in (checkpoints or {}).items():
+        if not isinstance(cp, dict) or not cp.get("outcome"):
+            continue
+        out.append((
+            review["id"], horizon, cp["outcome"], cp.get("return_pct"),
+            cp.get("benchmark_return_pct"), cp.get("excess_pct"), is_exit,
+            review.get("trend_state") or "", review.get("rec_action") or "",
+            review.get("style") or "", _json.dumps(true_signals, ensure_ascii=False),
+            cp.get("verified_at"),
+        ))
+    return out
+
+
+async def decision_review_apply_verifications(items: list[dict]) -> int:
+    """答え合わせの結果をまとめて書き込む（1 トランザクション）。
+
+    items: [{"review": decision_reviews の行 dict, "checkpoints": dict, "status": str}, ...]
+    decision_reviews の checkpoints/status 更新と decision_outcomes への展開を同時に行う。"""
     import json as _json
+    if not items:
+        return 0
     now = datetime.datetime.now(JST).isoformat()
     async with aiosqlite.connect(str(DB_PATH)) as db:
-        cursor = await db.execute(
+        await db.executemany(
             "UPDATE decision_reviews SET checkpoints = ?, status = ?, updated_at = ? WHERE id = ?",
-            (_json.dumps(checkpoints or {}, ensure_ascii=False), status, now, review_id),
+            [(_json.dumps(it["checkpoints"] or {}, ensure_ascii=False), it["status"], now, it["review"]["id"])
+             for it in items],
+        )
+        await db.executemany(
+            _DECISION_OUTCOME_UPSERT,
+            [t for it in items for t in _decision_outcome_tuples(it["review"], it["checkpoints"])],
         )
         await db.commit()
-        return cursor.rowcount > 0
+    return len(items)
+
+
+async def decision_outcome_aggregate(horizon: str, deadband: float) -> dict:
+    """期日 horizon の答え合わせ結果を集計する（decision_outcomes の索引で絞り込み）。
+
+    deadband は生リターン/市場超過を勝ち負けに直すときの不感帯（%）。売り判断は符号を反転する。
+    Returns:
+        {"overall": {...}, "by_trend"/"by_action"/"by_style"/"by_signal": [{key, total, win, lose,
+         draw, sum_excess, n_excess}], "raw": {win, lose}, "excess": {win, lose},
+         "exit_excess": {n, sum}, "recorded": int, "pending": int}
+    """
+    bucket_cols = (
+        "COUNT(*) AS total, "
+        "SUM(outcome = '正解') AS win, SUM(outcome = '不正解') AS lose, "
+        "SUM(outcome NOT IN ('正解', '不正解')) AS draw, "
+        "COALESCE(SUM(excess_pct), 0) AS sum_excess, COUNT(excess_pct) AS n_excess"
+    )
+    signed = "(CASE WHEN is_exit THEN -{col} ELSE {col} END)"
+    raw, exc = signed.format(col="return_pct"), signed.format(col="excess_pct")
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+
+        async def _rows(sql: str, params: tuple) -> list[dict]:
+            cur = await db.execute(sql, params)
+            return [dict(r) for r in await cur.fetchall()]
+
+        out: dict = {}
+        out["overall"] = (await _rows(
+            f"SELECT {bucket_cols} FROM decision_outcomes WHERE horizon = ?", (horizon,)))[0]
+        for name, col in (("by_trend", "trend_state"), ("by_action", "rec_action"), ("by_style", "style")):
+            out[name] = await _rows(
+                f"SELECT {col} AS key, {bucket_cols} FROM decision_outcomes "
+                f"WHERE horizon = ? AND {col} != '' GROUP BY {col}",
+                (horizon,),
+            )
+        out["by_signal"] = await _rows(
+            f"SELECT j.value AS key, {bucket_cols} FROM decision_outcomes, json_each(true_signals) AS j "
+            "WHERE horizon = ? GROUP BY j.value",
+            (horizon,),
+        )
+        r = (await _rows(
+            f"SELECT SUM({raw} > :d) AS raw_win, SUM({raw} < -:d) AS raw_lose, "
+            f"SUM({exc} > :d) AS ex_win, SUM({exc} < -:d) AS ex_lose, "
+            "SUM(is_exit AND excess_pct IS NOT NULL) AS exit_n, "
+            "SUM(CASE WHEN is_exit THEN excess_pct END) AS exit_sum "
+            "FROM decision_outcomes WHERE horizon = :h",
+            {"d": deadband, "h": horizon},
+        ))[0]
+        out["raw"] = {"win": r["raw_win"] or 0, "lose": r["raw_lose"] or 0}
+        out["excess"] = {"win": r["ex_win"] or 0, "lose": r["ex_lose"] or 0}
+        out["exit_excess"] = {"n": r["exit_n"] or 0, "sum": r["exit_sum"] or 0.0}
+        cnt = (await _rows(
+            "SELECT COUNT(*) AS recorded, SUM(status IN ('open', 'partial')) AS pending FROM decision_reviews",
+            (),
+        ))[0]
+        out["recorded"] = cnt["recorded"] or 0
+        out["pending"] = cnt["pending"] or 0
+    return out
 
 
 async def decision_review_delete(review_id: int) -> bool:
     async with aiosqlite.connect(str(DB_PATH)) as db:
         cursor = await db.execute("DELETE FROM decision_reviews WHERE id = ?", (review_id,))
+        await db.execute("DELETE FROM decision_outcomes WHERE review_id = ?", (review_id,))
         await db.commit()
         return cursor.rowcount > 0
 
@@ -2303,3 +3499,727 @@ async def habit_has_any_data() -> bool:
     async with aiosqlite.connect(str(DB_PATH)) as db:
         cursor = await db.execute("SELECT 1 FROM habits LIMIT 1")
         return (await cursor.fetchone()) is not None
+
+
+# =========================================================
+# Google Tasks ミラー
+# =========================================================
+
+async def gtasks_lists_all() -> list[dict]:
+    """キャッシュ済みのタスクリスト（ID・名前・同期時刻）を返す。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM gtasks_lists")
+        return [dict(r) for r in await cursor.fetchall()]
+
+
+async def gtasks_list_put(list_id: str, title: str) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT INTO gtasks_lists (list_id, title) VALUES (?, ?) "
+            "ON CONFLICT(list_id) DO UPDATE SET title = excluded.title",
+            (list_id, title or ""),
+        )
+        await db.commit()
+
+
+async def gtasks_apply(list_id: str, upserts: list[dict], deletes: list[str] | None = None, *,
+                       replace: bool = False, synced_at: str | None = None) -> None:
+    """ミラーへの反映を 1 トランザクションで行う。
+
+    upserts: gtasks_items の列名を持つ dict（task_id 必須）。deletes: 消す task_id。
+    replace=True はリストの全件同期（upserts に無いタスクを消す）。synced_at を渡すと
+    リストの最終同期時刻も更新する（replace なら全件照合の時刻も）。"""
+    cols = ("title", "notes", "status", "due", "completed", "parent", "position", "hidden", "updated")
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        if replace:
+            await db.execute("DELETE FROM gtasks_items WHERE list_id = ?", (list_id,))
+        if deletes:
+            await db.executemany(
+                "DELETE FROM gtasks_items WHERE list_id = ? AND task_id = ?",
+                [(list_id, tid) for tid in deletes],
+            )
+        if upserts:
+            await db.executemany(
+                f"INSERT OR REPLACE INTO gtasks_items (list_id, task_id, {', '.join(cols)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in cols)})",
+                [(list_id, u["task_id"], *(u.get(c) for c in cols)) for u in upserts],
+            )
+        if synced_at:
+            await db.execute(
+                "INSERT INTO gtasks_lists (list_id, synced_at, full_synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(list_id) DO UPDATE SET synced_at = excluded.synced_at, "
+                "full_synced_at = CASE WHEN ? THEN excluded.synced_at ELSE gtasks_lists.full_synced_at END",
+                (list_id, synced_at, synced_at if replace else "", 1 if replace else 0),
+            )
+        await db.commit()
+
+
+async def gtasks_query(list_id: str, status: str | None = None, keyword: str = "") -> list[dict]:
+    """ミラーからタスクを読む（親→position 順＝Google Tasks の表示順）。
+
+    status: "needsAction" / "completed" / None（全件）。keyword はタイトルの部分一致（大文字小文字無視）。"""
+    sql = "SELECT * FROM gtasks_items WHERE list_id = ?"
+    params: list = [list_id]
+    if status:
+        sql += " AND status = ?"
+        params.append(status)
+    if keyword:
+        sql += " AND instr(lower(title), lower(?)) > 0"
+        params.append(keyword)
+    sql += " ORDER BY parent, position"
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, params)
+        return [dict(r) for r in await cursor.fetchall()]
+
+
+
+# =========================================================
+# Google カレンダー ローカルストア
+# =========================================================
+
+async def gcal_sync_state(calendar_id: str) -> dict | None:
+    """カレンダーの同期状態（sync_token・取り込み済み期間）。未同期なら None。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM gcal_sync WHERE calendar_id = ?", (calendar_id,))
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+async def gcal_apply(calendar_id: str, upserts: list[dict], deletes: list[str] | None = None, *,
+                     replace: bool = False, sync_token: str | None = None,
+                     window: tuple[float, float] | None = None) -> None:
+    """ストアへの反映を 1 トランザクションで行う。
+
+    upserts: gcal_events の列名を持つ dict（event_id 必須）。deletes: 消す event_id。
+    replace=True は全件同期（既存の予定を消してから入れ直す）。sync_token / window を
+    渡すと同期状態も更新する（window は全件同期で取り込んだ期間の epoch 秒）。"""
+    cols = ("status", "summary", "description", "location", "start_epoch", "end_epoch", "all_day", "raw")
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        if replace:
+            await db.execute("DELETE FROM gcal_events WHERE calendar_id = ?", (calendar_id,))
+        if deletes:
+            await db.executemany(
+                "DELETE FROM gcal_events WHERE calendar_id = ? AND event_id = ?",
+                [(calendar_id, eid) for eid in deletes],
+            )
+        if upserts:
+            await db.executemany(
+                f"INSERT OR REPLACE INTO gcal_events (calendar_id, event_id, {', '.join(cols)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in cols)})",
+                [(calendar_id, u["event_id"], *(u.get(c) for c in cols)) for u in upserts],
+            )
+        if sync_token or window:
+            now = datetime.datetime.now(JST).isoformat()
+            if window:
+                await db.execute(
+                    "INSERT OR REPLACE INTO gcal_sync "
+                    "(calendar_id, sync_token, window_start, window_end, synced_at) VALUES (?, ?, ?, ?, ?)",
+                    (calendar_id, sync_token, window[0], window[1], now),
+                )
+            else:
+                await db.execute(
+                    "UPDATE gcal_sync SET sync_token = ?, synced_at = ? WHERE calendar_id = ?",
+                    (sync_token, now, calendar_id),
+                )
+        await db.commit()
+
+
+async def gcal_clear(calendar_id: str) -> None:
+    """ストアと同期状態を捨てる（syncToken が失効した 410 Gone のとき）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute("DELETE FROM gcal_events WHERE calendar_id = ?", (calendar_id,))
+        await db.execute("DELETE FROM gcal_sync WHERE calendar_id = ?", (calendar_id,))
+        await db.commit()
+
+
+async def gcal_query(calendar_id: str, time_min: float, time_max: float) -> list[dict]:
+    """[time_min, time_max) と重なる予定の API リソース（raw）を開始順に返す。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT raw FROM gcal_events WHERE calendar_id = ? AND start_epoch < ? AND end_epoch > ? "
+            "AND status != 'cancelled' ORDER BY start_epoch, all_day DESC, event_id",
+            (calendar_id, time_max, time_min),
+        )
+        return [json.loads(r[0]) for r in await cursor.fetchall()]
+
+
+# ---- 保有銘柄ニュース（services/news_pipeline.py） ----
+
+async def news_report_get(code: str, trading_day: str, prompt_version: str) -> Optional[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT code, trading_day, market, report, saved_as, created_at FROM news_reports "
+            "WHERE code = ? AND trading_day = ? AND prompt_version = ?",
+            (code, trading_day, prompt_version),
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+async def news_report_put(
+    code: str, trading_day: str, prompt_version: str, market: str, report: str, saved_as: str = ""
+) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO news_reports "
+            "(code, trading_day, prompt_version, market, report, saved_as, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (code, trading_day, prompt_version, market, report, saved_as,
+             datetime.datetime.now(JST).isoformat()),
+        )
+        await db.commit()
+
+
+async def news_items_record(code: str, items: list[dict], day: str, notified_on: str = "") -> set:
+    """ニュース項目（{"hash", "headline", "section"}）を記録し、既知だった hash の集合を返す。
+
+    既知 = 営業日 day より前に見た項目か、notified_on（配信した暦日。省略時は day）より前の日に
+    すでに配信した項目。同じ日の再実行では同じ差分を返し、週末に金曜のレポートを使い回しても
+    金曜に配信した項目は出さない。"""
+    if not items:
+        return set()
+    notified_on = notified_on or day
+    hashes = [it["hash"] for it in items]
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            f"SELECT item_hash FROM news_items WHERE code = ? "
+            f"AND (first_seen < ? OR (notified_on != '' AND notified_on < ?)) "
+            f"AND item_hash IN ({','.join('?' for _ in hashes)})",
+            [code, day, notified_on, *hashes],
+        )
+        known = {r[0] for r in await cursor.fetchall()}
+        await db.executemany(
+            "INSERT INTO news_items (code, item_hash, headline, section, first_seen, last_seen, notified_on) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(code, item_hash) DO UPDATE SET last_seen = excluded.last_seen, "
+            "notified_on = CASE WHEN news_items.notified_on = '' OR news_items.notified_on IS NULL "
+            "THEN excluded.notified_on ELSE news_items.notified_on END",
+            [(code, it["hash"], it["headline"], it.get("section") or "", day, day, notified_on) for it in items],
+        )
+        await db.commit()
+    return known
+
+
+async def news_items_count(code: str) -> int:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM news_items WHERE code = ?", (code,))
+        row = await cursor.fetchone()
+        return row[0] if row else 0
+
+
+# ---- 投資データ（services/investment_store.py） ----
+
+_INV_HOLDING_COLS = (
+    "code", "ticker", "market", "name", "sector", "shares", "avg_cost", "account",
+    "currency", "opened_at", "updated_at", "notes", "preferred_method",
+)
+_INV_TX_COLS = (
+    "ts", "action", "code", "name", "shares", "price", "avg_cost",
+    "realized_pnl", "realized_pnl_pct", "notes",
+)
+_INV_JOURNAL_COLS = ("filename", "date", "time", "title", "ticker", "action", "emotion", "updated_at")
+_INV_RULE_COLS = ("id", "ticker", "code", "market", "type", "threshold", "enabled", "memo", "created_at")
+
+
+def _inv_split(item: dict, cols: tuple) -> tuple[list, str]:
+    """dict を (列の値, 列に無い項目の JSON) に分ける。"""
+    extra = {k: v for k, v in item.items() if k not in cols and k != "content"}
+    return [item.get(c) for c in cols], json.dumps(extra, ensure_ascii=False)
+
+
+def _inv_merge(row, cols: tuple) -> dict:
+    """_inv_split の逆。列の NULL は出力から省く（元の JSON に無かった項目を増やさない）。"""
+    out = {c: row[c] for c in cols if row[c] is not None}
+    try:
+        out.update(json.loads(row["extra"] or "{}"))
+    except (TypeError, ValueError):
+        pass
+    return out
+
+
+async def inv_holdings_list() -> list[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(f"SELECT {', '.join(_INV_HOLDING_COLS)}, extra FROM inv_holdings ORDER BY rowid")
+        return [_inv_merge(r, _INV_HOLDING_COLS) for r in await cursor.fetchall()]
+
+
+async def inv_holding_get(code: str) -> Optional[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT {', '.join(_INV_HOLDING_COLS)}, extra FROM inv_holdings WHERE code = ?", (code,)
+        )
+        row = await cursor.fetchone()
+        return _inv_merge(row, _INV_HOLDING_COLS) if row else None
+
+
+async def inv_holdings_put(holdings: list[dict]) -> None:
+    """保有銘柄を upsert する（既存行の並び順は保つ）。"""
+    if not holdings:
+        return
+    cols = ", ".join(_INV_HOLDING_COLS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in _INV_HOLDING_COLS[1:])
+    rows = []
+    for h in holdings:
+        values, extra = _inv_split(h, _INV_HOLDING_COLS)
+        rows.append((*values, extra))
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            f"INSERT INTO inv_holdings ({cols}, extra) VALUES ({', '.join('?' for _ in range(len(_INV_HOLDING_COLS) + 1))}) "
+            f"ON CONFLICT(code) DO UPDATE SET {updates}, extra = excluded.extra",
+            rows,
+        )
+        await db.commit()
+
+
+async def inv_holding_delete(code: str) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute("DELETE FROM inv_holdings WHERE code = ?", (code,))
+        await db.commit()
+
+
+async def inv_lot_add(code: str, opened_at: str, shares: float, price: float) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT INTO inv_lots (code, opened_at, shares, price, remaining) VALUES (?, ?, ?, ?, ?)",
+            (code, opened_at, shares, price, shares),
+        )
+        await db.commit()
+
+
+async def inv_lots_consume(code: str, shares: float) -> None:
+    """売却分を古いロットから順に減らす（先入先出）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT id, remaining FROM inv_lots WHERE code = ? AND remaining > 0 ORDER BY opened_at, id",
+            (code,),
+        )
+        left = float(shares)
+        updates = []
+        for lot_id, remaining in await cursor.fetchall():
+            if left <= 0:
+                break
+            used = min(left, remaining)
+            updates.append((remaining - used, lot_id))
+            left -= used
+        if updates:
+            await db.executemany("UPDATE inv_lots SET remaining = ? WHERE id = ?", updates)
+            await db.commit()
+
+
+async def inv_lots_list(code: str, open_only: bool = True) -> list[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT id, code, opened_at, shares, price, remaining FROM inv_lots WHERE code = ?"
+            + (" AND remaining > 0" if open_only else "") + " ORDER BY opened_at, id",
+            (code,),
+        )
+        return [dict(r) for r in await cursor.fetchall()]
+
+
+async def inv_transactions_add(entries: list[dict]) -> None:
+    if not entries:
+        return
+    rows = []
+    for e in entries:
+        values, extra = _inv_split(e, _INV_TX_COLS)
+        rows.append((*values, extra))
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            f"INSERT INTO inv_transactions ({', '.join(_INV_TX_COLS)}, extra) "
+            f"VALUES ({', '.join('?' for _ in range(len(_INV_TX_COLS) + 1))})",
+            rows,
+        )
+        await db.commit()
+
+
+async def inv_transactions_list(limit: Optional[int] = 100, action: Optional[str] = None) -> list[dict]:
+    """取引履歴を新しい順に返す（limit=None で全件・古い順）。"""
+    where = "WHERE action = ?" if action else ""
+    params: list = [action] if action else []
+    if limit is None:
+        sql = f"SELECT {', '.join(_INV_TX_COLS)}, extra FROM inv_transactions {where} ORDER BY ts, id"
+    else:
+        sql = f"SELECT {', '.join(_INV_TX_COLS)}, extra FROM inv_transactions {where} ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(int(limit))
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, params)
+        return [_inv_merge(r, _INV_TX_COLS) for r in await cursor.fetchall()]
+
+
+async def inv_realized_summary(recent_limit: int = 30) -> dict:
+    """売却で確定した実現損益を SQL で集計する（idx_inv_tx_action を使う）。"""
+    realized = "action = 'sell' AND realized_pnl IS NOT NULL"
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(realized_pnl), 0) AS total, "
+            "SUM(CASE WHEN realized_pnl > 0 THEN 1 ELSE 0 END) AS wins, "
+            "SUM(CASE WHEN realized_pnl < 0 THEN 1 ELSE 0 END) AS loses, "
+            "(SELECT COUNT(*) FROM inv_transactions WHERE action = 'sell') AS sells "
+            f"FROM inv_transactions WHERE {realized}"
+        )
+        totals = dict(await cursor.fetchone())
+        cursor = await db.execute(
+            "SELECT code, MAX(name) AS name, SUM(realized_pnl) AS realized_pnl, COUNT(*) AS sell_count "
+            f"FROM inv_transactions WHERE {realized} GROUP BY code ORDER BY realized_pnl DESC"
+        )
+        by_code = [dict(r) for r in await cursor.fetchall()]
+        cursor = await db.execute(
+            "SELECT ts, code, name, shares, price, avg_cost, realized_pnl, realized_pnl_pct "
+            f"FROM inv_transactions WHERE {realized} ORDER BY ts DESC, id DESC LIMIT ?",
+            (recent_limit,),
+        )
+        recent = [dict(r) for r in await cursor.fetchall()]
+    return {**totals, "by_code": by_code, "recent": recent}
+
+
+async def inv_journal_list(limit: Optional[int] = 50, ticker: str = "") -> list[dict]:
+    """日記のメタ情報を新しい順に返す（本文は含まない）。"""
+    where = "WHERE ticker = ?" if ticker else ""
+    params: list = [ticker] if ticker else []
+    sql = f"SELECT {', '.join(_INV_JOURNAL_COLS)}, extra FROM inv_journal {where} ORDER BY date DESC, time DESC, filename DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, params)
+        return [_inv_merge(r, _INV_JOURNAL_COLS) for r in await cursor.fetchall()]
+
+
+async def inv_journal_get(filename: str) -> Optional[dict]:
+    """日記 1 件（メタ＋ content）。content が None なら本文はまだ手元に無い（Drive から読む）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT {', '.join(_INV_JOURNAL_COLS)}, content, extra FROM inv_journal WHERE filename = ?",
+            (filename,),
+        )
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        out = _inv_merge(row, _INV_JOURNAL_COLS)
+        out["content"] = row["content"]
+        return out
+
+
+async def inv_journal_put(entries: list[dict], keep_content: bool = False) -> None:
+    """日記を upsert する。keep_content=True なら entry に content が無いとき既存の本文を残す。"""
+    if not entries:
+        return
+    cols = ", ".join(_INV_JOURNAL_COLS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in _INV_JOURNAL_COLS[1:])
+    content_update = "COALESCE(excluded.content, inv_journal.content)" if keep_content else "excluded.content"
+    rows = []
+    for e in entries:
+        values, extra = _inv_split(e, _INV_JOURNAL_COLS)
+        rows.append((*values, e.get("content"), extra))
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            f"INSERT INTO inv_journal ({cols}, content, extra) "
+            f"VALUES ({', '.join('?' for _ in range(len(_INV_JOURNAL_COLS) + 2))}) "
+            f"ON CONFLICT(filename) DO UPDATE SET {updates}, content = {content_update}, extra = excluded.extra",
+            rows,
+        )
+        await db.commit()
+
+
+async def inv_journal_delete(filename: str) -> bool:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute("DELETE FROM inv_journal WHERE filename = ?", (filename,))
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def inv_alert_rules_list() -> list[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(f"SELECT {', '.join(_INV_RULE_COLS)}, extra FROM inv_alert_rules ORDER BY rowid")
+        rules = [_inv_merge(r, _INV_RULE_COLS) for r in await cursor.fetchall()]
+    for r in rules:
+        r["enabled"] = bool(r.get("enabled"))
+    return rules
+
+
+async def inv_alert_rules_put(rules: list[dict]) -> None:
+    if not rules:
+        return
+    cols = ", ".join(_INV_RULE_COLS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in _INV_RULE_COLS[1:])
+    rows = []
+    for r in rules:
+        values, extra = _inv_split({**r, "enabled": 1 if r.get("enabled", True) else 0}, _INV_RULE_COLS)
+        rows.append((*values, extra))
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            f"INSERT INTO inv_alert_rules ({cols}, extra) VALUES ({', '.join('?' for _ in range(len(_INV_RULE_COLS) + 1))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}, extra = excluded.extra",
+            rows,
+        )
+        await db.commit()
+
+
+async def inv_alert_rule_delete(rule_id: int) -> bool:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute("DELETE FROM inv_alert_rules WHERE id = ?", (int(rule_id),))
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def inv_alert_events_add(events: list[dict]) -> None:
+    """アラートの発火を記録する。各 event は ts を含む dict（alert_log.jsonl の 1 行と同じ形）。"""
+    if not events:
+        return
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            "INSERT INTO inv_alert_events (ts, rule_id, code, payload) VALUES (?, ?, ?, ?)",
+            [
+                (e.get("ts") or datetime.datetime.now(JST).isoformat(), e.get("id"), e.get("code") or "",
+                 json.dumps(e, ensure_ascii=False))
+                for e in events
+            ],
+        )
+        await db.commit()
+
+
+async def inv_alert_events_list(limit: Optional[int] = None) -> list[dict]:
+    """発火履歴を古い順に返す（limit 指定時は直近 limit 件）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        if limit is None:
+            cursor = await db.execute("SELECT payload FROM inv_alert_events ORDER BY ts, id")
+            rows = await cursor.fetchall()
+        else:
+            cursor = await db.execute(
+                "SELECT payload FROM inv_alert_events ORDER BY ts DESC, id DESC LIMIT ?", (int(limit),)
+            )
+            rows = list(reversed(await cursor.fetchall()))
+    out = []
+    for (payload,) in rows:
+        try:
+            out.append(json.loads(payload))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+async def inv_export_mark(keys: list[str]) -> None:
+    if not keys:
+        return
+    now = datetime.datetime.now(JST).isoformat()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            "INSERT OR REPLACE INTO inv_export_dirty (key, marked_at) VALUES (?, ?)",
+            [(k, now) for k in keys],
+        )
+        await db.commit()
+
+
+async def inv_export_take() -> list[str]:
+    """書き出し待ちのキーを取り出して消す（失敗したら呼び出し側が inv_export_mark し直す）。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute("SELECT key, marked_at FROM inv_export_dirty ORDER BY marked_at")
+        rows = await cursor.fetchall()
+        if rows:
+            # 読んだ後に付け直された印（marked_at が新しい）は残す
+            await db.executemany("DELETE FROM inv_export_dirty WHERE key = ? AND marked_at = ?", rows)
+            await db.commit()
+        return [k for k, _ in rows]
+
+
+async def research_artifact_get(
+    kind: str, code: str, trading_day: str, prompt_version: str, params_key: str = ""
+) -> Optional[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT payload, created_at FROM research_artifacts WHERE kind = ? AND code = ? "
+            "AND trading_day = ? AND prompt_version = ? AND params_key = ?",
+            (kind, code, trading_day, prompt_version, params_key),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    try:
+        return {"payload": json.loads(row[0]), "created_at": row[1]}
+    except (TypeError, ValueError):
+        return None
+
+
+async def research_artifact_put(
+    kind: str, code: str, trading_day: str, prompt_version: str, payload: dict, params_key: str = ""
+) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO research_artifacts "
+            "(kind, code, trading_day, prompt_version, params_key, payload, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, code, trading_day, prompt_version, params_key,
+             json.dumps(payload, ensure_ascii=False, default=str), datetime.datetime.now(JST).isoformat()),
+        )
+        await db.commit()
+
+
+async def gemini_response_cache_get(key: str, now: float) -> Optional[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT model, response, expires_at FROM gemini_response_cache WHERE key = ? AND expires_at > ?",
+            (key, now),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    return {"model": row[0], "response": row[1], "expires_at": row[2]}
+
+
+async def gemini_response_cache_put(
+    key: str, feature: str, model: str, response: str, in_tokens: int, out_tokens: int, expires_at: float
+) -> None:
+    """応答を保存し、ついでに期限切れの行を消す。"""
+    now = time.time()
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute("DELETE FROM gemini_response_cache WHERE expires_at <= ?", (now,))
+        await db.execute(
+            "INSERT OR REPLACE INTO gemini_response_cache "
+            "(key, feature, model, response, in_tokens, out_tokens, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, feature, model, response, int(in_tokens or 0), int(out_tokens or 0), now, expires_at),
+        )
+        await db.commit()
+
+
+async def gemini_context_cache_get(key: str, now: float) -> Optional[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM gemini_context_caches WHERE key = ? AND expires_at > ?", (key, now)
+        )
+        row = await cursor.fetchone()
+    return dict(row) if row else None
+
+
+async def gemini_context_cache_put(
+    key: str, label: str, model: str, name: str, token_count: int, expires_at: float
+) -> list[str]:
+    """キャッシュ名を保存する。同じ label・model の古いキャッシュ名（差し替えで不要になった分）を返して消す。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT name FROM gemini_context_caches WHERE label = ? AND model = ? AND key != ?",
+            (label, model, key),
+        )
+        stale = [r[0] for r in await cursor.fetchall()]
+        await db.execute(
+            "DELETE FROM gemini_context_caches WHERE (label = ? AND model = ? AND key != ?) OR expires_at <= ?",
+            (label, model, key, time.time()),
+        )
+        await db.execute(
+            "INSERT OR REPLACE INTO gemini_context_caches (key, label, model, name, token_count, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, label, model, name, int(token_count or 0), expires_at),
+        )
+        await db.commit()
+    return stale
+
+
+async def gemini_context_cache_delete(name: str) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute("DELETE FROM gemini_context_caches WHERE name = ?", (name,))
+        await db.commit()
+
+
+async def gemini_cache_stats_add(
+    feature: str, field: str, saved_in_tokens: int = 0, saved_out_tokens: int = 0, saved_usd: float = 0.0
+) -> None:
+    """field は hits / misses / coalesced のいずれか。"""
+    if field not in ("hits", "misses", "coalesced"):
+        raise ValueError(field)
+    date_str = datetime.datetime.now(JST).strftime("%Y-%m-%d")
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT OR IGNORE INTO gemini_cache_stats (date, feature) VALUES (?, ?)",
+            (date_str, feature),
+        )
+        await db.execute(
+            f"UPDATE gemini_cache_stats SET {field} = {field} + 1, "
+            "saved_in_tokens = saved_in_tokens + ?, saved_out_tokens = saved_out_tokens + ?, "
+            "saved_usd = saved_usd + ? WHERE date = ? AND feature = ?",
+            (int(saved_in_tokens or 0), int(saved_out_tokens or 0), float(saved_usd or 0.0), date_str, feature),
+        )
+        await db.commit()
+
+
+async def get_gemini_cache_stats(start_date: str, end_date: str) -> list[dict]:
+    """[start_date, end_date] のキャッシュ効果を機能ごとに合算して返す。"""
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT feature, SUM(hits) AS hits, SUM(misses) AS misses, SUM(coalesced) AS coalesced, "
+            "SUM(saved_in_tokens) AS saved_in_tokens, SUM(saved_out_tokens) AS saved_out_tokens, "
+            "SUM(saved_usd) AS saved_usd "
+            "FROM gemini_cache_stats WHERE date BETWEEN ? AND ? GROUP BY feature ORDER BY feature",
+            (start_date, end_date),
+        )
+        rows = await cursor.fetchall()
+    return [dict(r) for r in rows]
+
+
+async def inv_notes_put(subfolder: str, filename: str, file_id: str, content: Optional[str]) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO inv_notes (subfolder, filename, file_id, modified_at, content) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (subfolder, filename, file_id,
+             datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"), content),
+        )
+        await db.commit()
+
+
+async def inv_notes_sync(subfolder: str, files: list[dict]) -> None:
+    """Drive の一覧（id, name, modifiedTime）を索引に反映する。更新されていた行は本文を捨てて読み直させる。"""
+    if not files:
+        return
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.executemany(
+            "INSERT INTO inv_notes (subfolder, filename, file_id, modified_at, content) VALUES (?, ?, ?, ?, NULL) "
+            "ON CONFLICT(subfolder, filename) DO UPDATE SET file_id = excluded.file_id, "
+            "content = CASE WHEN inv_notes.modified_at >= excluded.modified_at THEN inv_notes.content ELSE NULL END, "
+            "modified_at = MAX(inv_notes.modified_at, excluded.modified_at)",
+            [(subfolder, f["name"], f["id"], f.get("modifiedTime") or "") for f in files if f.get("id") and f.get("name")],
+        )
+        await db.commit()
+
+
+async def inv_notes_list(subfolder: str, limit: int = 20) -> list[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        cursor = await db.execute(
+            "SELECT file_id, filename, modified_at FROM inv_notes WHERE subfolder = ? "
+            "ORDER BY modified_at DESC LIMIT ?",
+            (subfolder, int(limit)),
+        )
+        return [{"id": r[0], "name": r[1], "modifiedTime": r[2]} for r in await cursor.fetchall()]
+
+
+async def inv_notes_get(file_id: str) -> Optional[dict]:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT subfolder, filename, file_id, modified_at, content FROM inv_notes WHERE file_id = ?", (file_id,)
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+async def inv_notes_set_content(file_id: str, content: str) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute("UPDATE inv_notes SET content = ? WHERE file_id = ?", (content, file_id))
+        await db.commit()
+
+
+async def inv_notes_delete(subfolder: str, filename: str) -> None:
+    async with aiosqlite.connect(str(DB_PATH)) as db:
+        await db.execute("DELETE FROM inv_notes WHERE subfolder = ? AND filename = ?", (subfolder, filename))
+        await db.commit()
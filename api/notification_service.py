@@ -6,6 +6,11 @@ VAPID 鍵は環境変数から読み込み:
     VAPID_SUBJECT     - 連絡先 (mailto:... または https://...)
 
 VAPID 鍵の生成は scratch/gen_vapid.py を実行して .env へコピーする。
+
+送信は push_outbox テーブルに購読ごとの行として積んでから、全購読へ並列に送る
+（web_push スレッドプール＋接続を使い回す requests.Session）。VAPID の署名（JWT）は
+プッシュサービスのオリジンごとに有効期限までキャッシュする。404/410 の購読は削除し、
+一時的な失敗（429/5xx/通信エラー）は間隔を空けて再送する。往復時間は行ごとに記録する。
 """
 
 import os
@@ -14,6 +19,7 @@ import json
 import logging
 import asyncio
 import datetime
+import time
 from typing import Optional
 
 from config import JST
@@ -35,15 +41,31 @@ def _strip_leading_time_tag(text: str) -> str:
         text = _LEADING_TIME_TAG_RE.sub("", text, count=1)
     return text
 
-from pywebpush import webpush, WebPushException
+from pywebpush import WebPusher
 
-from api.database import get_all_push_subscriptions, remove_push_subscription
+from api.database import (
+    get_all_push_subscriptions, push_outbox_enqueue, push_outbox_claim,
+    push_outbox_prune, push_outbox_update, remove_push_subscription,
+)
+from utils.executors import WEB_PUSH, run_in
 
 
 _VAPID_PUBLIC = os.getenv("VAPID_PUBLIC_KEY", "")
 _VAPID_PRIVATE = os.getenv("VAPID_PRIVATE_KEY", "")
 _VAPID_SUBJECT = os.getenv("VAPID_SUBJECT", "")
 
+_VAPID_TTL_SEC = 12 * 3600               # JWT の有効期間（仕様上の上限は 24 時間）
+_VAPID_REFRESH_MARGIN_SEC = 600          # 期限のこれだけ前に署名し直す
+_SEND_TIMEOUT_SEC = 10
+_RETRY_DELAYS_SEC = [30, 120, 600, 1800] # 一時的な失敗の再送間隔（回数を超えたら破棄）
+_RETRY_MAX_AGE_HOURS = 6                 # これより古い通知は再送しない
+
+_vapid = None
+_vapid_headers: dict[str, tuple[dict, float]] = {}  # origin -> (署名ヘッダ, 期限 epoch)
+_http_session = None
+_retry_handle: Optional[asyncio.TimerHandle] = None
+_retry_at = 0.0
+
 
 def is_configured() -> bool:
     return bool(_VAPID_PUBLIC and _VAPID_PRIVATE and _VAPID_SUBJECT)
@@ -53,29 +75,133 @@ def get_public_key() -> str:
     return _VAPID_PUBLIC
 
 
-def _send_one(subscription: dict, payload: str) -> tuple[bool, Optional[int]]:
-    """1 件の購読へ送信。成功なら (True, None)、失敗なら (False, status_code)。
-    status_code が 404/410 のときは購読が無効化されている。"""
+def _session():
+    """プッシュサービスへの接続を使い回す requests.Session（スレッド間で共有）。"""
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+        session.mount("https://", adapter)
+        _http_session = session
+    return _http_session
+
+
+def _vapid_headers_for(endpoint: str) -> dict:
+    """エンドポイントのオリジン宛ての VAPID 署名ヘッダ。期限まではキャッシュを返す。"""
+    global _vapid
+    from urllib.parse import urlparse
+
+    parsed = urlparse(endpoint)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    now = time.time()
+    cached = _vapid_headers.get(origin)
+    if cached and cached[1] - _VAPID_REFRESH_MARGIN_SEC > now:
+        return cached[0]
+    if _vapid is None:
+        from py_vapid import Vapid
+        _vapid = Vapid.from_string(private_key=_VAPID_PRIVATE)
+    exp = int(now) + _VAPID_TTL_SEC
+    headers = _vapid.sign({"sub": _VAPID_SUBJECT, "aud": origin, "exp": exp})
+    _vapid_headers[origin] = (headers, exp)
+    return headers
+
+
+def _send_one(subscription: dict, payload: str) -> tuple[Optional[int], int]:
+    """1 件の購読へ送信し (HTTP ステータス, 往復ミリ秒) を返す。通信エラーは (None, ...)。"""
+    started = time.monotonic()
     try:
-        webpush(
-            subscription_info={
+        pusher = WebPusher(
+            {
                 "endpoint": subscription["endpoint"],
-                "keys": {
-                    "p256dh": subscription["p256dh"],
-                    "auth": subscription["auth"],
-                },
+                "keys": {"p256dh": subscription["p256dh"], "auth": subscription["auth"]},
             },
+            requests_session=_session(),
+        )
+        response = pusher.send(
             data=payload,
-            vapid_private_key=_VAPID_PRIVATE,
-            vapid_claims={"sub": _VAPID_SUBJECT},
+            headers=dict(_vapid_headers_for(subscription["endpoint"])),
+            ttl=0,
+            timeout=_SEND_TIMEOUT_SEC,
         )
-        return True, None
-    except WebPushException as e:
-        status = getattr(e.response, "status_code", None) if e.response is not None else None
-        return False, status
+        status = response.status_code
+    except Exception as e:
+        logging.warning(f"WebPush 送信エラー: {e}")
+        status = None
+    return status, int((time.monotonic() - started) * 1000)
+
+
+async def _deliver_rows(rows: list[dict]) -> int:
+    """送信待ちの行を並列に送り、結果を書き戻して成功数を返す。"""
+    if not rows:
+        return 0
+    outcomes = await asyncio.gather(*(run_in(WEB_PUSH, _send_one, row, row["payload"]) for row in rows))
+
+    now = datetime.datetime.now(JST)
+    too_old = now - datetime.timedelta(hours=_RETRY_MAX_AGE_HOURS)
+    results, dead_endpoints, retry_in = [], set(), None
+    for row, (status, latency_ms) in zip(rows, outcomes):
+        attempts = row["attempts"] + 1
+        result = {"id": row["id"], "attempts": attempts, "last_status": status, "latency_ms": latency_ms}
+        if status is not None and 200 <= status < 300:
+            result["status"] = "sent"
+        elif status in (404, 410):
+            result["status"] = "gone"
+            dead_endpoints.add(row["endpoint"])
+        elif (status is None or status == 429 or status >= 500) and attempts <= len(_RETRY_DELAYS_SEC) and (
+            datetime.datetime.fromisoformat(row["created_at"]) > too_old
+        ):
+            delay = _RETRY_DELAYS_SEC[attempts - 1]
+            result["status"] = "pending"
+            result["next_attempt_at"] = (now + datetime.timedelta(seconds=delay)).isoformat()
+            retry_in = delay if retry_in is None else min(retry_in, delay)
+        else:
+            result["status"] = "failed"
+            logging.warning(f"WebPush 配信失敗 (status={status}) endpoint={row['endpoint'][:40]}...")
+        results.append(result)
+    await push_outbox_update(results)
+
+    for endpoint in dead_endpoints:
+        await remove_push_subscription(endpoint)
+        logging.info(f"無効な購読を削除: {endpoint[:40]}...")
+    if retry_in is not None:
+        _schedule_retry(retry_in)
+    return sum(1 for r in results if r["status"] == "sent")
+
+
+def _schedule_retry(delay: float) -> None:
+    """再送をタイマーで予約する（既に早い予約があればそれに任せる）。"""
+    global _retry_handle, _retry_at
+    loop = asyncio.get_running_loop()
+    at = loop.time() + delay
+    if _retry_handle is not None and _retry_at <= at:
+        return
+    if _retry_handle is not None:
+        _retry_handle.cancel()
+
+    def _fire():
+        global _retry_handle
+        _retry_handle = None
+        from utils.async_utils import safe_create_task
+        safe_create_task(drain_push_outbox(), name="push-outbox-retry")
+
+    _retry_at = at
+    _retry_handle = loop.call_later(delay, _fire)
+
+
+async def drain_push_outbox() -> int:
+    """再送時刻が来た送信待ちを送る（再起動前に積み残した分もここで拾う）。"""
+    if not is_configured():
+        return 0
+    rows = await push_outbox_claim()
+    sent = await _deliver_rows(rows)
+    try:
+        await push_outbox_prune()
     except Exception as e:
-        logging.error(f"WebPush 不明エラー: {e}")
-        return False, None
+        logging.debug(f"push_outbox prune failed: {e}")
+    return sent
 
 
 async def send_push(
@@ -83,7 +209,8 @@ async def send_push(
     actions: Optional[list] = None, data: Optional[dict] = None,
 ) -> int:
     """全サブスクリプションへ通知を送信し、配信成功数を返す。
-    送信不可（404/410）のサブスクリプションは自動で削除する。
+    購読ごとに push_outbox へ積んでから並列に送る。送信不可（404/410）の
+    サブスクリプションは自動で削除し、一時的な失敗は後で再送する。
     actions: 通知のアクションボタン [{"action": id, "title": ラベル}, ...]（最大2件程度）。
     data: 通知に同梱する追加データ（SW のクリック処理が参照。例: qid / answers）。"""
     if not is_configured():
@@ -101,24 +228,8 @@ async def send_push(
         payload_obj.update(data)
     payload = json.dumps(payload_obj, ensure_ascii=False)
 
-    loop = asyncio.get_running_loop()
-    success = 0
-    dead_endpoints: list[str] = []
-
-    for sub in subs:
-        ok, status = await loop.run_in_executor(None, _send_one, sub, payload)
-        if ok:
-            success += 1
-        elif status in (404, 410):
-            dead_endpoints.append(sub["endpoint"])
-        else:
-            logging.warning(f"WebPush 配信失敗 (status={status}) endpoint={sub['endpoint'][:40]}...")
-
-    for endpoint in dead_endpoints:
-        await remove_push_subscription(endpoint)
-        logging.info(f"無効な購読を削除: {endpoint[:40]}...")
-
-    return success
+    ids = await push_outbox_enqueue([sub["endpoint"] for sub in subs], payload)
+    return await _deliver_rows(await push_outbox_claim(ids))
 
 
 # ============================================================
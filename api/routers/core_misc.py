@@ -1,6 +1,7 @@
 """core_misc: 小さい補助エンドポイント群。
 - /history（会話履歴取得）
 - /error_log（バックグラウンドタスク失敗ログ）
+- /executor_stats（ブロッキング I/O 用スレッドプールの混み具合）
 - /permanent_notes/confirm（永久ノート確定保存）
 - /reset_history（履歴全削除）
 - /daily_report（プレースホルダ）
@@ -37,6 +38,36 @@ async def error_log(limit: int = 100):
     return {"errors": await get_recent_errors(limit=limit)}
 
 
+@router.get("/executor_stats", dependencies=[Depends(verify_api_key)])
+async def executor_stats_endpoint():
+    """名前付きスレッドプール（google_api / market_data / parsing / file_io）の
+    実行中・待ち件数と待ち時間。デバッグ用。"""
+    from utils.executors import executor_stats
+    return {"pools": executor_stats()}
+
+
+@router.get("/gemini_dispatch_stats", dependencies=[Depends(verify_api_key)])
+async def gemini_dispatch_stats_endpoint():
+    """Gemini 呼び出しのモデル系統別スケジューラ（レーンごとの待ち件数・待ち時間・429 再試行数）。"""
+    from services.gemini_dispatch import gemini_dispatcher
+    return gemini_dispatcher.stats()
+
+
+@router.get("/startup_report", dependencies=[Depends(verify_api_key)])
+async def startup_report_endpoint(limit: int = 10):
+    """今回の起動のフェーズ別所要時間（import・DB 復元・ルーター・Cog・uvicorn）と、過去の起動の記録。"""
+    from api.database import startup_runs_recent
+    from utils.startup import startup
+    return {"current": startup.report(), "recent": await startup_runs_recent(limit)}
+
+
+@router.get("/chat_context_stats", dependencies=[Depends(verify_api_key)])
+async def chat_context_stats_endpoint():
+    """チャット用コンテキスト（取扱説明書・今日の予定・タスク・MIT）の先回り取得の状態とヒット数。"""
+    from services.context_assembler import context_assembler
+    return {"sources": context_assembler.snapshot(), **context_assembler.stats}
+
+
 @router.post("/permanent_notes/confirm", dependencies=[Depends(verify_api_key)])
 async def permanent_notes_confirm(req: PermanentNoteConfirmRequest):
     """ユーザーが永久ノートの確認モーダルで『保存』を押した時に呼ばれる。"""
@@ -32,14 +32,17 @@ async def cost_summary(days: int = 30):
     this_month = await cost_meter_service.summary(month_start, end.strftime("%Y-%m-%d"))
     infra = await cost_meter_service.get_infra_cost_jpy()
     threshold = await cost_meter_service.get_monthly_threshold_jpy()
+    cache = await cost_meter_service.cache_summary(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
     return {
         **data,
         "this_month_jpy": this_month["total_jpy"],
         "this_month_in_tokens": this_month["total_in_tokens"],
         "this_month_out_tokens": this_month["total_out_tokens"],
+        "this_month_cached_tokens": this_month["total_cached_tokens"],
         "infra_cost_jpy_per_month": infra,
         "monthly_threshold_jpy": threshold,
         "monthly_total_jpy_including_infra": this_month["total_jpy"] + infra,
+        "cache": cache,
     }
 
 
@@ -114,10 +114,17 @@ async def daily_summary_get(date: str = ""):
         if not text and not explicit_date:
             # 最新の保存分を「デイリーノート」「マネージャーの気づき」と同様に
             # できるだけ広い範囲で探す（過去 30 日まで遡る）
+            # （日ごとの Drive 読み込みではなく、デイリーノート索引を 1 回引く）
+            from services.note_index import get_sections
             base = datetime.datetime.strptime(date, "%Y-%m-%d").date()
-            for offset in range(1, 31):
-                prev = (base - datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
-                t = await _read_summary_for_date(chat_service, prev)
+            by_date = await get_sections(
+                (base - datetime.timedelta(days=30)).strftime("%Y-%m-%d"),
+                (base - datetime.timedelta(days=1)).strftime("%Y-%m-%d"),
+                ["## 📅 Daily Summary"],
+                drive_service=chat_service.drive_service,
+            )
+            for prev in sorted(by_date, reverse=True):
+                t = by_date[prev][0][1].strip()
                 if t:
                     text = t
                     fallback_date = prev
@@ -637,7 +644,7 @@ async def _maybe_generate_followup(scope: str, answer_text: str, *, date: str |
     # 追質問は「いつものマネージャー」と同じ人格・口調で発話させる。
     # チャットや定期メッセージと同じ get_system_prompt を system_instruction に渡し、
     # 別人格に感じられないようにする（質問文だけ JSON で受け取る）。
-    from prompts import get_system_prompt
+    from prompts import current_time_note, get_system_prompt
     partner_cog = bot.get_cog("PartnerCog")
     user_name = getattr(partner_cog, "user_name", "ゆうすけ") if partner_cog else "ゆうすけ"
     now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
@@ -647,9 +654,11 @@ async def _maybe_generate_followup(scope: str, answer_text: str, *, date: str |
             user_manual = await partner_cog._get_user_manual()
         except Exception:
             user_manual = ""
-    system_prompt = get_system_prompt(user_name, now_str, user_manual)
+    # 時刻を抜いた固定文面にしてコンテキストキャッシュ（services/prompt_cache.py）に載せる
+    system_prompt = get_system_prompt(user_name, None, user_manual)
 
     task = (
+        f"{current_time_note(now_str)}\n"
         f"ゆうすけが今ちょうど「{label}」をこう記録したよ:\n「{text}」\n\n"
         "これを読んで、もう一歩だけ掘り下げて聞く価値があるか判断して。"
         "感情・判断・学び・次の行動につながりそうなら掘り下げる。"
@@ -662,12 +671,13 @@ async def _maybe_generate_followup(scope: str, answer_text: str, *, date: str |
     try:
         from google.genai import types as _gt
         from services.gemini_model_resolver import resolve_gemini_model as _rgm
+        from services.prompt_cache import prompt_cache
         _m = await _rgm("partner_chat", default_pro=False)
         resp = await bot.gemini_client.aio.models.generate_content(
             model=_m,
             contents=_gt.Content(role="user", parts=[_gt.Part.from_text(text=task)]),
-            config=_gt.GenerateContentConfig(
-                system_instruction=system_prompt,
+            config=await prompt_cache.config(
+                bot.gemini_client, _m, "partner_persona", system_prompt,
                 response_mime_type="application/json",
             ),
         )
@@ -809,7 +819,7 @@ async def _generate_message_reflection(date_str: str | None = None) -> str:
 
     joined = "\n".join(f"- {m}" for m in msgs[:60])
 
-    from prompts import get_system_prompt
+    from prompts import current_time_note, get_system_prompt
     partner_cog = bot.get_cog("PartnerCog")
     user_name = getattr(partner_cog, "user_name", "ゆうすけ") if partner_cog else "ゆうすけ"
     now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
@@ -819,9 +829,10 @@ async def _generate_message_reflection(date_str: str | None = None) -> str:
             user_manual = await partner_cog._get_user_manual()
         except Exception:
             user_manual = ""
-    system_prompt = get_system_prompt(user_name, now_str, user_manual)
+    system_prompt = get_system_prompt(user_name, None, user_manual)
 
     task = (
+        f"{current_time_note(now_str)}\n"
         f"今日（{day}）ゆうすけが君に送ってくれたメッセージはこれだよ:\n{joined}\n\n"
         "これを読んで、一日の終わりに『今日のメッセージの振り返り』を短くまとめて。\n"
         "【ねらい】ゆうすけがこれからも気軽にメッセージを送り続けたくなるように、温かく前向きに。\n"
@@ -834,11 +845,12 @@ async def _generate_message_reflection(date_str: str | None = None) -> str:
     )
     try:
         from services.gemini_model_resolver import resolve_gemini_model as _rgm
+        from services.prompt_cache import prompt_cache
         _m = await _rgm("daily_review", default_pro=False)
         resp = await bot.gemini_client.aio.models.generate_content(
             model=_m,
             contents=_gt.Content(role="user", parts=[_gt.Part.from_text(text=task)]),
-            config=_gt.GenerateContentConfig(system_instruction=system_prompt),
+            config=await prompt_cache.config(bot.gemini_client, _m, "partner_persona", system_prompt),
         )
         return (resp.text or "").strip()
     except Exception as e:
@@ -1,6 +1,5 @@
 """EDINET（金融庁書類検索/ダウンロード）関連エンドポイント。"""
 
-import asyncio
 import datetime
 import logging
 import os
@@ -13,6 +12,7 @@ from pydantic import BaseModel
 
 from api.routes import verify_api_key
 from config import JST
+from utils.executors import GOOGLE_API, run_in
 
 router = APIRouter(prefix="/edinet", tags=["edinet"])
 
@@ -92,7 +92,7 @@ async def edinet_download(req: EdinetDownloadRequest):
         existing = await drive.find_file(service, edinet_folder, filename)
         if existing:
             try:
-                await asyncio.to_thread(lambda: service.files().delete(fileId=existing).execute())
+                await run_in(GOOGLE_API, lambda: service.files().delete(fileId=existing).execute())
             except Exception as e:
                 logging.warning(f"EDINET 旧ファイル削除失敗: {e}")
         file_id = await drive.upload_file(
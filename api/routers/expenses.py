@@ -99,13 +99,15 @@ async def analyze_expense_text(text: str) -> dict:
         "金額がはっきり読み取れないときは confidence='low' とし amount は控えめに。"
     )
     try:
+        from services.gemini_gateway import gemini_cache
         from services.gemini_model_resolver import resolve_gemini_model as _rgm
         _m = await _rgm("receipt_ocr", default_pro=False)
-        response = await bot.gemini_client.aio.models.generate_content(
-            model=_m,
-            contents=_gt.Content(role="user", parts=[_gt.Part.from_text(text=prompt)]),
-            config=_gt.GenerateContentConfig(response_mime_type="application/json"),
-        )
+        with gemini_cache("expense_text"):
+            response = await bot.gemini_client.aio.models.generate_content(
+                model=_m,
+                contents=_gt.Content(role="user", parts=[_gt.Part.from_text(text=prompt)]),
+                config=_gt.GenerateContentConfig(response_mime_type="application/json"),
+            )
         return json.loads(response.text)
     except Exception as e:
         logging.error(f"analyze_expense_text error: {e}")
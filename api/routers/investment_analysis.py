@@ -12,17 +12,20 @@ router = APIRouter(prefix="/investment", tags=["investment"])
 
 class InvestmentTickerRequest(BaseModel):
     ticker: str
+    refresh: bool = False
 
 
 class InvestmentEarningsRequest(BaseModel):
     ticker: str
     register_calendar: bool = True
+    refresh: bool = False
 
 
 class InvestmentCEORequest(BaseModel):
     ticker: str
     video_url: str
     video_title: Optional[str] = ""
+    refresh: bool = False
 
 
 class InvestmentConstitutionUpdateRequest(BaseModel):
@@ -42,6 +45,7 @@ class InvestmentEarningsDocSaveUrlRequest(BaseModel):
 class InvestmentDividendRequest(BaseModel):
     ticker: str
     register_calendar: bool = True
+    refresh: bool = False
 
 
 class InvestmentReviewRequest(BaseModel):
@@ -57,19 +61,21 @@ async def investment_sentiment():
 @router.post("/snapshot", dependencies=[Depends(verify_api_key)])
 async def investment_snapshot(req: InvestmentTickerRequest):
     cog = _get_investment_cog()
-    return await cog.run_stock_snapshot(req.ticker)
+    return await cog.run_stock_snapshot(req.ticker, refresh=req.refresh)
 
 
 @router.post("/audit", dependencies=[Depends(verify_api_key)])
 async def investment_audit(req: InvestmentTickerRequest):
     cog = _get_investment_cog()
-    return await cog.run_stock_audit(req.ticker)
+    return await cog.run_stock_audit(req.ticker, refresh=req.refresh)
 
 
 @router.post("/earnings_schedule", dependencies=[Depends(verify_api_key)])
 async def investment_earnings_schedule(req: InvestmentEarningsRequest):
     cog = _get_investment_cog()
-    return await cog.run_earnings_schedule(req.ticker, register_calendar=req.register_calendar)
+    return await cog.run_earnings_schedule(
+        req.ticker, register_calendar=req.register_calendar, refresh=req.refresh
+    )
 
 
 @router.post("/earnings_documents", dependencies=[Depends(verify_api_key)])
@@ -102,7 +108,7 @@ async def investment_earnings_documents_save_file(
 async def investment_ceo_check(req: InvestmentCEORequest):
     cog = _get_investment_cog()
     return await cog.run_ceo_crosscheck(
-        req.ticker, req.video_url, video_title=req.video_title or ""
+        req.ticker, req.video_url, video_title=req.video_title or "", refresh=req.refresh
     )
 
 
@@ -139,20 +145,20 @@ async def investment_history_item(category: str, file_id: str):
 @router.post("/peer_comparison", dependencies=[Depends(verify_api_key)])
 async def investment_peer_comparison(req: InvestmentTickerRequest):
     cog = _get_investment_cog()
-    return await cog.run_peer_comparison(req.ticker)
+    return await cog.run_peer_comparison(req.ticker, refresh=req.refresh)
 
 
 @router.post("/news_sentiment", dependencies=[Depends(verify_api_key)])
 async def investment_news_sentiment(req: InvestmentTickerRequest):
     cog = _get_investment_cog()
-    return await cog.run_news_sentiment(req.ticker)
+    return await cog.run_news_sentiment(req.ticker, refresh=req.refresh)
 
 
 @router.post("/dividend", dependencies=[Depends(verify_api_key)])
 async def investment_dividend(req: InvestmentDividendRequest):
     cog = _get_investment_cog()
     return await cog.run_dividend_schedule(
-        req.ticker, register_calendar=req.register_calendar
+        req.ticker, register_calendar=req.register_calendar, refresh=req.refresh
     )
 
 
@@ -1,13 +1,13 @@
 """旧 StudyCog ベースの勉強エンドポイント（subjects 一覧 / メモ保存）。
 （新しい目標/教材/セッション機能は api/routers/study.py に分離済み）"""
 
-import asyncio
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
 from api.routes import verify_api_key
+from utils.executors import GOOGLE_API, run_in
 
 router = APIRouter(prefix="/study", tags=["study-legacy"])
 
@@ -34,7 +34,8 @@ async def study_subjects():
         )
         if folder_id:
             query = f"'{folder_id}' in parents and trashed=false"
-            results = await asyncio.to_thread(
+            results = await run_in(
+                GOOGLE_API,
                 lambda: service.files().list(
                     q=query, fields="files(id, name, modifiedTime)",
                     orderBy="modifiedTime desc", pageSize=30
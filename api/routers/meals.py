@@ -161,13 +161,15 @@ async def analyze_meal_text(text: str) -> dict:
         "情報が乏しいときは confidence='low' とし、数値は控えめに。"
     )
     try:
+        from services.gemini_gateway import gemini_cache
         from services.gemini_model_resolver import resolve_gemini_model as _rgm
         _m = await _rgm("meal_image", default_pro=False)
-        response = await bot.gemini_client.aio.models.generate_content(
-            model=_m,
-            contents=_gt.Content(role="user", parts=[_gt.Part.from_text(text=prompt)]),
-            config=_gt.GenerateContentConfig(response_mime_type="application/json"),
-        )
+        with gemini_cache("meal_text"):
+            response = await bot.gemini_client.aio.models.generate_content(
+                model=_m,
+                contents=_gt.Content(role="user", parts=[_gt.Part.from_text(text=prompt)]),
+                config=_gt.GenerateContentConfig(response_mime_type="application/json"),
+            )
         data = json.loads(response.text)
         if not (data.get("name") or "").strip():
             data["name"] = fallback["name"]
@@ -1,9 +1,9 @@
 """ノート関連エンドポイント。
 - 手書きメモ画像（単数/複数）→ Gemini Vision で読み取り
 - Drive 上のノート一覧 / 永久ノート検索 / 保存（新規・追記）
+- デイリーノート索引からの期間レビュー（月次・任意期間）
 """
 
-import asyncio
 import base64
 import datetime
 import json
@@ -16,6 +16,7 @@ from pydantic import BaseModel
 
 from api.routes import verify_api_key
 from config import JST
+from utils.executors import GOOGLE_API, run_in
 
 router = APIRouter(prefix="", tags=["notes"])
 
@@ -48,6 +49,11 @@ class SaveNoteRequest(BaseModel):
     target_filename: str = ""
 
 
+class PeriodReviewRequest(BaseModel):
+    start_date: str = ""  # YYYY-MM-DD（省略時は end_date の 30 日前から）
+    end_date: str = ""  # YYYY-MM-DD（省略時は今日）
+
+
 @router.post("/note_from_image", dependencies=[Depends(verify_api_key)])
 async def note_from_image(req: NoteFromImageRequest):
     from google.genai import types
@@ -155,7 +161,8 @@ async def get_notes_list():
     try:
         study_folder = await chat_service.drive_service.find_file(service, drive_root, "StudyLogs")
         if study_folder:
-            results = await asyncio.to_thread(
+            results = await run_in(
+                GOOGLE_API,
                 lambda: service.files().list(
                     q=f"'{study_folder}' in parents and trashed = false",
                     fields="files(id, name)",
@@ -197,7 +204,8 @@ async def search_notes(q: str = "", limit: int = 8):
         notes_folder = await chat_service.drive_service.find_file(service, drive_root, "Notes")
         if not notes_folder:
             return {"candidates": []}
-        results = await asyncio.to_thread(
+        results = await run_in(
+            GOOGLE_API,
             lambda: service.files().list(
                 q=f"'{notes_folder}' in parents and trashed = false",
                 fields="files(id, name, modifiedTime)",
@@ -381,3 +389,31 @@ async def save_note(req: SaveNoteRequest):
         raise HTTPException(status_code=500, detail=f"保存に失敗しました: {str(e)}")
 
     return {"status": "success"}
+
+
+def _get_review_cog():
+    from api import app
+    bot = getattr(app.state, "bot", None)
+    if not bot:
+        raise HTTPException(status_code=503, detail="Botエンジンが初期化されていません。")
+    cog = bot.get_cog("WeeklyReviewCog")
+    if not cog:
+        raise HTTPException(status_code=503, detail="WeeklyReviewCogがロードされていません。")
+    return cog
+
+
+@router.post("/notes/review", dependencies=[Depends(verify_api_key)])
+async def notes_period_review(req: PeriodReviewRequest = PeriodReviewRequest()):
+    """指定期間のデイリーノート（Alter Log / Insights / Events）から振り返りレポートを生成する。"""
+    try:
+        end = datetime.date.fromisoformat(req.end_date) if req.end_date else datetime.datetime.now(JST).date()
+        start = datetime.date.fromisoformat(req.start_date) if req.start_date else end - datetime.timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日付は YYYY-MM-DD 形式で指定してください。")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date は end_date 以前にしてください。")
+    if (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="期間は最大 1 年までです。")
+
+    report = await _get_review_cog().run_review(start.isoformat(), end.isoformat())
+    return {"start_date": start.isoformat(), "end_date": end.isoformat(), "report": report}
@@ -1,10 +1,10 @@
-"""Web Push 通知（VAPID鍵公開・購読/解除・テスト）。"""
+"""Web Push 通知（VAPID鍵公開・購読/解除・テスト・配信状況）。"""
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
 from api import notification_service
-from api.database import add_push_subscription, remove_push_subscription
+from api.database import add_push_subscription, push_delivery_stats, remove_push_subscription
 from api.routes import verify_api_key
 
 router = APIRouter(prefix="", tags=["push"])
@@ -47,3 +47,9 @@ async def push_test():
     """通知テスト送信。設定確認用。"""
     count = await notification_service.send_push("通知テスト", "通知が届けば設定はOKだよ！")
     return {"status": "success", "delivered": count}
+
+
+@router.get("/push/stats", dependencies=[Depends(verify_api_key)])
+async def push_stats(hours: int = 24):
+    """直近の配信状況（状態別件数・往復時間）。"""
+    return await push_delivery_stats(max(1, min(hours, 24 * 7)))
@@ -1,6 +1,5 @@
 """読書機能（書籍一覧 / 読書メモ保存 / マネージャー問いかけ / ログ / 多読プラン）。"""
 
-import asyncio
 import logging
 import re
 from typing import List
@@ -10,6 +9,7 @@ from pydantic import BaseModel
 
 from api.database import get_all_links, get_reading_plan, update_reading_plan
 from api.routes import verify_api_key
+from utils.executors import GOOGLE_API, run_in
 
 router = APIRouter(prefix="/reading", tags=["reading"])
 
@@ -60,7 +60,8 @@ async def reading_books():
                 )
                 if folder_id:
                     query = f"'{folder_id}' in parents and mimeType='text/markdown' and trashed=false"
-                    results = await asyncio.to_thread(
+                    results = await run_in(
+                        GOOGLE_API,
                         lambda: service.files().list(
                             q=query, fields="files(id, name, modifiedTime)",
                             orderBy="modifiedTime desc", pageSize=30
@@ -29,12 +29,13 @@ class SettingsSchedulesRequest(BaseModel):
 @router.get("/schedules", dependencies=[Depends(verify_api_key)])
 async def settings_schedules_get():
     """カタログを 2 グループ（manager / auto）に分けて返す。時刻は固定で読取専用。"""
-    from api.database import get_app_setting
+    from services.job_scheduler import scheduler
     from services.schedule_resolver import SCHEDULE_CATALOG
+    flags = await scheduler.enabled_flags()
+    next_runs = scheduler.next_runs()
     manager = []
     auto = []
     for row in SCHEDULE_CATALOG:
-        enabled = await get_app_setting(_schedule_setting_key(row["key"], "enabled"), "1")
         entry = {
             "key": row["key"],
             "label": row["label"],
@@ -43,7 +44,8 @@ async def settings_schedules_get():
             "dow": row["dow"],
             "dow_label": _DOW_LABEL.get(row["dow"], row["dow"]),
             "category": row["category"],
-            "enabled": enabled == "1",
+            "enabled": flags.get(row["key"], True),
+            "next_run": (next_runs.get(row["key"]) or {}).get("next_run"),
         }
         if row["category"] == "manager":
             manager.append(entry)
@@ -65,9 +67,21 @@ async def settings_schedules_post(req: SettingsSchedulesRequest):
         if "enabled" in v:
             await set_app_setting(_schedule_setting_key(k, "enabled"), "1" if v["enabled"] else "0")
             saved += 1
+    if saved:
+        from services.job_scheduler import scheduler
+        scheduler.invalidate_settings()
     return {"ok": True, "saved": saved}
 
 
+@router.get("/schedules/runs", dependencies=[Depends(verify_api_key)])
+async def settings_schedules_runs(job_key: str = "", limit: int = 50):
+    """定時ジョブの実行履歴（新しい順）とスケジューラの統計。"""
+    from api.database import job_runs_recent
+    from services.job_scheduler import scheduler
+    runs = await job_runs_recent(job_key or None, max(1, min(limit, 500)))
+    return {"ok": True, "runs": runs, "jobs": scheduler.next_runs(), "stats": scheduler.stats}
+
+
 # ===== Gemini Gem URL =====
 
 GEM_URL_CATALOG = [
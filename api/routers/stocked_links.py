@@ -1,12 +1,12 @@
 """ストックリンク（Web/YouTube/レシピ/マップ/書籍）関連エンドポイント。
 
-CRUD + 一括既読化。ヘルパー sync_link_to_obsidian / DB 関数は routes.py や api.database から共有利用。
+CRUD + 一括既読化 + タグ・サムネイルの一括補完ジョブ。ヘルパー sync_link_to_obsidian / DB 関数は routes.py や api.database から共有利用。
 """
 
 import datetime
 import logging
 import os
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
@@ -16,7 +16,7 @@ from api.database import (
     update_link_details, mark_link_as_saved, delete_stocked_link,
     backup_db_to_drive, set_link_thumbnail, set_link_tags, set_link_cook_dates,
 )
-from api.routes import verify_api_key, sync_link_to_obsidian, fetch_og_image
+from api.routes import verify_api_key, sync_link_to_obsidian
 from utils.async_utils import safe_create_task
 
 router = APIRouter(prefix="/links", tags=["links"])
@@ -60,7 +60,7 @@ def _schedule_db_backup(name: str):
 async def _generate_tags(title: str, link_type: str, summary: str = "") -> str:
     """タイトル（＋概要）から分類用タグを 1〜3 個、AI（Flash）で生成する。失敗時は空。"""
     from api import app
-    import re as _re
+    from services.link_enrichment_service import normalize_tags
 
     bot = getattr(app.state, "bot", None)
     if not bot or not getattr(bot, "gemini_client", None) or not (title or "").strip():
@@ -75,13 +75,12 @@ async def _generate_tags(title: str, link_type: str, summary: str = "") -> str:
         f"タイトル: {title}\n" + (f"概要: {summary[:300]}\n" if summary else "")
     )
     try:
+        from services.gemini_gateway import gemini_cache
         from services.gemini_model_resolver import resolve_gemini_model as _rgm
         model = await _rgm("link_auto_tag", default_pro=False)
-        resp = await bot.gemini_client.aio.models.generate_content(model=model, contents=prompt)
-        raw = (resp.text or "").strip()
-        parts = [p.strip(" 　#・-・") for p in _re.split(r"[,、\n]", raw) if p.strip()]
-        parts = [p for p in parts if p and len(p) <= 12][:3]
-        return ",".join(parts)
+        with gemini_cache("link_tags"):
+            resp = await bot.gemini_client.aio.models.generate_content(model=model, contents=prompt)
+        return normalize_tags((resp.text or "").strip())
     except Exception as e:
         logging.debug(f"auto tag generate error: {e}")
         return ""
@@ -115,62 +114,51 @@ async def link_auto_tag(link_id: int, req: AutoTagRequest = AutoTagRequest()):
     return {"ok": True, "tags": tags}
 
 
+def _get_enrich_cog():
+    from api import app
+    bot = getattr(app.state, "bot", None)
+    if not bot:
+        raise HTTPException(status_code=503, detail="Botエンジンが初期化されていません。")
+    cog = bot.get_cog("LinkEnrichCog")
+    if not cog:
+        raise HTTPException(status_code=503, detail="LinkEnrichCogがロードされていません。")
+    return cog
+
+
+class EnrichRequest(BaseModel):
+    kind: str = "all"  # tags / thumbnails / all
+    link_ids: Optional[List[int]] = None  # 省略時は全リンク
+    overwrite: bool = False  # 既存タグも付け直す
+    refresh: bool = False  # 取得済み・URL キャッシュ済みのサムネイルも取り直す
+
+
 @router.post("/auto_tag_all", dependencies=[Depends(verify_api_key)])
 async def link_auto_tag_all():
-    """タグが付いていないリンク全件にAIでタグを自動付与する（一括）。"""
-    links = await get_all_links()
-    targets = [lk for lk in links if not (lk.get("tags") or "").strip()]
-    count = 0
-    for lk in targets:
-        try:
-            tags = await auto_tag_link(lk["id"], overwrite=False)
-            if tags:
-                count += 1
-        except Exception as e:
-            logging.debug(f"auto_tag_all error ({lk.get('id')}): {e}")
-    return {"ok": True, "tagged": count, "total": len(targets)}
+    """タグが付いていないリンク全件にAIでタグを自動付与する（一括）。
+    バックグラウンドジョブとして起動し job_id を返す。進捗は /links/enrich/{job_id}。"""
+    return await _get_enrich_cog().start_job("tags")
 
 
-@router.get("", dependencies=[Depends(verify_api_key)])
-async def get_links():
-    return {"links": await get_all_links()}
-
+@router.post("/enrich", dependencies=[Depends(verify_api_key)])
+async def link_enrich(req: EnrichRequest = EnrichRequest()):
+    """タグ・サムネイルの一括補完ジョブを起動し job_id を返す（再起動しても続きから再開する）。"""
+    return await _get_enrich_cog().start_job(
+        req.kind, link_ids=req.link_ids, overwrite=req.overwrite, refresh=req.refresh,
+    )
 
-async def _fetch_thumbnail_for_link(lk: dict) -> str:
-    """リンク種別に応じた最適な方法でサムネイル画像URLを取得する。
-    書籍は Google Books、マップは Google Places、それ以外は OGP画像。
-    種別固有の取得に失敗したら OGP画像にフォールバックする。"""
-    from api.routes import fetch_book_cover, fetch_place_photo, _extract_youtube_id
 
-    url = lk.get("url") or ""
-    ltype = lk.get("type") or "web"
-    title = (lk.get("title") or "").strip()
+@router.get("/enrich/{job_id}", dependencies=[Depends(verify_api_key)])
+async def link_enrich_status(job_id: str):
+    """一括補完ジョブの進捗（処理済み件数・付与件数・残り）。"""
+    res = await _get_enrich_cog().get_job_status(job_id)
+    if not res.get("ok"):
+        raise HTTPException(status_code=404, detail=res.get("error") or "ジョブが見つかりません")
+    return res
 
-    # YouTube は動画サムネをフロントで使うのでサーバー取得は不要
-    if _extract_youtube_id(url):
-        return ""
 
-    if ltype == "book":
-        img = await fetch_book_cover(title)
-        if img:
-            return img
-        return await fetch_og_image(url)
-    if ltype == "map":
-        # タイトルが場所名（fetch_maps_info 由来）。汎用名なら URL から場所名を引き直す。
-        query = title
-        if not query or query in ("Google Maps", "Google Maps Location", "Untitled"):
-            try:
-                from web_parser import fetch_maps_info
-                place_name, _ = await fetch_maps_info(url)
-                if place_name and place_name != "Google Maps Location":
-                    query = place_name
-            except Exception:
-                pass
-        img = await fetch_place_photo(query)
-        if img:
-            return img
-        return await fetch_og_image(url)
-    return await fetch_og_image(url)
+@router.get("", dependencies=[Depends(verify_api_key)])
+async def get_links():
+    return {"links": await get_all_links()}
 
 
 class ThumbnailRequest(BaseModel):
@@ -187,7 +175,8 @@ async def link_thumbnail(link_id: int, req: ThumbnailRequest = ThumbnailRequest(
     cached = (lk.get("thumbnail") or "").strip()
     if cached and not req.refresh:
         return {"ok": True, "thumbnail": "" if cached == "__none__" else cached}
-    img = await _fetch_thumbnail_for_link(lk)
+    from services.link_enrichment_service import thumbnail_for_link
+    img = await thumbnail_for_link(lk, refresh=req.refresh)
     await set_link_thumbnail(link_id, img or "__none__")
     return {"ok": True, "thumbnail": img}
 
@@ -349,7 +338,7 @@ async def update_link(link_id: int, req: LinkUpdateRequest):
             try:
                 cal_svc = bot.calendar_service.get_service()
                 if existing_cal_event_id:
-                    cal_svc.events().update(
+                    result = cal_svc.events().update(
                         calendarId="primary", eventId=existing_cal_event_id, body=cal_body
                     ).execute()
                 else:
@@ -357,6 +346,8 @@ async def update_link(link_id: int, req: LinkUpdateRequest):
                         calendarId="primary", body=cal_body
                     ).execute()
                     new_cal_event_id = result.get("id", "")
+                if bot.calendar_service.calendar_id == "primary":
+                    await bot.calendar_service.remember_event(result)
             except Exception as e:
                 logging.warning(f"link calendar add/update failed: {e}")
 
@@ -1,7 +1,6 @@
 """ゼロ秒思考（Zero Second Thinking）関連エンドポイント。
 テーマ候補生成 / 深掘りテーマ / セッション保存 / 開始ログ。"""
 
-import asyncio
 import datetime
 import json
 import logging
@@ -13,6 +12,7 @@ from pydantic import BaseModel
 
 from api.routes import verify_api_key
 from config import JST
+from utils.executors import GOOGLE_API, run_in
 
 router = APIRouter(prefix="/zerosec", tags=["zerosec"])
 
@@ -120,7 +120,8 @@ async def zerosec_save(req: ZTSaveRequest):
         try:
             query = (f"'{folder_id}' in parents and trashed=false "
                      f"and name contains '{session_id}'")
-            results = await asyncio.to_thread(
+            results = await run_in(
+                GOOGLE_API,
                 lambda: service.files().list(q=query, fields="files(id, name)").execute()
             )
             files = results.get("files", [])
@@ -4,6 +4,7 @@ import logging
 import asyncio
 import datetime
 import json
+from dataclasses import dataclass
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, Depends, Header, UploadFile, File, Form
 from pydantic import BaseModel
@@ -34,6 +35,7 @@ from config import (
     TIMEOUT_PLAYWRIGHT,
 )
 from utils.async_utils import safe_create_task
+from utils.executors import GOOGLE_API, run_in
 
 router = APIRouter(prefix="/api")
 
@@ -152,6 +154,7 @@ class ChatRequest(BaseModel):
 # 冪等キー → (timestamp, ChatResponse) のキャッシュ。5 秒以内の同 ID 再送は弾く
 _CHAT_IDEMPOTENCY_CACHE: dict = {}
 _CHAT_IDEMPOTENCY_WINDOW_SEC = 5.0
+_CHAT_STREAM_PING_SEC = 15.0  # /chat_stream で無音が続いたときの keep-alive 間隔
 
 class ChatResponse(BaseModel):
     reply: str
@@ -170,11 +173,12 @@ async def authenticate(req: AuthRequest):
         raise HTTPException(status_code=401, detail="パスワードが正しくありません。")
     return {"api_key": API_KEY}
 
-async def fetch_og_image(url: str) -> str:
+async def fetch_og_image(url: str, session=None) -> str:
     """ページから og:image（なければ twitter:image など）を取り出し、絶対URLで返す。失敗時は空。
 
     Amazon（書籍）や Google Maps（場所）は og:image だけだと取れないことがあるため、
     サイト別のフォールバックも持つ。Amazon は商品画像、Maps は場所写真を拾う。
+    session（aiohttp.ClientSession）を渡すと接続を使い回す（一括取得用）。
     """
     import aiohttp
     import re as _re
@@ -192,13 +196,15 @@ async def fetch_og_image(url: str) -> str:
     is_amazon = ("amazon.co.jp" in url or "amazon.com" in url or "amzn." in url)
     try:
         timeout = aiohttp.ClientTimeout(total=TIMEOUT_HTTP_DEFAULT)
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-            async with session.get(url, allow_redirects=True) as resp:
-                if resp.status != 200:
-                    return ""
-                final_url = str(resp.url)
-                # Amazon は商品画像が <head> より後ろにあることがあるので多めに読む。
-                raw = await resp.content.read(600_000 if is_amazon else 250_000)
+        if session is None:
+            async with aiohttp.ClientSession(timeout=timeout) as own:
+                return await fetch_og_image(url, own)
+        async with session.get(url, headers=headers, timeout=timeout, allow_redirects=True) as resp:
+            if resp.status != 200:
+                return ""
+            final_url = str(resp.url)
+            # Amazon は商品画像が <head> より後ろにあることがあるので多めに読む。
+            raw = await resp.content.read(600_000 if is_amazon else 250_000)
         html = raw.decode("utf-8", "ignore")
 
         # Amazon 商品画像（og:image が無い/汎用画像のことがあるので商品画像を優先で拾う）
@@ -235,7 +241,7 @@ async def fetch_og_image(url: str) -> str:
     return ""
 
 
-async def fetch_book_cover(title: str, author: str = "") -> str:
+async def fetch_book_cover(title: str, author: str = "", session=None) -> str:
     """Google Books API で書籍の表紙画像URLを取得する（Amazonのスクレイピングより確実）。
     GOOGLE_BOOKS_API_KEY があれば使う（無くてもAPIは叩けるがレート制限が厳しい）。失敗時は空。"""
     import aiohttp
@@ -255,11 +261,13 @@ async def fetch_book_cover(title: str, author: str = "") -> str:
         url += f"&key={key}"
     try:
         timeout = aiohttp.ClientTimeout(total=TIMEOUT_HTTP_SHORT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    return ""
-                data = await resp.json()
+        if session is None:
+            async with aiohttp.ClientSession(timeout=timeout) as own:
+                return await fetch_book_cover(title, author, own)
+        async with session.get(url, timeout=timeout) as resp:
+            if resp.status != 200:
+                return ""
+            data = await resp.json()
         for item in (data.get("items") or []):
             links = ((item.get("volumeInfo") or {}).get("imageLinks") or {})
             img = links.get("thumbnail") or links.get("smallThumbnail") or ""
@@ -273,7 +281,7 @@ async def fetch_book_cover(title: str, author: str = "") -> str:
     return ""
 
 
-async def fetch_place_photo(query: str) -> str:
+async def fetch_place_photo(query: str, session=None) -> str:
     """Google Places API で場所の写真URLを取得する。GOOGLE_PLACES_API_KEY が必要。
     Photo エンドポイントは 302 で実画像(googleusercontent)へリダイレクトするため、
     その最終URL（キー不要）を取り出して保存する。失敗時は空。"""
@@ -286,36 +294,38 @@ async def fetch_place_photo(query: str) -> str:
         return ""
     try:
         timeout = aiohttp.ClientTimeout(total=TIMEOUT_HTTP_SHORT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            search_url = (
-                "https://maps.googleapis.com/maps/api/place/textsearch/json"
-                f"?query={quote(q)}&language=ja&key={key}"
-            )
-            async with session.get(search_url) as resp:
-                if resp.status != 200:
-                    return ""
-                data = await resp.json()
-            results = data.get("results") or []
-            photo_ref = ""
-            for r in results:
-                photos = r.get("photos") or []
-                if photos and photos[0].get("photo_reference"):
-                    photo_ref = photos[0]["photo_reference"]
-                    break
-            if not photo_ref:
+        if session is None:
+            async with aiohttp.ClientSession(timeout=timeout) as own:
+                return await fetch_place_photo(query, own)
+        search_url = (
+            "https://maps.googleapis.com/maps/api/place/textsearch/json"
+            f"?query={quote(q)}&language=ja&key={key}"
+        )
+        async with session.get(search_url, timeout=timeout) as resp:
+            if resp.status != 200:
                 return ""
-            photo_url = (
-                "https://maps.googleapis.com/maps/api/place/photo"
-                f"?maxwidth=600&photo_reference={photo_ref}&key={key}"
-            )
-            # リダイレクト先（キー不要の実画像URL）を取得して保存する
-            async with session.get(photo_url, allow_redirects=False) as presp:
-                loc = presp.headers.get("Location") or ""
-                if loc:
-                    return loc
-                # 一部環境では直接画像が返る場合がある（その場合はキー付きURLを返す）
-                if presp.status == 200:
-                    return photo_url
+            data = await resp.json()
+        results = data.get("results") or []
+        photo_ref = ""
+        for r in results:
+            photos = r.get("photos") or []
+            if photos and photos[0].get("photo_reference"):
+                photo_ref = photos[0]["photo_reference"]
+                break
+        if not photo_ref:
+            return ""
+        photo_url = (
+            "https://maps.googleapis.com/maps/api/place/photo"
+            f"?maxwidth=600&photo_reference={photo_ref}&key={key}"
+        )
+        # リダイレクト先（キー不要の実画像URL）を取得して保存する
+        async with session.get(photo_url, timeout=timeout, allow_redirects=False) as presp:
+            loc = presp.headers.get("Location") or ""
+            if loc:
+                return loc
+            # 一部環境では直接画像が返る場合がある（その場合はキー付きURLを返す）
+            if presp.status == 200:
+                return photo_url
     except Exception as e:
         logging.debug(f"Places 写真取得失敗 ({q}): {e}")
     return ""
@@ -458,7 +468,7 @@ async def sync_link_to_obsidian(chat_service, title: str, link_type: str, url: s
         for search_title in search_titles:
             q_title = search_title.replace("'", "\\'")
             query = f"'{f_id}' in parents and name contains '{q_title}' and trashed = false"
-            results = await asyncio.to_thread(lambda: service.files().list(q=query, fields="files(id, name)").execute())
+            results = await run_in(GOOGLE_API, lambda: service.files().list(q=query, fields="files(id, name)").execute())
             for f in results.get("files", []):
                 fname = f["name"]
                 if fname == f"{search_title}.md" or fname.endswith(f"-{search_title}.md"):
@@ -523,12 +533,23 @@ async def sync_link_to_obsidian(chat_service, title: str, link_type: str, url: s
     except Exception as e: logging.error(f"Obsidian Sync Error: {e}")
 
 
-@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(verify_api_key)])
-async def chat(req: ChatRequest):
+@dataclass
+class _ChatTurn:
+    """AI に渡す直前まで準備したチャット 1 往復（/chat と /chat_stream で共通）。"""
+    bot: object
+    partner_cog: object
+    user_id: Optional[int]
+    user_message: str
+    history_messages: list
+    translation: Optional[str]
+
+
+async def _begin_chat_turn(req: ChatRequest):
+    """冪等キーの確認・リンクのストック・ユーザー発言の保存・履歴の組み立てまでを行う。
+    その場で返答が決まる場合（冪等キーの再送・リンク共有）は ChatResponse を、AI に回す場合は _ChatTurn を返す。"""
     from api import app
     import re
     import time as _time_mod
-    from api.database import backup_db_to_drive
 
     # 冪等キーによる二重送信ガード
     if req.client_msg_id:
@@ -623,6 +644,8 @@ async def chat(req: ChatRequest):
     if not bot: raise HTTPException(status_code=503, detail="Botエンジンが初期化されていません。")
     partner_cog = bot.get_cog("PartnerCog")
     if not partner_cog: raise HTTPException(status_code=503, detail="AIコアがロードされていません。")
+    # 履歴の読み込み・翻訳・生成の間に、取扱説明書や今日の予定・タスクを裏で揃えておく
+    partner_cog.prefetch_chat_context(req.message)
 
     user_id = await save_message("user", req.message, reply_to=req.reply_to_id)
 
@@ -688,11 +711,19 @@ async def chat(req: ChatRequest):
     if not req.english_mode and not is_japanese and _re.search(r'[a-zA-Z]', req.message) and len(req.message) > 5:
         english_feedback_hint = "\n\n[SYSTEM HINT: The user has written in English. Naturally include brief, encouraging feedback on their English (grammar, naturalness, word choice) within your response. Keep feedback short and positive.]"
 
-    reply = await partner_cog.generate_response_for_app(
-        user_message + english_feedback_hint, history_messages,
-        english_mode=req.english_mode, search_mode=req.search_mode,
+    return _ChatTurn(
+        bot=bot, partner_cog=partner_cog, user_id=user_id,
+        user_message=user_message + english_feedback_hint,
+        history_messages=history_messages, translation=translation,
     )
 
+
+async def _finish_chat_turn(req: ChatRequest, turn: _ChatTurn, reply: str) -> ChatResponse:
+    """AI の返信を保存・通知し、夜の振り返り回答の記録やバックアップを済ませて ChatResponse を返す。"""
+    import time as _time_mod
+    from api.database import backup_db_to_drive
+
+    bot, user_id, translation = turn.bot, turn.user_id, turn.translation
     # 「〇〇を食べた」系のメッセージを検出 → 食事ログ登録ボタンを添える
     try:
         if "[ACTION:log_meal" not in reply:
@@ -746,6 +777,82 @@ async def chat(req: ChatRequest):
         _CHAT_IDEMPOTENCY_CACHE[req.client_msg_id] = (_time_mod.time(), _resp)
     return _resp
 
+
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(verify_api_key)])
+async def chat(req: ChatRequest):
+    turn = await _begin_chat_turn(req)
+    if not isinstance(turn, _ChatTurn):
+        return turn
+    reply = await turn.partner_cog.generate_response_for_app(
+        turn.user_message, turn.history_messages,
+        english_mode=req.english_mode, search_mode=req.search_mode,
+    )
+    return await _finish_chat_turn(req, turn, reply)
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat_stream", dependencies=[Depends(verify_api_key)])
+async def chat_stream(req: ChatRequest):
+    """/chat のストリーム版（Server-Sent Events）。
+
+    delta（本文の差分）・tool（ツール実行の開始/終了）を順に送り、最後に done（/chat と同じ
+    ChatResponse の中身。ACTION マーカー込みの返信全文）か error を送る。生成と保存は接続とは別の
+    タスクで最後まで行うので、途中で画面を閉じても返信は保存され、同じ client_msg_id の再送には
+    保存済みの応答が返る。"""
+    from fastapi.responses import StreamingResponse
+
+    turn = await _begin_chat_turn(req)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            if not isinstance(turn, _ChatTurn):
+                resp = turn
+            else:
+                reply = None
+                async for event in turn.partner_cog.stream_response_for_app(
+                    turn.user_message, turn.history_messages,
+                    english_mode=req.english_mode, search_mode=req.search_mode,
+                ):
+                    if event["type"] == "final":
+                        reply = event["text"]
+                    else:
+                        queue.put_nowait(event)
+                resp = await _finish_chat_turn(req, turn, reply or "了解！")
+            if resp is None:
+                # 同じ client_msg_id の要求がまだ処理中
+                queue.put_nowait({"type": "error", "detail": "同じメッセージを処理中です。"})
+                return
+            queue.put_nowait({"type": "done", **resp.model_dump()})
+        except Exception as e:
+            logging.error(f"chat_stream failed: {e}", exc_info=True)
+            if req.client_msg_id:
+                _CHAT_IDEMPOTENCY_CACHE.pop(req.client_msg_id, None)
+            queue.put_nowait({"type": "error", "detail": "エラーが発生しました。"})
+
+    safe_create_task(produce(), name="chat-stream")
+
+    async def events():
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=_CHAT_STREAM_PING_SEC)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"   # プロキシに切られないよう、間が空いたらコメント行を送る
+                continue
+            yield _sse(event)
+            if event["type"] in ("done", "error"):
+                return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # /history, /error_log, /permanent_notes/confirm は api/routers/core_misc.py へ移動済み
 
 # /dashboard は api/routers/dashboard.py へ移動済み
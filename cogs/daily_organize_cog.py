@@ -1,17 +1,31 @@
 import os
+import asyncio
 import logging
 import datetime
+import hashlib
 import json
 import re
 
-from discord.ext import commands, tasks
+from discord.ext import commands
 from google.genai import types
 
 from config import JST
+from services.job_scheduler import scheduler
 from utils.obsidian_utils import update_section, update_frontmatter
 from prompts import PROMPT_DAILY_ORGANIZE
 from services.info_service import InfoService
-from api.database import get_history
+from api.database import get_messages_between, timeline_summary_get, timeline_summary_put
+
+# 時間帯別要約の共通ルール（まとめて要約・個別要約の両方で使う）
+_PERIOD_SUMMARY_RULES = (
+    "- 文体は必ず「だ・である」調（『〜した』『〜だ』『〜である』など）。タメ口や敬語は禁止\n"
+    "- 体言止め（『投資の相談』『夕食メニュー』など名詞だけで終わる形）は禁止\n"
+    "- 朝/昼/夜などの時間帯ラベルを文中に含めない\n"
+    "- 感情語や評価語を含めず、客観的事実のみ\n"
+    "- 同種の話題はまとめて1行\n"
+)
+# プロンプトや区分を変えたら上げる（要約キャッシュのキーに含める）
+_PERIOD_SUMMARY_VERSION = 1
 
 
 class DailyOrganizeCog(commands.Cog):
@@ -24,19 +38,13 @@ class DailyOrganizeCog(commands.Cog):
         self.tasks_service = getattr(bot, "tasks_service", None)
         self.info_service = getattr(bot, "info_service", InfoService())
 
-        self._last_run_date = None
-        self.daily_organize_task.start()
+        # 23:55 の整理は「今日」のノートを書くので、取りこぼしの再実行も日付が変わる前まで
+        scheduler.register("daily_organize", self.daily_organize_task, catch_up_sec=4 * 60)
 
     def cog_unload(self):
-        self.daily_organize_task.cancel()
+        scheduler.unregister("daily_organize")
 
-    @tasks.loop(minutes=1)
     async def daily_organize_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("daily_organize", "23:55", "daily", self._last_run_date)
-        if not due:
-            return
-        self._last_run_date = today
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -55,6 +63,7 @@ class DailyOrganizeCog(commands.Cog):
         min_t = weather_res.get("min_temp", "N/A")
 
         location_log_text = "（記録なし）"
+        note_content = None
         service = self.drive_service.get_service()
         if service:
             daily_folder = await self.drive_service.find_file(
@@ -69,6 +78,7 @@ class DailyOrganizeCog(commands.Cog):
                         raw_content = await self.drive_service.read_text_file(
                             service, daily_file
                         )
+                        note_content = raw_content or ""
                         match = re.search(
                             r"## 📍 Location History\n(.*?)(?=\n## |\Z)",
                             raw_content,
@@ -111,7 +121,7 @@ class DailyOrganizeCog(commands.Cog):
         }
 
         try:
-            timeline_md = await self._build_integrated_timeline(today_str, location_log_text)
+            timeline_md = await self._build_integrated_timeline(today_str, location_log_text, note_content)
             if timeline_md:
                 result["timeline"] = timeline_md
         except Exception as e:
@@ -254,11 +264,16 @@ class DailyOrganizeCog(commands.Cog):
     async def _summarize_user_messages_per_period(self, date_str: str) -> list:
         """ユーザー発言を時間帯ごとに集約して Gemini で1〜3行に要約する。
         会話原文は ## 💬 Chat Log セクションに保存されるためここでは要約のみ作る。
+        全時間帯を 1 回の構造化出力リクエストでまとめて要約し、形式が崩れた時間帯だけ
+        個別リクエスト（並列）で補う。発言集合が前回と同じならキャッシュを返す（再生成は無料）。
         戻り値: [(start_HHMM, end_HHMM, bullets_list), ...]
         bullets_list は「だ・である」調の短い箇条書き（時間帯ラベル不要）。
         """
         try:
-            history = await get_history(limit=500)
+            day = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+            history = await get_messages_between(
+                date_str, (day + datetime.timedelta(days=1)).strftime("%Y-%m-%d"), role="user"
+            )
         except Exception as e:
             logging.error(f"timeline: history fetch error: {e}")
             return []
@@ -267,10 +282,6 @@ class DailyOrganizeCog(commands.Cog):
         buckets = {b[2]: [] for b in self._PERIOD_BUCKETS}
         for m in history:
             ts = m.get("timestamp") or ""
-            if not ts.startswith(date_str):
-                continue
-            if m.get("role") != "user":
-                continue
             content = (m.get("content") or "").strip()
             if not content:
                 continue
@@ -286,62 +297,151 @@ class DailyOrganizeCog(commands.Cog):
                     buckets[name].append((hhmm, content))
                     break
 
+        joined_by_period = {
+            name: "\n".join(f"[{t}] {c}" for t, c in buckets[name])
+            for _s, _e, name in self._PERIOD_BUCKETS if buckets[name]
+        }
+        if not joined_by_period:
+            return []
+
+        msg_hash = hashlib.sha1(
+            json.dumps([_PERIOD_SUMMARY_VERSION, joined_by_period], ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        try:
+            cached = await timeline_summary_get(date_str, msg_hash)
+        except Exception as e:
+            logging.debug(f"timeline: summary cache read failed: {e}")
+            cached = None
+
+        if cached is not None:
+            summaries = cached
+        else:
+            summaries, complete = await self._summarize_periods(joined_by_period)
+            if complete and self.gemini_client:
+                try:
+                    await timeline_summary_put(date_str, msg_hash, summaries)
+                except Exception as e:
+                    logging.debug(f"timeline: summary cache write failed: {e}")
+
         results = []
         for start, end, name in self._PERIOD_BUCKETS:
-            msgs = buckets.get(name, [])
-            if not msgs:
+            bullets = summaries.get(name) or []
+            if bullets:
+                results.append((start, end, bullets))
+        return results
+
+    async def _summarize_periods(self, joined_by_period: dict) -> tuple[dict, bool]:
+        """全時間帯を 1 リクエストで要約する。返り値は ({区分名: bullets}, 全区分そろったか)。
+        応答がスキーマどおりでない区分は _summarize_period_messages で並列に個別要約する。"""
+        summaries: dict[str, list] = {}
+        if self.gemini_client:
+            sections = "\n\n".join(
+                f"### {name}\n{joined}" for name, joined in joined_by_period.items()
+            )
+            prompt = (
+                "次は1日のうちの各時間帯にユーザーが送信したチャット発言です（### の後が時間帯名）。\n"
+                "発言原文は別に保存されているので、ここでは時間帯ごとの要約だけ作ってください。\n"
+                "各時間帯について、次のルールで1〜3行の短い行動・話題の要約を bullets に入れます。\n"
+                f"{_PERIOD_SUMMARY_RULES}"
+                "- period には入力の時間帯名をそのまま入れ、入力にある全時間帯を返す\n\n"
+                f"--- 発言ログ ---\n{sections}\n--- 終わり ---"
+            )
+            schema = types.Schema(
+                type="OBJECT",
+                properties={
+                    "periods": types.Schema(
+                        type="ARRAY",
+                        items=types.Schema(
+                            type="OBJECT",
+                            properties={
+                                "period": types.Schema(type="STRING"),
+                                "bullets": types.Schema(type="ARRAY", items=types.Schema(type="STRING")),
+                            },
+                            required=["period", "bullets"],
+                        ),
+                    ),
+                },
+                required=["periods"],
+            )
+            try:
+                from services.gemini_gateway import gemini_cache
+                from services.gemini_model_resolver import resolve_gemini_model
+                _m = await resolve_gemini_model("routines", default_pro=False)
+                with gemini_cache("period_summary"):
+                    response = await self.gemini_client.aio.models.generate_content(
+                        model=_m,
+                        contents=prompt,
+                        config=types.GenerateContentConfig(
+                            response_mime_type="application/json", response_schema=schema
+                        ),
+                    )
+                data = json.loads(response.text or "{}")
+                for row in data.get("periods") or []:
+                    name = (row.get("period") or "").strip()
+                    raw = row.get("bullets")
+                    if name in joined_by_period and isinstance(raw, list):
+                        bullets = self._clean_bullets(str(b) for b in raw)
+                        if bullets:
+                            summaries[name] = bullets
+            except Exception as e:
+                logging.warning(f"timeline: batched summary failed, falling back per period: {e}")
+
+        missing = [name for name in joined_by_period if name not in summaries]
+        if missing:
+            fallback = await asyncio.gather(
+                *(self._summarize_period_messages(name, joined_by_period[name]) for name in missing)
+            )
+            for name, bullets in zip(missing, fallback):
+                if bullets:
+                    summaries[name] = bullets
+        return summaries, all(name in summaries for name in joined_by_period)
+
+    @staticmethod
+    def _clean_bullets(lines) -> list:
+        """最大3行に制限し、・/-/数字などの行頭記号を落とした本文だけを拾う。"""
+        bullets = []
+        for line in lines:
+            line = line.strip()
+            if not line:
                 continue
-            joined = "\n".join(f"[{t}] {c}" for t, c in msgs)
-            bullets = await self._summarize_period_messages(name, joined)
-            if not bullets:
+            stripped = line.lstrip("・-*0123456789.)） ").strip()
+            if not stripped:
                 continue
-            results.append((start, end, bullets))
-        return results
+            bullets.append(stripped)
+            if len(bullets) >= 3:
+                break
+        return bullets
 
-    async def _summarize_period_messages(self, period_name: str, joined: str) -> str:
+    async def _summarize_period_messages(self, period_name: str, joined: str) -> list:
         """時間帯のユーザー発言テキストから1〜3行の客観的トピック要約を「だ・である」調で作る。
         Gemini が使えない場合は最初の発言を短縮して返す。"""
         if not self.gemini_client:
             first = joined.splitlines()[0] if joined.splitlines() else joined
             first = first.split("] ", 1)[-1]
-            return first[:60]
+            return [first[:60]]
         prompt = (
             f"次は{period_name}の時間帯にユーザーが送信したチャット発言です。\n"
             "発言原文は別に保存されているので、ここでは要約だけ作ってください。\n"
             "次のルールで1〜3行のmarkdown箇条書き内に収まる短い行動・話題の要約を書きます。\n"
             "- 各行は「- 」で始め、30文字程度に収める\n"
-            "- 文体は必ず「だ・である」調（『〜した』『〜だ』『〜である』など）。タメ口や敬語は禁止\n"
-            "- 体言止め（『投資の相談』『夕食メニュー』など名詞だけで終わる形）は禁止\n"
-            "- 朝/昼/夜などの時間帯ラベルを文中に含めない\n"
-            "- 感情語や評価語を含めず、客観的事実のみ\n"
-            "- 同種の話題はまとめて1行\n"
+            f"{_PERIOD_SUMMARY_RULES}"
             "- 説明や前置きは書かず、箇条書きだけを返す\n\n"
             f"--- 発言ログ ---\n{joined}\n--- 終わり ---"
         )
         try:
+            from services.gemini_gateway import gemini_cache
             from services.gemini_model_resolver import resolve_gemini_model
             _m = await resolve_gemini_model("routines", default_pro=False)
-            response = await self.gemini_client.aio.models.generate_content(
-                model=_m,
-                contents=prompt,
-            )
+            with gemini_cache("period_summary"):
+                response = await self.gemini_client.aio.models.generate_content(
+                    model=_m,
+                    contents=prompt,
+                )
             text = (response.text or "").strip()
         except Exception as e:
             logging.error(f"timeline: summary error ({period_name}): {e}")
-            return ""
-        # 最大3行に制限し、・/-/数字始まりの行のみ拾う
-        bullets = []
-        for line in text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            stripped = line.lstrip("・-*0123456789.)） ").strip()
-            if not stripped:
-                continue
-            bullets.append(stripped)
-            if len(bullets) >= 3:
-                break
-        return bullets
+            return []
+        return self._clean_bullets(text.splitlines())
 
     async def rebuild_daily_log(self, date_str: str) -> bool:
         """指定日の Daily Log（時系列の統合ビュー）だけを組み直して保存する（手動再生成）。
@@ -364,7 +464,7 @@ class DailyOrganizeCog(commands.Cog):
         if m and m.group(1).strip():
             location_log_text = m.group(1).strip()
 
-        timeline_md = await self._build_integrated_timeline(date_str, location_log_text)
+        timeline_md = await self._build_integrated_timeline(date_str, location_log_text, content)
         if not timeline_md:
             return False
 
@@ -377,10 +477,32 @@ class DailyOrganizeCog(commands.Cog):
         await self.drive_service.update_text(service, f_id, content)
         return True
 
-    async def _build_integrated_timeline(self, date_str: str, location_log_text: str) -> str:
+    async def _read_daily_note(self, date_str: str) -> str:
+        """指定日のデイリーノート本文（無ければ空文字）。"""
+        try:
+            service = self.drive_service.get_service()
+            if not service:
+                return ""
+            daily_folder = await self.drive_service.find_file(
+                service, self.drive_folder_id, "DailyNotes"
+            )
+            if not daily_folder:
+                return ""
+            f_id = await self.drive_service.find_file(service, daily_folder, f"{date_str}.md")
+            if not f_id:
+                return ""
+            return await self.drive_service.read_text_file(service, f_id) or ""
+        except Exception as e:
+            logging.error(f"timeline: daily note read error: {e}")
+            return ""
+
+    async def _build_integrated_timeline(
+        self, date_str: str, location_log_text: str, note_content: str | None = None
+    ) -> str:
         """客観データ（睡眠・天気・カレンダー・ライフログ・ロケーション）と
         ユーザー発言の時間帯要約を統合し、時系列順のmarkdownを返す。
         会話原文は ## 💬 Chat Log セクションに別途保存されるためここには含めない。
+        note_content（当日のノート本文）を渡せばノートを読み直さない。
         """
         events = []  # list[(time_str_HHMM, icon, line)]
 
@@ -460,38 +582,29 @@ class DailyOrganizeCog(commands.Cog):
             logging.error(f"timeline: location parse error: {e}")
 
         # --- 5) ライフログ（既存 Lifelog / Tasks セクションから時刻付き行を取り込み） ---
+        if note_content is None:
+            note_content = await self._read_daily_note(date_str)
         try:
-            service = self.drive_service.get_service()
-            if service:
-                daily_folder = await self.drive_service.find_file(
-                    service, self.drive_folder_id, "DailyNotes"
+            for sec_header, icon in [
+                ("## 🪟 Lifelog", "🪟"),
+                ("## 🎯 Tasks", "🎯"),
+            ]:
+                mm = re.search(
+                    rf"{re.escape(sec_header)}\n(.*?)(?=\n## |\Z)",
+                    note_content,
+                    re.DOTALL,
                 )
-                if daily_folder:
-                    f_id = await self.drive_service.find_file(
-                        service, daily_folder, f"{date_str}.md"
-                    )
-                    if f_id:
-                        raw = await self.drive_service.read_text_file(service, f_id)
-                        for sec_header, icon in [
-                            ("## 🪟 Lifelog", "🪟"),
-                            ("## 🎯 Tasks", "🎯"),
-                        ]:
-                            mm = re.search(
-                                rf"{re.escape(sec_header)}\n(.*?)(?=\n## |\Z)",
-                                raw,
-                                re.DOTALL,
-                            )
-                            if not mm:
-                                continue
-                            for line in mm.group(1).splitlines():
-                                line_s = line.strip().lstrip("-").strip()
-                                if not line_s:
-                                    continue
-                                tm = re.search(r"(\d{1,2}):(\d{2})", line_s)
-                                if not tm:
-                                    continue
-                                hh = int(tm.group(1)); mn = int(tm.group(2))
-                                events.append((f"{hh:02d}:{mn:02d}", icon, line_s))
+                if not mm:
+                    continue
+                for line in mm.group(1).splitlines():
+                    line_s = line.strip().lstrip("-").strip()
+                    if not line_s:
+                        continue
+                    tm = re.search(r"(\d{1,2}):(\d{2})", line_s)
+                    if not tm:
+                        continue
+                    hh = int(tm.group(1)); mn = int(tm.group(2))
+                    events.append((f"{hh:02d}:{mn:02d}", icon, line_s))
         except Exception as e:
             logging.error(f"timeline: lifelog re-import error: {e}")
 
@@ -518,18 +631,8 @@ class DailyOrganizeCog(commands.Cog):
 
         # --- 5c) 日記チェックイン（気分/出来事/学び/良かったこと）・読書・勉強の時刻付き行も統合 ---
         try:
-            service = self.drive_service.get_service()
-            note_raw = ""
-            if service:
-                daily_folder = await self.drive_service.find_file(
-                    service, self.drive_folder_id, "DailyNotes"
-                )
-                if daily_folder:
-                    f_id = await self.drive_service.find_file(service, daily_folder, f"{date_str}.md")
-                    if f_id:
-                        note_raw = await self.drive_service.read_text_file(service, f_id) or ""
             for sec_header in ["## 📔 Daily Journal", "## 📖 Reading Log", "## 📝 Study Log"]:
-                mm = re.search(rf"{re.escape(sec_header)}\n(.*?)(?=\n## |\Z)", note_raw, re.DOTALL)
+                mm = re.search(rf"{re.escape(sec_header)}\n(.*?)(?=\n## |\Z)", note_content, re.DOTALL)
                 if not mm:
                     continue
                 for line in mm.group(1).splitlines():
@@ -564,10 +667,6 @@ class DailyOrganizeCog(commands.Cog):
             lines.extend(f"- {b}" for b in period_bullets)
         return "\n".join(lines)
 
-    @daily_organize_task.before_loop
-    async def before_daily_organize(self):
-        await self.bot.wait_until_ready()
-
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(DailyOrganizeCog(bot))
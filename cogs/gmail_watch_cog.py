@@ -15,25 +15,25 @@ import logging
 from discord.ext import commands, tasks
 
 from config import JST
+from services.job_scheduler import scheduler
+from services.rate_limiter import LANE_BACKGROUND, in_lane
 
 
 GMAIL_SUMMARY_MODEL = "gemini-2.5-flash"
 
 
 class GmailWatchCog(commands.Cog):
-    # 未処理メールが溜まっているときの 1 日 1 回リマインドの最終実行日。
-    _last_pileup_reminder_date = None
     # この件数以上 pending（未処理）が溜まっていたら促し通知を出す。
     PILEUP_THRESHOLD = 10
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.gmail_loop.start()
-        self.pileup_reminder_task.start()
+        scheduler.register("gmail_pileup_reminder", self.pileup_reminder_task, default_time="09:00")
 
     def cog_unload(self):
         self.gmail_loop.cancel()
-        self.pileup_reminder_task.cancel()
+        scheduler.unregister("gmail_pileup_reminder")
 
     @tasks.loop(minutes=7)
     async def gmail_loop(self):
@@ -45,6 +45,7 @@ class GmailWatchCog(commands.Cog):
         # 起動直後の負荷を避けるため 30 秒待ち
         await asyncio.sleep(30)
 
+    @in_lane(LANE_BACKGROUND)
     async def _run(self):
         try:
             now = datetime.datetime.now(JST)
@@ -154,16 +155,7 @@ class GmailWatchCog(commands.Cog):
     # ==========================================================
     # 未処理メールが溜まったら 1 日 1 回（朝）に整理を促す
     # ==========================================================
-    @tasks.loop(minutes=1)
     async def pileup_reminder_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due(
-            "gmail_pileup_reminder", "09:00", "daily",
-            self._last_pileup_reminder_date,
-        )
-        if not due:
-            return
-        self._last_pileup_reminder_date = today
         try:
             from api.database import gmail_count_pending
             n = await gmail_count_pending()
@@ -182,10 +174,6 @@ class GmailWatchCog(commands.Cog):
         except Exception as e:
             logging.error(f"pileup_reminder notify error: {e}")
 
-    @pileup_reminder_task.before_loop
-    async def before_pileup_reminder(self):
-        await self.bot.wait_until_ready()
-
     async def _summarize(self, msg: dict) -> tuple[str, str]:
         """件名 + 本文先頭からマネージャー口調の 2〜3 行要約 + 重要度を返す。"""
         gemini = getattr(self.bot, "gemini_client", None)
@@ -0,0 +1,38 @@
+"""Google サービスのローカルミラーを裏で整える Cog。
+
+Tasks ミラー（gtasks_items）は読み取り時に updatedMin の差分同期で更新されるが、
+他端末でのパージ（完了済みの削除など）は差分に現れないことがある。ここで定期的に
+全件照合（reconcile）して取りこぼしを解消する。
+"""
+import logging
+
+from discord.ext import commands, tasks
+
+
+class GoogleSyncCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.tasks_service = getattr(bot, "tasks_service", None)
+
+        self.tasks_reconcile_task.start()
+
+    def cog_unload(self):
+        self.tasks_reconcile_task.cancel()
+
+    @tasks.loop(hours=3)
+    async def tasks_reconcile_task(self):
+        if not self.tasks_service:
+            return
+        try:
+            n = await self.tasks_service.reconcile()
+            logging.info(f"Tasks ミラーを全件照合しました（{n}リスト）")
+        except Exception as e:
+            logging.error(f"tasks_reconcile_task error: {e}", exc_info=True)
+
+    @tasks_reconcile_task.before_loop
+    async def before_tasks(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(GoogleSyncCog(bot))
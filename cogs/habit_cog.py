@@ -56,6 +56,9 @@ class HabitCog(commands.Cog):
     async def _save_data(self, data):
         from api.database import habit_save_all
         await habit_save_all(data)
+        proactive = self.bot.get_cog("ProactiveAlertCog")
+        if proactive:
+            proactive.invalidate("habits")  # 習慣トリガーの発火予定を組み直す
 
     async def complete_habit(self, habit_name_or_keyword: str, frequency_days: int = 1):
         if hasattr(self.bot, "tasks_service") and self.bot.tasks_service:
@@ -121,18 +124,12 @@ class HabitCog(commands.Cog):
 
         if hasattr(self.bot, "tasks_service") and self.bot.tasks_service:
             try:
-                # Get completed tasks to find the task_id
-                list_id = await self.bot.tasks_service._get_tasklist_id(self.bot.tasks_service.get_service(), "習慣")
-                res = await asyncio.get_running_loop().run_in_executor(
-                    None,
-                    lambda: self.bot.tasks_service.get_service().tasks().list(
-                        tasklist=list_id, showCompleted=True, showHidden=True
-                    ).execute()
+                # 完了済みタスクから task_id を探す（Tasks ミラーを参照）
+                done = await self.bot.tasks_service.find_tasks(
+                    habit_name_or_keyword, list_name="習慣", status="completed"
                 )
-                for t in res.get("items", []):
-                    if t.get("status") == "completed" and habit_name_or_keyword.lower() in t["title"].lower():
-                        await self.bot.tasks_service.update_task(t["id"], completed=False, list_name="習慣")
-                        break
+                if done:
+                    await self.bot.tasks_service.update_task(done[0]["id"], completed=False, list_name="習慣")
             except Exception as e:
                 logging.error(f"Failed to uncomplete habit in Tasks: {e}")
 
@@ -30,6 +30,7 @@ PWAから REST 経由でのみ呼び出されるサービス層。Discordコマ
   - Portfolio/transactions.jsonl
   - Journal/journal_index.json + 個別エントリ
   - Alerts/rules.json + alert_log.jsonl
+  （上記 4 つの正本は SQLite の inv_* テーブル。Drive へは services/investment_store.py が遅延で書き出す）
 """
 import os
 import re
@@ -37,7 +38,7 @@ import json
 import asyncio
 import logging
 import datetime
-import random
+import time
 from typing import Optional
 
 from discord.ext import commands, tasks
@@ -48,6 +49,7 @@ from prompts import (
     PROMPT_MARKET_SENTIMENT,
     PROMPT_STOCK_SNAPSHOT,
     PROMPT_STOCK_AUDIT,
+    PROMPT_STOCK_AUDIT_TARGET,
     PROMPT_EARNINGS_SCHEDULE,
     PROMPT_EARNINGS_DOCUMENTS,
     PROMPT_CEO_CROSSCHECK,
@@ -59,6 +61,8 @@ from prompts import (
     PROMPT_DIVIDEND_SCHEDULE,
     PROMPT_RISK_ASSESSMENT,
 )
+from utils.executors import GOOGLE_API, run_in
+from services.job_scheduler import scheduler
 
 
 INVESTMENT_FOLDER = "Investment"
@@ -84,6 +88,8 @@ TRANSACTIONS_FILE = "transactions.jsonl"
 JOURNAL_INDEX_FILE = "journal_index.json"
 ALERT_RULES_FILE = "rules.json"
 ALERT_LOG_FILE = "alert_log.jsonl"
+# 履歴索引（inv_notes）へ Drive のフォルダ一覧を取り込み直す間隔
+_HISTORY_SYNC_SEC = 6 * 3600
 
 GEMINI_MODEL = "gemini-2.5-pro"
 GEMINI_FLASH_MODEL = "gemini-2.5-flash"
@@ -217,59 +223,55 @@ def _resolve_market(ticker: str):
     return "US", t
 
 
+def _market_session_open(now: datetime.datetime) -> bool:
+    """東証（平日 9:00〜15:30）または米国市場（JST 22:30〜翌 6:15、夏時間・冬時間の両方を含む）の場中か。"""
+    hm = (now.hour, now.minute)
+    if now.weekday() < 5 and (9, 0) <= hm <= (15, 30):
+        return True
+    if now.weekday() < 5 and hm >= (22, 30):
+        return True
+    # 米国の金曜の取引は JST 土曜の朝まで続く
+    return 0 < now.weekday() <= 5 and hm <= (6, 15)
+
+
 def _safe_filename(name: str) -> str:
     return re.sub(r"[\\/:*?\"<>|]", "_", name).strip() or "untitled"
 
 
-def _normalize_news_line(line: str) -> str:
-    """ニュース行の比較用正規化キー。
-    - 行頭の箇条書き記号・番号・空白を除去
-    - 日付（YYYY-MM-DD, M/D 等）と数字単位を緩く除去して、同一トピックを同一視
-    """
-    s = line.strip()
-    s = re.sub(r"^[-*・●◯○■□▶▷>]+\s*", "", s)
-    s = re.sub(r"^\d+[\.\)、]\s*", "", s)
-    s = re.sub(r"\(\s*出典[^\)]*\)", "", s)
-    s = re.sub(r"https?://\S+", "", s)
-    s = re.sub(r"\d{4}[-/年]\d{1,2}[-/月]\d{1,2}日?", "", s)
-    s = re.sub(r"\d{1,2}/\d{1,2}", "", s)
-    s = re.sub(r"\s+", "", s)
-    return s.lower()
-
-
-def _extract_news_diff(prev_report: str, curr_report: str) -> list[str]:
-    """前回レポートに無い「新規行」だけを抜き出す。
-    比較は正規化キー（記号/日付/URLを除去した素のテキスト）で行う。
-    見出し行は新規・既存に関わらず文脈用に残す（直後に新規行があるときだけ）。
-    """
-    if not curr_report:
-        return []
-    prev_keys: set[str] = set()
-    for ln in (prev_report or "").splitlines():
-        k = _normalize_news_line(ln)
-        if k:
-            prev_keys.add(k)
-
-    out: list[str] = []
-    pending_header: str | None = None
-    for raw in curr_report.splitlines():
-        line = raw.rstrip()
-        if not line.strip():
-            continue
-        is_header = line.lstrip().startswith("#") or line.lstrip().startswith("##")
-        if is_header:
-            pending_header = line
-            continue
-        key = _normalize_news_line(line)
-        if not key:
-            continue
-        if key in prev_keys:
-            continue
-        if pending_header is not None:
-            out.append(pending_header)
-            pending_header = None
-        out.append(line)
-    return out
+def _render_journal_note(entry: dict) -> str:
+    """投資日記 1 件を Obsidian 用の Markdown にする（編集済みなら updated_at も載せる）。"""
+    title = entry.get("title") or "(無題)"
+    date_str = entry.get("date") or ""
+    time_str = entry.get("time") or ""
+    ticker = entry.get("ticker") or ""
+    action = entry.get("action") or ""
+    emotion = entry.get("emotion") or ""
+    updated_at = entry.get("updated_at") or ""
+    lines = [
+        "---",
+        f"title: {title}",
+        f"date: {date_str}",
+        f"ticker: {ticker}",
+        f"action: {action}",
+        f"emotion: {emotion}",
+    ]
+    if updated_at:
+        lines.append(f"updated_at: {updated_at}")
+    lines += [
+        "tags: [investment, journal]",
+        "---",
+        "",
+        f"# {title}",
+        "",
+        f"- 日時: {date_str} {time_str}",
+        f"- 銘柄: {ticker or '(なし)'}",
+        f"- アクション: {action or '(なし)'}",
+        f"- 感情: {emotion or '(なし)'}",
+    ]
+    if updated_at:
+        lines.append(f"- 更新: {updated_at}")
+    lines += ["", "## 内容", "", entry.get("content") or ""]
+    return "\n".join(lines)
 
 
 def ext_map_lookup_mime(filename: str) -> str:
@@ -316,34 +318,33 @@ class InvestmentCog(commands.Cog):
 
     async def cog_load(self):
         asyncio.create_task(self._ensure_constitution_exists())
+        # 投資データの正本は SQLite。Drive の JSON / Markdown へは遅延で書き出す
+        from services.investment_store import investment_store
+        investment_store.attach(self._export_investment_item, self._import_investment_data)
+        asyncio.create_task(self._start_investment_store())
         # 自動実行ループ群（環境変数 INVESTMENT_AUTO_DISABLE=1 で全停止）
+        # 時刻・曜日（平日のみ等）は SCHEDULE_CATALOG、起動は中央スケジューラ
         if os.getenv("INVESTMENT_AUTO_DISABLE", "0") != "1":
-            for task in (
-                self.auto_market_sentiment_task,
-                self.auto_alerts_and_earnings_task,
-                self.auto_news_sentiment_task,
-                self.auto_holdings_noon_review_task,
-                self.auto_decision_review_verify_task,
-                self.auto_daily_screening_task,
-            ):
-                try:
-                    task.start()
-                except RuntimeError:
-                    pass
+            for key, func, opts in self._scheduled_jobs():
+                scheduler.register(key, func, **opts)
+            from services.alert_engine import alert_engine
+            alert_engine.set_fired_callback(self._notify_fired_alerts)
+            self.alert_watch_loop.start()
 
     def cog_unload(self):
-        for task in (
-            self.auto_market_sentiment_task,
-            self.auto_alerts_and_earnings_task,
-            self.auto_news_sentiment_task,
-            self.auto_holdings_noon_review_task,
-            self.auto_decision_review_verify_task,
-            self.auto_daily_screening_task,
-        ):
-            try:
-                task.cancel()
-            except Exception:
-                pass
+        for key, _func, _opts in self._scheduled_jobs():
+            scheduler.unregister(key)
+        self.alert_watch_loop.cancel()
+
+    def _scheduled_jobs(self) -> list[tuple]:
+        return [
+            ("auto_market_sentiment", self.auto_market_sentiment_task, {"jitter_sec": 180}),
+            ("auto_alerts_earnings", self.auto_alerts_and_earnings_task, {"jitter_sec": 180}),
+            ("auto_news_sentiment", self.auto_news_sentiment_task, {"jitter_sec": 180}),
+            ("holdings_noon_review", self.auto_holdings_noon_review_task, {}),
+            ("decision_review_verify", self.auto_decision_review_verify_task, {}),
+            ("auto_daily_screening", self.auto_daily_screening_task, {}),
+        ]
 
     # ==========================================================
     # 自動実行ヘルパー
@@ -395,16 +396,8 @@ class InvestmentCog(commands.Cog):
         except Exception as e:
             logging.error(f"InvestmentCog notify_long lead error: {e}")
 
-    @tasks.loop(time=datetime.time(hour=6, minute=45, tzinfo=JST))
     async def auto_market_sentiment_task(self):
         """平日朝 06:45 (JST) に米国市場クローズ後の地合いを取得して通知する。"""
-        # 土日は実行しない
-        if datetime.datetime.now(JST).weekday() >= 5:
-            return
-        from services.schedule_resolver import is_enabled
-        if not await is_enabled("auto_market_sentiment"):
-            return
-        await asyncio.sleep(random.randint(0, 180))
         try:
             result = await self.run_market_sentiment()
         except Exception:
@@ -418,23 +411,14 @@ class InvestmentCog(commands.Cog):
         header = "🌅 今朝の市場の地合い"
         await self._notify_long("market_sentiment", header, report)
 
-    @auto_market_sentiment_task.before_loop
-    async def _before_auto_market_sentiment(self):
-        await self.bot.wait_until_ready()
-
-    @tasks.loop(time=datetime.time(hour=7, minute=15, tzinfo=JST))
     async def auto_alerts_and_earnings_task(self):
         """毎朝 07:15 (JST) に価格アラートをチェックし、保有銘柄の当日決算予定も通知する。"""
-        from services.schedule_resolver import is_enabled
-        if not await is_enabled("auto_alerts_earnings"):
-            return
-        await asyncio.sleep(random.randint(0, 180))
         lines = []
 
-        # 1) 価格アラート
+        # 1) 価格アラート（前回から新たに条件を満たしたものだけ）
         try:
             alerts_result = await self.alerts_check_now()
-            hits = alerts_result.get("hits") or []
+            hits = alerts_result.get("fired") or []
             if hits:
                 lines.append("🔔 価格アラート")
                 for h in hits:
@@ -446,9 +430,7 @@ class InvestmentCog(commands.Cog):
         # 2) 保有銘柄の当日決算
         try:
             today = datetime.datetime.now(JST).strftime("%Y-%m-%d")
-            holdings = await self._read_json_file(
-                PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-            )
+            holdings = await self._holdings()
             today_earnings = []
             for h in holdings:
                 code = h.get("code")
@@ -465,7 +447,8 @@ class InvestmentCog(commands.Cog):
                 if ed and ed.startswith(today):
                     company = (res.get("data") or {}).get("company_name") or code
                     today_earnings.append(f"- {company} ({code})")
-                await asyncio.sleep(2)
+                if not res.get("cached"):
+                    await asyncio.sleep(2)
             if today_earnings:
                 lines.append("📊 本日の決算予定（保有銘柄）")
                 lines.extend(today_earnings)
@@ -480,68 +463,91 @@ class InvestmentCog(commands.Cog):
             else:
                 await self._notify_routine(joined)
 
-    @auto_alerts_and_earnings_task.before_loop
-    async def _before_auto_alerts_and_earnings(self):
+    @tasks.loop(minutes=5)
+    async def alert_watch_loop(self):
+        """場中（東証・米国市場）は 5 分ごとに価格を取り直してアラートをローカル評価し、
+        新たに条件を満たしたものだけ通知する。"""
+        if not _market_session_open(datetime.datetime.now(JST)):
+            return
+        try:
+            from services.alert_engine import alert_engine
+            if not await self._prepare_alert_engine():
+                return
+            await alert_engine.refresh_prices()
+            result = await alert_engine.evaluate()
+            if result["fired"]:
+                await self._notify_fired_alerts(result["fired"])
+        except Exception as e:
+            logging.error(f"alert_watch_loop error: {e}")
+
+    @alert_watch_loop.before_loop
+    async def before_alert_watch_loop(self):
         await self.bot.wait_until_ready()
 
-    @tasks.loop(time=datetime.time(hour=8, minute=30, tzinfo=JST))
+    async def _notify_fired_alerts(self, fired: list[dict]):
+        """新たに条件を満たしたアラートを記録し、LLM で言い回しを整えて通知する（判定はしない）。"""
+        from services.alert_engine import phrase_alerts
+
+        await self._log_alert_events(fired)
+        body = await phrase_alerts(
+            fired, lambda prompt: self._gemini_plain(prompt, feature_key="investment_review")
+        )
+        if body:
+            await self._notify_routine("🔔 価格アラート\n" + body)
+
     async def auto_news_sentiment_task(self):
         """毎朝 08:30 (JST) に保有銘柄のニュースを取得し、
-        前回配信からの「差分（新規行）」のみを銘柄ごとにまとめて通知する。
+        前回配信からの「差分（新規項目）」のみを銘柄ごとにまとめて通知する。
 
-        - 銘柄ごとに直近レポートを app_settings に保存し、次回はそれと比較する
-        - 行（箇条書きやヘッダなど）単位で前回に無いものだけ抽出
-        - 全銘柄で新規行ゼロなら通知自体をスキップ（朝刊は出さない）
+        - 銘柄ごとのレポートは services/news_pipeline.py が並列に集め、営業日単位でキャッシュする
+          （同じ日に PWA から開いた銘柄は取り直さない）
+        - 差分は見出しの正規化ハッシュで判定し、前の営業日までに見た項目は除く
+        - 全銘柄で新規項目ゼロなら通知自体をスキップ（朝刊は出さない）
         """
-        from services.schedule_resolver import is_enabled
-        if not await is_enabled("auto_news_sentiment"):
-            return
-        await asyncio.sleep(random.randint(0, 180))
         try:
-            holdings = await self._read_json_file(
-                PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-            )
+            holdings = await self._holdings()
         except Exception:
             logging.exception("auto news_sentiment: holdings read failed")
             return
         if not holdings:
             return
+        if not self.gemini_client:
+            return
 
-        from api.database import get_app_setting, set_app_setting
-        sections = []
+        from api.database import get_app_setting
+        from services.news_pipeline import news_pipeline, prompt_version
+        from services.rate_limiter import LANE_ROUTINE
+
+        names = {}
         for h in holdings:
-            code = h.get("code")
-            if not code:
-                continue
-            try:
-                res = await self.run_news_sentiment(code)
-            except Exception:
-                logging.exception(f"run_news_sentiment failed for {code}")
-                continue
-            if not res.get("ok"):
-                continue
-            report = (res.get("report") or "").strip()
-            if not report:
-                continue
+            if h.get("code"):
+                names.setdefault(_resolve_market(h["code"])[1], h.get("name") or "")
+        reports = await news_pipeline.collect(
+            list(names),
+            lambda code: lambda: self._fetch_news_sentiment(code),
+            version=prompt_version(PROMPT_NEWS_SENTIMENT),
+            market_for=lambda code: _resolve_market(code)[0],
+            lane=LANE_ROUTINE,
+        )
 
-            head = (res.get("name") or h.get("name") or code)
-            setting_key = f"news_sentiment.last.{code}"
+        sections = []
+        for code, head in names.items():
+            entry = reports.get(code)
+            if not entry:
+                continue
+            # 旧方式（app_settings に前回本文）からの移行: 初回だけ前回本文を既知として登録する
             try:
-                prev_report = await get_app_setting(setting_key, "")
+                seed = await get_app_setting(f"news_sentiment.last.{code}", "")
             except Exception:
-                prev_report = ""
-
-            new_lines = _extract_news_diff(prev_report, report)
-            # 今回の本文は次回比較用に常に保存（変化があってもなくても）
+                seed = ""
             try:
-                await set_app_setting(setting_key, report)
+                new_lines = await news_pipeline.new_items(code, entry["report"], seed_report=seed)
             except Exception:
-                pass
-
+                logging.exception(f"auto news_sentiment: diff failed for {code}")
+                continue
             if new_lines:
                 diff_body = "\n".join(new_lines)
-                sections.append(f"## {head} ({code})\n{diff_body}")
-            await asyncio.sleep(2)
+                sections.append(f"## {head or code} ({code})\n{diff_body}")
 
         if sections:
             raw_body = "\n\n---\n\n".join(sections)
@@ -549,7 +555,9 @@ class InvestmentCog(commands.Cog):
             digest = ""
             try:
                 digest_prompt = PROMPT_NEWS_DIGEST.format(yesterday=yesterday, reports=raw_body)
-                digest = await self._gemini_plain(digest_prompt, feature_key="news_sentiment")
+                from services.gemini_gateway import gemini_cache
+                with gemini_cache("news_digest"):
+                    digest = await self._gemini_plain(digest_prompt, feature_key="news_sentiment")
             except Exception:
                 logging.exception("auto_news_sentiment: digest 生成失敗。生データで通知します。")
             body = (digest or "").strip() or raw_body
@@ -559,20 +567,9 @@ class InvestmentCog(commands.Cog):
         else:
             logging.info("auto_news_sentiment: 全銘柄で新規ニュース無し、通知スキップ")
 
-    @auto_news_sentiment_task.before_loop
-    async def _before_auto_news_sentiment(self):
-        await self.bot.wait_until_ready()
-
-    @tasks.loop(time=datetime.time(hour=12, minute=0, tzinfo=JST))
     async def auto_holdings_noon_review_task(self):
         """平日 12:00 (JST) に保有銘柄の継続/縮小/売却をテクニカル×ファンダで診断し通知。
         12:30 の売買判断の参考にする。決定論的・Gemini非依存・無料。"""
-        # 土日は実行しない
-        if datetime.datetime.now(JST).weekday() >= 5:
-            return
-        from services.schedule_resolver import is_enabled
-        if not await is_enabled("holdings_noon_review"):
-            return
         try:
             result = await self.run_holdings_review()
         except Exception:
@@ -583,19 +580,9 @@ class InvestmentCog(commands.Cog):
         await self._notify_long("holdings_review", "🕛 保有銘柄の昼チェック", result["report"],
                                 advice_job_id=result.get("advice_job_id") or "")
 
-    @auto_holdings_noon_review_task.before_loop
-    async def _before_auto_holdings_noon_review(self):
-        await self.bot.wait_until_ready()
-
-    @tasks.loop(time=datetime.time(hour=15, minute=45, tzinfo=JST))
     async def auto_decision_review_verify_task(self):
         """平日 15:45 (JST) 市場クローズ後に、過去の売買判断を答え合わせ（20/60営業日後）。
         新たに判定が確定した分があるときだけ、的中率を通知ログに届ける。"""
-        if datetime.datetime.now(JST).weekday() >= 5:
-            return
-        from services.schedule_resolver import is_enabled
-        if not await is_enabled("decision_review_verify"):
-            return
         screener = self.bot.get_cog("ScreenerCog")
         if not screener:
             return
@@ -634,10 +621,6 @@ class InvestmentCog(commands.Cog):
         lines += ["", "※ 上昇/下落は市場全体に対する『超過』で採点（相場の地合いに翻弄されない判定）。"]
         await self._notify_long("decision_review", "🔎 売買判断の答え合わせ", "\n".join(lines))
 
-    @auto_decision_review_verify_task.before_loop
-    async def _before_auto_decision_review_verify(self):
-        await self.bot.wait_until_ready()
-
     async def run_holdings_review(self) -> dict:
         """保有銘柄をテクニカル×ファンダで診断し、売買判断用の短いレポートを作る。
         ScreenerCog の advise_portfolio（決定論的・高速・無料）を使う。"""
@@ -696,16 +679,10 @@ class InvestmentCog(commands.Cog):
     # 旧: 「じわじわ高値ブレイク×一括診断」(run_breakout_advise) と平日16:00の自動通知は、
     # 16:15 の全手法版（auto_daily_screening / 毎日ここから）に内包される部分集合だったため撤去した。
 
-    @tasks.loop(time=datetime.time(hour=16, minute=15, tzinfo=JST))
     async def auto_daily_screening_task(self):
         """平日 16:15 (JST) 大引け後に、全メソッドで日本株＋米国株を横断抽出（どの投資手法が拾ったかの
         ラベル付き）し、保有＋候補を一括診断（目標配分のドリフト・入替数量つき）してお知らせへ。
         日次ワークフロー①の自動化（日米1:1配分のため両市場から候補抽出）。"""
-        if datetime.datetime.now(JST).weekday() >= 5:
-            return
-        from services.schedule_resolver import is_enabled
-        if not await is_enabled("auto_daily_screening"):
-            return
         try:
             result = await self.run_daily_screening()
         except Exception:
@@ -716,10 +693,6 @@ class InvestmentCog(commands.Cog):
         await self._notify_long("daily_screening", "🔎 今日の注目銘柄×手法", result["report"],
                                 advice_job_id=result.get("advice_job_id") or "")
 
-    @auto_daily_screening_task.before_loop
-    async def _before_auto_daily_screening(self):
-        await self.bot.wait_until_ready()
-
     async def gather_daily_candidates(
         self, universes: Optional[list] = None,
         styles: Optional[list] = None, top_n: int = 3, max_per_market: int = 10,
@@ -727,7 +700,9 @@ class InvestmentCog(commands.Cog):
         """全メソッドで日米ユニバースを横断し、買い候補（手法ラベル付き union）を抽出する。
         自動の日次スクリーニング（run_daily_screening）と、PWA「毎日ここから一括診断」の
         auto_screen の双方が共有する“候補生成”部。各候補がどの手法で拾われたかを matched_by_code に残す。
-        戻り値: {"ok", "candidates": [{code,name,sector}], "matched_by_code": {code: [styles]}}"""
+        全ユニバースの和集合を先に 1 回だけ温め、ユニバースごとのスクリーニングは並行に走らせる。
+        戻り値: {"ok", "candidates": [{code,name,sector}], "matched_by_code": {code: [styles]},
+                 "per_universe": {universe: {ok, candidates, scanned}}}"""
         screener = self.bot.get_cog("ScreenerCog")
         if not screener:
             return {"ok": False, "error": "ScreenerCog 未ロード", "candidates": [], "matched_by_code": {}}
@@ -736,38 +711,60 @@ class InvestmentCog(commands.Cog):
             from services.screener_engine import list_strategies
             styles = [s["name"] for s in list_strategies()]
 
-        # JP/US 各ユニバースを全メソッドで union 抽出（各候補に matched_styles＝どの手法が拾ったか）
-        matched_by_code: dict[str, list] = {}
-        cand_input: list[dict] = []
-        any_ok = False
+        universes = [u for u in (universes or ["topix500", "us_sp500", "us_mega"]) if u]
+        started = time.monotonic()
 
-        async def _screen(universe: str):
-            nonlocal any_ok
-            if not universe:
-                return
+        # 1) 全ユニバースの和集合を 1 銘柄 1 回だけ先読み（us_mega ⊂ us_sp500 の重複取得を避ける）。
+        #    失敗しても各スクリーニングが個別に取りに行くので続行する。
+        try:
+            warm = await screener.warm_universes(universes, styles=styles)
+            logging.info(
+                f"gather_daily_candidates warm-up: {warm.get('codes')}銘柄 "
+                f"{warm.get('by_market')} 失敗{warm.get('failed')} {warm.get('elapsed_sec')}秒"
+            )
+        except Exception as e:
+            logging.warning(f"gather_daily_candidates warm-up 失敗: {e}")
+
+        # 2) 温めたキャッシュを共有して全ユニバースを並行にスクリーニング
+        #    （所要時間は各ユニバースの合計ではなく最も遅いものになる）。
+        async def _screen(universe: str) -> Optional[dict]:
+            t0 = time.monotonic()
             try:
                 scr = await screener.run_multi_screening(
                     styles=styles, top_n=int(top_n), universe_name=universe, combine_mode="any",
                 )
             except Exception as e:
                 logging.warning(f"gather_daily_candidates screening失敗({universe}): {e}")
-                return
-            if not scr.get("ok"):
-                return
+                return None
+            logging.info(f"gather_daily_candidates {universe}: {time.monotonic() - t0:.1f}秒")
+            return scr
+
+        results = await asyncio.gather(*(_screen(u) for u in universes))
+
+        # 3) 指定順（日本株 topix500 → 米国株 sp500/mega）に union。重複コードは先勝ちでスキップ
+        #    するので、並行実行でも結果は逐次実行と同じになる。
+        matched_by_code: dict[str, list] = {}
+        cand_input: list[dict] = []
+        per_universe: dict[str, dict] = {}
+        any_ok = False
+        for universe, scr in zip(universes, results):
+            if not scr or not scr.get("ok"):
+                per_universe[universe] = {"ok": False, "candidates": 0}
+                continue
             any_ok = True
             cands = sorted((scr.get("candidates") or []),
                            key=lambda c: c.get("score") or 0, reverse=True)[:max_per_market]
+            per_universe[universe] = {"ok": True, "candidates": len(cands),
+                                      "scanned": scr.get("scanned", 0)}
             for c in cands:
                 code = c.get("code")
                 if not code or code in matched_by_code:
                     continue
                 matched_by_code[code] = c.get("matched_styles") or []
                 cand_input.append({"code": code, "name": c.get("name"), "sector": c.get("sector")})
-
-        # 日本株 topix500 ＋ 米国株 sp500/mega を横断（重複コードは先勝ちでスキップ）。
-        for u in (universes or ["topix500", "us_sp500", "us_mega"]):
-            await _screen(u)
-        return {"ok": any_ok, "candidates": cand_input, "matched_by_code": matched_by_code}
+        logging.info(f"gather_daily_candidates 完了: {time.monotonic() - started:.1f}秒")
+        return {"ok": any_ok, "candidates": cand_input, "matched_by_code": matched_by_code,
+                "per_universe": per_universe}
 
     async def run_daily_screening(
         self, universes: Optional[list] = None,
@@ -975,10 +972,19 @@ class InvestmentCog(commands.Cog):
         existing = await self.drive_service.find_file(service, sub_id, filename)
         if existing:
             await self.drive_service.update_text(service, existing, content)
-            return existing
-        return await self.drive_service.upload_text(
-            service, sub_id, filename, content
-        )
+            file_id = existing
+        else:
+            file_id = await self.drive_service.upload_text(
+                service, sub_id, filename, content
+            )
+        if file_id:
+            # list_history / read_history_item 用の索引（本文ごと）
+            try:
+                from api.database import inv_notes_put
+                await inv_notes_put(subfolder, filename, file_id, content)
+            except Exception as e:
+                logging.debug(f"inv_notes 更新失敗 {subfolder}/{filename}: {e}")
+        return file_id
 
     async def _list_subfolder_files(self, subfolder: str, limit: int = 30):
         """指定サブフォルダ内のMarkdownファイル一覧を取得する。"""
@@ -995,7 +1001,8 @@ class InvestmentCog(commands.Cog):
             f"'{sub_id}' in parents and mimeType = 'text/markdown' and trashed = false"
         )
         try:
-            results = await asyncio.to_thread(
+            results = await run_in(
+                GOOGLE_API,
                 lambda: service.files()
                 .list(
                     q=query,
@@ -1054,15 +1061,24 @@ class InvestmentCog(commands.Cog):
             return ""
 
     async def _gemini_plain(
-        self, prompt: str, model: Optional[str] = None, feature_key: Optional[str] = None
+        self, prompt: str, model: Optional[str] = None, feature_key: Optional[str] = None,
+        system_instruction: Optional[str] = None, cache_label: str = "",
     ) -> str:
+        """system_instruction を渡すと、cache_label でコンテキストキャッシュ（services/prompt_cache.py）に載せる。"""
         if not self.gemini_client:
             return ""
         resolved = await self._resolve_model(model, feature_key)
         try:
+            config = None
+            if system_instruction:
+                from services.prompt_cache import prompt_cache
+                config = await prompt_cache.config(
+                    self.gemini_client, resolved, cache_label or feature_key or "investment", system_instruction
+                )
             response = await self.gemini_client.aio.models.generate_content(
                 model=resolved,
                 contents=prompt,
+                config=config,
             )
             return (response.text or "").strip()
         except Exception as e:
@@ -1137,10 +1153,19 @@ class InvestmentCog(commands.Cog):
             logging.error(f"地合いノート保存エラー: {e}")
         return {"ok": True, "report": result, "saved_as": filename}
 
-    async def run_stock_snapshot(self, ticker: str) -> dict:
+    async def run_stock_snapshot(self, ticker: str, refresh: bool = False) -> dict:
+        """銘柄スナップショット。同じ営業日に取得済みならキャッシュを返す（refresh=True で取り直し）。"""
         if not self.gemini_client:
             return {"ok": False, "error": "Geminiクライアント未設定"}
+        from services.research_cache import research_cache, version_of
+
         market, code = _resolve_market(ticker)
+        return await research_cache.get_or_run(
+            "snapshot", code, version_of(PROMPT_STOCK_SNAPSHOT),
+            lambda: self._fetch_stock_snapshot(code, market), refresh=refresh,
+        )
+
+    async def _fetch_stock_snapshot(self, code: str, market: str) -> dict:
         now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
         prompt = PROMPT_STOCK_SNAPSHOT.format(
             ticker=code, market=market, date=now_str
@@ -1166,7 +1191,8 @@ class InvestmentCog(commands.Cog):
             "saved_as": filename,
         }
 
-    async def run_stock_audit(self, ticker: str) -> dict:
+    async def run_stock_audit(self, ticker: str, refresh: bool = False) -> dict:
+        """投資憲法に照らした銘柄審査。憲法を書き換えるか営業日が変わるまではキャッシュを返す。"""
         if not self.gemini_client:
             return {"ok": False, "error": "Geminiクライアント未設定"}
         constitution = await self._read_constitution()
@@ -1175,22 +1201,28 @@ class InvestmentCog(commands.Cog):
                 "ok": False,
                 "error": "投資憲法が見つかりません。先に投資憲法を初期化してください。",
             }
-        market, code = _resolve_market(ticker)
-        now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
+        from services.research_cache import research_cache, version_of
 
-        snap_prompt = PROMPT_STOCK_SNAPSHOT.format(
-            ticker=code, market=market, date=now_str
+        market, code = _resolve_market(ticker)
+        return await research_cache.get_or_run(
+            "audit", code, version_of(PROMPT_STOCK_SNAPSHOT, PROMPT_STOCK_AUDIT, PROMPT_STOCK_AUDIT_TARGET, constitution),
+            lambda: self._fetch_stock_audit(code, market, constitution, refresh), refresh=refresh,
         )
-        snapshot = await self._gemini_with_search(snap_prompt, feature_key="investment_snapshot")
+
+    async def _fetch_stock_audit(self, code: str, market: str, constitution: str, refresh: bool) -> dict:
+        # 同じ営業日のスナップショットがあれば使い回す
+        snap = await self.run_stock_snapshot(code, refresh=refresh)
+        snapshot = snap.get("report") if snap.get("ok") else ""
         if not snapshot:
             return {"ok": False, "error": "銘柄データの取得に失敗"}
 
-        audit_prompt = PROMPT_STOCK_AUDIT.format(
-            constitution=constitution,
-            snapshot=snapshot,
-            ticker=code,
+        # 憲法＋指示は銘柄によらず同じなので system_instruction（コンテキストキャッシュ）に、銘柄側は本文に
+        audit = await self._gemini_plain(
+            PROMPT_STOCK_AUDIT_TARGET.format(ticker=code, snapshot=snapshot),
+            feature_key="investment_audit",
+            system_instruction=PROMPT_STOCK_AUDIT.format(constitution=constitution),
+            cache_label="investment_audit",
         )
-        audit = await self._gemini_plain(audit_prompt, feature_key="investment_audit")
         if not audit:
             return {"ok": False, "error": "審査結果の生成に失敗"}
 
@@ -1214,10 +1246,31 @@ class InvestmentCog(commands.Cog):
             "saved_as": filename,
         }
 
-    async def run_earnings_schedule(self, ticker: str, register_calendar: bool = True) -> dict:
+    async def run_earnings_schedule(
+        self, ticker: str, register_calendar: bool = True, refresh: bool = False
+    ) -> dict:
+        """次回決算日。調査結果は営業日単位でキャッシュし、カレンダー登録はその日 1 回だけ行う。"""
         if not self.gemini_client:
             return {"ok": False, "error": "Geminiクライアント未設定"}
+        from services.research_cache import research_cache, version_of
+
         market, code = _resolve_market(ticker)
+        version = version_of(PROMPT_EARNINGS_SCHEDULE)
+        result = await research_cache.get_or_run(
+            "earnings", code, version,
+            lambda: self._fetch_earnings_schedule(code, market), refresh=refresh,
+        )
+        if not result.get("ok"):
+            return result
+        registered = []
+        if register_calendar and self.calendar_service and not result.get("calendar_registered"):
+            registered = await self._register_earnings_events(code, result["data"])
+            await research_cache.remember(
+                "earnings", code, version, {**result, "calendar_registered": True}
+            )
+        return {**result, "registered": registered}
+
+    async def _fetch_earnings_schedule(self, code: str, market: str) -> dict:
         prompt = PROMPT_EARNINGS_SCHEDULE.format(ticker=code, market=market)
         raw = await self._gemini_with_search(prompt, feature_key="investment_earnings")
         if not raw:
@@ -1237,60 +1290,63 @@ class InvestmentCog(commands.Cog):
                 "error": f"{company} ({code}) の次回決算日が確認できませんでした",
                 "data": data,
             }
-        registered = []
-        if register_calendar and self.calendar_service:
-            summary = f"📊 {company} ({code}) 決算発表"
-            description_lines = [
-                f"会計期間: {data.get('fiscal_period', '不明')}",
-                f"発表時間帯: {data.get('earnings_time', '不明')}",
-                f"信頼度: {data.get('confidence', 'N/A')}",
-                f"出典: {data.get('source', 'N/A')}",
-            ]
-            related = data.get("related_events") or []
-            if related:
-                description_lines.append("\n関連イベント:")
-                for ev in related:
-                    description_lines.append(
-                        f"- {ev.get('title', '?')} : {ev.get('date', '?')}"
-                    )
-            description = "\n".join(description_lines)
-            try:
-                cal_result = await self.calendar_service.create_event(
-                    summary=summary,
-                    start_time=earnings_date,
-                    end_time=earnings_date,
-                    description=description,
-                )
-                registered.append(
-                    {"summary": summary, "date": earnings_date, "result": cal_result}
-                )
-            except Exception as e:
-                registered.append({"error": str(e), "summary": summary})
-            for ev in related:
-                ev_date = ev.get("date")
-                ev_title = ev.get("title")
-                if not (ev_date and ev_title):
-                    continue
-                try:
-                    r = await self.calendar_service.create_event(
-                        summary=f"📅 {company} {ev_title}",
-                        start_time=ev_date,
-                        end_time=ev_date,
-                        description=f"出典: {data.get('source', 'N/A')}",
-                    )
-                    registered.append(
-                        {"summary": ev_title, "date": ev_date, "result": r}
-                    )
-                except Exception as e:
-                    registered.append({"error": str(e), "summary": ev_title})
         return {
             "ok": True,
             "ticker": code,
             "market": market,
             "data": data,
-            "registered": registered,
         }
 
+    async def _register_earnings_events(self, code: str, data: dict) -> list:
+        company = data.get("company_name") or code
+        earnings_date = data.get("next_earnings_date")
+        registered = []
+        summary = f"📊 {company} ({code}) 決算発表"
+        description_lines = [
+            f"会計期間: {data.get('fiscal_period', '不明')}",
+            f"発表時間帯: {data.get('earnings_time', '不明')}",
+            f"信頼度: {data.get('confidence', 'N/A')}",
+            f"出典: {data.get('source', 'N/A')}",
+        ]
+        related = data.get("related_events") or []
+        if related:
+            description_lines.append("\n関連イベント:")
+            for ev in related:
+                description_lines.append(
+                    f"- {ev.get('title', '?')} : {ev.get('date', '?')}"
+                )
+        description = "\n".join(description_lines)
+        try:
+            cal_result = await self.calendar_service.create_event(
+                summary=summary,
+                start_time=earnings_date,
+                end_time=earnings_date,
+                description=description,
+            )
+            registered.append(
+                {"summary": summary, "date": earnings_date, "result": cal_result}
+            )
+        except Exception as e:
+            registered.append({"error": str(e), "summary": summary})
+        for ev in related:
+            ev_date = ev.get("date")
+            ev_title = ev.get("title")
+            if not (ev_date and ev_title):
+                continue
+            try:
+                r = await self.calendar_service.create_event(
+                    summary=f"📅 {company} {ev_title}",
+                    start_time=ev_date,
+                    end_time=ev_date,
+                    description=f"出典: {data.get('source', 'N/A')}",
+                )
+                registered.append(
+                    {"summary": ev_title, "date": ev_date, "result": r}
+                )
+            except Exception as e:
+                registered.append({"error": str(e), "summary": ev_title})
+        return registered
+
     async def run_earnings_documents(self, ticker: str) -> dict:
         if not self.gemini_client:
             return {"ok": False, "error": "Geminiクライアント未設定"}
@@ -1493,7 +1549,8 @@ class InvestmentCog(commands.Cog):
                 "parents": [ticker_id],
                 "mimeType": mime,
             }
-            created = await asyncio.to_thread(
+            created = await run_in(
+                GOOGLE_API,
                 lambda: service.files()
                 .create(body=file_metadata, media_body=media, fields="id, webViewLink")
                 .execute()
@@ -1573,7 +1630,8 @@ class InvestmentCog(commands.Cog):
             import io as _io
             media = MediaIoBaseUpload(_io.BytesIO(content), mimetype=mime, resumable=True)
             file_metadata = {"name": final_filename, "parents": [ticker_id], "mimeType": mime}
-            created = await asyncio.to_thread(
+            created = await run_in(
+                GOOGLE_API,
                 lambda: service.files()
                 .create(body=file_metadata, media_body=media, fields="id, webViewLink")
                 .execute()
@@ -1621,8 +1679,9 @@ class InvestmentCog(commands.Cog):
         }
 
     async def run_ceo_crosscheck(
-        self, ticker: str, video_url: str, video_title: str = ""
+        self, ticker: str, video_url: str, video_title: str = "", refresh: bool = False
     ) -> dict:
+        """CEO 発言動画の検証。同じ銘柄・同じ動画は営業日単位でキャッシュを返す。"""
         if not self.gemini_client:
             return {"ok": False, "error": "Geminiクライアント未設定"}
         if not video_url:
@@ -1632,14 +1691,21 @@ class InvestmentCog(commands.Cog):
                 "ok": False,
                 "error": "YouTubeのURLとして認識できませんでした",
             }
-        market, code = _resolve_market(ticker)
+        from services.research_cache import research_cache, version_of
 
-        # 1. 銘柄スナップショットを下調べとして取得
-        now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
-        snap_prompt = PROMPT_STOCK_SNAPSHOT.format(
-            ticker=code, market=market, date=now_str
+        market, code = _resolve_market(ticker)
+        return await research_cache.get_or_run(
+            "ceo_check", code, version_of(PROMPT_STOCK_SNAPSHOT, PROMPT_CEO_CROSSCHECK),
+            lambda: self._fetch_ceo_crosscheck(code, market, video_url, video_title, refresh),
+            refresh=refresh, params_key=video_url,
         )
-        snapshot = await self._gemini_with_search(snap_prompt, feature_key="investment_snapshot")
+
+    async def _fetch_ceo_crosscheck(
+        self, code: str, market: str, video_url: str, video_title: str, refresh: bool
+    ) -> dict:
+        # 1. 銘柄スナップショットを下調べとして取得（同じ営業日のものがあれば使い回す）
+        snap = await self.run_stock_snapshot(code, refresh=refresh)
+        snapshot = snap.get("report") if snap.get("ok") else ""
 
         # 2. 動画解析プロンプトを構築
         background = (
@@ -1749,30 +1815,60 @@ class InvestmentCog(commands.Cog):
     }
 
     async def list_history(self, category: str, limit: int = 20) -> dict:
-        """履歴一覧を取得する。"""
+        """履歴一覧を取得する（保存時に作る索引 inv_notes から。Drive 側の変化は数時間おきに取り込む）。"""
         sub = self.HISTORY_FOLDER_MAP.get(category)
         if not sub:
             return {"ok": False, "error": f"未知のカテゴリ: {category}"}
-        files = await self._list_subfolder_files(sub, limit=limit)
+        from api.database import inv_notes_list
+
+        await self._sync_history_index(sub)
+        files = await inv_notes_list(sub, limit=limit)
         return {
             "ok": True,
             "category": category,
-            "items": [
-                {
-                    "id": f.get("id"),
-                    "name": f.get("name"),
-                    "modifiedTime": f.get("modifiedTime"),
-                }
-                for f in files
-            ],
+            "items": files,
         }
 
+    async def _sync_history_index(self, subfolder: str) -> None:
+        """Obsidian 側で足した・直したファイルを索引へ取り込む。初回は待ち、以後は _HISTORY_SYNC_SEC
+        おきにバックグラウンドで一覧を取り直す。"""
+        from api.database import get_app_setting, inv_notes_sync, set_app_setting
+
+        key = f"inv_notes.synced.{subfolder}"
+        last = await get_app_setting(key, "")
+        now = time.time()
+        try:
+            if last and now - float(last) < _HISTORY_SYNC_SEC:
+                return
+        except ValueError:
+            pass
+        await set_app_setting(key, str(now))
+
+        async def _sync():
+            try:
+                files = await self._list_subfolder_files(subfolder, limit=200)
+                await inv_notes_sync(subfolder, files)
+            except Exception as e:
+                logging.debug(f"history index sync failed ({subfolder}): {e}")
+
+        if last:
+            asyncio.create_task(_sync())
+        else:
+            await _sync()
+
     async def read_history_item(self, category: str, file_id: str) -> dict:
         if category not in self.HISTORY_FOLDER_MAP:
             return {"ok": False, "error": f"未知のカテゴリ: {category}"}
-        content = await self._read_subfolder_file(
-            self.HISTORY_FOLDER_MAP[category], file_id
-        )
+        from api.database import inv_notes_get, inv_notes_set_content
+
+        note = await inv_notes_get(file_id)
+        content = note.get("content") if note else None
+        if content is None:
+            content = await self._read_subfolder_file(
+                self.HISTORY_FOLDER_MAP[category], file_id
+            )
+            if content and note:
+                await inv_notes_set_content(file_id, content)
         if not content:
             return {"ok": False, "error": "ファイルが空または取得失敗"}
         return {"ok": True, "content": content}
@@ -1781,24 +1877,30 @@ class InvestmentCog(commands.Cog):
     # JSONストレージヘルパー (ポートフォリオ・日記・アラート用)
     # ==========================================================
 
+    async def _find_investment_file(self, service, subfolder: str, filename: str):
+        """Investment/{subfolder}/{filename} の ID を返す（フォルダは作らない）。
+        どこかが本当に無ければ None、Drive の API エラーは例外のまま投げる。"""
+        inv_id = await self.drive_service.find_file(
+            service, self.drive_folder_id, INVESTMENT_FOLDER, strict=True
+        )
+        if not inv_id:
+            return None
+        sub_id = await self.drive_service.find_file(service, inv_id, subfolder, strict=True)
+        if not sub_id:
+            return None
+        return await self.drive_service.find_file(service, sub_id, filename, strict=True)
+
     async def _read_json_file(self, subfolder: str, filename: str, default):
-        """Investment/{subfolder}/{filename} をJSONとして読む。無ければdefault。"""
-        if not self.drive_service:
-            return default
-        service = self.drive_service.get_service()
+        """Investment/{subfolder}/{filename} をJSONとして読む。ファイルが無ければdefault。
+        読み込み・パースの失敗は例外にする（空として取り込むと、書き出しで Drive 側を消してしまう）。"""
+        service = self.drive_service.get_service() if self.drive_service else None
         if not service:
-            return default
-        inv_id = await self._get_investment_folder(service)
-        sub_id = await self._get_or_create_folder(service, inv_id, subfolder)
-        f_id = await self.drive_service.find_file(service, sub_id, filename)
+            raise RuntimeError("Drive に接続できません")
+        f_id = await self._find_investment_file(service, subfolder, filename)
         if not f_id:
             return default
-        try:
-            text = await self.drive_service.read_text_file(service, f_id)
-            return json.loads(text) if text else default
-        except Exception as e:
-            logging.error(f"InvestmentCog: JSON read error ({filename}): {e}")
-            return default
+        text = await self.drive_service.read_text_file(service, f_id, strict=True)
+        return json.loads(text) if text.strip() else default
 
     async def _write_json_file(self, subfolder: str, filename: str, data):
         """Investment/{subfolder}/{filename} にJSONを書き込む。"""
@@ -1821,8 +1923,8 @@ class InvestmentCog(commands.Cog):
             )
         return True
 
-    async def _append_jsonl(self, subfolder: str, filename: str, entry: dict):
-        """append-only JSONL ファイルに1行追加する。"""
+    async def _write_jsonl_file(self, subfolder: str, filename: str, entries: list):
+        """Investment/{subfolder}/{filename} を JSONL（1 行 1 件）で丸ごと書き込む。"""
         if not self.drive_service:
             return False
         service = self.drive_service.get_service()
@@ -1830,43 +1932,27 @@ class InvestmentCog(commands.Cog):
             return False
         inv_id = await self._get_investment_folder(service)
         sub_id = await self._get_or_create_folder(service, inv_id, subfolder)
+        body = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
         existing_id = await self.drive_service.find_file(service, sub_id, filename)
-        prev = ""
-        if existing_id:
-            try:
-                prev = await self.drive_service.read_text_file(service, existing_id)
-            except Exception:
-                prev = ""
-        new_line = json.dumps(entry, ensure_ascii=False)
-        new_text = (prev or "") + new_line + "\n"
         if existing_id:
             await self.drive_service.update_text(
-                service, existing_id, new_text, mime_type="application/x-ndjson"
+                service, existing_id, body, mime_type="application/x-ndjson"
             )
         else:
             await self.drive_service.upload_text(
-                service, sub_id, filename, new_text, mime_type="application/x-ndjson"
+                service, sub_id, filename, body, mime_type="application/x-ndjson"
             )
         return True
 
     async def _read_jsonl(self, subfolder: str, filename: str):
-        """JSONLファイルの全行をパースしてリストで返す。"""
-        if not self.drive_service:
-            return []
-        service = self.drive_service.get_service()
+        """JSONLファイルの全行をパースしてリストで返す。ファイルが無ければ空、読み込み失敗は例外。"""
+        service = self.drive_service.get_service() if self.drive_service else None
         if not service:
-            return []
-        inv_id = await self._get_investment_folder(service)
-        sub_id = await self.drive_service.find_file(service, inv_id, subfolder)
-        if not sub_id:
-            return []
-        f_id = await self.drive_service.find_file(service, sub_id, filename)
+            raise RuntimeError("Drive に接続できません")
+        f_id = await self._find_investment_file(service, subfolder, filename)
         if not f_id:
             return []
-        try:
-            text = await self.drive_service.read_text_file(service, f_id)
-        except Exception:
-            return []
+        text = await self.drive_service.read_text_file(service, f_id, strict=True)
         out = []
         for line in (text or "").splitlines():
             line = line.strip()
@@ -1878,17 +1964,159 @@ class InvestmentCog(commands.Cog):
                 continue
         return out
 
+    # ==========================================================
+    # 投資データの正本（SQLite）と Drive への書き出し
+    # ==========================================================
+
+    async def _start_investment_store(self):
+        from services.investment_store import investment_store
+        try:
+            await investment_store.ready()
+            await investment_store.flush()  # 前回の書き出し残り
+        except Exception as e:
+            logging.error(f"InvestmentCog: investment store start failed: {e}")
+
+    async def _store_write_error(self) -> Optional[dict]:
+        """Drive の投資データを取り込めるまでは変更を断る（取り込み前に行を足すと、その表の取り込みが
+        飛ばされ、書き出しで Drive 側を足した行だけで上書きしてしまう）。変更してよければ None。"""
+        from services.investment_store import investment_store
+
+        if await investment_store.ready():
+            return None
+        return {
+            "ok": False,
+            "error": "Drive の投資データをまだ取り込めていないため、変更できません。しばらくしてから再度お試しください。",
+        }
+
+    async def _holdings(self) -> list:
+        from api.database import inv_holdings_list
+        from services.investment_store import investment_store
+        await investment_store.ready()
+        return await inv_holdings_list()
+
+    async def _import_investment_data(self) -> bool:
+        """Drive の既存 JSON / JSONL を SQLite に取り込む（初回のみ。手元に行がある表は触らない）。
+
+        先に必要なファイルをすべて読み、1 つでも読めなければ何も書かずに例外を投げる
+        （取り込み済みにならないので、Drive 側を上書きする書き出しも始まらない）。"""
+        from api import database as db
+
+        if not self.drive_service or not self.drive_service.get_service():
+            return False
+        need_holdings = not await db.inv_holdings_list()
+        need_txns = not await db.inv_transactions_list(limit=1)
+        need_journal = not await db.inv_journal_list(limit=1)
+        need_rules = not await db.inv_alert_rules_list()
+        need_events = not await db.inv_alert_events_list(limit=1)
+
+        holdings = await self._read_json_file(PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]) if need_holdings else []
+        txns = await self._read_jsonl(PORTFOLIO_FOLDER, TRANSACTIONS_FILE) if need_txns else []
+        index = await self._read_json_file(JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]) if need_journal else []
+        rules = await self._read_json_file(ALERTS_FOLDER, ALERT_RULES_FILE, default=[]) if need_rules else []
+        events = await self._read_jsonl(ALERTS_FOLDER, ALERT_LOG_FILE) if need_events else []
+
+        holdings = [h for h in holdings if h.get("code")]
+        await db.inv_holdings_put(holdings)
+        for h in holdings:
+            try:
+                await db.inv_lot_add(
+                    h["code"], h.get("opened_at") or "", float(h.get("shares") or 0),
+                    float(h.get("avg_cost") or 0),
+                )
+            except (TypeError, ValueError):
+                continue
+        await db.inv_transactions_add([t for t in txns if t.get("ts") and t.get("action")])
+        # 本文は Drive に置いたまま（content=NULL）。journal_get で初めて読んだときに手元へ保存する
+        await db.inv_journal_put([it for it in index if it.get("filename") and it.get("date")])
+        await db.inv_alert_rules_put([r for r in rules if r.get("id") is not None and r.get("type")])
+        await db.inv_alert_events_add(events)
+        return True
+
+    async def _export_investment_item(self, key: str) -> bool:
+        """investment_store の書き出しキー 1 つ分を Drive に書き出す。"""
+        from api import database as db
+
+        if key == "holdings":
+            return await self._write_json_file(PORTFOLIO_FOLDER, HOLDINGS_FILE, await db.inv_holdings_list())
+        if key == "transactions":
+            return await self._write_jsonl_file(
+                PORTFOLIO_FOLDER, TRANSACTIONS_FILE, await db.inv_transactions_list(limit=None)
+            )
+        if key == "journal_index":
+            index = list(reversed(await db.inv_journal_list(limit=None)))
+            return await self._write_json_file(JOURNAL_FOLDER, JOURNAL_INDEX_FILE, index)
+        if key == "alert_rules":
+            return await self._write_json_file(ALERTS_FOLDER, ALERT_RULES_FILE, await db.inv_alert_rules_list())
+        if key == "alert_log":
+            return await self._write_jsonl_file(ALERTS_FOLDER, ALERT_LOG_FILE, await db.inv_alert_events_list())
+        if key.startswith("journal:"):
+            filename = key.split(":", 1)[1]
+            entry = await db.inv_journal_get(filename)
+            if entry is None:
+                return await self._delete_journal_note(filename)
+            if entry.get("content") is None:
+                return True  # 本文が手元に無い（Drive 側が正しい）
+            await self._save_dated_note(JOURNAL_FOLDER, filename, _render_journal_note(entry))
+            return True
+        logging.warning(f"InvestmentCog: unknown export key {key}")
+        return True
+
+    async def _delete_journal_note(self, filename: str) -> bool:
+        """Journal/{filename} をゴミ箱へ移動する（無ければ何もしない）。"""
+        if not self.drive_service:
+            return False
+        service = self.drive_service.get_service()
+        if not service:
+            return False
+        inv_id = await self._get_investment_folder(service)
+        sub_id = await self.drive_service.find_file(service, inv_id, JOURNAL_FOLDER)
+        if not sub_id:
+            return True
+        f_id = await self.drive_service.find_file(service, sub_id, filename)
+        if f_id:
+            await self.drive_service.delete_file(service, f_id)
+        from api.database import inv_notes_delete
+        await inv_notes_delete(JOURNAL_FOLDER, filename)
+        return True
+
+    async def _read_journal_content(self, filename: str) -> Optional[str]:
+        """日記本文（## 内容 以降）。手元に無ければ Drive から読んで保存する。"""
+        from api.database import inv_journal_get, inv_journal_put
+
+        entry = await inv_journal_get(filename)
+        if entry is None:
+            return None
+        if entry.get("content") is not None:
+            return entry["content"]
+        if not self.drive_service:
+            return None
+        service = self.drive_service.get_service()
+        if not service:
+            return None
+        inv_id = await self._get_investment_folder(service)
+        sub_id = await self.drive_service.find_file(service, inv_id, JOURNAL_FOLDER)
+        f_id = await self.drive_service.find_file(service, sub_id, filename) if sub_id else None
+        if not f_id:
+            return None
+        raw = await self.drive_service.read_text_file(service, f_id) or ""
+        marker = "## 内容"
+        content = (raw.split(marker, 1)[1].lstrip("\n") if marker in raw else raw).strip()
+        entry["content"] = content
+        await inv_journal_put([entry])
+        return content
+
     # ==========================================================
     # ポートフォリオ管理
     # ==========================================================
 
     async def portfolio_list(self) -> dict:
-        holdings = await self._read_json_file(
-            PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-        )
+        holdings = await self._holdings()
         return {"ok": True, "holdings": holdings}
 
     async def portfolio_add(self, holding: dict) -> dict:
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
         ticker = (holding.get("ticker") or "").strip()
         if not ticker:
             return {"ok": False, "error": "tickerが必要です"}
@@ -1905,9 +2133,7 @@ class InvestmentCog(commands.Cog):
         acc_raw = str(holding.get("account") or "").strip().lower()
         account = "nisa" if acc_raw in ("nisa", "非課税", "tax_free") else "taxable"
 
-        holdings = await self._read_json_file(
-            PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-        )
+        holdings = await self._holdings()
         # 既存があれば加重平均で更新、なければ追加
         idx = next(
             (i for i, h in enumerate(holdings) if h.get("code") == code),
@@ -1952,11 +2178,13 @@ class InvestmentCog(commands.Cog):
                     "notes": holding.get("notes") or "",
                 }
             )
-        await self._write_json_file(PORTFOLIO_FOLDER, HOLDINGS_FILE, holdings)
+        from api.database import inv_holdings_put, inv_lot_add, inv_transactions_add
+        from services.investment_store import investment_store
+
+        await inv_holdings_put([holdings[idx] if idx is not None else holdings[-1]])
+        await inv_lot_add(code, now_iso, shares, avg_cost)
         # 取引履歴にも追記
-        await self._append_jsonl(
-            PORTFOLIO_FOLDER,
-            TRANSACTIONS_FILE,
+        await inv_transactions_add([
             {
                 "ts": now_iso,
                 "action": "buy",
@@ -1965,7 +2193,8 @@ class InvestmentCog(commands.Cog):
                 "price": avg_cost,
                 "notes": holding.get("notes") or "",
             },
-        )
+        ])
+        await investment_store.mark("holdings", "transactions")
         # 事後検証用に「買い」判断のスナップショットを記録（バックグラウンド）
         self._snapshot_trade_decision(
             code=code, name=holding.get("name") or code, market=market,
@@ -1977,9 +2206,10 @@ class InvestmentCog(commands.Cog):
     async def portfolio_remove(self, code: str, shares: float = None, price: float = None) -> dict:
         """sharesがNoneなら全数売却。指定なら部分売却。
         price に実際の売却単価を渡すと、実現損益((売却単価-平均取得単価)×株数)を記録する。"""
-        holdings = await self._read_json_file(
-            PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-        )
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
+        holdings = await self._holdings()
         idx = next(
             (i for i, h in enumerate(holdings) if h.get("code") == code),
             None,
@@ -2013,15 +2243,20 @@ class InvestmentCog(commands.Cog):
             realized_pnl = round((sell_price - avg_cost) * sold_shares, 2)
             realized_pnl_pct = round((sell_price - avg_cost) / avg_cost * 100, 2)
 
+        from api.database import (
+            inv_holding_delete, inv_holdings_put, inv_lots_consume, inv_transactions_add,
+        )
+        from services.investment_store import investment_store
+
         if sold_shares >= float(existing.get("shares", 0)):
             holdings.pop(idx)
+            await inv_holding_delete(code)
         else:
             existing["shares"] = float(existing["shares"]) - sold_shares
             existing["updated_at"] = now_iso
-        await self._write_json_file(PORTFOLIO_FOLDER, HOLDINGS_FILE, holdings)
-        await self._append_jsonl(
-            PORTFOLIO_FOLDER,
-            TRANSACTIONS_FILE,
+            await inv_holdings_put([existing])
+        await inv_lots_consume(code, sold_shares)
+        await inv_transactions_add([
             {
                 "ts": now_iso,
                 "action": "sell",
@@ -2033,7 +2268,8 @@ class InvestmentCog(commands.Cog):
                 "realized_pnl": realized_pnl,
                 "realized_pnl_pct": realized_pnl_pct,
             },
-        )
+        ])
+        await investment_store.mark("holdings", "transactions")
         # 事後検証用に「売り」判断のスナップショットを記録（バックグラウンド）。
         # 実売却単価が分かればそれを基準にし、無ければ診断時の現値を使う。
         self._snapshot_trade_decision(
@@ -2050,37 +2286,28 @@ class InvestmentCog(commands.Cog):
     async def portfolio_realized_summary(self) -> dict:
         """取引履歴から、売却で確定した実現損益を集計する。
         「自分の売買がどれだけ利益を生んだか」を可視化する（実現損益ベース）。"""
-        txns = await self._read_jsonl(PORTFOLIO_FOLDER, TRANSACTIONS_FILE)
-        sells = [t for t in txns if t.get("action") == "sell"]
-        realized = [t for t in sells if t.get("realized_pnl") is not None]
+        from api.database import inv_realized_summary
+        from services.investment_store import investment_store
 
-        total = round(sum(float(t.get("realized_pnl") or 0) for t in realized), 2)
-        wins = [t for t in realized if float(t.get("realized_pnl") or 0) > 0]
-        loses = [t for t in realized if float(t.get("realized_pnl") or 0) < 0]
-        win_rate = round(len(wins) / len(realized) * 100, 1) if realized else None
+        await investment_store.ready()
+        agg = await inv_realized_summary(recent_limit=30)
+        n_realized = agg["n"] or 0
+        total = round(float(agg["total"] or 0), 2)
+        wins = agg["wins"] or 0
+        loses = agg["loses"] or 0
+        win_rate = round(wins / n_realized * 100, 1) if n_realized else None
 
         # 銘柄別の実現損益
-        by_code: dict[str, dict] = {}
-        for t in realized:
-            c = str(t.get("code") or "")
-            b = by_code.setdefault(c, {"code": c, "name": t.get("name") or c,
-                                       "realized_pnl": 0.0, "sell_count": 0})
-            b["realized_pnl"] = round(b["realized_pnl"] + float(t.get("realized_pnl") or 0), 2)
-            b["sell_count"] += 1
-        by_code_list = sorted(by_code.values(), key=lambda x: x["realized_pnl"], reverse=True)
-
-        # 直近の売却（新しい順）
-        recent = [{
-            "ts": t.get("ts"), "code": t.get("code"), "name": t.get("name"),
-            "shares": t.get("shares"), "price": t.get("price"), "avg_cost": t.get("avg_cost"),
-            "realized_pnl": t.get("realized_pnl"), "realized_pnl_pct": t.get("realized_pnl_pct"),
-        } for t in realized[-30:][::-1]]
-
-        if realized:
-            summary = (f"確定済み売却{len(realized)}件：実現損益 合計 {total:+,.0f}。"
-                       f"勝ち{len(wins)}・負け{len(loses)}（勝率 {win_rate}%）。")
+        by_code_list = [{
+            "code": str(b["code"] or ""), "name": b["name"] or str(b["code"] or ""),
+            "realized_pnl": round(float(b["realized_pnl"] or 0), 2), "sell_count": b["sell_count"],
+        } for b in agg["by_code"]]
+
+        if n_realized:
+            summary = (f"確定済み売却{n_realized}件：実現損益 合計 {total:+,.0f}。"
+                       f"勝ち{wins}・負け{loses}（勝率 {win_rate}%）。")
         else:
-            untracked = len(sells)
+            untracked = agg["sells"] or 0
             summary = ("実現損益はまだ記録されていません。"
                        + (f"（売却{untracked}件は売却単価が未入力のため損益未計算）"
                           if untracked else "売却履歴がありません。"))
@@ -2089,19 +2316,20 @@ class InvestmentCog(commands.Cog):
             "ok": True,
             "summary": summary,
             "total_realized_pnl": total,
-            "realized_trades": len(realized),
-            "win_count": len(wins),
-            "lose_count": len(loses),
+            "realized_trades": n_realized,
+            "win_count": wins,
+            "lose_count": loses,
             "win_rate": win_rate,
             "by_code": by_code_list,
-            "recent": recent,
+            "recent": agg["recent"],
         }
 
     async def portfolio_update(self, code: str, **fields) -> dict:
         """既存保有銘柄を直接編集する（株数・平均取得単価などを上書き）。"""
-        holdings = await self._read_json_file(
-            PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-        )
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
+        holdings = await self._holdings()
         idx = next(
             (i for i, h in enumerate(holdings) if h.get("code") == code),
             None,
@@ -2151,10 +2379,11 @@ class InvestmentCog(commands.Cog):
                 return {"ok": False, "error": "購入日は YYYY-MM-DD 形式で指定してください"}
 
         existing["updated_at"] = now_iso
-        await self._write_json_file(PORTFOLIO_FOLDER, HOLDINGS_FILE, holdings)
-        await self._append_jsonl(
-            PORTFOLIO_FOLDER,
-            TRANSACTIONS_FILE,
+        from api.database import inv_holdings_put, inv_transactions_add
+        from services.investment_store import investment_store
+
+        await inv_holdings_put([existing])
+        await inv_transactions_add([
             {
                 "ts": now_iso,
                 "action": "update",
@@ -2163,12 +2392,16 @@ class InvestmentCog(commands.Cog):
                 "price": existing.get("avg_cost"),
                 "notes": fields.get("notes") or "",
             },
-        )
+        ])
+        await investment_store.mark("holdings", "transactions")
         return {"ok": True, "holdings": holdings}
 
     async def portfolio_transactions(self, limit: int = 100) -> dict:
-        items = await self._read_jsonl(PORTFOLIO_FOLDER, TRANSACTIONS_FILE)
-        items = items[-limit:][::-1]
+        from api.database import inv_transactions_list
+        from services.investment_store import investment_store
+
+        await investment_store.ready()
+        items = await inv_transactions_list(limit=limit)
         return {"ok": True, "transactions": items}
 
     def _snapshot_trade_decision(
@@ -2201,6 +2434,9 @@ class InvestmentCog(commands.Cog):
     # ==========================================================
 
     async def journal_add(self, entry: dict) -> dict:
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
         title = (entry.get("title") or "").strip() or "(無題)"
         content = (entry.get("content") or "").strip()
         if not content:
@@ -2214,35 +2450,12 @@ class InvestmentCog(commands.Cog):
         slug = _safe_filename(ticker or title)[:40]
         filename = f"{date_str}_{now.strftime('%H%M%S')}_{slug}.md"
 
-        body_lines = [
-            f"---",
-            f"title: {title}",
-            f"date: {date_str}",
-            f"ticker: {ticker}",
-            f"action: {action}",
-            f"emotion: {emotion}",
-            f"tags: [investment, journal]",
-            f"---",
-            "",
-            f"# {title}",
-            "",
-            f"- 日時: {date_str} {time_str}",
-            f"- 銘柄: {ticker or '(なし)'}",
-            f"- アクション: {action or '(なし)'}",
-            f"- 感情: {emotion or '(なし)'}",
-            "",
-            "## 内容",
-            "",
-            content,
-        ]
-        body = "\n".join(body_lines)
-        await self._save_dated_note(JOURNAL_FOLDER, filename, body)
+        # 正本は SQLite。Markdown とインデックスは investment_store が Drive へ書き出す
+        from api.database import inv_journal_put
+        from services.investment_store import investment_store
 
-        # インデックスを更新
-        index = await self._read_json_file(
-            JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]
-        )
-        index.append(
+        await investment_store.ready()
+        await inv_journal_put([
             {
                 "filename": filename,
                 "date": date_str,
@@ -2251,51 +2464,35 @@ class InvestmentCog(commands.Cog):
                 "ticker": ticker,
                 "action": action,
                 "emotion": emotion,
+                "content": content,
             }
-        )
-        await self._write_json_file(JOURNAL_FOLDER, JOURNAL_INDEX_FILE, index)
+        ])
+        await investment_store.mark(f"journal:{filename}", "journal_index")
         return {"ok": True, "filename": filename}
 
     async def journal_list(self, limit: int = 50) -> dict:
-        index = await self._read_json_file(
-            JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]
-        )
+        from api.database import inv_journal_list
+        from services.investment_store import investment_store
+
+        await investment_store.ready()
         # 新しい順
-        items = list(reversed(index))[:limit]
+        items = await inv_journal_list(limit=limit)
         return {"ok": True, "items": items}
 
     async def journal_get(self, filename: str) -> dict:
-        """指定ファイル名の日記エントリを取得（インデックス + 本文）。"""
+        """指定ファイル名の日記エントリを取得（メタ + 本文）。本文が手元に無い古い日記だけ Drive から読む。"""
         if not filename:
             return {"ok": False, "error": "filename が空です"}
-        index = await self._read_json_file(
-            JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]
-        )
-        meta = next((it for it in index if it.get("filename") == filename), None)
+        from api.database import inv_journal_get
+        from services.investment_store import investment_store
+
+        await investment_store.ready()
+        meta = await inv_journal_get(filename)
         if not meta:
             return {"ok": False, "error": "日記が見つかりません"}
-        # 本文取得
-        if not self.drive_service:
-            return {"ok": False, "error": "Drive未接続"}
-        service = self.drive_service.get_service()
-        if not service:
-            return {"ok": False, "error": "Drive接続失敗"}
-        inv_id = await self._get_investment_folder(service)
-        sub_id = await self.drive_service.find_file(service, inv_id, JOURNAL_FOLDER)
-        if not sub_id:
-            return {"ok": False, "error": "Journalフォルダがありません"}
-        f_id = await self.drive_service.find_file(service, sub_id, filename)
-        if not f_id:
+        content = await self._read_journal_content(filename)
+        if content is None:
             return {"ok": False, "error": "ファイルが見つかりません"}
-        raw = await self.drive_service.read_text_file(service, f_id)
-        # 本文（## 内容 以降）を抽出
-        content = ""
-        if raw:
-            marker = "## 内容"
-            if marker in raw:
-                content = raw.split(marker, 1)[1].lstrip("\n")
-            else:
-                content = raw
         return {
             "ok": True,
             "filename": filename,
@@ -2312,10 +2509,13 @@ class InvestmentCog(commands.Cog):
         """既存日記を上書き編集する。filename と作成日時は維持し、本文・メタを更新。"""
         if not filename:
             return {"ok": False, "error": "filename が空です"}
-        index = await self._read_json_file(
-            JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]
-        )
-        meta = next((it for it in index if it.get("filename") == filename), None)
+        from api.database import inv_journal_get, inv_journal_put
+        from services.investment_store import investment_store
+
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
+        meta = await inv_journal_get(filename)
         if not meta:
             return {"ok": False, "error": "日記が見つかりません"}
 
@@ -2323,108 +2523,53 @@ class InvestmentCog(commands.Cog):
         content = (entry.get("content") or "").strip()
         if not content:
             return {"ok": False, "error": "本文が空です"}
-        ticker = (entry.get("ticker") or "").strip().upper()
-        action = (entry.get("action") or "").strip()
-        emotion = (entry.get("emotion") or "").strip()
-        date_str = meta.get("date") or datetime.datetime.now(JST).strftime("%Y-%m-%d")
-        time_str = meta.get("time") or datetime.datetime.now(JST).strftime("%H:%M")
-        now_iso = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
-
-        body_lines = [
-            "---",
-            f"title: {title}",
-            f"date: {date_str}",
-            f"ticker: {ticker}",
-            f"action: {action}",
-            f"emotion: {emotion}",
-            f"updated_at: {now_iso}",
-            "tags: [investment, journal]",
-            "---",
-            "",
-            f"# {title}",
-            "",
-            f"- 日時: {date_str} {time_str}",
-            f"- 銘柄: {ticker or '(なし)'}",
-            f"- アクション: {action or '(なし)'}",
-            f"- 感情: {emotion or '(なし)'}",
-            f"- 更新: {now_iso}",
-            "",
-            "## 内容",
-            "",
-            content,
-        ]
-        body = "\n".join(body_lines)
-        # _save_dated_note は既存ファイルがあれば上書きする
-        await self._save_dated_note(JOURNAL_FOLDER, filename, body)
-
-        # インデックスを更新
-        meta["title"] = title
-        meta["ticker"] = ticker
-        meta["action"] = action
-        meta["emotion"] = emotion
-        meta["updated_at"] = now_iso
-        await self._write_json_file(JOURNAL_FOLDER, JOURNAL_INDEX_FILE, index)
+        meta.update({
+            "title": title,
+            "ticker": (entry.get("ticker") or "").strip().upper(),
+            "action": (entry.get("action") or "").strip(),
+            "emotion": (entry.get("emotion") or "").strip(),
+            "date": meta.get("date") or datetime.datetime.now(JST).strftime("%Y-%m-%d"),
+            "time": meta.get("time") or datetime.datetime.now(JST).strftime("%H:%M"),
+            "updated_at": datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M"),
+            "content": content,
+        })
+        await inv_journal_put([meta])
+        await investment_store.mark(f"journal:{filename}", "journal_index")
         return {"ok": True, "filename": filename}
 
     async def journal_delete(self, filename: str) -> dict:
-        """日記を削除する。Driveファイルをゴミ箱に移動し、インデックスからも除去。"""
+        """日記を削除する。インデックスから除き、Drive ファイルは書き出し時にゴミ箱へ移動する。"""
         if not filename:
             return {"ok": False, "error": "filename が空です"}
-        index = await self._read_json_file(
-            JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]
-        )
-        meta = next((it for it in index if it.get("filename") == filename), None)
-        if not meta:
-            return {"ok": False, "error": "日記が見つかりません"}
+        from api.database import inv_journal_delete
+        from services.investment_store import investment_store
 
-        # Driveファイル削除（ゴミ箱）
-        if self.drive_service:
-            service = self.drive_service.get_service()
-            if service:
-                inv_id = await self._get_investment_folder(service)
-                sub_id = await self.drive_service.find_file(
-                    service, inv_id, JOURNAL_FOLDER
-                )
-                if sub_id:
-                    f_id = await self.drive_service.find_file(
-                        service, sub_id, filename
-                    )
-                    if f_id:
-                        try:
-                            await self.drive_service.delete_file(service, f_id)
-                        except Exception as e:
-                            logging.warning(f"journal_delete: drive削除失敗 {filename}: {e}")
-
-        # インデックスから除去
-        new_index = [it for it in index if it.get("filename") != filename]
-        await self._write_json_file(JOURNAL_FOLDER, JOURNAL_INDEX_FILE, new_index)
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
+        if not await inv_journal_delete(filename):
+            return {"ok": False, "error": "日記が見つかりません"}
+        await investment_store.mark(f"journal:{filename}", "journal_index")
         return {"ok": True}
 
     async def journal_analyze_pattern(self, limit: int = 30) -> dict:
-        index = await self._read_json_file(
-            JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]
-        )
-        if not index:
+        from api.database import inv_journal_list
+        from services.investment_store import investment_store
+
+        await investment_store.ready()
+        recent = await inv_journal_list(limit=limit)
+        if not recent:
             return {"ok": False, "error": "投資日記がまだありません"}
-        # 直近N件を読み込む
-        recent = list(reversed(index))[:limit]
-        chunks = []
-        service = self.drive_service.get_service() if self.drive_service else None
-        if not service:
-            return {"ok": False, "error": "Drive接続失敗"}
-        inv_id = await self._get_investment_folder(service)
-        sub_id = await self.drive_service.find_file(service, inv_id, JOURNAL_FOLDER)
-        if not sub_id:
-            return {"ok": False, "error": "Journalフォルダがありません"}
-        for it in recent:
-            f_id = await self.drive_service.find_file(
-                service, sub_id, it.get("filename") or ""
-            )
-            if not f_id:
-                continue
-            content = await self.drive_service.read_text_file(service, f_id)
-            if content:
-                chunks.append(content)
+        # 直近N件（本文は手元から。古い日記だけ Drive から読む）
+        contents = await asyncio.gather(
+            *(self._read_journal_content(it["filename"]) for it in recent),
+            return_exceptions=True,
+        )
+        chunks = [
+            _render_journal_note({**it, "content": c})
+            for it, c in zip(recent, contents)
+            if isinstance(c, str) and c
+        ]
         if not chunks:
             return {"ok": False, "error": "日記本文の読み込みに失敗"}
         joined = "\n\n---\n\n".join(chunks)
@@ -2444,13 +2589,64 @@ class InvestmentCog(commands.Cog):
     # アラート
     # ==========================================================
 
+    async def _load_alert_rules(self) -> list:
+        from api.database import inv_alert_rules_list
+        from services.investment_store import investment_store
+
+        await investment_store.ready()
+        return await inv_alert_rules_list()
+
+    async def _save_alert_rules(self, changed: list) -> None:
+        """追加・変更したルールだけを保存し、rules.json の書き出しを予約する。"""
+        from api.database import inv_alert_rules_put
+        from services.investment_store import investment_store
+
+        await inv_alert_rules_put(changed)
+        await investment_store.mark("alert_rules")
+        await self._refresh_alert_engine()
+
+    async def _refresh_alert_engine(self) -> None:
+        """ルールの追加・削除・有効切り替えの後に、エンジンの持つルールを差し替える
+        （他機能の価格更新で、消した・無効にしたルールが発火しないように）。"""
+        try:
+            await self._prepare_alert_engine()
+        except Exception as e:
+            logging.warning(f"InvestmentCog: alert engine refresh failed: {e}")
+
+    async def _log_alert_events(self, fired: list[dict]) -> None:
+        """発火したアラートを記録し、alert_log.jsonl の書き出しを予約する。"""
+        from api.database import inv_alert_events_add
+        from services.investment_store import investment_store
+
+        if not fired:
+            return
+        now_iso = datetime.datetime.now(JST).isoformat()
+        await inv_alert_events_add([{"ts": now_iso, **h} for h in fired])
+        await investment_store.mark("alert_log")
+
+    async def _prepare_alert_engine(self) -> bool:
+        """ルールと保有銘柄をエンジンへ渡す。有効なルールが無ければ False。"""
+        from services.alert_engine import alert_engine
+
+        rules = [r for r in await self._load_alert_rules() if r.get("enabled")]
+        if not rules:
+            alert_engine.set_rules([], [])
+            return False
+        holdings_codes = []
+        if any(not r.get("ticker") for r in rules):
+            holdings = await self._holdings()
+            holdings_codes = [_resolve_market(h["code"])[1] for h in holdings if h.get("code")]
+        alert_engine.set_rules(rules, holdings_codes)
+        return True
+
     async def alerts_list(self) -> dict:
-        rules = await self._read_json_file(
-            ALERTS_FOLDER, ALERT_RULES_FILE, default=[]
-        )
+        rules = await self._load_alert_rules()
         return {"ok": True, "rules": rules}
 
     async def alerts_add(self, rule: dict) -> dict:
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
         ticker = (rule.get("ticker") or "").strip()
         rtype = (rule.get("type") or "").strip()
         valid_types = {
@@ -2471,9 +2667,7 @@ class InvestmentCog(commands.Cog):
         except (TypeError, ValueError):
             return {"ok": False, "error": "threshold は数値を指定してください"}
 
-        rules = await self._read_json_file(
-            ALERTS_FOLDER, ALERT_RULES_FILE, default=[]
-        )
+        rules = await self._load_alert_rules()
         market, code = _resolve_market(ticker) if ticker else ("", "")
         new_rule = {
             "id": int(datetime.datetime.now(JST).timestamp() * 1000),
@@ -2487,89 +2681,66 @@ class InvestmentCog(commands.Cog):
             "created_at": datetime.datetime.now(JST).isoformat(),
         }
         rules.append(new_rule)
-        await self._write_json_file(ALERTS_FOLDER, ALERT_RULES_FILE, rules)
+        await self._save_alert_rules([new_rule])
         return {"ok": True, "rule": new_rule, "rules": rules}
 
     async def alerts_remove(self, rule_id: int) -> dict:
-        rules = await self._read_json_file(
-            ALERTS_FOLDER, ALERT_RULES_FILE, default=[]
-        )
-        new_rules = [r for r in rules if r.get("id") != int(rule_id)]
-        if len(new_rules) == len(rules):
+        from api.database import inv_alert_rule_delete
+        from services.investment_store import investment_store
+
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
+        if not await inv_alert_rule_delete(int(rule_id)):
             return {"ok": False, "error": f"rule_id={rule_id} が見つかりません"}
-        await self._write_json_file(ALERTS_FOLDER, ALERT_RULES_FILE, new_rules)
-        return {"ok": True, "rules": new_rules}
+        await investment_store.mark("alert_rules")
+        await self._refresh_alert_engine()
+        return {"ok": True, "rules": await self._load_alert_rules()}
 
     async def alerts_toggle(self, rule_id: int, enabled: bool) -> dict:
-        rules = await self._read_json_file(
-            ALERTS_FOLDER, ALERT_RULES_FILE, default=[]
-        )
+        blocked = await self._store_write_error()
+        if blocked:
+            return blocked
+        rules = await self._load_alert_rules()
         for r in rules:
             if r.get("id") == int(rule_id):
                 r["enabled"] = bool(enabled)
-                await self._write_json_file(ALERTS_FOLDER, ALERT_RULES_FILE, rules)
+                await self._save_alert_rules([r])
                 return {"ok": True, "rules": rules}
         return {"ok": False, "error": f"rule_id={rule_id} が見つかりません"}
 
     async def alerts_check_now(self) -> dict:
-        """現在のアラートルールをすべて評価し、ヒットしたものを返す。"""
-        rules = await self._read_json_file(
-            ALERTS_FOLDER, ALERT_RULES_FILE, default=[]
-        )
-        active = [r for r in rules if r.get("enabled")]
-        if not active:
-            return {"ok": True, "hits": [], "checked": 0}
-        if not self.gemini_client:
-            return {"ok": False, "error": "Geminiクライアント未設定"}
-        # すべてのルールをまとめてGeminiに渡し、現在の市場データで判定させる
-        rules_str = json.dumps(active, ensure_ascii=False, indent=2)
-        today = datetime.datetime.now(JST).strftime("%Y-%m-%d")
-        prompt = (
-            f"以下の投資アラートルールを、Google検索とGoogleファイナンスから取得"
-            f"できる現在の最新データで評価してください。今日の日付は {today} です。\n\n"
-            f"【ルール】\n{rules_str}\n\n"
-            f"各ルールを評価し、ヒットしたものを報告してください。\n"
-            f"出力は以下の JSON のみで、前置き不要:\n"
-            f"{{\n"
-            f'  "hits": [\n'
-            f'    {{"id": 123, "ticker": "...", "type": "...", "threshold": 0,'
-            f'      "current_value": 0, "message": "1行で日本語"}}\n'
-            f"  ],\n"
-            f'  "checked_count": 0,\n'
-            f'  "as_of": "YYYY-MM-DD HH:MM"\n'
-            f"}}\n"
-            f"ルール種別の意味:\n"
-            f"- per_below/per_above: PERが threshold を下回った/上回った\n"
-            f"- price_below/price_above: 株価が threshold を下回った/上回った\n"
-            f"- drop_pct/rise_pct: 直近1ヶ月で threshold% 以上下落/上昇\n"
-            f"- earnings_within_days: 次回決算が threshold 日以内に迫っている"
-        )
-        raw = await self._gemini_with_search(prompt, feature_key="investment_review")
-        data = self._extract_json(raw) or {}
-        hits = data.get("hits") or []
-        # ログ追記
-        for h in hits:
-            await self._append_jsonl(
-                ALERTS_FOLDER,
-                ALERT_LOG_FILE,
-                {"ts": datetime.datetime.now(JST).isoformat(), **h},
-            )
-        return {
-            "ok": True,
-            "hits": hits,
-            "checked": data.get("checked_count", len(active)),
-            "as_of": data.get("as_of") or today,
-            "raw": raw if not data else None,
-        }
+        """現在のアラートルールをすべてローカルで評価する。
+
+        価格・PER・決算日はキャッシュ（stock_ohlcv / fundamentals_snapshot）から作り、足りない分だけ
+        取り直す。hits は現在条件を満たしている全件、fired はそのうち前回評価から新たに満たしたもの
+        （アラートログには fired だけを追記する）。"""
+        from services.alert_engine import alert_engine
+
+        if not await self._prepare_alert_engine():
+            return {"ok": True, "hits": [], "fired": [], "checked": 0}
+        await alert_engine.refresh_prices()
+        result = await alert_engine.evaluate()
+        await self._log_alert_events(result["fired"])
+        return {"ok": True, **result}
 
     # ==========================================================
     # 同業他社比較
     # ==========================================================
 
-    async def run_peer_comparison(self, ticker: str) -> dict:
+    async def run_peer_comparison(self, ticker: str, refresh: bool = False) -> dict:
+        """同業他社比較。同じ営業日に作成済みならキャッシュを返す（refresh=True で取り直し）。"""
         if not self.gemini_client:
             return {"ok": False, "error": "Geminiクライアント未設定"}
+        from services.research_cache import research_cache, version_of
+
         market, code = _resolve_market(ticker)
+        return await research_cache.get_or_run(
+            "peer", code, version_of(PROMPT_PEER_COMPARISON),
+            lambda: self._fetch_peer_comparison(code, market), refresh=refresh,
+        )
+
+    async def _fetch_peer_comparison(self, code: str, market: str) -> dict:
         prompt = PROMPT_PEER_COMPARISON.format(ticker=code, market=market)
         result = await self._gemini_with_search(prompt, feature_key="investment_peer")
         if not result:
@@ -2593,15 +2764,14 @@ class InvestmentCog(commands.Cog):
     # ニュースセンチメント
     # ==========================================================
 
-    async def run_news_sentiment(self, ticker: str) -> dict:
-        if not self.gemini_client:
-            return {"ok": False, "error": "Geminiクライアント未設定"}
-        market, code = _resolve_market(ticker)
+    async def _fetch_news_sentiment(self, code: str) -> tuple[str, str]:
+        """Gemini（検索つき）で前日のニュースレポートを作り、Drive に保存する。(本文, ファイル名)"""
+        market, code = _resolve_market(code)
         yesterday = (datetime.datetime.now(JST) - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
         prompt = PROMPT_NEWS_SENTIMENT.format(ticker=code, market=market, yesterday=yesterday)
         result = await self._gemini_with_search(prompt, feature_key="investment_news")
         if not result:
-            return {"ok": False, "error": "ニュース取得に失敗"}
+            return "", ""
         date_str = datetime.datetime.now(JST).strftime("%Y-%m-%d")
         filename = f"{date_str}_{_safe_filename(code)}.md"
         body = (
@@ -2609,12 +2779,31 @@ class InvestmentCog(commands.Cog):
             f"tags: [investment, news_sentiment]\n---\n\n{result}"
         )
         await self._save_dated_note(NEWS_SENTIMENT_FOLDER, filename, body)
+        return result, filename
+
+    async def run_news_sentiment(self, ticker: str, refresh: bool = False) -> dict:
+        """銘柄の前日ニュースレポート。同じ営業日に取得済みならキャッシュを返す（refresh=True で取り直し）。"""
+        if not self.gemini_client:
+            return {"ok": False, "error": "Geminiクライアント未設定"}
+        from services.news_pipeline import news_pipeline, prompt_version
+
+        market, code = _resolve_market(ticker)
+        entry = await news_pipeline.get_report(
+            code,
+            lambda: self._fetch_news_sentiment(code),
+            version=prompt_version(PROMPT_NEWS_SENTIMENT),
+            market=market,
+            refresh=refresh,
+        )
+        if not entry:
+            return {"ok": False, "error": "ニュース取得に失敗"}
         return {
             "ok": True,
             "ticker": code,
             "market": market,
-            "report": result,
-            "saved_as": filename,
+            "report": entry["report"],
+            "saved_as": entry["saved_as"],
+            "cached": entry["cached"],
         }
 
     # ==========================================================
@@ -2622,11 +2811,31 @@ class InvestmentCog(commands.Cog):
     # ==========================================================
 
     async def run_dividend_schedule(
-        self, ticker: str, register_calendar: bool = True
+        self, ticker: str, register_calendar: bool = True, refresh: bool = False
     ) -> dict:
+        """配当カレンダー。調査結果は営業日単位でキャッシュし、カレンダー登録はその日 1 回だけ行う。"""
         if not self.gemini_client:
             return {"ok": False, "error": "Geminiクライアント未設定"}
+        from services.research_cache import research_cache, version_of
+
         market, code = _resolve_market(ticker)
+        version = version_of(PROMPT_DIVIDEND_SCHEDULE)
+        result = await research_cache.get_or_run(
+            "dividend", code, version,
+            lambda: self._fetch_dividend_schedule(code, market), refresh=refresh,
+        )
+        if not result.get("ok"):
+            return result
+        registered = []
+        events = (result.get("data") or {}).get("events") or []
+        if register_calendar and self.calendar_service and events and not result.get("calendar_registered"):
+            registered = await self._register_dividend_events(code, market, result["data"])
+            await research_cache.remember(
+                "dividend", code, version, {**result, "calendar_registered": True}
+            )
+        return {**result, "registered": registered}
+
+    async def _fetch_dividend_schedule(self, code: str, market: str) -> dict:
         prompt = PROMPT_DIVIDEND_SCHEDULE.format(ticker=code, market=market)
         raw = await self._gemini_with_search(prompt, feature_key="investment_dividend")
         if not raw:
@@ -2667,38 +2876,6 @@ class InvestmentCog(commands.Cog):
                     f"({ev.get('fiscal_period', '?')})"
                 )
         body = "\n".join(lines)
-
-        registered = []
-        if register_calendar and self.calendar_service and events:
-            for ev in events:
-                ev_date = ev.get("date")
-                ev_type = ev.get("type")
-                if not (ev_date and ev_type):
-                    continue
-                type_label_map = {
-                    "ex_dividend": "配当落ち日",
-                    "record_date": "権利確定日",
-                    "payment_date": "配当支払日",
-                    "forecast": "配当予想",
-                }
-                summary = (
-                    f"💴 {company} {type_label_map.get(ev_type, ev_type)}"
-                )
-                desc = (
-                    f"配当: {ev.get('amount_per_share', '?')} {currency}/株\n"
-                    f"対象期: {ev.get('fiscal_period', '?')}\n"
-                    f"出典: {data.get('source', 'N/A')}"
-                )
-                try:
-                    r = await self.calendar_service.create_event(
-                        summary=summary,
-                        start_time=ev_date,
-                        end_time=ev_date,
-                        description=desc,
-                    )
-                    registered.append({"summary": summary, "date": ev_date, "result": r})
-                except Exception as e:
-                    registered.append({"error": str(e), "summary": summary})
         await self._save_dated_note(
             DIVIDENDS_FOLDER, f"{date_str}_{_safe_filename(code)}.md", body
         )
@@ -2708,9 +2885,44 @@ class InvestmentCog(commands.Cog):
             "market": market,
             "data": data,
             "report": body,
-            "registered": registered,
         }
 
+    async def _register_dividend_events(self, code: str, market: str, data: dict) -> list:
+        company = data.get("company_name") or code
+        events = data.get("events") or []
+        currency = data.get("currency") or ("JPY" if market == "JP" else "USD")
+        registered = []
+        for ev in events:
+            ev_date = ev.get("date")
+            ev_type = ev.get("type")
+            if not (ev_date and ev_type):
+                continue
+            type_label_map = {
+                "ex_dividend": "配当落ち日",
+                "record_date": "権利確定日",
+                "payment_date": "配当支払日",
+                "forecast": "配当予想",
+            }
+            summary = (
+                f"💴 {company} {type_label_map.get(ev_type, ev_type)}"
+            )
+            desc = (
+                f"配当: {ev.get('amount_per_share', '?')} {currency}/株\n"
+                f"対象期: {ev.get('fiscal_period', '?')}\n"
+                f"出典: {data.get('source', 'N/A')}"
+            )
+            try:
+                r = await self.calendar_service.create_event(
+                    summary=summary,
+                    start_time=ev_date,
+                    end_time=ev_date,
+                    description=desc,
+                )
+                registered.append({"summary": summary, "date": ev_date, "result": r})
+            except Exception as e:
+                registered.append({"error": str(e), "summary": summary})
+        return registered
+
     # ==========================================================
     # 投資憲法レビュー
     # ==========================================================
@@ -2741,11 +2953,13 @@ class InvestmentCog(commands.Cog):
         audits_str = "\n\n".join(audit_chunks)[:40000] or "(履歴なし)"
 
         # 投資日記の最近を抜粋
-        index = await self._read_json_file(
-            JOURNAL_FOLDER, JOURNAL_INDEX_FILE, default=[]
-        )
+        from api.database import inv_journal_list
+        from services.investment_store import investment_store
+
+        await investment_store.ready()
         recent_journal = [
-            it for it in index if (it.get("date", "") >= cutoff_str)
+            it for it in reversed(await inv_journal_list(limit=None))
+            if (it.get("date", "") >= cutoff_str)
         ]
         journal_summary_lines = []
         for it in recent_journal[-30:]:
@@ -2756,9 +2970,7 @@ class InvestmentCog(commands.Cog):
         journal_str = "\n".join(journal_summary_lines) or "(日記なし)"
 
         # 保有銘柄
-        holdings = await self._read_json_file(
-            PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-        )
+        holdings = await self._holdings()
         holdings_str = json.dumps(holdings, ensure_ascii=False, indent=2)
 
         prompt = PROMPT_CONSTITUTION_REVIEW.format(
@@ -2797,9 +3009,7 @@ class InvestmentCog(commands.Cog):
         if not pos_section:
             pos_section = "(投資憲法のポジション管理セクションが見つかりません)"
 
-        holdings = await self._read_json_file(
-            PORTFOLIO_FOLDER, HOLDINGS_FILE, default=[]
-        )
+        holdings = await self._holdings()
         if not holdings:
             return {"ok": False, "error": "保有銘柄がありません"}
 
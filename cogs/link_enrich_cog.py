@@ -0,0 +1,101 @@
+"""ストックリンクの一括補完ジョブ（AI タグ・サムネイル）を起動・再開する Cog。
+
+処理本体は services/link_enrichment_service.py。ここではジョブの受付（同時 1 件）と、
+再起動で中断されたジョブ（queued/running のまま残ったもの）の起動時再開を受け持つ。
+"""
+import asyncio
+import datetime
+import logging
+import secrets
+from typing import Optional
+
+from discord.ext import commands, tasks
+
+from config import JST
+
+
+class LinkEnrichCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._tasks: dict[str, asyncio.Task] = {}
+
+        self.resume_task.start()
+
+    def cog_unload(self):
+        self.resume_task.cancel()
+        for task in self._tasks.values():
+            task.cancel()
+
+    def _spawn(self, job_id: str) -> None:
+        from services.link_enrichment_service import run_job
+        from utils.async_utils import safe_create_task
+
+        if job_id in self._tasks and not self._tasks[job_id].done():
+            return
+        task = safe_create_task(
+            run_job(job_id, getattr(self.bot, "gemini_client", None)),
+            name=f"link_enrich_{job_id}",
+        )
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _t: self._tasks.pop(job_id, None))
+
+    async def start_job(self, kind: str = "all", link_ids: Optional[list[int]] = None,
+                        overwrite: bool = False, refresh: bool = False) -> dict:
+        """一括補完ジョブを登録してバックグラウンドで走らせ、job_id を返す。"""
+        from api.database import get_all_links, link_enrich_job_create, link_enrich_jobs_unfinished
+        from services.link_enrichment_service import JOB_KINDS, pending_for
+
+        if kind not in JOB_KINDS:
+            return {"ok": False, "error": f"kind は {', '.join(JOB_KINDS)} のいずれかです"}
+        active = await link_enrich_jobs_unfinished()
+        if active:
+            return {"ok": False, "error": "既に一括補完ジョブが実行中です。完了をお待ちください。",
+                    "job_id": active[0]["job_id"]}
+
+        pending = pending_for(kind, await get_all_links(), link_ids, overwrite=overwrite, refresh=refresh)
+        total = sum(len(v) for v in pending.values())
+        job_id = f"lnk_{datetime.datetime.now(JST).strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(3)}"
+        await link_enrich_job_create(job_id, kind, pending, {"overwrite": overwrite, "refresh": refresh})
+        self._spawn(job_id)
+        return {"ok": True, "job_id": job_id, "status": "queued", "total": total}
+
+    async def get_job_status(self, job_id: str) -> dict:
+        from api.database import link_enrich_job_get
+
+        job = await link_enrich_job_get(job_id)
+        if not job:
+            return {"ok": False, "error": "ジョブが見つかりません"}
+        return {
+            "ok": True,
+            "job_id": job_id,
+            "kind": job["kind"],
+            "status": job["status"],
+            "progress_current": job["progress_current"],
+            "progress_total": job["progress_total"],
+            "tagged": job["tagged"],
+            "thumbnails": job["thumbnails"],
+            "remaining": {k: len(v) for k, v in (job.get("pending") or {}).items()},
+            "error": job.get("error") or "",
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+
+    @tasks.loop(count=1)
+    async def resume_task(self):
+        from api.database import link_enrich_jobs_unfinished
+        try:
+            jobs = await link_enrich_jobs_unfinished()
+        except Exception as e:
+            logging.error(f"link enrich resume error: {e}", exc_info=True)
+            return
+        for job in jobs:
+            logging.info(f"中断されたリンク補完ジョブを再開します: {job['job_id']}")
+            self._spawn(job["job_id"])
+
+    @resume_task.before_loop
+    async def before_resume(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(LinkEnrichCog(bot))
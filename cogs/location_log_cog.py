@@ -2,7 +2,6 @@ import os
 import logging
 import tempfile
 from datetime import datetime, time, timedelta
-import asyncio
 import re
 
 import ijson
@@ -14,6 +13,8 @@ from googleapiclient.http import MediaIoBaseDownload
 from config import JST
 from utils.obsidian_utils import update_section
 from prompts import PROMPT_LOCATION_SYNC
+from utils.executors import GOOGLE_API, run_in
+from services.job_scheduler import scheduler
 
 DATE_REGEX = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
@@ -52,11 +53,11 @@ class LocationLogCog(commands.Cog):
         self._place_name_cache: dict[str, str] = {}
 
         self.process_timeline_json.start()
-        self.location_save_reminder_task.start()
+        scheduler.register("location_save_reminder", self.location_save_reminder_task)
 
     def cog_unload(self):
         self.process_timeline_json.cancel()
-        self.location_save_reminder_task.cancel()
+        scheduler.unregister("location_save_reminder")
 
     def _get_place_name_from_id(self, place_id: str) -> str:
         if not self.gmaps:
@@ -334,26 +335,25 @@ class LocationLogCog(commands.Cog):
     async def perform_manual_sync(self, target_date: str) -> str:
         if not DATE_REGEX.match(target_date):
             return "❌ 日付の形式が正しくありません。(例: 2026-02-15)"
-        loop = asyncio.get_running_loop()
         service = self.drive_service.get_service()
         if not service:
             return "Google Driveに接続できませんでした。"
 
-        timeline_folder_id = await loop.run_in_executor(
-            None, self._find_folder_in_root, service, "Timeline"
+        timeline_folder_id = await run_in(
+            GOOGLE_API, self._find_folder_in_root, service, "Timeline"
         )
         if not timeline_folder_id:
             return "Timelineフォルダが見つかりません。"
 
-        latest_file = await loop.run_in_executor(
-            None, self._get_latest_timeline_json, service, timeline_folder_id
+        latest_file = await run_in(
+            GOOGLE_API, self._get_latest_timeline_json, service, timeline_folder_id
         )
         if not latest_file:
             return "タイムラインのJSONファイルが見つかりません。"
 
         try:
-            logs_by_date = await loop.run_in_executor(
-                None, self._read_and_extract, service, latest_file["id"], {target_date}
+            logs_by_date = await run_in(
+                GOOGLE_API, self._read_and_extract, service, latest_file["id"], {target_date}
             )
         except Exception as e:
             return f"JSON読み込みエラー: {e}"
@@ -369,19 +369,18 @@ class LocationLogCog(commands.Cog):
     @tasks.loop(time=time(hour=23, minute=50, tzinfo=JST))
     async def process_timeline_json(self):
         logging.info("タイムラインJSONの自動処理を開始します。")
-        loop = asyncio.get_running_loop()
         service = self.drive_service.get_service()
         if not service:
             return
 
-        timeline_folder_id = await loop.run_in_executor(
-            None, self._find_folder_in_root, service, "Timeline"
+        timeline_folder_id = await run_in(
+            GOOGLE_API, self._find_folder_in_root, service, "Timeline"
         )
         if not timeline_folder_id:
             return
 
-        json_files = await loop.run_in_executor(
-            None, self._get_unprocessed_json, service, timeline_folder_id
+        json_files = await run_in(
+            GOOGLE_API, self._get_unprocessed_json, service, timeline_folder_id
         )
         if not json_files:
             return
@@ -408,8 +407,8 @@ class LocationLogCog(commands.Cog):
             # リネーム（処理済み化）だけ行う。空集合を渡すと全日処理になる点に注意。
             if pending_dates:
                 try:
-                    logs_by_date = await loop.run_in_executor(
-                        None, self._read_and_extract, service, file_id, pending_dates
+                    logs_by_date = await run_in(
+                        GOOGLE_API, self._read_and_extract, service, file_id, pending_dates
                     )
                 except Exception:
                     logs_by_date = None
@@ -427,8 +426,8 @@ class LocationLogCog(commands.Cog):
                                 await self._maybe_regenerate_summary(date_str)
 
             timestamp = datetime.now(JST).strftime("%Y%m%d_%H%M%S")
-            await loop.run_in_executor(
-                None,
+            await run_in(
+                GOOGLE_API,
                 self._rename_file,
                 service,
                 file_id,
@@ -517,18 +516,7 @@ class LocationLogCog(commands.Cog):
     # ==========================================================
     # 毎日 22:30 にロケーション保存をユーザーへリマインドする
     # ==========================================================
-    _last_save_reminder_date = None
-
-    @tasks.loop(minutes=1)
     async def location_save_reminder_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due(
-            "location_save_reminder", "22:30", "daily",
-            self._last_save_reminder_date,
-        )
-        if not due:
-            return
-        self._last_save_reminder_date = today
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -544,10 +532,6 @@ class LocationLogCog(commands.Cog):
         except Exception as e:
             logging.error(f"location save reminder send error: {e}")
 
-    @location_save_reminder_task.before_loop
-    async def before_save_reminder(self):
-        await self.bot.wait_until_ready()
-
 
 async def setup(bot):
     await bot.add_cog(LocationLogCog(bot))
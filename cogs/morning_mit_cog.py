@@ -1,12 +1,11 @@
-import asyncio
 import datetime
 import json
 import logging
-import random
 
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from config import JST
+from services.job_scheduler import scheduler
 
 # 朝のMITとして登録する質問テキスト（インライン回答欄のラベルに使われる）
 _MIT_QUESTION_TEXT = "今朝のMIT候補。回答欄で編集（1行に1つ）して回答すると今日のMITに確定するよ。"
@@ -18,36 +17,12 @@ class MorningMitCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._last_run_date = None
-        self.morning_mit_loop.start()
+        # 06:30〜10:00 の時間窓で未実行なら実行する（Bot が 06:30 に停止していて
+        # 少し後に起動しても取りこぼさない）。一斉スパムにならないよう 0〜90 秒のジッタ。
+        scheduler.register("morning_mit", self._run, jitter_sec=90, catch_up_sec=int(3.5 * 3600))
 
     def cog_unload(self):
-        self.morning_mit_loop.cancel()
-
-    @tasks.loop(minutes=1)
-    async def morning_mit_loop(self):
-        from services.schedule_resolver import is_enabled
-        now = datetime.datetime.now(JST)
-        today = now.date()
-        # 1日1回。既に実行済みならスキップ
-        if self._last_run_date == today:
-            return
-        # 06:30〜10:00 の時間窓で未実行なら実行する。
-        # 厳密に「06:30 ちょうど」ではなく窓で判定することで、
-        # Bot が 06:30 に停止していて少し後に起動しても取りこぼさない。
-        now_minutes = now.hour * 60 + now.minute
-        if not (6 * 60 + 30 <= now_minutes < 10 * 60):
-            return
-        if not await is_enabled("morning_mit"):
-            return
-        self._last_run_date = today
-        # 一斉スパムにならないよう 0〜90 秒のジッタ
-        await asyncio.sleep(random.randint(0, 90))
-        await self._run()
-
-    @morning_mit_loop.before_loop
-    async def before_loop(self):
-        await self.bot.wait_until_ready()
+        scheduler.unregister("morning_mit")
 
     async def _run(self):
         try:
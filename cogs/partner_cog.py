@@ -3,13 +3,26 @@ import logging
 import datetime
 import asyncio
 
-from discord.ext import commands
+from discord.ext import commands, tasks
 from google.genai import types
 
 from config import JST
 from utils.obsidian_utils import remove_section, replace_section, update_section
 from utils.async_utils import safe_create_task
-from prompts import get_system_prompt, PROMPT_INTERIM_SUMMARY, PROMPT_CONTEXTUAL_LOG
+from prompts import current_time_note, get_system_prompt, PROMPT_INTERIM_SUMMARY, PROMPT_CONTEXTUAL_LOG
+from services.context_assembler import context_assembler
+
+# チャットで先回りして揃えるコンテキスト（services/context_assembler.py）
+_CHAT_CONTEXT_SOURCES = ("user_manual", "schedule_today", "open_tasks", "mit_today")
+# 同時に実行してよいツール（読み取りのみ・ACTION タグを組み立てるだけのもの）。
+# それ以外（Drive のノートへの追記・新規作成など）は読んで書き戻すので、呼び出し順に 1 つずつ実行する
+_CONCURRENT_TOOLS = frozenset({
+    "check_schedule", "check_tasks", "get_mit_status", "search_memory", "list_habits",
+    "create_calendar_event", "add_task", "delete_task", "set_mit", "rollover_mit",
+    "propose_note", "complete_task", "delete_calendar_event", "delete_habit",
+    "log_journal_entry", "log_life_activity", "save_thought_reflection",
+    "propose_permanent_note", "record_habit",
+})
 
 
 class PartnerCog(commands.Cog):
@@ -23,21 +36,69 @@ class PartnerCog(commands.Cog):
         self.tasks_service = getattr(bot, "tasks_service", None)
         self.gemini_client = bot.gemini_client
 
-        self.user_manual_cache = ""
-        self.last_manual_fetch = None
         self.last_interaction = datetime.datetime.now(JST)
 
+        self._register_context_sources()
+        self.context_warm_task.start()
+
+    def cog_unload(self):
+        self.context_warm_task.cancel()
+
+    def _register_context_sources(self):
+        """チャットの文脈になるソースを取得コスト・有効期限つきで登録する。
+        予定・タスクはサービスの変更通知で捨て、MIT はノート保存時に捨てる。"""
+        context_assembler.add_source(
+            "user_manual", self._fetch_user_manual, ttl_sec=3600, cost=1.5, warm=True,
+        )
+        context_assembler.add_source(
+            "mit_today", self._fetch_mit_today, ttl_sec=300, cost=1.0, daily=True, warm=True,
+        )
+        if self.calendar_service:
+            context_assembler.add_source(
+                "schedule_today", lambda: self._fetch_schedule(0),
+                ttl_sec=600, cost=0.8, daily=True, warm=True,
+            )
+            context_assembler.add_source(
+                "schedule_tomorrow", lambda: self._fetch_schedule(1),
+                ttl_sec=600, cost=0.8, daily=True,
+            )
+            self.calendar_service.add_change_listener(self._on_calendar_change)
+        if self.tasks_service:
+            context_assembler.add_source(
+                "open_tasks", self._fetch_open_tasks, ttl_sec=600, cost=0.3, warm=True,
+            )
+            self.tasks_service.add_change_listener(lambda: context_assembler.invalidate("open_tasks"))
+
+    @staticmethod
+    def _on_calendar_change():
+        context_assembler.invalidate("schedule_today")
+        context_assembler.invalidate("schedule_tomorrow")
+
+    @tasks.loop(minutes=4)
+    async def context_warm_task(self):
+        try:
+            await context_assembler.warm()
+        except Exception as e:
+            logging.debug(f"context warm failed: {e}")
+
+    @context_warm_task.before_loop
+    async def before_context_warm(self):
+        await self.bot.wait_until_ready()
+
+    def prefetch_chat_context(self, text: str = "") -> None:
+        """モデルが生成している間に、ツールで聞かれそうな予定・タスク・MIT を裏で揃えておく。"""
+        names = list(_CHAT_CONTEXT_SOURCES)
+        if "明日" in (text or "") or "tomorrow" in (text or "").lower():
+            names.append("schedule_tomorrow")
+        context_assembler.prefetch(*names)
+
     async def _get_user_manual(self):
-        now = datetime.datetime.now()
-        if (
-            self.last_manual_fetch
-            and (now - self.last_manual_fetch).total_seconds() < 3600
-        ):
-            return self.user_manual_cache
+        return await context_assembler.get("user_manual", default="")
 
+    async def _fetch_user_manual(self) -> str:
         service = self.drive_service.get_service()
         if not service:
-            return ""
+            raise RuntimeError("Drive に接続できません")
         try:
             folder_id = await self.drive_service.find_file(
                 service, self.drive_folder_id, ".bot"
@@ -48,14 +109,30 @@ class PartnerCog(commands.Cog):
                 service, folder_id, "UserManual.md"
             )
             if file_id:
-                content = await self.drive_service.read_text_file(service, file_id)
-                self.user_manual_cache = content
-                self.last_manual_fetch = now
-                return content
+                return await self.drive_service.read_text_file(service, file_id)
         except Exception as e:
             logging.error(f"UserManual 読み込みエラー: {e}")
+            raise
         return ""
 
+    async def _fetch_mit_today(self) -> str:
+        if not self.drive_service.get_service():
+            raise RuntimeError("Drive に接続できません")
+        return await self._get_mit_section()
+
+    async def _fetch_schedule(self, days_ahead: int) -> str:
+        date_str = (datetime.datetime.now(JST) + datetime.timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+        text = await self.calendar_service.list_events_for_date(date_str)
+        if text.startswith("エラー"):
+            raise RuntimeError(text)
+        return text
+
+    async def _fetch_open_tasks(self) -> str:
+        text = await self.tasks_service.get_uncompleted_tasks()
+        if text.startswith(("Tasks APIに接続できません", "タスクの取得に失敗")):
+            raise RuntimeError(text)
+        return text
+
     async def _get_todays_obsidian_note(self) -> str:
         """今日のデイリーノートの内容を取得する。"""
         service = self.drive_service.get_service()
@@ -93,11 +170,8 @@ class PartnerCog(commands.Cog):
         """1年前と3ヶ月前のデイリーノートから Daily Journal セクションを抜粋して返す。"""
         if not self.drive_service:
             return ""
-        service = self.drive_service.get_service()
-        if not service:
-            return ""
 
-        import re as _re
+        from services.note_index import get_sections, sync_daily_notes
         now = datetime.datetime.now(JST)
         # 1年前 / 3ヶ月前（≒90日前）
         targets = [
@@ -106,28 +180,15 @@ class PartnerCog(commands.Cog):
         ]
 
         try:
-            folder_id = await self.drive_service.find_file(
-                service, self.drive_folder_id, "DailyNotes"
-            )
-            if not folder_id:
-                return ""
+            await sync_daily_notes(self.drive_service)
         except Exception as e:
-            logging.error(f"DailyNotes folder lookup error: {e}")
-            return ""
+            logging.debug(f"past journal: note index sync failed: {e}")
 
         excerpts = []
         for label, date_str in targets:
             try:
-                fid = await self.drive_service.find_file(service, folder_id, f"{date_str}.md")
-                if not fid:
-                    continue
-                content = await self.drive_service.read_text_file(service, fid)
-                if not content:
-                    continue
-                m = _re.search(r"## 📔 Daily Journal\n(.*?)(?=\n## |\Z)", content, _re.DOTALL)
-                if not m:
-                    continue
-                journal = m.group(1).strip()
+                sections = (await get_sections(date_str, date_str, ["## 📔 Daily Journal"])).get(date_str, [])
+                journal = sections[0][1].strip() if sections else ""
                 if not journal:
                     continue
                 # 通知カードは展開可能なので長文を保持できる。長すぎる場合のみ
@@ -184,6 +245,7 @@ class PartnerCog(commands.Cog):
                 await self.drive_service.upload_text(
                     service, folder_id, today_file, content
                 )
+            context_assembler.invalidate("mit_today")
         except Exception as e:
             logging.error(f"DailyNote 保存エラー: {e}")
 
@@ -779,6 +841,8 @@ class PartnerCog(commands.Cog):
             await self.drive_service.update_text(service, f_id, new_content)
         else:
             await self.drive_service.upload_text(service, folder_id, f"{date_str}.md", new_content)
+        if date_str == datetime.datetime.now(JST).strftime("%Y-%m-%d"):
+            context_assembler.invalidate("mit_today")
         return f"{date_str} のMITを設定したよ！: {' / '.join(items)}"
 
     async def _clear_mit_in_obsidian(self, index: int | None = None) -> dict:
@@ -1068,7 +1132,7 @@ class PartnerCog(commands.Cog):
                 cat = "other"
             return f"[ACTION:note_create:title={t}|category={cat}] (この内容、ノートに保存しておく？モーダルで内容を確認・編集できるよ)"
         elif name == "get_mit_status":
-            section = await self._get_mit_section()
+            section = await context_assembler.get("mit_today", default="")
             return section if section else "今日はまだMITが設定されてないみたい。"
         elif name == "complete_task":
             return "タスクの完了はアプリの予定タブから直接チェックできるよ！"
@@ -1147,19 +1211,22 @@ class PartnerCog(commands.Cog):
             elif name == "search_memory":
                 return await self._search_drive_notes(args["keywords"])
             elif name == "check_schedule":
-                return (
-                    await self.calendar_service.list_events_for_date(args["date"])
-                    if self.calendar_service
-                    else "カレンダー非接続"
-                )
+                if not self.calendar_service:
+                    return "カレンダー非接続"
+                # 今日・明日の予定は先回りで取得済みのものを返す
+                now = datetime.datetime.now(JST)
+                source = {
+                    now.strftime("%Y-%m-%d"): "schedule_today",
+                    (now + datetime.timedelta(days=1)).strftime("%Y-%m-%d"): "schedule_tomorrow",
+                }.get(str(args["date"]))
+                cached = await context_assembler.get(source) if source else None
+                return cached or await self.calendar_service.list_events_for_date(args["date"])
             elif name == "check_tasks":
-                return (
-                    await self.tasks_service.get_uncompleted_tasks(
-                        args.get("list_name")
-                    )
-                    if self.tasks_service
-                    else "Tasks非接続"
-                )
+                if not self.tasks_service:
+                    return "Tasks非接続"
+                list_name = args.get("list_name")
+                cached = None if list_name else await context_assembler.get("open_tasks")
+                return cached or await self.tasks_service.get_uncompleted_tasks(list_name)
             elif name == "list_habits":
                 habit_cog = self.bot.get_cog("HabitCog")
                 return await habit_cog.list_habits() if habit_cog else "HabitCog不在"
@@ -1249,144 +1316,259 @@ class PartnerCog(commands.Cog):
             return True
         return False
 
-    async def generate_response_for_app(
-        self, text: str, history_messages: list,
-        english_mode: bool = False, search_mode: bool = False,
-    ):
-        """PWAアプリから呼び出されるAI応答生成。
+    async def _prepare_app_turn(
+        self, text: str, history_messages: list, english_mode: bool, search_mode: bool,
+    ) -> tuple:
+        """アプリ会話 1 往復ぶんの (モデル, contents, 1 回目の config, 2 回目の config を作る関数) を組み立てる。
         search_mode=True または発話が検索クエリ風なら Google Search grounding を有効化。"""
         self.last_interaction = datetime.datetime.now(JST)
         # 明示指定 or 自動判定で検索 grounding を有効化
         enable_search = bool(search_mode) or self._looks_like_search_query(text)
 
+        # システムプロンプトは時刻を含めない固定文面にしてコンテキストキャッシュに載せ、
+        # 現在時刻は最新のユーザーメッセージ側に付ける
         now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
-        system_prompt = get_system_prompt(
-            self.user_name, now_str, await self._get_user_manual()
+        self.prefetch_chat_context(text)
+        from services.gemini_model_resolver import resolve_gemini_model
+        user_manual, _m = await asyncio.gather(
+            self._get_user_manual(), resolve_gemini_model("partner_chat", default_pro=True),
         )
+        system_prompt = get_system_prompt(self.user_name, None, user_manual)
+        cache_label = "partner_chat"
         if english_mode:
             from prompts import PROMPT_ENGLISH_CONVERSATION
             system_prompt = system_prompt + "\n\n" + PROMPT_ENGLISH_CONVERSATION
+            cache_label = "partner_chat_en"
 
         contents = history_messages.copy()
         contents.append(
             types.Content(
-                role="user", parts=[types.Part.from_text(text=text)]
+                role="user",
+                parts=[
+                    types.Part.from_text(text=current_time_note(now_str)),
+                    types.Part.from_text(text=text),
+                ],
             )
         )
 
+        # 検索＋関数呼び出し併用時は include_server_side_tool_invocations が必要
+        # （Gemini API の制約）。SDK バージョン差を吸収するため try/except で構築。
+        cfg_kwargs = {
+            "tools": self._get_function_tools(enable_search=enable_search),
+        }
+        if enable_search:
+            try:
+                cfg_kwargs["tool_config"] = types.ToolConfig(
+                    include_server_side_tool_invocations=True,
+                )
+            except TypeError:
+                # SDK が当該フィールドを未サポート → 検索と関数呼び出しは併用不可。
+                # 検索 grounding を諦め、関数ツール（ask_log_question / カレンダー登録など）を優先する。
+                # 検索のみにすると ask_log_question 等が呼べず、モデルがツール呼び出しを
+                # 本文テキストとして漏らす不具合（謎の生文字列・ボタン）につながるため。
+                cfg_kwargs["tools"] = self._get_function_tools(enable_search=False)
+                cfg_kwargs.pop("tool_config", None)
+                logging.info("SDK が include_server_side_tool_invocations 未対応のため、関数ツール優先で実行（検索は無効）")
+
+        from services.prompt_cache import prompt_cache
+        config = await prompt_cache.config(
+            self.gemini_client, _m,
+            f"{cache_label}:{'search' if 'tool_config' in cfg_kwargs else 'tools'}",
+            system_prompt, **cfg_kwargs,
+        )
+        # 二回目の生成では [ACTION:...] マーカーを文面に保つよう明示指示する。
+        # これがないと Gemini が「登録したよ！」のように言うだけで
+        # 確認ボタン用マーカーを省略してしまい、実際の登録が行われない事故が起こる。
+        second_instruction = system_prompt + (
+            "\n\n【重要】ツールの戻り値に `[ACTION:...]` マーカーが含まれている場合、"
+            "**必ずそのマーカーを返信文の末尾にそのままコピーして残してください**。"
+            "このマーカーはユーザーの画面に確認ボタンを表示するために使われます。"
+            "勝手に『登録したよ』『追加したよ』のように完了形で答えてはいけません。"
+            "実際の登録/追加はユーザーがボタンを押して初めて行われます。"
+        )
+
+        async def followup_config():
+            return await prompt_cache.config(
+                self.gemini_client, _m, f"{cache_label}:followup", second_instruction
+            )
+
+        return _m, contents, config, followup_config
+
+    async def _run_app_tools(self, function_calls: list) -> tuple:
+        """関数呼び出しを実行し、(function_response の Content, 結果テキストのリスト) を返す。"""
+        # 読み取りだけのツールは同時に実行し、書き込むツールは呼び出し順に 1 つずつ実行する
+        # （同じターンで同じノートに 2 回追記すると、片方が消えたりフォルダが重複したりするため）。
+        # 結果の順序は呼び出し順のまま
+        results: list = [None] * len(function_calls)
+
+        async def run_one(i: int) -> None:
+            results[i] = await self._dispatch_tool_call(function_calls[i])
+
+        async def run_writes() -> None:
+            for i, fc in enumerate(function_calls):
+                if fc.name not in _CONCURRENT_TOOLS:
+                    await run_one(i)
+
+        await asyncio.gather(
+            run_writes(),
+            *(run_one(i) for i, fc in enumerate(function_calls) if fc.name in _CONCURRENT_TOOLS),
+        )
+        tool_result_texts = [str(res) for res in results]
+        f_responses = [
+            types.Part.from_function_response(name=fc.name, response={"result": res})
+            for fc, res in zip(function_calls, tool_result_texts)
+        ]
+        return types.Content(role="user", parts=f_responses), tool_result_texts
+
+    def _finish_app_reply(
+        self, text: str, reply_text: str, tool_result_texts: list, gmeta=None,
+    ) -> str:
+        """ACTION マーカーの補完・検索の参考リンク付与・文脈ログ保存をして最終返信を返す。"""
+        if tool_result_texts:
+            # 安全網: ツール結果に [ACTION:...] が含まれているのに、
+            # 最終返信から欠落していたら自動で末尾に補完する。
+            import re as _re
+            # ACTION（確認ボタン）と QUESTIONS（回答欄）の両マーカーを取りこぼさない
+            action_pat = _re.compile(r"\[(?:ACTION|QUESTIONS):[^\]]+\]")
+            missing_actions = []
+            for tr in tool_result_texts:
+                for m in action_pat.findall(tr or ""):
+                    if m not in reply_text:
+                        missing_actions.append(m)
+            if missing_actions:
+                reply_text = reply_text.rstrip() + "\n\n" + "\n".join(missing_actions)
+                logging.info(f"[partner] 欠落していた ACTION マーカーを {len(missing_actions)} 件補完")
+
+        # Google Search grounding が走った場合、citation を簡易付与
         try:
-            from services.gemini_model_resolver import resolve_gemini_model
-            _m = await resolve_gemini_model("partner_chat", default_pro=True)
+            if gmeta:
+                chunks = getattr(gmeta, "grounding_chunks", None) or []
+                sources = []
+                for ch in chunks[:5]:
+                    web = getattr(ch, "web", None)
+                    if web and getattr(web, "uri", None):
+                        title = getattr(web, "title", None) or web.uri
+                        sources.append(f"- [{title}]({web.uri})")
+                if sources:
+                    reply_text = reply_text + "\n\n🔎 参考:\n" + "\n".join(sources)
+        except Exception as _se:
+            logging.debug(f"grounding citation extract failed: {_se}")
+
+        safe_create_task(
+            self._save_contextual_user_log(text, reply_text),
+            name="partner-contextual-log",
+        )
+        return reply_text
 
-            # 検索＋関数呼び出し併用時は include_server_side_tool_invocations が必要
-            # （Gemini API の制約）。SDK バージョン差を吸収するため try/except で構築。
-            cfg_kwargs = {
-                "system_instruction": system_prompt,
-                "tools": self._get_function_tools(enable_search=enable_search),
-            }
-            if enable_search:
-                try:
-                    cfg_kwargs["tool_config"] = types.ToolConfig(
-                        include_server_side_tool_invocations=True,
-                    )
-                except TypeError:
-                    # SDK が当該フィールドを未サポート → 検索と関数呼び出しは併用不可。
-                    # 検索 grounding を諦め、関数ツール（ask_log_question / カレンダー登録など）を優先する。
-                    # 検索のみにすると ask_log_question 等が呼べず、モデルがツール呼び出しを
-                    # 本文テキストとして漏らす不具合（謎の生文字列・ボタン）につながるため。
-                    cfg_kwargs["tools"] = self._get_function_tools(enable_search=False)
-                    cfg_kwargs.pop("tool_config", None)
-                    logging.info("SDK が include_server_side_tool_invocations 未対応のため、関数ツール優先で実行（検索は無効）")
+    @staticmethod
+    def _tool_fallback(tool_result_texts: list) -> str:
+        fallback = " / ".join(r for r in tool_result_texts if r and r != "None")
+        return fallback if fallback else "処理したよ！"
 
+    async def generate_response_for_app(
+        self, text: str, history_messages: list,
+        english_mode: bool = False, search_mode: bool = False,
+    ):
+        """PWAアプリから呼び出されるAI応答生成。"""
+        try:
+            _m, contents, config, followup_config = await self._prepare_app_turn(
+                text, history_messages, english_mode, search_mode,
+            )
             response = await self.gemini_client.aio.models.generate_content(
-                model=_m,
-                contents=contents,
-                config=types.GenerateContentConfig(**cfg_kwargs),
+                model=_m, contents=contents, config=config,
             )
 
+            tool_result_texts: list[str] = []
             if response.function_calls:
                 contents.append(response.candidates[0].content)
-                f_responses = []
-                tool_result_texts: list[str] = []
-                for fc in response.function_calls:
-                    res = await self._dispatch_tool_call(fc)
-                    tool_result_texts.append(str(res))
-                    f_responses.append(
-                        types.Part.from_function_response(
-                            name=fc.name, response={"result": str(res)}
-                        )
-                    )
-
-                contents.append(types.Content(role="user", parts=f_responses))
-                # 二回目の生成では [ACTION:...] マーカーを文面に保つよう明示指示する。
-                # これがないと Gemini が「登録したよ！」のように言うだけで
-                # 確認ボタン用マーカーを省略してしまい、実際の登録が行われない事故が起こる。
-                second_instruction = system_prompt + (
-                    "\n\n【重要】ツールの戻り値に `[ACTION:...]` マーカーが含まれている場合、"
-                    "**必ずそのマーカーを返信文の末尾にそのままコピーして残してください**。"
-                    "このマーカーはユーザーの画面に確認ボタンを表示するために使われます。"
-                    "勝手に『登録したよ』『追加したよ』のように完了形で答えてはいけません。"
-                    "実際の登録/追加はユーザーがボタンを押して初めて行われます。"
-                )
+                f_content, tool_result_texts = await self._run_app_tools(response.function_calls)
+                contents.append(f_content)
                 final_res = await self.gemini_client.aio.models.generate_content(
-                    model=_m,
-                    contents=contents,
-                    config=types.GenerateContentConfig(system_instruction=second_instruction),
+                    model=_m, contents=contents, config=await followup_config(),
                 )
                 if final_res.text and final_res.text.strip():
                     reply_text = final_res.text.strip()
                 else:
-                    fallback = " / ".join(r for r in tool_result_texts if r and r != "None")
-                    reply_text = fallback if fallback else "処理したよ！"
-
-                # 安全網: ツール結果に [ACTION:...] が含まれているのに、
-                # 最終返信から欠落していたら自動で末尾に補完する。
-                import re as _re
-                # ACTION（確認ボタン）と QUESTIONS（回答欄）の両マーカーを取りこぼさない
-                action_pat = _re.compile(r"\[(?:ACTION|QUESTIONS):[^\]]+\]")
-                missing_actions = []
-                for tr in tool_result_texts:
-                    for m in action_pat.findall(tr or ""):
-                        if m not in reply_text:
-                            missing_actions.append(m)
-                if missing_actions:
-                    reply_text = reply_text.rstrip() + "\n\n" + "\n".join(missing_actions)
-                    logging.info(f"[partner] 欠落していた ACTION マーカーを {len(missing_actions)} 件補完")
+                    reply_text = self._tool_fallback(tool_result_texts)
             else:
                 reply_text = response.text.strip() if response.text else "了解！"
 
-            # Google Search grounding が走った場合、citation を簡易付与
-            try:
-                gmeta = getattr(response.candidates[0], "grounding_metadata", None) if response.candidates else None
-                if gmeta:
-                    chunks = getattr(gmeta, "grounding_chunks", None) or []
-                    sources = []
-                    for ch in chunks[:5]:
-                        web = getattr(ch, "web", None)
-                        if web and getattr(web, "uri", None):
-                            title = getattr(web, "title", None) or web.uri
-                            sources.append(f"- [{title}]({web.uri})")
-                    if sources:
-                        reply_text = reply_text + "\n\n🔎 参考:\n" + "\n".join(sources)
-            except Exception as _se:
-                logging.debug(f"grounding citation extract failed: {_se}")
-
-            safe_create_task(
-                self._save_contextual_user_log(text, reply_text),
-                name="partner-contextual-log",
-            )
-            return reply_text
+            gmeta = getattr(response.candidates[0], "grounding_metadata", None) if response.candidates else None
+            return self._finish_app_reply(text, reply_text, tool_result_texts, gmeta)
         except Exception as e:
             logging.error(f"App Resp Error: {e}")
             return "エラーが発生しちゃった、もう一回送ってくれる？"
 
+    async def _stream_round(self, model: str, contents: list, config, state: dict):
+        """generate_content_stream を 1 回読み、本文の差分を {"type": "delta"} で流す。
+        読み終えたら state に parts（応答の全パート）と grounding_metadata を入れる。"""
+        parts: list = []
+        stream = await self.gemini_client.aio.models.generate_content_stream(
+            model=model, contents=contents, config=config,
+        )
+        async for chunk in stream:
+            cand = chunk.candidates[0] if chunk.candidates else None
+            if cand is None:
+                continue
+            if getattr(cand, "grounding_metadata", None):
+                state["gmeta"] = cand.grounding_metadata
+            for part in (cand.content.parts if cand.content else None) or []:
+                parts.append(part)
+                if part.text and not part.thought and not part.function_call:
+                    yield {"type": "delta", "text": part.text}
+        state["parts"] = parts
+
+    async def stream_response_for_app(
+        self, text: str, history_messages: list,
+        english_mode: bool = False, search_mode: bool = False,
+    ):
+        """generate_response_for_app のストリーム版（/api/chat_stream 用）。
+        {"type": "delta", "text"}・{"type": "tool", "name", "status": "start" | "done"} を順に流し、
+        最後に {"type": "final", "text": 返信全文} を必ず 1 回流す（ACTION マーカー補完・参考リンク込み）。"""
+        try:
+            _m, contents, config, followup_config = await self._prepare_app_turn(
+                text, history_messages, english_mode, search_mode,
+            )
+            first: dict = {}
+            streamed: list[str] = []
+            async for event in self._stream_round(_m, contents, config, first):
+                streamed.append(event["text"])
+                yield event
+
+            tool_result_texts: list[str] = []
+            calls = [p.function_call for p in first.get("parts", []) if p.function_call]
+            if calls:
+                # 思考の署名などを保ったまま、流れてきたパートをそのまま履歴に戻す
+                contents.append(types.Content(role="model", parts=first["parts"]))
+                for fc in calls:
+                    yield {"type": "tool", "name": fc.name, "status": "start"}
+                f_content, tool_result_texts = await self._run_app_tools(calls)
+                for fc in calls:
+                    yield {"type": "tool", "name": fc.name, "status": "done"}
+                contents.append(f_content)
+                streamed = []
+                async for event in self._stream_round(_m, contents, await followup_config(), {}):
+                    streamed.append(event["text"])
+                    yield event
+                reply_text = "".join(streamed).strip() or self._tool_fallback(tool_result_texts)
+            else:
+                reply_text = "".join(streamed).strip() or "了解！"
+
+            yield {
+                "type": "final",
+                "text": self._finish_app_reply(text, reply_text, tool_result_texts, first.get("gmeta")),
+            }
+        except Exception as e:
+            logging.error(f"App Stream Error: {e}")
+            yield {"type": "final", "text": "エラーが発生しちゃった、もう一回送ってくれる？"}
+
     async def generate_and_send_routine_message(
         self, context_text: str, routine_prompt: str
     ):
         """定期メッセージをAIで生成してDBへ保存する（アプリに表示）。"""
         now_str = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M")
         system_prompt = get_system_prompt(
-            self.user_name, now_str, await self._get_user_manual()
+            self.user_name, None, await self._get_user_manual()
         )
 
         # context_text が空のときは「【状況】」見出しを付けない
@@ -1395,14 +1577,23 @@ class PartnerCog(commands.Cog):
             prompt = f"{routine_prompt}\n\n【状況】\n{context_text}"
         else:
             prompt = routine_prompt
+        prompt = f"{current_time_note(now_str)}\n{prompt}"
         try:
+            from services.gemini_gateway import gemini_cache
             from services.gemini_model_resolver import resolve_gemini_model
+            from services.prompt_cache import prompt_cache
             _m = await resolve_gemini_model("routines", default_pro=False)
-            response = await self.gemini_client.aio.models.generate_content(
-                model=_m,
-                contents=prompt,
-                config=types.GenerateContentConfig(system_instruction=system_prompt),
-            )
+            config = await prompt_cache.config(self.gemini_client, _m, "partner_persona", system_prompt)
+            with gemini_cache("routine_message") as cache:
+                response = await self.gemini_client.aio.models.generate_content(
+                    model=_m,
+                    contents=prompt,
+                    config=config,
+                )
+            if cache.reused:
+                # 同じ状況での二重トリガー。生成済みのメッセージをもう一度送らない
+                logging.info("Routine message: 同じ内容の定期メッセージを直前に生成済みのため送信をスキップ")
+                return
             if response.text:
                 reply_text = response.text.strip()
                 from api.notification_service import save_message_and_notify as _save_msg
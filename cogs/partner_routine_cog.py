@@ -1,8 +1,6 @@
 import os
-import asyncio
 import logging
 import datetime
-import random
 import re
 from datetime import timedelta
 
@@ -10,6 +8,7 @@ from discord.ext import commands, tasks
 
 from config import JST
 from utils.async_utils import safe_create_task
+from services.job_scheduler import scheduler
 from prompts import (
     PROMPT_ROUTINE_NIGHTLY,
     PROMPT_WEEKEND_STOCK_REVIEW,
@@ -25,53 +24,34 @@ class PartnerRoutineCog(commands.Cog):
         self.tasks_service = getattr(bot, "tasks_service", None)
         self.calendar_service = getattr(bot, "calendar_service", None)
         self.info_service = getattr(bot, "info_service", InfoService())
-        # スケジュール対象タスクの最終実行日（同日重複防止用）
-        self._last_run_dates: dict[str, "datetime.date"] = {}
         # DB バックアップの重複アップロード抑止用（前回バックアップ時の DB mtime）
         self._last_db_backup_mtime: float = 0.0
 
-        for task in [
-            self.nightly_reflection_task,
-            self.weekend_stock_review_task,
-            self.habit_check_task,
-            self.morning_routine_task,
-            self.update_manual_task,
-            self.tomorrow_plan_task,
-            self.obsidian_review_task,
-            self.db_backup_task,
-            self.gratitude_check_task,
-            self.learning_check_task,
-            self.english_quiz_task,
-        ]:
-            task.start()
+        # 定時ジョブは中央スケジューラに登録する（時刻・曜日は SCHEDULE_CATALOG）
+        self._scheduled_jobs = {
+            "update_manual": (self.update_manual_task, {"jitter_sec": 600}),
+            "morning_routine": (self.morning_routine_task, {"jitter_sec": 900}),
+            "weekend_stocks": (self.weekend_stock_review_task, {}),
+            "habit_check": (self.habit_check_task, {"jitter_sec": 600}),
+            "obsidian_review": (self.obsidian_review_task, {"jitter_sec": 600}),
+            "gratitude_check": (self.gratitude_check_task, {"jitter_sec": 600}),
+            "learning_check": (self.learning_check_task, {"jitter_sec": 600}),
+            # 週3回（火=1・木=3・土=5）に限定して通知過多を避ける
+            "english_quiz": (self.english_quiz_task, {"jitter_sec": 600, "days": (1, 3, 5)}),
+        }
+        for key, (func, opts) in self._scheduled_jobs.items():
+            scheduler.register(key, func, **opts)
+        self.db_backup_task.start()
 
     def cog_unload(self):
-        for task in [
-            self.nightly_reflection_task,
-            self.weekend_stock_review_task,
-            self.habit_check_task,
-            self.morning_routine_task,
-            self.update_manual_task,
-            self.tomorrow_plan_task,
-            self.obsidian_review_task,
-            self.db_backup_task,
-            self.gratitude_check_task,
-            self.learning_check_task,
-            self.english_quiz_task,
-        ]:
-            task.cancel()
+        for key in self._scheduled_jobs:
+            scheduler.unregister(key)
+        self.db_backup_task.cancel()
 
     # ==========================================
     # 毎晩23:45に「取扱説明書」を自動更新
     # ==========================================
-    @tasks.loop(minutes=1)
     async def update_manual_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("update_manual", "23:45", "daily", self._last_run_dates.get("update_manual"))
-        if not due:
-            return
-        self._last_run_dates["update_manual"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -117,8 +97,8 @@ class PartnerRoutineCog(commands.Cog):
                     service, folder_id, "UserManual.md", new_manual
                 )
 
-            partner_cog.user_manual_cache = new_manual
-            partner_cog.last_manual_fetch = datetime.datetime.now()
+            from services.context_assembler import context_assembler
+            context_assembler.put("user_manual", new_manual)
             logging.info("【UserManual】取扱説明書の更新と保存が完了しました！")
         except Exception as e:
             logging.error(f"Manual Update Error: {e}")
@@ -126,14 +106,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # 朝のルーティン（7:00）
     # ==========================================
-    @tasks.loop(minutes=1)
     async def morning_routine_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("morning_routine", "07:00", "daily", self._last_run_dates.get("morning_routine"))
-        if not due:
-            return
-        self._last_run_dates["morning_routine"] = today
-        await asyncio.sleep(random.randint(0, 900))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -238,14 +211,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # 昼の振り返り（14:30）— 午後の調子を1タップで記録
     # ==========================================
-    @tasks.loop(minutes=1)
     async def afternoon_check_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("afternoon_check", "14:30", "daily", self._last_run_dates.get("afternoon_check"))
-        if not due:
-            return
-        self._last_run_dates["afternoon_check"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -257,14 +223,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # 良かったこと・感謝（20:45）— 今日のポジティブを1つ残す
     # ==========================================
-    @tasks.loop(minutes=1)
     async def gratitude_check_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("gratitude_check", "20:45", "daily", self._last_run_dates.get("gratitude_check"))
-        if not due:
-            return
-        self._last_run_dates["gratitude_check"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -276,14 +235,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # 今日の学び・気づき（21:15）— インプットや発見を1行残す
     # ==========================================
-    @tasks.loop(minutes=1)
     async def learning_check_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("learning_check", "21:15", "daily", self._last_run_dates.get("learning_check"))
-        if not due:
-            return
-        self._last_run_dates["learning_check"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -295,17 +247,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # 英語クイズ（火・木・土の19:30）— 週3回、選択肢チップで気軽に学習
     # ==========================================
-    @tasks.loop(minutes=1)
     async def english_quiz_task(self):
-        from services.schedule_resolver import is_due
-        # 週3回（火=1・木=3・土=5）に限定して通知過多を避ける
-        if datetime.datetime.now(JST).weekday() not in (1, 3, 5):
-            return
-        due, today = await is_due("english_quiz", "19:30", "daily", self._last_run_dates.get("english_quiz"))
-        if not due:
-            return
-        self._last_run_dates["english_quiz"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -342,18 +284,11 @@ class PartnerRoutineCog(commands.Cog):
     # 夜の振り返り（22:00）— DailySummaryCog に統合済みのため通常は早期 return
     # （明日の天気・予定・MIT 質問も DailySummaryCog のメッセージに含まれる）
     # ==========================================
-    @tasks.loop(minutes=1)
     async def nightly_reflection_task(self):
         # 統合により無効化。互換性のため関数自体は残す。
         return
         # 以下の旧コードは保守の参考用にコメントアウトしてもよいが、
         # 重複通知を防ぐためここで return している。
-        from services.schedule_resolver import is_due  # noqa: E402,F401  # type: ignore[unreachable]
-        due, today = await is_due("evening_review", "22:00", "daily", self._last_run_dates.get("evening_review"))
-        if not due:
-            return
-        self._last_run_dates["evening_review"] = today
-        await asyncio.sleep(random.randint(0, 900))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -437,13 +372,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # 週末の株レビュー（金曜20:00）
     # ==========================================
-    @tasks.loop(minutes=1)
     async def weekend_stock_review_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("weekend_stocks", "20:15", "friday", self._last_run_dates.get("weekend_stocks"))
-        if not due:
-            return
-        self._last_run_dates["weekend_stocks"] = today
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -454,14 +383,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # 習慣チェック（21:00）
     # ==========================================
-    @tasks.loop(minutes=1)
     async def habit_check_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("habit_check", "20:30", "daily", self._last_run_dates.get("habit_check"))
-        if not due:
-            return
-        self._last_run_dates["habit_check"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         habit_cog = self.bot.get_cog("HabitCog")
         if not partner_cog or not habit_cog:
@@ -489,15 +411,8 @@ class PartnerRoutineCog(commands.Cog):
     #   明日の天気・予定を個別カードで送るようになり、内容が重複するため停止。
     #   互換のため関数自体は残し、即 return する。
     # ==========================================
-    @tasks.loop(minutes=1)
     async def tomorrow_plan_task(self):
         return  # 無効化（DailySummaryCog のカードに統合済み）
-        from services.schedule_resolver import is_due  # noqa: E402,F401  # type: ignore[unreachable]
-        due, today = await is_due("tomorrow_preview", "21:00", "daily", self._last_run_dates.get("tomorrow_preview"))
-        if not due:
-            return
-        self._last_run_dates["tomorrow_preview"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -531,14 +446,7 @@ class PartnerRoutineCog(commands.Cog):
     # ==========================================
     # Obsidianデイリーノートの振り返り（20:00）
     # ==========================================
-    @tasks.loop(minutes=1)
     async def obsidian_review_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("obsidian_review", "20:00", "daily", self._last_run_dates.get("obsidian_review"))
-        if not due:
-            return
-        self._last_run_dates["obsidian_review"] = today
-        await asyncio.sleep(random.randint(0, 600))
         partner_cog = self.bot.get_cog("PartnerCog")
         if not partner_cog:
             return
@@ -551,18 +459,7 @@ class PartnerRoutineCog(commands.Cog):
             daily_note, PROMPT_ROUTINE_DAILY_REVIEW
         )
 
-    @update_manual_task.before_loop
-    @morning_routine_task.before_loop
-    @nightly_reflection_task.before_loop
-    @weekend_stock_review_task.before_loop
-    @habit_check_task.before_loop
-    @tomorrow_plan_task.before_loop
-    @obsidian_review_task.before_loop
     @db_backup_task.before_loop
-    @afternoon_check_task.before_loop
-    @gratitude_check_task.before_loop
-    @learning_check_task.before_loop
-    @english_quiz_task.before_loop
     async def before_tasks(self):
         await self.bot.wait_until_ready()
 
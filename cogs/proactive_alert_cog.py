@@ -1,9 +1,14 @@
 """プロアクティブ・リマインダー Cog。
 
-15分ごとに走り、以下3種類の先回り通知を判定する:
+以下4種類の先回り通知を、発火時刻ちょうどに送る:
   1. カレンダー予定の30分前ブリーフィング
   2. タスク締切の24h前 / 1h前
-  3. 移動を伴う予定の出発時刻アラート
+  3. 移動を伴う予定の出発時刻アラート（45分前）
+  4. 時刻指定の習慣トリガー
+
+発火予定は services/proactive_engine.py の ProactiveEngine が 1 本のタイマーヒープで持つ。
+カレンダー・タスクはローカルストア/ミラーの変更通知で、習慣は保存時の invalidate で
+組み直し、外部での変更は _REFRESH_* ごとの読み直しで拾う（内容が同じなら計画は据え置き）。
 
 通知済みフラグは DB の proactive_alerts_sent テーブルで重複防止。
 発火時は AI 生成メッセージを `save_message_and_notify` 経由で保存し、
@@ -24,6 +29,26 @@ from prompts import (
     PROMPT_HABIT_TRIGGER,
 )
 from api.database import mark_alert_sent, cleanup_alert_keys
+from services.proactive_engine import ProactiveEngine, Trigger
+
+_TASK_LISTS = ("仕事", "プライベート")
+# 外部（スマホ等）での変更を拾うための読み直し間隔
+_REFRESH_CALENDAR_SEC = 15 * 60
+_REFRESH_TASKS_SEC = 15 * 60
+_REFRESH_HABITS_SEC = 6 * 3600
+# カレンダーは先 36 時間ぶんの予定から発火予定を組む
+_CALENDAR_HORIZON = datetime.timedelta(hours=36)
+_BRIEFING_BEFORE = datetime.timedelta(minutes=30)
+_DEPARTURE_BEFORE = datetime.timedelta(minutes=45)
+# 旧ポーリングの窓の終わり。これより遅れて気づいた予定には「30分後」「出発の目安」を出さない
+_BRIEFING_LATEST = datetime.timedelta(minutes=25)
+_DEPARTURE_LATEST = datetime.timedelta(minutes=40)
+_HABIT_GRACE = datetime.timedelta(minutes=12)
+
+
+def _is_quiet_hour(now: datetime.datetime) -> bool:
+    """静かな時間帯（深夜・早朝）か。"""
+    return not (7 <= now.hour <= 22)
 
 
 class ProactiveAlertCog(commands.Cog):
@@ -33,15 +58,35 @@ class ProactiveAlertCog(commands.Cog):
         self.tasks_service = getattr(bot, "tasks_service", None)
         self.gemini_client = bot.gemini_client
 
-        self.proactive_check_task.start()
+        self.engine = ProactiveEngine(self._fire)
+        if self.calendar_service:
+            self.engine.add_source("calendar", self._load_calendar, self._plan_calendar, _REFRESH_CALENDAR_SEC)
+            self.calendar_service.add_change_listener(lambda: self.engine.invalidate("calendar"))
+        if self.tasks_service:
+            self.engine.add_source("tasks", self._load_tasks, self._plan_tasks, _REFRESH_TASKS_SEC)
+            self.tasks_service.add_change_listener(lambda: self.engine.invalidate("tasks"))
+        self.engine.add_source("habits", self._load_habits, self._plan_habits, _REFRESH_HABITS_SEC)
+
+        self.engine_start_task.start()
+        self.held_flush_task.start()
         self.cleanup_task.start()
 
     def cog_unload(self):
-        self.proactive_check_task.cancel()
+        self.engine_start_task.cancel()
+        self.held_flush_task.cancel()
         self.cleanup_task.cancel()
+        self.bot.loop.create_task(self.engine.stop())
+
+    def invalidate(self, source: str = None) -> None:
+        """ソースデータが変わったことをエンジンへ伝える（次の周回で読み直して組み直す）。"""
+        self.engine.invalidate(source)
+
+    @tasks.loop(count=1)
+    async def engine_start_task(self):
+        self.engine.start()
 
     @tasks.loop(minutes=15)
-    async def proactive_check_task(self):
+    async def held_flush_task(self):
         # 保留通知が長く溜まり続けるのを防ぐため、深夜帯でも flush を試みる。
         # 60分以上前の保留は会話に紛れさせると不自然なので proactive push へ送り出す。
         try:
@@ -49,98 +94,70 @@ class ProactiveAlertCog(commands.Cog):
             await notification_service.flush_stale_held_notifications()
         except Exception as e:
             logging.error(f"flush_stale_held_notifications error: {e}", exc_info=True)
-
-        partner_cog = self.bot.get_cog("PartnerCog")
-        if not partner_cog:
-            return
-
-        now = datetime.datetime.now(JST)
-        # 静かな時間帯（深夜）はスキップ
-        if not (7 <= now.hour <= 22):
-            return
-
-        try:
-            await self._check_calendar_briefing(partner_cog, now)
-        except Exception as e:
-            logging.error(f"proactive calendar briefing error: {e}", exc_info=True)
-
-        try:
-            await self._check_task_deadlines(partner_cog, now)
-        except Exception as e:
-            logging.error(f"proactive task deadline error: {e}", exc_info=True)
-
-        try:
-            await self._check_departure(partner_cog, now)
-        except Exception as e:
-            logging.error(f"proactive departure error: {e}", exc_info=True)
-
+        # 再起動などで再送タイマーが失われた Web Push の送信待ちを拾う
         try:
-            await self._check_habit_triggers(partner_cog, now)
+            from api import notification_service
+            await notification_service.drain_push_outbox()
         except Exception as e:
-            logging.error(f"proactive habit trigger error: {e}", exc_info=True)
+            logging.error(f"drain_push_outbox error: {e}", exc_info=True)
 
     @tasks.loop(hours=12)
     async def cleanup_task(self):
         await cleanup_alert_keys(older_than_hours=48)
 
-    async def _check_calendar_briefing(self, partner_cog, now: datetime.datetime):
-        """30分後に始まる予定があれば、関連メモを添えてブリーフィング。"""
-        if not self.calendar_service:
-            return
+    # ---- ソースの読み込み（ローカルストア/ミラー/DB） ----
 
-        # 30分先までの予定を取得（next 35 分まで余裕を持つ）
-        upcoming = await self.calendar_service.get_upcoming_events(minutes=35)
-        if not upcoming:
-            return
+    async def _load_calendar(self) -> list[dict]:
+        now = datetime.datetime.now(JST)
+        events = await self.calendar_service.get_events_between(now, now + _CALENDAR_HORIZON)
+        return [
+            {k: ev.get(k) for k in ("id", "summary", "location", "description", "start")}
+            for ev in events
+        ]
 
-        for event in upcoming:
-            event_id = event.get("id")
-            summary = event.get("summary", "(タイトルなし)")
-            start = event.get("start", {})
-            start_time = start.get("dateTime")
-            if not event_id or not start_time:
-                continue
+    async def _load_tasks(self) -> dict:
+        return {name: await self.tasks_service.get_raw_tasks(name) for name in _TASK_LISTS}
 
-            try:
-                start_dt = datetime.datetime.fromisoformat(start_time)
-            except Exception:
-                continue
-            minutes_until = (start_dt - now).total_seconds() / 60.0
-            # 25〜35分の窓に該当する予定だけ通知（15分間隔ループの取りこぼし防止）
-            if not (25 <= minutes_until <= 35):
-                continue
+    async def _load_habits(self) -> dict:
+        habit_cog = self.bot.get_cog("HabitCog")
+        if not habit_cog:
+            return {}
+        data = await habit_cog._load_data()
+        # 日付が変わったら計画し直す（今日・明日ぶんのトリガーを組む）
+        return {"date": datetime.datetime.now(JST).strftime("%Y-%m-%d"), "habits": data.get("habits", [])}
 
-            key = f"briefing:{event_id}:{start_time}"
-            if not await mark_alert_sent(key):
-                continue
+    # ---- 発火予定の組み立て ----
 
-            # 関連メモを検索
-            related_notes = ""
+    @staticmethod
+    def _plan_calendar(events: list[dict], now: datetime.datetime) -> list[Trigger]:
+        out = []
+        for event in events:
+            event_id = event.get("id")
+            start_time = (event.get("start") or {}).get("dateTime")
+            if not event_id or not start_time:
+                continue
             try:
-                related_notes = await partner_cog._search_drive_notes(summary)
+                start_dt = datetime.datetime.fromisoformat(start_time).astimezone(JST)
             except Exception:
-                related_notes = ""
-
-            ctx = (
-                f"【30分後の予定】{summary}\n"
-                f"開始: {start_dt.strftime('%H:%M')}\n"
-                f"場所: {event.get('location', '指定なし')}\n"
-                f"説明: {event.get('description', 'なし')[:200]}\n\n"
-                f"【関連する過去のメモ】\n{related_notes or '（特になし）'}"
-            )
-            await partner_cog.generate_and_send_routine_message(ctx, PROMPT_PROACTIVE_BRIEFING)
-
-    async def _check_task_deadlines(self, partner_cog, now: datetime.datetime):
-        """due が設定されたタスクの 24h前 / 1h前 アラート。"""
-        if not self.tasks_service:
-            return
-
-        for list_name in ("仕事", "プライベート"):
-            tasks_list = await self.tasks_service.get_raw_tasks(list_name)
-            if not tasks_list:
                 continue
+            out.append(Trigger(
+                key=f"briefing:{event_id}:{start_time}", kind="briefing",
+                fire_at=start_dt - _BRIEFING_BEFORE, expires_at=start_dt - _BRIEFING_LATEST,
+                payload={"event": event, "start": start_dt.isoformat()},
+            ))
+            if event.get("location"):
+                out.append(Trigger(
+                    key=f"departure:{event_id}:{start_time}", kind="departure",
+                    fire_at=start_dt - _DEPARTURE_BEFORE, expires_at=start_dt - _DEPARTURE_LATEST,
+                    payload={"event": event, "start": start_dt.isoformat()},
+                ))
+        return out
 
-            for t in tasks_list:
+    @staticmethod
+    def _plan_tasks(lists: dict, now: datetime.datetime) -> list[Trigger]:
+        out = []
+        for list_name, tasks_list in lists.items():
+            for t in tasks_list or []:
                 due = t.get("due", "")
                 if not due:
                     continue
@@ -148,66 +165,107 @@ class ProactiveAlertCog(commands.Cog):
                     due_dt = datetime.datetime.fromisoformat(due.replace("Z", "+00:00")).astimezone(JST)
                 except Exception:
                     continue
-
-                hours_until = (due_dt - now).total_seconds() / 3600.0
-                trigger = None
-                if 23.0 <= hours_until <= 24.5:
-                    trigger = "24h"
-                elif 0.75 <= hours_until <= 1.25:
-                    trigger = "1h"
-                if not trigger:
-                    continue
-
-                key = f"deadline:{t['id']}:{trigger}"
-                if not await mark_alert_sent(key):
-                    continue
-
-                ctx = (
-                    f"【締切が迫っているタスク】\n"
-                    f"タイトル: {t['title']}\n"
-                    f"リスト: {list_name}\n"
-                    f"締切: {due_dt.strftime('%Y-%m-%d %H:%M')}\n"
-                    f"残り: 約{trigger}前"
-                )
-                await partner_cog.generate_and_send_routine_message(ctx, PROMPT_TASK_DEADLINE_ALERT)
-
-    async def _check_departure(self, partner_cog, now: datetime.datetime):
-        """場所付き予定の出発時刻アラート。location があれば 45分前に発火。"""
-        if not self.calendar_service:
+                payload = {"title": t["title"], "list_name": list_name, "due": due_dt.isoformat()}
+                # 24h前は 23h前まで、1h前は 45分前までに送れなければ見送る（従来の判定窓と同じ）
+                for trigger, before, until in (("24h", 24, 23), ("1h", 1, 0.75)):
+                    out.append(Trigger(
+                        key=f"deadline:{t['id']}:{trigger}", kind="deadline",
+                        fire_at=due_dt - datetime.timedelta(hours=before),
+                        expires_at=due_dt - datetime.timedelta(hours=until),
+                        payload=dict(payload, trigger=trigger),
+                    ))
+        return out
+
+    def _plan_habits(self, data: dict, now: datetime.datetime) -> list[Trigger]:
+        out = []
+        for habit in data.get("habits", []):
+            trigger = (habit.get("trigger") or "").strip()
+            # 時刻ベーストリガーのみ発火（文脈トリガーは現時点ではスキップ）
+            parsed = self._parse_trigger_time(trigger) if trigger else None
+            if parsed is None:
+                continue
+            trig_h, trig_m = parsed
+            for day in (now.date(), now.date() + datetime.timedelta(days=1)):
+                fire_at = datetime.datetime(day.year, day.month, day.day, trig_h % 24, trig_m, tzinfo=JST)
+                day_str = day.strftime("%Y-%m-%d")
+                out.append(Trigger(
+                    key=f"habit_trigger:{habit['id']}:{day_str}:{trig_h:02d}{trig_m:02d}", kind="habit",
+                    fire_at=fire_at, expires_at=fire_at + _HABIT_GRACE,
+                    payload={"habit_id": habit["id"], "date": day_str},
+                ))
+        return out
+
+    # ---- 発火 ----
+
+    async def _fire(self, t: Trigger) -> None:
+        now = datetime.datetime.now(JST)
+        if _is_quiet_hour(now):
             return
-
-        upcoming = await self.calendar_service.get_upcoming_events(minutes=50)
-        if not upcoming:
+        partner_cog = self.bot.get_cog("PartnerCog")
+        if not partner_cog:
             return
+        handler = {
+            "briefing": self._send_briefing,
+            "departure": self._send_departure,
+            "deadline": self._send_deadline,
+            "habit": self._send_habit,
+        }.get(t.kind)
+        if handler:
+            await handler(partner_cog, t, now)
+
+    async def _send_briefing(self, partner_cog, t: Trigger, now: datetime.datetime):
+        """30分後に始まる予定を、関連メモを添えてブリーフィング。"""
+        if not await mark_alert_sent(t.key):
+            return
+        event = t.payload["event"]
+        summary = event.get("summary") or "(タイトルなし)"
+        start_dt = datetime.datetime.fromisoformat(t.payload["start"])
 
-        for event in upcoming:
-            event_id = event.get("id")
-            location = event.get("location", "")
-            start = event.get("start", {})
-            start_time = start.get("dateTime")
-            if not event_id or not start_time or not location:
-                continue
-            try:
-                start_dt = datetime.datetime.fromisoformat(start_time)
-            except Exception:
-                continue
-
-            minutes_until = (start_dt - now).total_seconds() / 60.0
-            if not (40 <= minutes_until <= 50):
-                continue
+        # 関連メモを検索
+        related_notes = ""
+        try:
+            related_notes = await partner_cog._search_drive_notes(summary)
+        except Exception:
+            related_notes = ""
 
-            key = f"departure:{event_id}:{start_time}"
-            if not await mark_alert_sent(key):
-                continue
+        ctx = (
+            f"【30分後の予定】{summary}\n"
+            f"開始: {start_dt.strftime('%H:%M')}\n"
+            f"場所: {event.get('location') or '指定なし'}\n"
+            f"説明: {(event.get('description') or 'なし')[:200]}\n\n"
+            f"【関連する過去のメモ】\n{related_notes or '（特になし）'}"
+        )
+        await partner_cog.generate_and_send_routine_message(ctx, PROMPT_PROACTIVE_BRIEFING)
 
-            ctx = (
-                f"【移動を伴う予定】\n"
-                f"予定: {event.get('summary', '(タイトルなし)')}\n"
-                f"開始: {start_dt.strftime('%H:%M')}\n"
-                f"場所: {location}\n"
-                f"出発の目安: そろそろ"
-            )
-            await partner_cog.generate_and_send_routine_message(ctx, PROMPT_DEPARTURE_ALERT)
+    async def _send_deadline(self, partner_cog, t: Trigger, now: datetime.datetime):
+        """due が設定されたタスクの 24h前 / 1h前 アラート。"""
+        if not await mark_alert_sent(t.key):
+            return
+        p = t.payload
+        due_dt = datetime.datetime.fromisoformat(p["due"])
+        ctx = (
+            f"【締切が迫っているタスク】\n"
+            f"タイトル: {p['title']}\n"
+            f"リスト: {p['list_name']}\n"
+            f"締切: {due_dt.strftime('%Y-%m-%d %H:%M')}\n"
+            f"残り: 約{p['trigger']}前"
+        )
+        await partner_cog.generate_and_send_routine_message(ctx, PROMPT_TASK_DEADLINE_ALERT)
+
+    async def _send_departure(self, partner_cog, t: Trigger, now: datetime.datetime):
+        """場所付き予定の出発時刻アラート（45分前）。"""
+        if not await mark_alert_sent(t.key):
+            return
+        event = t.payload["event"]
+        start_dt = datetime.datetime.fromisoformat(t.payload["start"])
+        ctx = (
+            f"【移動を伴う予定】\n"
+            f"予定: {event.get('summary') or '(タイトルなし)'}\n"
+            f"開始: {start_dt.strftime('%H:%M')}\n"
+            f"場所: {event.get('location')}\n"
+            f"出発の目安: そろそろ"
+        )
+        await partner_cog.generate_and_send_routine_message(ctx, PROMPT_DEPARTURE_ALERT)
 
     @staticmethod
     def _parse_trigger_time(trigger: str) -> tuple[int, int] | None:
@@ -232,70 +290,55 @@ class ProactiveAlertCog(commands.Cog):
             return (int(m.group(1)), int(m.group(2)))
         return None
 
-    async def _check_habit_triggers(self, partner_cog, now: datetime.datetime):
-        """習慣トリガーの時刻と一致する習慣がある場合、マネージャーから声をかける。"""
+    async def _send_habit(self, partner_cog, t: Trigger, now: datetime.datetime):
+        """習慣トリガーの時刻になった習慣が未完了なら、マネージャーから声をかける。"""
         habit_cog = self.bot.get_cog("HabitCog")
         if not habit_cog:
             return
 
+        # 発火時点の最新データで判定する（計画後に完了・削除されていれば送らない）
         data = await habit_cog._load_data()
-        today_str = now.strftime("%Y-%m-%d")
-        today_logs = data.get("logs", {}).get(today_str, [])
-
-        # トリガーは habit_data 側（永続化）を優先。Bot 再起動でも消えない。
-        for habit in data.get("habits", []):
-            h_id = habit["id"]
-            h_name = habit["name"]
-            freq = habit.get("frequency_days", 1)
-            trigger = (habit.get("trigger") or "").strip()
-            if not trigger:
-                continue
-
-            # 既に今日完了済みならスキップ
-            if h_id in today_logs:
-                continue
-
-            # 非毎日習慣: 前回完了から freq 日以上経過していなければスキップ
-            if freq > 1:
-                last_done = None
-                for i in range(1, 60):
-                    d = (now - datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-                    if h_id in data.get("logs", {}).get(d, []):
-                        last_done = now.date() - datetime.timedelta(days=i)
-                        break
-                if last_done is not None:
-                    days_since = (now.date() - last_done).days
-                    if days_since < freq:
-                        continue
-
-            # 時刻ベーストリガーのみ発火（文脈トリガーは現時点ではスキップ）
-            parsed = self._parse_trigger_time(trigger)
-            if parsed is None:
-                continue
+        habit = next((h for h in data.get("habits", []) if h["id"] == t.payload["habit_id"]), None)
+        if not habit:
+            return
+        h_id = habit["id"]
+        freq = habit.get("frequency_days", 1)
+        trigger = (habit.get("trigger") or "").strip()
+        today_str = t.payload["date"]
 
-            trig_h, trig_m = parsed
-            trig_minutes = trig_h * 60 + trig_m
-            now_minutes = now.hour * 60 + now.minute
-            # ±12分の窓に収まっているか確認（15分ループで確実に拾う）
-            if not (-12 <= now_minutes - trig_minutes <= 12):
-                continue
+        # 既に今日完了済みならスキップ
+        if h_id in data.get("logs", {}).get(today_str, []):
+            return
 
-            key = f"habit_trigger:{h_id}:{today_str}:{trig_h:02d}{trig_m:02d}"
-            if not await mark_alert_sent(key):
-                continue
+        # 非毎日習慣: 前回完了から freq 日以上経過していなければスキップ
+        if freq > 1:
+            last_done = None
+            for i in range(1, 60):
+                d = (now - datetime.timedelta(days=i)).strftime("%Y-%m-%d")
+                if h_id in data.get("logs", {}).get(d, []):
+                    last_done = now.date() - datetime.timedelta(days=i)
+                    break
+            if last_done is not None:
+                days_since = (now.date() - last_done).days
+                if days_since < freq:
+                    return
+
+        if not await mark_alert_sent(t.key):
+            return
 
-            streak_info = habit_cog._get_habit_stats(data, h_id, today_str)
-            freq_str = "毎日" if freq == 1 else (f"週1回" if freq == 7 else f"{freq}日に1回")
-            ctx = (
-                f"【習慣トリガー発火】\n"
-                f"習慣名: {h_name}\n"
-                f"設定トリガー: {trigger}\n"
-                f"頻度: {freq_str}\n"
-                f"記録: {streak_info}"
-            )
-            await partner_cog.generate_and_send_routine_message(ctx, PROMPT_HABIT_TRIGGER)
-
-    @proactive_check_task.before_loop
+        streak_info = habit_cog._get_habit_stats(data, h_id, today_str)
+        freq_str = "毎日" if freq == 1 else (f"週1回" if freq == 7 else f"{freq}日に1回")
+        ctx = (
+            f"【習慣トリガー発火】\n"
+            f"習慣名: {habit['name']}\n"
+            f"設定トリガー: {trigger}\n"
+            f"頻度: {freq_str}\n"
+            f"記録: {streak_info}"
+        )
+        await partner_cog.generate_and_send_routine_message(ctx, PROMPT_HABIT_TRIGGER)
+
+    @engine_start_task.before_loop
+    @held_flush_task.before_loop
     @cleanup_task.before_loop
     async def before_tasks(self):
         await self.bot.wait_until_ready()
@@ -0,0 +1,30 @@
+"""定時ジョブの中央スケジューラ（services/job_scheduler.py）を起動・停止する Cog。
+
+各 Cog は __init__ で scheduler.register() するだけで、ここが Bot の準備完了を待って
+ループを 1 本だけ起動する。
+"""
+from discord.ext import commands, tasks
+
+from services.job_scheduler import scheduler
+
+
+class SchedulerCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.start_task.start()
+
+    def cog_unload(self):
+        self.start_task.cancel()
+        self.bot.loop.create_task(scheduler.stop())
+
+    @tasks.loop(count=1)
+    async def start_task(self):
+        scheduler.start()
+
+    @start_task.before_loop
+    async def before_start(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(SchedulerCog(bot))
@@ -15,6 +15,7 @@ from typing import Optional
 from discord.ext import commands
 
 from config import JST
+from services.rate_limiter import LANE_BACKGROUND, in_lane
 from services.screener_service import ScreenerService
 from services.screener_engine import (
     list_strategies, factor_axes_catalog, select_with_sector_cap,
@@ -98,6 +99,9 @@ class ScreenerCog(commands.Cog):
             refine=refine,
         )
 
+    async def warm_universes(self, universe_names: list[str], styles: Optional[list[str]] = None) -> dict:
+        return await self.service.warm_universes(universe_names, styles=styles)
+
     async def apply_secondary_style(
         self,
         candidates: list[dict],
@@ -863,6 +867,7 @@ class ScreenerCog(commands.Cog):
         return {"ok": True, "job_id": job.get("job_id"),
                 "created_at": job.get("created_at"), "result": result}
 
+    @in_lane(LANE_BACKGROUND)
     async def _run_qualitative_job(
         self,
         job_id: str,
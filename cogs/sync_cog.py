@@ -20,6 +20,7 @@ sys.stdout.reconfigure(encoding="utf-8")
 # --- 基本設定 ---
 # --- 設定インポート ---
 from config import JST, PENDING_MEMOS_FILE
+from utils.executors import FILE_IO, run_in
 
 
 class SyncCog(commands.Cog):
@@ -66,7 +67,8 @@ class SyncCog(commands.Cog):
 
             # 中身が空の配列 '[]' の場合もスキップする — asyncコンテキストでは非同期I/Oで読む
             try:
-                content = await asyncio.to_thread(
+                content = await run_in(
+                    FILE_IO,
                     PENDING_MEMOS_FILE.read_text, encoding="utf-8"
                 )
                 content = content.strip()
@@ -101,6 +103,9 @@ class SyncCog(commands.Cog):
                 worker_logs = stderr.decode("utf-8", "ignore").strip()
 
                 if proc.returncode == 0:
+                    # ワーカーがデイリーノートを書き換えたので、次の参照でノート索引を差分同期させる
+                    from services import note_index
+                    note_index.mark_stale()
                     self.logger.info(
                         f"【強制同期】ワーカーが正常に完了しました。\n--- ワーカーログ ---\n{worker_logs}\n--------------------"
                     )
@@ -118,6 +123,12 @@ class SyncCog(commands.Cog):
     async def auto_sync_loop(self):
         """5分ごとに保留メモの同期を試みるループ"""
         await self.force_sync()
+        # デイリーノート索引の差分同期（Obsidian 側での編集を拾う。6時間に1回程度）
+        try:
+            from services.note_index import sync_daily_notes
+            await sync_daily_notes(getattr(self.bot, "drive_service", None), max_age_sec=6 * 3600)
+        except Exception as e:
+            self.logger.debug(f"note index sync failed: {e}")
 
     @auto_sync_loop.before_loop
     async def before_auto_sync_loop(self):
@@ -1,13 +1,20 @@
 import os
 import logging
 import datetime
-import asyncio
-import random
 
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from config import JST
-from prompts import PROMPT_WEEKLY_REVIEW
+from services.job_scheduler import scheduler
+from prompts import PROMPT_PERIOD_REVIEW, PROMPT_WEEKLY_REVIEW
+
+# レビューで読むデイリーノートの見出し
+REVIEW_SECTIONS = [
+    "## 🪞 Alter Log",
+    "## 🔎 Insights",
+    "## 💡 Insights & Thoughts",  # 旧名（未移行ノート用フォールバック）
+    "## 📝 Events & Actions",
+]
 
 
 class WeeklyReviewCog(commands.Cog):
@@ -17,20 +24,12 @@ class WeeklyReviewCog(commands.Cog):
         self.drive_service = bot.drive_service
         self.gemini_client = bot.gemini_client
 
-        self._last_run_date = None
-        self.weekly_review_task.start()
+        scheduler.register("weekly_review", self.weekly_review_task, jitter_sec=900)
 
     def cog_unload(self):
-        self.weekly_review_task.cancel()
+        scheduler.unregister("weekly_review")
 
-    @tasks.loop(minutes=1)
     async def weekly_review_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due("weekly_review", "21:30", "sunday", self._last_run_date)
-        if not due:
-            return
-        self._last_run_date = today
-
         # 月額閾値を超過していれば週次レビューをスキップ（頻度調整）
         try:
             from services import cost_meter_service
@@ -40,84 +39,59 @@ class WeeklyReviewCog(commands.Cog):
         except Exception as e:
             logging.debug(f"WeeklyReviewCog: throttle check failed: {e}")
 
-        await asyncio.sleep(random.randint(0, 900))
-
-        service = self.drive_service.get_service()
-        if not service:
+        now = datetime.datetime.now(JST)
+        start = (now - datetime.timedelta(days=6)).strftime("%Y-%m-%d")
+        report = await self.run_review(start, now.strftime("%Y-%m-%d"), prompt=PROMPT_WEEKLY_REVIEW)
+        if not report:
             return
 
-        daily_folder = await self.drive_service.find_file(
-            service, self.drive_folder_id, "DailyNotes"
-        )
-        if not daily_folder:
-            return
-
-        gathered_texts = []
-        for i in range(7):
-            target_date = now - datetime.timedelta(days=i)
-            file_name = f"{target_date.strftime('%Y-%m-%d')}.md"
-            f_id = await self.drive_service.find_file(service, daily_folder, file_name)
-            if f_id:
-                try:
-                    content = await self.drive_service.read_text_file(service, f_id)
-                    extracted = self._extract_key_sections(content)
-                    if extracted.strip():
-                        gathered_texts.append(
-                            f"=== {target_date.strftime('%Y-%m-%d')} ===\n{extracted}"
-                        )
-                except Exception as e:
-                    logging.error(f"WeeklyReview read error for {file_name}: {e}")
-
-        if not gathered_texts:
-            logging.info("WeeklyReview: No data found for the week.")
-            return
+        send_msg = f"**【今週の Weekly Review 棚卸しレポート】**\n\n{report}"
+        try:
+            from api.notification_service import save_message_and_notify as _save_msg
+            await _save_msg("assistant", send_msg, proactive=True)
+        except Exception:
+            pass
 
-        combined_text = "\n\n".join(reversed(gathered_texts))
-        prompt = f"{PROMPT_WEEKLY_REVIEW}\n\n【過去1週間のデータ】\n{combined_text}"
+    async def gather_sections(self, start_date: str, end_date: str) -> str:
+        """期間 [start_date, end_date] のレビュー対象見出しをノート索引から 1 回で取り出して整形する。"""
+        from services.note_index import get_sections
 
+        by_date = await get_sections(
+            start_date, end_date, REVIEW_SECTIONS, drive_service=self.drive_service
+        )
+        blocks = []
+        for note_date in sorted(by_date):
+            lines = []
+            for heading, body in by_date[note_date]:
+                body_lines = [ln.strip() for ln in body.split("\n") if ln.strip()]
+                if body_lines:
+                    lines.append(heading)
+                    lines.extend(body_lines)
+            if lines:
+                blocks.append(f"=== {note_date} ===\n" + "\n".join(lines))
+        return "\n\n".join(blocks)
+
+    async def run_review(self, start_date: str, end_date: str, prompt: str = PROMPT_PERIOD_REVIEW) -> str:
+        """任意期間の振り返りレポートを生成する。データが無い・失敗時は空文字。"""
+        if not self.gemini_client:
+            return ""
+        combined_text = await self.gather_sections(start_date, end_date)
+        if not combined_text:
+            logging.info(f"WeeklyReview: No data found for {start_date}〜{end_date}.")
+            return ""
+
+        full_prompt = f"{prompt}\n\n【{start_date}〜{end_date} のデータ】\n{combined_text}"
         try:
-            if self.gemini_client:
-                from services.gemini_model_resolver import resolve_gemini_model
-                _m = await resolve_gemini_model("routines", default_pro=True)
-                response = await self.gemini_client.aio.models.generate_content(
-                    model=_m,
-                    contents=prompt,
-                )
-
-                send_msg = f"**【今週の Weekly Review 棚卸しレポート】**\n\n{response.text}"
-                try:
-                    from api.notification_service import save_message_and_notify as _save_msg
-                    await _save_msg("assistant", send_msg, proactive=True)
-                except Exception:
-                    pass
+            from services.gemini_model_resolver import resolve_gemini_model
+            _m = await resolve_gemini_model("routines", default_pro=True)
+            response = await self.gemini_client.aio.models.generate_content(
+                model=_m,
+                contents=full_prompt,
+            )
+            return response.text or ""
         except Exception as e:
             logging.error(f"WeeklyReview API Error: {e}")
-
-    def _extract_key_sections(self, content: str) -> str:
-        sections_to_extract = [
-            "## 🪞 Alter Log",
-            "## 🔎 Insights",
-            "## 💡 Insights & Thoughts",  # 旧名（未移行ノート用フォールバック）
-            "## 📝 Events & Actions",
-        ]
-        extracted = []
-        lines = content.split("\n")
-        current_section = None
-
-        for line in lines:
-            if line.startswith("## "):
-                current_section = line.strip()
-                extracted.append(line.strip())
-            elif current_section in sections_to_extract:
-                if line.strip():
-                    extracted.append(line.strip())
-
-        return "\n".join(extracted)
-
-
-    @weekly_review_task.before_loop
-    async def before_weekly_review(self):
-        await self.bot.wait_until_ready()
+            return ""
 
 
 async def setup(bot: commands.Bot):
@@ -11,21 +11,20 @@ import logging
 
 from discord.ext import commands, tasks
 
+from services.job_scheduler import scheduler
 
-class YouTubeWatchCog(commands.Cog):
-    _last_subs_refresh_date = None
-    _last_digest_date = None
 
+class YouTubeWatchCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.poll_loop.start()
-        self.subs_refresh_task.start()
-        self.digest_task.start()
+        scheduler.register("youtube_subs_refresh", self._refresh_subscriptions, default_time="05:00")
+        scheduler.register("youtube_digest", self._send_digest, default_time="07:30")
 
     def cog_unload(self):
         self.poll_loop.cancel()
-        self.subs_refresh_task.cancel()
-        self.digest_task.cancel()
+        scheduler.unregister("youtube_subs_refresh")
+        scheduler.unregister("youtube_digest")
 
     def _service(self):
         return getattr(self.bot, "youtube_service", None)
@@ -33,17 +32,6 @@ class YouTubeWatchCog(commands.Cog):
     # ==========================================================
     # 登録チャンネル一覧のリフレッシュ（1 日 1 回・API）
     # ==========================================================
-    @tasks.loop(minutes=1)
-    async def subs_refresh_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due(
-            "youtube_subs_refresh", "05:00", "daily", self._last_subs_refresh_date,
-        )
-        if not due:
-            return
-        self._last_subs_refresh_date = today
-        await self._refresh_subscriptions()
-
     async def _refresh_subscriptions(self) -> int:
         yt = self._service()
         if not yt or not getattr(yt, "creds", None):
@@ -60,10 +48,6 @@ class YouTubeWatchCog(commands.Cog):
             logging.error(f"YouTubeWatchCog subs refresh error: {e}")
             return 0
 
-    @subs_refresh_task.before_loop
-    async def before_subs(self):
-        await self.bot.wait_until_ready()
-
     # ==========================================================
     # 新着動画のポーリング（RSS・30 分間隔）
     # ==========================================================
@@ -110,17 +94,6 @@ class YouTubeWatchCog(commands.Cog):
     # ==========================================================
     # 1 日 1 回ダイジェスト通知
     # ==========================================================
-    @tasks.loop(minutes=1)
-    async def digest_task(self):
-        from services.schedule_resolver import is_due
-        due, today = await is_due(
-            "youtube_digest", "07:30", "daily", self._last_digest_date,
-        )
-        if not due:
-            return
-        self._last_digest_date = today
-        await self._send_digest()
-
     async def _send_digest(self):
         try:
             from api.database import youtube_list_unnotified_new, youtube_mark_notified
@@ -142,10 +115,6 @@ class YouTubeWatchCog(commands.Cog):
         except Exception as e:
             logging.error(f"YouTubeWatchCog digest send error: {e}")
 
-    @digest_task.before_loop
-    async def before_digest(self):
-        await self.bot.wait_until_ready()
-
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(YouTubeWatchCog(bot))
@@ -1,7 +1,11 @@
+from utils.startup import startup  # 起動計測の起点。ほかの import より先に読む
+
 import os
 import sys
 import asyncio
+import importlib
 import logging
+import time
 from pathlib import Path
 import discord
 from discord.ext import commands
@@ -22,8 +26,9 @@ load_dotenv()
 
 
 def _install_gemini_usage_tracker(client) -> None:
-    """genai.Client.aio.models.generate_content をラップしてトークン数を SQLite に記録する。
-    既存の全呼び出しを変更せず、レスポンスの usage_metadata から自動的に計上する。"""
+    """genai.Client.aio.models.generate_content / generate_content_stream をラップしてトークン数を
+    SQLite に記録する。既存の全呼び出しを変更せず、レスポンスの usage_metadata から自動的に計上する。
+    応答キャッシュ（services/gemini_gateway.py）もここで挟む（ストリームは対象外）。"""
     try:
         aio_models = client.aio.models
     except AttributeError:
@@ -32,8 +37,9 @@ def _install_gemini_usage_tracker(client) -> None:
         return
 
     original = aio_models.generate_content
+    original_stream = getattr(aio_models, "generate_content_stream", None)
 
-    async def tracked(*args, **kwargs):
+    async def downgrade(args, kwargs):
         # ---- 自動格下げ: pro 系を要求していて閾値超過の設定なら flash に差し替える ----
         try:
             from services import cost_meter_service
@@ -47,26 +53,75 @@ def _install_gemini_usage_tracker(client) -> None:
                         kwargs["model"] = new_model
                     elif args:
                         args = (new_model,) + args[1:]
+                    # コンテキストキャッシュはモデルごとなので、格下げ時は元のプレフィックスで送る
+                    if getattr(kwargs.get("config"), "cached_content", None):
+                        from services.prompt_cache import prompt_cache
+                        kwargs["config"] = prompt_cache.uncached_config(kwargs["config"])
         except Exception as e:
             logging.debug(f"auto-downgrade check failed: {e}")
+        return args, kwargs
 
-        response = await original(*args, **kwargs)
+    async def record(args, kwargs, response, source):
         try:
             from api.database import record_api_usage
             model = kwargs.get("model") or (args[0] if args else "") or ""
             meta = getattr(response, "usage_metadata", None)
             in_tokens = getattr(meta, "prompt_token_count", 0) or 0
             out_tokens = getattr(meta, "candidates_token_count", 0) or 0
+            cached_tokens = getattr(meta, "cached_content_token_count", 0) or 0
             if not in_tokens and not out_tokens:
                 total = getattr(meta, "total_token_count", 0) or 0
                 if total:
                     out_tokens = total
-            await record_api_usage(str(model), int(in_tokens), int(out_tokens), source="generate_content")
+            await record_api_usage(
+                str(model), int(in_tokens), int(out_tokens),
+                source=source, cached_tokens=int(cached_tokens),
+            )
         except Exception as e:
             logging.debug(f"usage record failed: {e}")
+
+    async def tracked(*args, **kwargs):
+        args, kwargs = await downgrade(args, kwargs)
+        # gemini_cache(feature) の中の呼び出しは応答キャッシュ越しに送る（ヒット時は計上しない）
+        from services.gemini_gateway import gemini_gateway
+        return await gemini_gateway.generate(call_and_record, args, kwargs)
+
+    async def call_and_record(*args, **kwargs):
+        # コンテキストキャッシュ（services/prompt_cache.py）が API 側で消えていたら通常送信で再試行する
+        from services.prompt_cache import prompt_cache
+        response = await prompt_cache.generate(dispatched, args, kwargs)
+        await record(args, kwargs, response, "generate_content")
         return response
 
+    async def dispatched(*args, **kwargs):
+        # モデル系統ごとの RPM/TPM・同時実行数と優先レーンで払い出す（services/gemini_dispatch.py）
+        from services.gemini_dispatch import gemini_dispatcher
+        return await gemini_dispatcher.generate(original, args, kwargs)
+
+    async def tracked_stream(*args, **kwargs):
+        # SDK と同じく await すると非同期イテレータを返す。使用量は最後のチャンクの usage_metadata で計上
+        args, kwargs = await downgrade(args, kwargs)
+        return stream_and_record(args, kwargs)
+
+    async def stream_and_record(args, kwargs):
+        from services.prompt_cache import prompt_cache
+        last = None
+        try:
+            async for chunk in prompt_cache.stream(dispatched_stream, args, kwargs):
+                if getattr(chunk, "usage_metadata", None) is not None:
+                    last = chunk
+                yield chunk
+        finally:
+            if last is not None:
+                await record(args, kwargs, last, "generate_content_stream")
+
+    async def dispatched_stream(*args, **kwargs):
+        from services.gemini_dispatch import gemini_dispatcher
+        return gemini_dispatcher.stream(original_stream, args, kwargs)
+
     aio_models.generate_content = tracked
+    if original_stream is not None:
+        aio_models.generate_content_stream = tracked_stream
     aio_models._usage_tracked = True
     logging.info("Geminiトークン計測+自動格下げフックを有効化しました")
 
@@ -147,123 +202,150 @@ class MyBot(commands.Bot):
         self.info_service = InfoService()
 
     async def setup_hook(self):
+        """cogs/ 以下の Cog を並行して読み込む（Cog 同士は読み込み順に依存しない）。"""
         logging.info("Cogの読み込みを開始します...")
-        cogs_dir = Path(__file__).parent / "cogs"
-
-        successful_loads = 0
-        failed_loads = []
-
-        for filename in os.listdir(cogs_dir):
-            if filename == "__pycache__":
-                continue
-            if filename.endswith(".py") and not filename.startswith("__"):
-                cog_name = f"cogs.{filename[:-3]}"
-                try:
-                    await self.load_extension(cog_name)
-                    logging.info(f" -> {cog_name} を読み込みました。")
-                    successful_loads += 1
-                except Exception as e:
-                    logging.error(
-                        f" -> {cog_name} の読み込みに失敗しました: {e}", exc_info=True
-                    )
-                    failed_loads.append(f"{cog_name} ({type(e).__name__})")
-
-        logging.info(f"Cog読み込み完了: {successful_loads}個成功")
+        names = _cog_modules()
+
+        async def load(cog_name: str):
+            t = time.monotonic()
+            try:
+                await self.load_extension(cog_name)
+                logging.info(f" -> {cog_name} を読み込みました。")
+                return None
+            except Exception as e:
+                logging.error(
+                    f" -> {cog_name} の読み込みに失敗しました: {e}", exc_info=True
+                )
+                return f"{cog_name} ({type(e).__name__})"
+            finally:
+                startup.detail("cogs", cog_name, time.monotonic() - t)
+
+        results = await asyncio.gather(*(load(n) for n in names))
+        failed_loads = [r for r in results if r]
+
+        logging.info(f"Cog読み込み完了: {len(names) - len(failed_loads)}個成功")
         if failed_loads:
             logging.error(f"Cog読み込み失敗: {len(failed_loads)}個 - {', '.join(failed_loads)}")
 
 
+# /api 配下に載せるサブルーター（api/routers/<name>.py の router。routes.py から段階的に切り出したもの）
+_API_ROUTERS = (
+    "investment_watchlist", "investment_journal", "investment_portfolio", "investment_alerts",
+    "investment_screener", "google_tasks", "habits", "gmail", "youtube", "expenses", "meals",
+    "stocked_links", "english_phrases", "messages", "calendar", "notes", "daily_summary", "fitbit",
+    "gemini_settings", "manager_notices", "push", "cost", "edinet", "investment_analysis",
+    "settings_misc", "drum_roadmap", "study", "mit_journal", "lifelog", "reading", "zerosec",
+    "environment", "tasks_ai", "legacy_study", "briefing", "core_misc", "dashboard", "media",
+)
+# Drive からの DB 復元がこれ以上かかったら警告を出すだけのしきい値（復元は最後まで待ち、/api/* は関門で待たせる）
+_RESTORE_WARN_SEC = float(os.getenv("STARTUP_RESTORE_WARN_SEC", "90"))
+
+
+def _cog_modules() -> list[str]:
+    cogs_dir = Path(__file__).parent / "cogs"
+    return sorted(
+        f"cogs.{filename[:-3]}"
+        for filename in os.listdir(cogs_dir)
+        if filename.endswith(".py") and not filename.startswith("__")
+    )
+
+
+def _import_routers() -> list:
+    """ルーターを import して (router, prefix) の一覧を返す。スレッドで呼び、DB 復元と並行させる。"""
+    routers = []
+    for name in ("routes",) + _API_ROUTERS:
+        module_name = "api.routes" if name == "routes" else f"api.routers.{name}"
+        t = time.monotonic()
+        module = importlib.import_module(module_name)
+        startup.detail("routers", name, time.monotonic() - t)
+        routers.append((module.router, "" if name == "routes" else "/api"))
+    return routers
+
+
+def _prewarm_cog_imports(names: list[str]) -> None:
+    """Cog が依存するモジュール（prompts・スクリーナー・各サービス）を先に import しておく。
+    load_extension は Cog のモジュール自体を実行し直すが、依存先は sys.modules から引けるので速くなる。
+    ここでの失敗は load_extension 側で改めて報告されるので握りつぶす。"""
+    for name in names:
+        t = time.monotonic()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logging.debug(f"cog prewarm failed ({name}): {e}")
+        startup.detail("cog_imports", name, time.monotonic() - t)
+
+
+async def _restore_and_init_db(bot) -> None:
+    from api.database import init_db, restore_db_from_drive
+
+    if bot.drive_service and GOOGLE_DRIVE_FOLDER_ID:
+        with startup.phase("restore"):
+            # 途中で打ち切ると復元が中途半端になるので、遅くても最後まで待つ（/api/* は関門で待たせる）
+            task = asyncio.ensure_future(restore_db_from_drive(bot.drive_service, GOOGLE_DRIVE_FOLDER_ID))
+            done, _ = await asyncio.wait({task}, timeout=_RESTORE_WARN_SEC)
+            if not done:
+                logging.warning(
+                    f"[startup] Drive からの DB 復元が {_RESTORE_WARN_SEC:.0f} 秒を超えています。終わるまで API は待機します"
+                )
+            await task
+    with startup.phase("db"):
+        await init_db()
+
+
+async def _wait_uvicorn_started(server, serve_task: asyncio.Task) -> None:
+    t = time.monotonic()
+    while not server.started and not serve_task.done():
+        await asyncio.sleep(0.05)
+    if server.started:
+        startup.record("uvicorn", t, time.monotonic())
+        startup.mark_ready("uvicorn")
+
+
+async def _record_startup_report() -> None:
+    report = startup.log_report()
+    try:
+        from api.database import startup_run_add
+        await startup_run_add(report["started_at"], report["elapsed_sec"], report)
+    except Exception as e:
+        logging.debug(f"startup report save failed: {e}")
+
+
 async def main():
-    bot = MyBot()
+    # モジュールの import（discord・genai・Google API クライアント）にかかった時間
+    startup.record("import", startup.started_at, time.monotonic())
+    # /api/* は DB の準備と Cog の読み込みが済むまで待たせる（api/__init__.py のミドルウェア）
+    startup.require("api")
+
+    with startup.phase("services"):
+        bot = MyBot()
 
     import uvicorn
     from api import app as fastapi_app
-    from api.routes import router as api_router
-    from api.routers.investment_watchlist import router as watchlist_router
-    from api.routers.investment_journal import router as journal_router
-    from api.routers.investment_portfolio import router as portfolio_router
-    from api.routers.investment_alerts import router as alerts_router
-    from api.routers.investment_screener import router as screener_router
-    from api.routers.google_tasks import router as tasks_router
-    from api.routers.habits import router as habits_router
-    from api.routers.gmail import router as gmail_router
-    from api.routers.youtube import router as youtube_router
-    from api.routers.expenses import router as expenses_router
-    from api.routers.meals import router as meals_router
-    from api.routers.stocked_links import router as stocked_links_router
-    from api.routers.english_phrases import router as english_phrases_router
-    from api.routers.messages import router as messages_router
-    from api.routers.calendar import router as calendar_router
-    from api.routers.notes import router as notes_router
-    from api.routers.daily_summary import router as daily_summary_router
-    from api.routers.fitbit import router as fitbit_router
-    from api.routers.gemini_settings import router as gemini_settings_router
-    from api.routers.manager_notices import router as manager_notices_router
-    from api.routers.push import router as push_router
-    from api.routers.cost import router as cost_router
-    from api.routers.edinet import router as edinet_router
-    from api.routers.investment_analysis import router as investment_analysis_router
-    from api.routers.settings_misc import router as settings_misc_router
-    from api.routers.drum_roadmap import router as drum_roadmap_router
-    from api.routers.study import router as study_router
-    from api.routers.mit_journal import router as mit_journal_router
-    from api.routers.lifelog import router as lifelog_router
-    from api.routers.reading import router as reading_router
-    from api.routers.zerosec import router as zerosec_router
-    from api.routers.environment import router as environment_router
-    from api.routers.tasks_ai import router as tasks_ai_router
-    from api.routers.legacy_study import router as legacy_study_router
-    from api.routers.briefing import router as briefing_router
-    from api.routers.core_misc import router as core_misc_router
-    from api.routers.dashboard import router as dashboard_router
-    from api.routers.media import router as media_router
-    from api.database import init_db, restore_db_from_drive
-    from api.chat_service import ChatService
 
-    fastapi_app.include_router(api_router)
-    # 段階的に切り出されたサブルーター（routes.py 由来）
-    fastapi_app.include_router(watchlist_router, prefix="/api")
-    fastapi_app.include_router(journal_router, prefix="/api")
-    fastapi_app.include_router(portfolio_router, prefix="/api")
-    fastapi_app.include_router(alerts_router, prefix="/api")
-    fastapi_app.include_router(screener_router, prefix="/api")
-    fastapi_app.include_router(tasks_router, prefix="/api")
-    fastapi_app.include_router(habits_router, prefix="/api")
-    fastapi_app.include_router(gmail_router, prefix="/api")
-    fastapi_app.include_router(youtube_router, prefix="/api")
-    fastapi_app.include_router(expenses_router, prefix="/api")
-    fastapi_app.include_router(meals_router, prefix="/api")
-    fastapi_app.include_router(stocked_links_router, prefix="/api")
-    fastapi_app.include_router(english_phrases_router, prefix="/api")
-    fastapi_app.include_router(messages_router, prefix="/api")
-    fastapi_app.include_router(calendar_router, prefix="/api")
-    fastapi_app.include_router(notes_router, prefix="/api")
-    fastapi_app.include_router(daily_summary_router, prefix="/api")
-    fastapi_app.include_router(fitbit_router, prefix="/api")
-    fastapi_app.include_router(gemini_settings_router, prefix="/api")
-    fastapi_app.include_router(manager_notices_router, prefix="/api")
-    fastapi_app.include_router(push_router, prefix="/api")
-    fastapi_app.include_router(cost_router, prefix="/api")
-    fastapi_app.include_router(edinet_router, prefix="/api")
-    fastapi_app.include_router(investment_analysis_router, prefix="/api")
-    fastapi_app.include_router(settings_misc_router, prefix="/api")
-    fastapi_app.include_router(drum_roadmap_router, prefix="/api")
-    fastapi_app.include_router(study_router, prefix="/api")
-    fastapi_app.include_router(mit_journal_router, prefix="/api")
-    fastapi_app.include_router(lifelog_router, prefix="/api")
-    fastapi_app.include_router(reading_router, prefix="/api")
-    fastapi_app.include_router(zerosec_router, prefix="/api")
-    fastapi_app.include_router(environment_router, prefix="/api")
-    fastapi_app.include_router(tasks_ai_router, prefix="/api")
-    fastapi_app.include_router(legacy_study_router, prefix="/api")
-    fastapi_app.include_router(briefing_router, prefix="/api")
-    fastapi_app.include_router(core_misc_router, prefix="/api")
-    fastapi_app.include_router(dashboard_router, prefix="/api")
-    fastapi_app.include_router(media_router, prefix="/api")
+    # ポートは最初に開ける（PaaS のヘルスチェックと PWA の静的ファイルはすぐ応答できる）
+    port = int(os.getenv("PORT", 10000))
+    config = uvicorn.Config(fastapi_app, host="0.0.0.0", port=port, log_level="info")
+    server = uvicorn.Server(config)
+    logging.info(f"Manager AI サーバーをポート {port} で起動します...")
+    serve_task = asyncio.create_task(server.serve(), name="uvicorn")
+    started_task = asyncio.create_task(_wait_uvicorn_started(server, serve_task), name="uvicorn-started")
+
+    # DB 復元（Drive の I/O 待ち）と、ルーター・Cog 依存モジュールの import（スレッド）を並行させる
+    names = _cog_modules()
 
-    if bot.drive_service and GOOGLE_DRIVE_FOLDER_ID:
-        await restore_db_from_drive(bot.drive_service, GOOGLE_DRIVE_FOLDER_ID)
-    await init_db()
+    async def import_routers():
+        with startup.phase("routers"):
+            return await asyncio.to_thread(_import_routers)
+
+    async def prewarm_cogs():
+        with startup.phase("cog_imports"):
+            await asyncio.to_thread(_prewarm_cog_imports, names)
+
+    routers, _, _ = await asyncio.gather(import_routers(), _restore_and_init_db(bot), prewarm_cogs())
+    for router, prefix in routers:
+        fastapi_app.include_router(router, prefix=prefix)
+
+    from api.chat_service import ChatService
 
     chat_service = ChatService(
         gemini_client=bot.gemini_client,
@@ -278,16 +360,16 @@ async def main():
     # _ready をCogロード前に初期化し、ロード後に set() するだけで十分
     # （全タスクは __init__ で start() し、before_loop で wait_until_ready() を待つ）
     bot._ready = asyncio.Event()
-    await bot.setup_hook()
+    with startup.phase("cogs"):
+        await bot.setup_hook()
     bot._ready.set()
+    startup.mark_ready("api")
 
-    port = int(os.getenv("PORT", 10000))
-    config = uvicorn.Config(fastapi_app, host="0.0.0.0", port=port, log_level="info")
-    server = uvicorn.Server(config)
+    await started_task
+    await _record_startup_report()
 
-    logging.info(f"Manager AI サーバーをポート {port} で起動します...")
     try:
-        await server.serve()
+        await serve_task
     except Exception as e:
         logging.error(f"サーバーの起動中にエラーが発生しました: {e}", exc_info=True)
 
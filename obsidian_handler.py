@@ -1,7 +1,6 @@
 import os
 import json
 import logging
-import asyncio
 from pathlib import Path
 from filelock import FileLock
 from datetime import datetime
@@ -9,6 +8,7 @@ from dotenv import load_dotenv
 
 # --- 追加: config.py から設定をインポート ---
 from config import JST, PENDING_MEMOS_FILE
+from utils.executors import FILE_IO, run_in
 
 # .envファイルから設定を読み込む
 load_dotenv()
@@ -98,9 +98,8 @@ async def add_memo_async(
 ):
     """Botの非同期処理を妨げずにメモを保存する関数"""
     created_at_iso = created_at or datetime.now(JST).isoformat()
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(
-        None,
+    await run_in(
+        FILE_IO,
         _add_memo_sync,
         content,
         author,
@@ -1,6 +1,20 @@
-def get_system_prompt(user_name: str, now_str: str, user_manual: str = "") -> str:
-    """ベースとなる頼れるマネージャー（相棒）のシステムプロンプト"""
+from typing import Optional
+
+# get_system_prompt(now_str=None) のときに時刻の代わりに入れる参照（時刻は current_time_note で会話側に付ける）
+_CURRENT_TIME_REF = "最新のユーザーメッセージ冒頭の【現在時刻】"
+
+
+def current_time_note(now_str: str) -> str:
+    """コンテキストキャッシュ用に時刻を抜いたシステムプロンプトと組み合わせる、会話側の時刻注記。"""
+    return f"【現在時刻】{now_str} (JST)"
+
+
+def get_system_prompt(user_name: str, now_str: Optional[str], user_manual: str = "") -> str:
+    """ベースとなる頼れるマネージャー（相棒）のシステムプロンプト。
+    now_str=None なら時刻を埋め込まない（毎回同じ文面になるのでコンテキストキャッシュに載せられる）。"""
     user_name = "ゆうすけ"
+    if now_str is None:
+        now_str = _CURRENT_TIME_REF
 
     manual_section = (
         f"\n**【ゆうすけの取扱説明書（コア・メモリー）】**\n{user_manual}\n"
@@ -275,6 +289,22 @@ PROMPT_WEEKLY_REVIEW = """
 挨拶はいらない、見出しから始めて。
 """
 
+PROMPT_PERIOD_REVIEW = """
+君は俺の専属マネージャーで、思考を整理してくれるコーチだ。
+指定した期間のデイリーノートを読んで「振り返りレポート」を作って。
+期間が長いときは、日ごとではなく週や月単位の流れ・変化をつかんでまとめて。
+
+【必須要素】
+### 🔍 この期間の思考の傾向
+- よく悩んでたこと、繰り返してたテーマ、途中で変わったこと。
+### 💡 点と点が結びつくインサイト
+- 日々の気づきを繋げて、新しく見えてきた「仮説」を教えて。
+### 🎯 俺への問いかけ
+- 次の期間をもっと良くするための「本質的な問い」を1〜2つ投げて。
+
+挨拶はいらない、見出しから始めて。
+"""
+
 PROMPT_LOCATION_SYNC = """
 「どこ行ってたか、記録しといたよ！」って短くね。労いの言葉も入れて。
 """
@@ -530,17 +560,16 @@ PROMPT_STOCK_SNAPSHOT = """
 - 日本株は決算短信ベース、米国株は10-Kベースを優先。
 """
 
+# 銘柄審査は「投資憲法＋指示」（system_instruction。どの銘柄でも同じなのでコンテキストキャッシュに載せる）と
+# 「審査対象」（contents）に分けて送る
 PROMPT_STOCK_AUDIT = """
-あなたは投資判断を支援するアナリストです。以下の「投資憲法」と「銘柄スナップショット」を読み比べ、この銘柄が憲法の基準に合致するかを厳格に審査してください。
+あなたは投資判断を支援するアナリストです。以下の「投資憲法」と、メッセージで渡される「銘柄スナップショット」を読み比べ、この銘柄が憲法の基準に合致するかを厳格に審査してください。
 
 【投資憲法】
 {constitution}
 
-【銘柄スナップショット】
-{snapshot}
-
 【出力形式（Markdown）】
-## 🎯 {ticker} 投資憲法審査
+## 🎯 （審査対象の銘柄コード） 投資憲法審査
 
 ### ✅ 合格項目
 - [基準名]: 該当値 / 判定理由（1行）
@@ -565,6 +594,13 @@ PROMPT_STOCK_AUDIT = """
 - 過度に楽観的な判断はしない。憲法の除外条件に1つでも該当したら必ず不合格にする。
 """
 
+PROMPT_STOCK_AUDIT_TARGET = """
+【審査対象の銘柄コード】{ticker}
+
+【銘柄スナップショット】
+{snapshot}
+"""
+
 PROMPT_EARNINGS_SCHEDULE = """
 あなたは投資情報の調査担当です。指定された銘柄の次回決算発表日と、関連する重要日程（権利確定日、配当支払日、株主総会など）を調査してください。
 
@@ -0,0 +1,341 @@
+"""投資アラートルールのローカル評価エンジン。
+
+従来の alerts_check_now は有効なルールをすべて JSON にして Gemini（Google 検索つき）に
+判定させていた（遅い・課金される・毎回結果が揺れる）。ここでは
+
+- ルールを (銘柄, 指標, 向き, 閾値) の表にコンパイルし、指標は手元のキャッシュだけから作る
+    price            : 直近値（get_last_price で取得済みならそれ、無ければ stock_ohlcv の最新終値）
+    change_1m_pct    : 約 1 ヶ月（21 営業日）前の終値からの騰落率（%）
+    per              : fundamentals_snapshot の PER を直近値で引き直したもの（PER × 現在値 / 取得時株価）
+    days_to_earnings : fundamentals_snapshot の次回決算日までの日数
+- 全ルールを NumPy の配列演算 1 回で判定する（ルール数によらず数ミリ秒）
+- 判定結果は alert_rule_state に持ち、「満たしていない→満たす」に変わったときだけ fired に入れる
+  （条件を満たし続けている間は再通知しない。外れたら再び通知対象に戻る）
+
+ticker の無い earnings_within_days は保有銘柄すべてに展開する。LLM は通知文の言い回しにだけ使う
+（phrase_alerts。失敗時は定型文）。価格の取り直しは refresh_prices、評価は evaluate。
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import math
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from config import JST
+
+# type -> (指標, 向き(+1: 以上/超, -1: 以下/未満), 厳密比較か)
+RULE_TYPES: dict[str, tuple[str, int, bool]] = {
+    "price_below": ("price", -1, True),
+    "price_above": ("price", 1, True),
+    "per_below": ("per", -1, True),
+    "per_above": ("per", 1, True),
+    "drop_pct": ("change_1m_pct", -1, False),
+    "rise_pct": ("change_1m_pct", 1, False),
+    "earnings_within_days": ("days_to_earnings", -1, False),
+}
+_METRICS = ("price", "change_1m_pct", "per", "days_to_earnings")
+_MONTH_BARS = 21
+_QUOTE_MAX_AGE_SEC = 30 * 60  # これより古い直近値は使わず終値で判定する
+_TEMPLATES = {
+    "price_below": "株価 {value:,.2f} が {threshold:,.2f} を下回った",
+    "price_above": "株価 {value:,.2f} が {threshold:,.2f} を上回った",
+    "per_below": "PER {value:.1f} 倍が {threshold:g} 倍を下回った",
+    "per_above": "PER {value:.1f} 倍が {threshold:g} 倍を上回った",
+    "drop_pct": "1ヶ月で {value:+.1f}%（{threshold:g}% 以上の下落）",
+    "rise_pct": "1ヶ月で {value:+.1f}%（{threshold:g}% 以上の上昇）",
+    "earnings_within_days": "決算まであと {value:.0f} 日（{threshold:g} 日以内）",
+}
+
+
+def compile_rules(rules: list[dict], holdings_codes: list[str] | None = None) -> list[dict]:
+    """有効なルールを 1 行 = (ルール, 銘柄) の判定行に展開する。未知の種別は捨てる。"""
+    compiled = []
+    for r in rules or []:
+        if not r.get("enabled"):
+            continue
+        spec = RULE_TYPES.get(r.get("type") or "")
+        if spec is None:
+            continue
+        try:
+            threshold = float(r.get("threshold", 0))
+        except (TypeError, ValueError):
+            continue
+        metric, direction, strict = spec
+        codes = [r.get("code") or r.get("ticker")] if (r.get("code") or r.get("ticker")) else []
+        if not codes and r.get("type") == "earnings_within_days":
+            codes = list(holdings_codes or [])
+        if r.get("type") == "drop_pct":
+            bound = -abs(threshold)
+        elif r.get("type") == "rise_pct":
+            bound = abs(threshold)
+        else:
+            bound = threshold
+        for code in codes:
+            code = str(code).strip().upper()
+            if not code:
+                continue
+            compiled.append({
+                "state_key": f"{r.get('id')}:{code}",
+                "id": r.get("id"),
+                "ticker": r.get("ticker") or code,
+                "code": code,
+                "type": r.get("type"),
+                "threshold": threshold,
+                "metric": metric,
+                "direction": direction,
+                "strict": strict,
+                "bound": bound,
+                "memo": r.get("memo") or "",
+            })
+    return compiled
+
+
+def evaluate_predicates(compiled: list[dict], metrics: dict[str, dict]) -> tuple[np.ndarray, np.ndarray]:
+    """全判定行を一括で評価し (条件を満たすか, 判定に使った値) を返す。値が無い行は NaN・False。"""
+    n = len(compiled)
+    if n == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0)
+    values = np.array(
+        [
+            v if isinstance(v := (metrics.get(c["code"]) or {}).get(c["metric"]), (int, float)) else np.nan
+            for c in compiled
+        ],
+        dtype=float,
+    )
+    bound = np.array([c["bound"] for c in compiled], dtype=float)
+    direction = np.array([c["direction"] for c in compiled])
+    strict = np.array([c["strict"] for c in compiled], dtype=bool)
+    is_days = np.array([c["metric"] == "days_to_earnings" for c in compiled], dtype=bool)
+
+    with np.errstate(invalid="ignore"):
+        up = np.where(strict, values > bound, values >= bound)
+        down = np.where(strict, values < bound, values <= bound)
+        hit = np.where(direction > 0, up, down)
+        hit &= ~np.isnan(values)
+        hit &= ~is_days | (values >= 0)  # 決算日が過去なら対象外
+    return hit, values
+
+
+async def load_metrics(codes: list[str], provider=None) -> dict[str, dict]:
+    """キャッシュ（stock_ohlcv・fundamentals_snapshot・取得済みの直近値）だけから指標を作る。通信しない。"""
+    from api.database import fundamentals_snapshot_many, get_ohlcv_closes_many
+
+    codes = sorted(set(codes))
+    if not codes:
+        return {}
+    start = (datetime.datetime.now(JST).date() - datetime.timedelta(days=60)).isoformat()
+    closes, funds = await asyncio.gather(
+        get_ohlcv_closes_many(codes, start),
+        fundamentals_snapshot_many(codes, ["per", "current_price", "next_earnings_ts"]),
+    )
+    now = datetime.datetime.now(JST)
+    now_ts = now.timestamp()
+    out: dict[str, dict] = {}
+    for code in codes:
+        m: dict = {}
+        series = closes.get(code) or []
+        price = series[-1][1] if series else None
+        price_as_of = series[-1][0] if series else None
+        quote = provider.latest_quote(code) if provider is not None else None
+        if quote and now_ts - quote[1] <= _QUOTE_MAX_AGE_SEC:
+            price = quote[0]
+            price_as_of = datetime.datetime.fromtimestamp(quote[1], JST).isoformat(timespec="minutes")
+        if price is not None:
+            m["price"] = float(price)
+            m["as_of"] = price_as_of
+            if len(series) > _MONTH_BARS:
+                base = series[-1 - _MONTH_BARS][1]
+                if base:
+                    m["change_1m_pct"] = (float(price) / float(base) - 1.0) * 100.0
+
+        cells = funds.get(code) or {}
+        per = (cells.get("per") or {}).get("num")
+        snap_price = (cells.get("current_price") or {}).get("num")
+        if isinstance(per, (int, float)) and per > 0:
+            if price is not None and isinstance(snap_price, (int, float)) and snap_price > 0:
+                m["per"] = float(per) * float(price) / float(snap_price)
+            else:
+                m["per"] = float(per)
+        earnings_ts = (cells.get("next_earnings_ts") or {}).get("num")
+        if isinstance(earnings_ts, (int, float)) and earnings_ts > 0:
+            earnings_day = datetime.datetime.fromtimestamp(earnings_ts, JST).date()
+            m["days_to_earnings"] = float((earnings_day - now.date()).days)
+        out[code] = m
+    return out
+
+
+def _format_value(value: float) -> Optional[float]:
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else round(float(value), 4)
+
+
+def default_message(hit: dict) -> str:
+    template = _TEMPLATES.get(hit.get("type") or "")
+    value = hit.get("current_value")
+    if not template or value is None:
+        return f"{hit.get('type')} の条件を満たした"
+    return template.format(value=value, threshold=hit.get("threshold", 0))
+
+
+class AlertEngine:
+    """ルールの評価と、越境（満たしていない→満たす）の検出。"""
+
+    def __init__(self, provider=None):
+        self._provider = provider
+        self._rules: list[dict] = []
+        self._holdings: list[str] = []
+        self._lock = asyncio.Lock()
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._refreshing = 0
+        self._on_fired: Optional[Callable[[list[dict]], Awaitable]] = None
+        self.stats = {"evaluations": 0, "fired": 0, "last_eval_ms": 0.0}
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            from services.jp_stock_data_service import get_provider
+            self._provider = get_provider()
+            self._provider.add_price_listener(self._on_price)
+        return self._provider
+
+    def set_rules(self, rules: list[dict], holdings_codes: list[str] | None = None) -> None:
+        self._rules = list(rules or [])
+        if holdings_codes is not None:
+            self._holdings = list(holdings_codes)
+
+    def set_fired_callback(self, callback: Callable[[list[dict]], Awaitable]) -> None:
+        """他の機能による価格更新をきっかけに評価し、越境があったとき呼ぶ（通知用）。"""
+        self._on_fired = callback
+        _ = self.provider  # リスナー登録
+
+    def codes(self) -> list[str]:
+        return sorted({c["code"] for c in compile_rules(self._rules, self._holdings)})
+
+    async def refresh_prices(self, codes: list[str] | None = None) -> None:
+        """ルール対象銘柄の終値キャッシュ・直近値・ファンダを取り直す（不足分だけ通信する）。"""
+        provider = self.provider
+        compiled = compile_rules(self._rules, self._holdings)
+        needs_fundamentals = {c["code"] for c in compiled if c["metric"] in ("per", "days_to_earnings")}
+        codes = codes if codes is not None else sorted({c["code"] for c in compiled})
+
+        async def one(code):
+            try:
+                await provider.get_ohlcv(code, days=40)
+                await provider.get_last_price(code)
+                if code in needs_fundamentals:
+                    # 同日中は fundamentals_snapshot から返るので通信は 1 日 1 回
+                    await provider.get_fundamentals_snapshot(code)
+            except Exception as e:
+                logging.debug(f"alert_engine: 価格更新に失敗 {code}: {e}")
+
+        # 自分で取り直している間の更新通知では評価しない（呼び出し側が続けて evaluate する）
+        self._refreshing += 1
+        try:
+            await asyncio.gather(*(one(c) for c in codes))
+        finally:
+            self._refreshing -= 1
+
+    async def evaluate(self) -> dict:
+        """全ルールを評価し、{hits: 満たしている全件, fired: 今回越境した分, checked, as_of} を返す。"""
+        from api.database import alert_states_get, alert_states_put
+
+        async with self._lock:
+            started = datetime.datetime.now(JST)
+            compiled = compile_rules(self._rules, self._holdings)
+            metrics = await load_metrics([c["code"] for c in compiled], self._provider)
+            hit, values = evaluate_predicates(compiled, metrics)
+            states = await alert_states_get()
+
+            now_iso = started.isoformat()
+            hits, fired, updates = [], [], []
+            for c, is_hit, value in zip(compiled, hit.tolist(), values.tolist()):
+                prev = states.get(c["state_key"])
+                if math.isnan(value):
+                    continue  # データが無い間は状態を変えない
+                entry = {
+                    "id": c["id"], "ticker": c["ticker"], "code": c["code"], "type": c["type"],
+                    "threshold": c["threshold"], "current_value": _format_value(value),
+                    "as_of": (metrics.get(c["code"]) or {}).get("as_of"), "memo": c["memo"],
+                }
+                entry["message"] = default_message(entry)
+                if is_hit:
+                    hits.append(entry)
+                was_active = bool(prev and prev["active"])
+                fired_at = (prev or {}).get("fired_at") or ""
+                if is_hit and not was_active:
+                    fired.append(entry)
+                    fired_at = now_iso
+                changed = prev is None or was_active != is_hit
+                updates.append({
+                    "state_key": c["state_key"], "active": is_hit, "last_value": value,
+                    "changed_at": now_iso if changed else prev["changed_at"], "fired_at": fired_at,
+                })
+            await alert_states_put(updates, drop_except=[c["state_key"] for c in compiled])
+
+            elapsed_ms = (datetime.datetime.now(JST) - started).total_seconds() * 1000
+            self.stats["evaluations"] += 1
+            self.stats["fired"] += len(fired)
+            self.stats["last_eval_ms"] = round(elapsed_ms, 2)
+            return {
+                "hits": hits,
+                "fired": fired,
+                "checked": len({c["id"] for c in compiled}),
+                "as_of": started.strftime("%Y-%m-%d %H:%M"),
+            }
+
+    # ---- 価格更新をきっかけにした評価 ----
+
+    def _on_price(self, code: str) -> None:
+        if self._on_fired is None or not self._rules or self._refreshing:
+            return
+        if code.upper() not in self.codes():
+            return
+        if self._pending is not None:
+            return  # 同じ更新の波はまとめて 1 回だけ評価する
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._pending = loop.call_later(2.0, self._fire_evaluation)
+
+    def _fire_evaluation(self) -> None:
+        self._pending = None
+        from utils.async_utils import safe_create_task
+        safe_create_task(self._evaluate_and_notify(), name="alert-engine-eval")
+
+    async def _evaluate_and_notify(self) -> None:
+        try:
+            result = await self.evaluate()
+        except Exception as e:
+            logging.error(f"alert_engine: 評価に失敗: {e}", exc_info=True)
+            return
+        if result["fired"] and self._on_fired is not None:
+            await self._on_fired(result["fired"])
+
+
+async def phrase_alerts(fired: list[dict], phrase: Callable[[str], Awaitable[str]] | None = None) -> str:
+    """越境したアラートを通知文にする。phrase（LLM 呼び出し）があれば言い回しだけ任せ、失敗時は定型文。"""
+    lines = [
+        f"- {h['ticker']}: {h['message']}" + (f"（メモ: {h['memo']}）" if h.get("memo") else "")
+        for h in fired
+    ]
+    plain = "\n".join(lines)
+    if not phrase or not fired:
+        return plain
+    prompt = (
+        "次の投資アラート（判定済みの事実）を、通知用の短い日本語にしてください。\n"
+        "銘柄ごとに1行、「- 」で始める。数値・銘柄名は変えず、売買の推奨や推測は書かない。"
+        "前置き不要。\n\n" + plain
+    )
+    try:
+        text = (await phrase(prompt) or "").strip()
+    except Exception as e:
+        logging.debug(f"alert_engine: 通知文の生成に失敗: {e}")
+        text = ""
+    return text or plain
+
+
+alert_engine = AlertEngine()
@@ -0,0 +1,252 @@
+"""Web クリップ用の常駐ヘッドレス Chromium（Playwright）とコンテキストの使い回し。
+
+従来は URL ごとに Chromium を起動・終了し、グローバルロックで 1 件ずつ直列化していた
+（毎回数秒の起動待ちと 100〜200MB のメモリの山）。ここでは
+
+- ブラウザプロセスは 1 つだけ起動して使い回す（初回利用時に起動）
+- 同時に開くコンテキストは BROWSER_POOL_CONTEXTS（既定 2）まで。使い終わったコンテキストは
+  Cookie を消して再利用し、_CONTEXT_MAX_PAGES ページで作り直す
+- 画像・フォント・動画などは読み込まずに中止する（本文抽出には不要）
+- ページごとにタイムアウト。BROWSER_POOL_MAX_PAGES ページ処理するか、ブラウザ配下の RSS が
+  BROWSER_POOL_MAX_RSS_MB を超えたら、実行中のページが終わるのを待って再起動する
+- _IDLE_CLOSE_SEC 使われなければ閉じてメモリを返す（次の利用でまた起動する）
+
+    from services.browser_pool import browser_pool
+    title, html = await browser_pool.fetch_html(url)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+
+_DEFAULT_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+# 低メモリ環境向けの起動引数（描画・プロセスを絞る）
+_LAUNCH_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--single-process",
+    "--no-zygote",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+]
+_BLOCKED_RESOURCES = {"image", "font", "media"}
+_CONTEXT_MAX_PAGES = 20
+_IDLE_CLOSE_SEC = 600
+_NETWORKIDLE_WAIT_MS = 5000
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, "") or default))
+    except ValueError:
+        return default
+
+
+def _process_tree_rss_mb() -> float:
+    """このプロセス配下（Playwright ドライバ・Chromium）の RSS 合計（MB）。Linux 以外は 0。"""
+    try:
+        parents: dict[int, int] = {}
+        rss: dict[int, int] = {}
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{name}/stat") as f:
+                    stat = f.read()
+                # comm に空白や括弧が入り得るので、最後の ')' より後ろを分割する
+                fields = stat[stat.rindex(")") + 2:].split()
+                parents[int(name)] = int(fields[1])
+                rss[int(name)] = int(fields[21])
+            except (OSError, ValueError, IndexError):
+                continue
+    except OSError:
+        return 0.0
+    root = os.getpid()
+    children: dict[int, list[int]] = {}
+    for pid, ppid in parents.items():
+        children.setdefault(ppid, []).append(pid)
+    total, stack = 0, list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class BrowserPool:
+    def __init__(self, max_contexts: int = 2, max_pages: int = 50, max_rss_mb: int = 450):
+        self.max_contexts = max_contexts
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._playwright = None
+        self._browser = None
+        self._idle_contexts: list[tuple[object, int]] = []  # (context, 処理済みページ数)
+        self._pages_since_launch = 0
+        self._in_flight = 0
+        self._restart_pending = False
+        self._last_used = 0.0
+        self._sem: asyncio.Semaphore | None = None
+        self._launch_lock: asyncio.Lock | None = None
+        self._idle_task: asyncio.Task | None = None
+        self.stats = {"launches": 0, "pages": 0, "errors": 0, "restarts": 0, "blocked": 0}
+
+    # ---- ブラウザの起動・終了 ----
+
+    async def _ensure_browser(self):
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            await self._close_browser()
+            from web_parser import _ensure_browser_installed
+            await _ensure_browser_installed()
+            # playwright は重い依存なので使用時に遅延 import（起動時の常駐メモリを抑える）
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True, args=_LAUNCH_ARGS)
+            self._pages_since_launch = 0
+            self.stats["launches"] += 1
+            logging.info("BrowserPool: Chromium を起動しました")
+            if self._idle_task is None or self._idle_task.done():
+                from utils.async_utils import safe_create_task
+                self._idle_task = safe_create_task(self._idle_watch(), name="browser-pool-idle")
+            return self._browser
+
+    async def _close_browser(self) -> None:
+        contexts, self._idle_contexts = self._idle_contexts, []
+        for ctx, _ in contexts:
+            try:
+                await ctx.close()
+            except Exception:
+                pass
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logging.debug(f"BrowserPool: browser close failed: {e}")
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logging.debug(f"BrowserPool: playwright stop failed: {e}")
+            self._playwright = None
+
+    async def close(self) -> None:
+        """ブラウザを閉じる（次の fetch_html でまた起動する）。"""
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            await self._close_browser()
+
+    async def _idle_watch(self) -> None:
+        while self._browser is not None:
+            await asyncio.sleep(60)
+            if self._in_flight == 0 and time.monotonic() - self._last_used > _IDLE_CLOSE_SEC:
+                logging.info("BrowserPool: しばらく使われていないため Chromium を閉じます")
+                await self.close()
+                return
+
+    # ---- コンテキストの貸し出し ----
+
+    async def _route(self, route) -> None:
+        if route.request.resource_type in _BLOCKED_RESOURCES:
+            self.stats["blocked"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _checkout(self):
+        if self._idle_contexts:
+            return self._idle_contexts.pop()
+        browser = await self._ensure_browser()
+        ctx = await browser.new_context(user_agent=_DEFAULT_UA, locale="ja-JP")
+        await ctx.route("**/*", self._route)
+        return ctx, 0
+
+    async def _checkin(self, ctx, used: int, healthy: bool) -> None:
+        if healthy and used < _CONTEXT_MAX_PAGES and not self._restart_pending:
+            try:
+                await ctx.clear_cookies()
+                self._idle_contexts.append((ctx, used))
+                return
+            except Exception:
+                pass
+        try:
+            await ctx.close()
+        except Exception:
+            pass
+
+    # ---- 本体 ----
+
+    async def fetch_html(self, url: str, timeout_ms: int = 45000) -> tuple[str, str]:
+        """URL をブラウザで開き、JavaScript 実行後の (タイトル, HTML) を返す。失敗時は例外。"""
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_contexts)
+        async with self._sem:
+            self._in_flight += 1
+            self._last_used = time.monotonic()
+            ctx, used, healthy = None, 0, False
+            try:
+                ctx, used = await self._checkout()
+                page = await ctx.new_page()
+                try:
+                    page.set_default_timeout(timeout_ms)
+                    await page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+                    try:
+                        await page.wait_for_load_state(
+                            "networkidle", timeout=min(_NETWORKIDLE_WAIT_MS, timeout_ms)
+                        )
+                    except Exception:
+                        pass
+                    html = await page.content()
+                    title = await page.title()
+                    healthy = True
+                finally:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                self.stats["pages"] += 1
+                return title, html
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self._in_flight -= 1
+                self._pages_since_launch += 1
+                if ctx is not None:
+                    await self._checkin(ctx, used + 1, healthy)
+                await self._maybe_restart()
+
+    async def _maybe_restart(self) -> None:
+        if self._browser is None:
+            return
+        if not self._restart_pending:
+            rss = _process_tree_rss_mb()
+            if self._pages_since_launch >= self.max_pages or rss > self.max_rss_mb:
+                logging.info(
+                    f"BrowserPool: 再起動を予約（{self._pages_since_launch} ページ, RSS {rss:.0f}MB）"
+                )
+                self._restart_pending = True
+        if self._restart_pending and self._in_flight == 0:
+            # 実行中のページが無くなった時点で閉じる。次の fetch_html で起動し直す
+            self._restart_pending = False
+            self.stats["restarts"] += 1
+            await self.close()
+
+
+browser_pool = BrowserPool(
+    max_contexts=_env_int("BROWSER_POOL_CONTEXTS", 2),
+    max_pages=_env_int("BROWSER_POOL_MAX_PAGES", 50),
+    max_rss_mb=_env_int("BROWSER_POOL_MAX_RSS_MB", 450),
+)
@@ -0,0 +1,192 @@
+"""チャット 1 往復ぶんのコンテキスト（取扱説明書・今日の予定・未完了タスク・MIT など）を先回りで揃える。
+
+/chat はこれまで、履歴・取扱説明書（Drive）を順番に読んでから PartnerCog に渡し、モデルが
+check_schedule / check_tasks / get_mit_status を呼ぶたびにカレンダー・タスク・Drive を 1 件ずつ
+取りに行っていた（ツール呼び出しの往復ぶん、最初の返答が遅れる）。ここでは
+
+- 各ソースを add_source(name, fetch, ttl_sec, cost) で宣言する。cost は取得にかかるおおよその秒数で、
+  _STALE_OK_COST 以上の重いソースは期限切れでも手元の値をすぐ返し、裏で取り直す
+- daily=True のソースは日付が変わったら捨てる（前日の「今日の予定」を返さない）
+- warm=True のソースは warm()（PartnerCog の定期ループ）で期限の少し前に取り直し、
+  その日のスナップショットを温かく保つ
+- prefetch(*names) は期限切れのものだけ裏で取りに行く。/chat の冒頭で呼べば、モデルが
+  生成している間に予定・タスクが揃い、ツール呼び出しはメモリから返る
+- gather(*names) は独立したソースを同時に取る。同じソースの同時取得は 1 回にまとめる
+- 書き込み側（カレンダー・タスクの変更通知、MIT の保存）は invalidate(name) で捨てる
+
+取得に失敗したときは（同じ日の）古い値、無ければ default を返す。
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from config import JST
+
+_STALE_OK_COST = 0.5        # これ以上重いソースは期限切れの値を返しつつ裏で取り直す
+_WARM_AHEAD_RATIO = 0.8     # warm() は ttl のこの割合を過ぎたら取り直す
+
+
+@dataclass
+class _Source:
+    name: str
+    fetch: Callable[[], Awaitable[Any]]
+    ttl_sec: float
+    cost: float = 0.0
+    daily: bool = False
+    warm: bool = False
+    value: Any = None
+    has_value: bool = False
+    fetched_at: float = 0.0
+    day: str = ""
+    generation: int = 0
+    task: Optional[asyncio.Task] = None
+
+
+def _today() -> str:
+    return datetime.datetime.now(JST).strftime("%Y-%m-%d")
+
+
+class ContextAssembler:
+    def __init__(self):
+        self._sources: dict[str, _Source] = {}
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "prefetched": 0, "warmed": 0, "errors": 0}
+
+    # ---- 登録・無効化 ----
+
+    def add_source(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl_sec: float,
+        cost: float = 0.0,
+        daily: bool = False,
+        warm: bool = False,
+    ) -> None:
+        """fetch() が例外を投げたときは値を保存しない（エラー文面をキャッシュしないこと）。"""
+        self._sources[name] = _Source(name, fetch, float(ttl_sec), float(cost), daily, warm)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """ソース（省略時は全ソース）の値を捨てる。次の get は取り直しを待つ。"""
+        for src in self._sources.values():
+            if name is None or src.name == name:
+                src.has_value = False
+                src.value = None
+                src.generation += 1   # 取得中の古い結果は保存しない
+                src.task = None
+
+    def put(self, name: str, value: Any) -> None:
+        """書き込んだ側が新しい値を知っているときに差し替える（取扱説明書の更新など）。"""
+        src = self._sources.get(name)
+        if src is not None:
+            src.generation += 1
+            src.task = None
+            self._store(src, value, _today())
+
+    # ---- 読み出し ----
+
+    def _usable(self, src: _Source) -> bool:
+        return src.has_value and (not src.daily or src.day == _today())
+
+    def _fresh(self, src: _Source, ratio: float = 1.0) -> bool:
+        return self._usable(src) and time.monotonic() - src.fetched_at < src.ttl_sec * ratio
+
+    async def get(self, name: str, default: Any = None) -> Any:
+        src = self._sources.get(name)
+        if src is None:
+            return default
+        if self._fresh(src):
+            self.stats["hits"] += 1
+            return src.value
+        if self._usable(src) and src.cost >= _STALE_OK_COST:
+            self.stats["stale"] += 1
+            self._start(src)
+            return src.value
+        self.stats["misses"] += 1
+        try:
+            return await asyncio.shield(self._start(src))
+        except Exception as e:
+            logging.debug(f"context_assembler: {name} の取得に失敗: {e}")
+            return src.value if self._usable(src) else default
+
+    async def gather(self, *names: str, default: Any = None) -> dict[str, Any]:
+        """names を同時に取得して {name: 値} で返す。"""
+        values = await asyncio.gather(*(self.get(n, default) for n in names))
+        return dict(zip(names, values))
+
+    def prefetch(self, *names: str) -> None:
+        """期限切れ・未取得のソースだけ裏で取りに行く（待たない）。"""
+        for name in names:
+            src = self._sources.get(name)
+            if src is not None and not self._fresh(src):
+                self.stats["prefetched"] += 1
+                self._start(src)
+
+    async def warm(self) -> int:
+        """warm=True のソースのうち期限が近いものを取り直す（重いものから）。取り直した数を返す。"""
+        due = [
+            s for s in self._sources.values()
+            if s.warm and not self._fresh(s, _WARM_AHEAD_RATIO)
+        ]
+        due.sort(key=lambda s: s.cost, reverse=True)
+        results = await asyncio.gather(*(self._start(s) for s in due), return_exceptions=True)
+        done = sum(1 for r in results if not isinstance(r, BaseException))
+        self.stats["warmed"] += done
+        return done
+
+    def snapshot(self) -> dict[str, dict]:
+        """各ソースの状態（取得からの秒数・期限内か）。確認用。"""
+        now = time.monotonic()
+        return {
+            s.name: {
+                "cached": self._usable(s),
+                "fresh": self._fresh(s),
+                "age_sec": round(now - s.fetched_at, 1) if s.has_value else None,
+                "ttl_sec": s.ttl_sec,
+                "cost": s.cost,
+                "fetching": s.task is not None,
+            }
+            for s in self._sources.values()
+        }
+
+    # ---- 取得 ----
+
+    def _start(self, src: _Source) -> asyncio.Task:
+        if src.task is None:
+            task = asyncio.ensure_future(self._fetch(src))
+
+            def _done(t: asyncio.Task) -> None:
+                if src.task is t:
+                    src.task = None
+                if not t.cancelled():
+                    t.exception()  # 裏で取り直した分の例外を回収しておく
+
+            src.task = task
+            task.add_done_callback(_done)
+        return src.task
+
+    async def _fetch(self, src: _Source) -> Any:
+        generation, day = src.generation, _today()
+        try:
+            value = await src.fetch()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.debug(f"context_assembler: {src.name} の取得に失敗: {e}")
+            raise
+        if src.generation == generation:
+            self._store(src, value, day)
+        return value
+
+    @staticmethod
+    def _store(src: _Source, value: Any, day: str) -> None:
+        src.value = value
+        src.has_value = True
+        src.fetched_at = time.monotonic()
+        src.day = day
+
+
+context_assembler = ContextAssembler()
@@ -19,18 +19,18 @@ from api.database import (
     set_app_setting,
 )
 
-# USD per 1,000,000 tokens
+# USD per 1,000,000 tokens（cached_input はコンテキストキャッシュから読まれた入力トークンの単価）
 # 値は概算。Google が公表する正確な単価はモデル世代ごとに変わるため `app_settings` でも上書き可。
 MODEL_PRICING: dict[str, dict[str, float]] = {
-    "gemini-2.5-pro":   {"input": 1.25,  "output": 10.00},
-    "gemini-2.5-flash": {"input": 0.30,  "output": 2.50},
-    "gemini-2.5-flash-preview-04-17": {"input": 0.30, "output": 2.50},
-    "gemini-2.5-flash-lite": {"input": 0.075, "output": 0.30},
-    "gemini-2.0-flash": {"input": 0.10,  "output": 0.40},
-    "gemini-1.5-pro":   {"input": 1.25,  "output": 5.00},
-    "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
+    "gemini-2.5-pro":   {"input": 1.25,  "output": 10.00, "cached_input": 0.125},
+    "gemini-2.5-flash": {"input": 0.30,  "output": 2.50,  "cached_input": 0.03},
+    "gemini-2.5-flash-preview-04-17": {"input": 0.30, "output": 2.50, "cached_input": 0.03},
+    "gemini-2.5-flash-lite": {"input": 0.075, "output": 0.30, "cached_input": 0.01},
+    "gemini-2.0-flash": {"input": 0.10,  "output": 0.40,  "cached_input": 0.025},
+    "gemini-1.5-pro":   {"input": 1.25,  "output": 5.00,  "cached_input": 0.3125},
+    "gemini-1.5-flash": {"input": 0.075, "output": 0.30,  "cached_input": 0.01875},
     # 未知モデルへのフォールバック（pro 相当の悲観値）
-    "_default":         {"input": 1.25,  "output": 10.00},
+    "_default":         {"input": 1.25,  "output": 10.00, "cached_input": 0.125},
 }
 
 # 設定キー
@@ -49,9 +49,15 @@ def _pricing_for(model: str) -> dict:
     return MODEL_PRICING.get(model) or MODEL_PRICING["_default"]
 
 
-def usd_cost(model: str, in_tokens: int, out_tokens: int) -> float:
+def usd_cost(model: str, in_tokens: int, out_tokens: int, cached_tokens: int = 0) -> float:
+    """in_tokens はキャッシュ読み出し分（cached_tokens）を含む総入力トークン数。"""
     p = _pricing_for(model)
-    return (in_tokens / 1_000_000.0) * p["input"] + (out_tokens / 1_000_000.0) * p["output"]
+    cached_tokens = min(max(0, cached_tokens or 0), in_tokens)
+    return (
+        ((in_tokens - cached_tokens) / 1_000_000.0) * p["input"]
+        + (cached_tokens / 1_000_000.0) * p.get("cached_input", p["input"])
+        + (out_tokens / 1_000_000.0) * p["output"]
+    )
 
 
 async def get_usd_jpy_rate() -> float:
@@ -96,9 +102,11 @@ async def summary(start_date: str, end_date: str) -> dict:
     for r in by_day_rows:
         d = r["date"]
         if d not in by_day_map:
-            by_day_map[d] = {"date": d, "in_tokens": 0, "out_tokens": 0, "request_count": 0, "usd": 0.0, "jpy": 0.0}
-        usd = usd_cost(r["model"], r["in_tokens"], r["out_tokens"])
+            by_day_map[d] = {"date": d, "in_tokens": 0, "out_tokens": 0, "cached_tokens": 0,
+                             "request_count": 0, "usd": 0.0, "jpy": 0.0}
+        usd = usd_cost(r["model"], r["in_tokens"], r["out_tokens"], r["cached_tokens"])
         by_day_map[d]["in_tokens"] += r["in_tokens"]
+        by_day_map[d]["cached_tokens"] += r["cached_tokens"]
         by_day_map[d]["out_tokens"] += r["out_tokens"]
         by_day_map[d]["request_count"] += r["request_count"]
         by_day_map[d]["usd"] += usd
@@ -110,17 +118,20 @@ async def summary(start_date: str, end_date: str) -> dict:
     total_usd = 0.0
     total_in = 0
     total_out = 0
+    total_cached = 0
     total_req = 0
     for r in by_model_rows:
-        usd = usd_cost(r["model"], r["in_tokens"], r["out_tokens"])
+        usd = usd_cost(r["model"], r["in_tokens"], r["out_tokens"], r["cached_tokens"])
         total_usd += usd
         total_in += r["in_tokens"]
         total_out += r["out_tokens"]
+        total_cached += r["cached_tokens"]
         total_req += r["request_count"]
         by_model.append({
             "model": r["model"],
             "in_tokens": r["in_tokens"],
             "out_tokens": r["out_tokens"],
+            "cached_tokens": r["cached_tokens"],
             "request_count": r["request_count"],
             "usd": round(usd, 4),
             "jpy": round(usd * rate, 1),
@@ -138,12 +149,38 @@ async def summary(start_date: str, end_date: str) -> dict:
         "by_model": by_model,
         "total_in_tokens": total_in,
         "total_out_tokens": total_out,
+        "total_cached_tokens": total_cached,
         "total_request_count": total_req,
         "total_usd": round(total_usd, 4),
         "total_jpy": round(total_usd * rate, 1),
     }
 
 
+async def cache_summary(start_date: str, end_date: str) -> list[dict]:
+    """Gemini 応答キャッシュ（services/gemini_gateway.py）の機能別ヒット率と節約額。"""
+    from api.database import get_gemini_cache_stats
+
+    rate = await get_usd_jpy_rate()
+    out = []
+    for r in await get_gemini_cache_stats(start_date, end_date):
+        hits = int(r["hits"] or 0)
+        coalesced = int(r["coalesced"] or 0)
+        requests = hits + coalesced + int(r["misses"] or 0)
+        out.append({
+            "feature": r["feature"],
+            "requests": requests,
+            "hits": hits,
+            "coalesced": coalesced,
+            "misses": int(r["misses"] or 0),
+            "hit_rate": round((hits + coalesced) / requests, 3) if requests else 0.0,
+            "saved_in_tokens": int(r["saved_in_tokens"] or 0),
+            "saved_out_tokens": int(r["saved_out_tokens"] or 0),
+            "saved_jpy": round(float(r["saved_usd"] or 0.0) * rate, 1),
+        })
+    out.sort(key=lambda x: x["requests"], reverse=True)
+    return out
+
+
 async def current_month_jpy() -> float:
     """今月のAPI概算コスト（円）。閾値判定で使う。"""
     now = datetime.datetime.now(JST)
@@ -0,0 +1,148 @@
+"""ユニバース横断（クロスセクション）の指標計算をまとめて行うベクトル化実装。
+
+スクリーナーは銘柄ごとのタスクで素点を集めたあと、RS レーティング・セクター中央値・
+同業比の百分位を Python の dict/list で組み立てていた（百分位は候補ごとにピア集合を
+走査するので O(n²)）。ここでは 1 ユニバース分の指標を 1 本の配列（DataFrame の列）に
+揃え、NumPy/pandas のソート系演算（argsort・lexsort・rank）で O(n log n) に計算する。
+
+戻り値の形は screener_engine の従来関数と同じ:
+  - rs_ratings            → compute_rs_ratings        {code: 1〜99}
+  - sector_medians        → compute_sector_medians    {sector: {per, pbr, psr, roe, operating_margin, n}}
+  - peer_percentiles      → compute_relative_metrics の百分位（0〜100・同値は上側に寄せる）
+  - relative_strength_blended_panel → relative_strength_blended を全銘柄ぶん一括で
+
+規模の目安は tools/bench_cross_section.py（500〜5,000 銘柄）で確認できる。
+"""
+from __future__ import annotations
+
+from typing import Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+_VALUATION_METRICS = ("per", "pbr", "psr")  # 正値のみ採用（赤字・債務超過の外れ値を除外）
+_QUALITY_METRICS = ("roe", "operating_margin")
+_RS_PERIODS = ((63, 2.0), (126, 1.0), (189, 1.0), (252, 1.0))
+
+
+def _as_float(values: Iterable) -> np.ndarray:
+    """数値以外（None・文字列・bool）を NaN にした float 配列。"""
+    return np.array(
+        [float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values],
+        dtype=float,
+    )
+
+
+def rs_ratings(returns_by_code: Mapping, *, min_n: int = 5) -> dict:
+    """リターン分布内の順位を 1〜99 に写像した RS レーティング（99＝最も強い）。
+
+    同値は入力順（安定ソート）で順位を分ける。標本が min_n 未満なら {} を返す。"""
+    codes = list((returns_by_code or {}).keys())
+    vals = _as_float(returns_by_code[c] for c in codes) if codes else np.empty(0)
+    valid = ~np.isnan(vals)
+    n = int(valid.sum())
+    if n < min_n:
+        return {}
+    codes_v = np.array(codes, dtype=object)[valid]
+    if n == 1:
+        return {codes_v[0]: 50}
+    order = np.argsort(vals[valid], kind="stable")
+    ratings = np.rint(1 + np.arange(n) / (n - 1) * 98).astype(int)
+    return {code: int(r) for code, r in zip(codes_v[order], ratings)}
+
+
+def sector_medians(records: Iterable[Mapping], *, min_n: int = 5) -> dict:
+    """セクター別の中央値。各セクター・各指標で有効値が min_n 未満なら None。
+
+    per/pbr/psr は正値のみ、roe/operating_margin は数値なら符号を問わず採用する。
+    n は per/pbr/psr の有効件数の最大値（相対評価の標本数の目安）。
+    指標ごとに (セクター, 値) で 1 回ソートし、各セクターの中央の位置を引く。"""
+    records = list(records or [])
+    sectors = np.array([(r.get("sector") or "").strip() for r in records], dtype=object)
+    keep = sectors != ""
+    if not keep.any():
+        return {}
+    codes, names = pd.factorize(sectors[keep], sort=False)
+    n_groups = len(names)
+    metrics = list(_VALUATION_METRICS) + list(_QUALITY_METRICS)
+    medians: dict[str, np.ndarray] = {}
+    counts: dict[str, np.ndarray] = {}
+    for m in metrics:
+        v = _as_float(r.get(m) for r in records)[keep]
+        valid = (v > 0) if m in _VALUATION_METRICS else ~np.isnan(v)
+        g, x = codes[valid], v[valid]
+        order = np.lexsort((x, g))
+        xs = x[order]
+        cnt = np.bincount(g, minlength=n_groups)
+        start = np.cumsum(cnt) - cnt
+        med = np.full(n_groups, np.nan)
+        has = cnt > 0
+        lo = start[has] + (cnt[has] - 1) // 2
+        hi = start[has] + cnt[has] // 2
+        med[has] = (xs[lo] + xs[hi]) / 2.0
+        medians[m], counts[m] = med, cnt
+    n_val = np.max([counts[m] for m in _VALUATION_METRICS], axis=0)
+    out: dict[str, dict] = {}
+    for j, sec in enumerate(names):
+        row = {m: (float(medians[m][j]) if counts[m][j] >= min_n else None) for m in metrics}
+        row["n"] = int(n_val[j])
+        out[sec] = row
+    return out
+
+
+def peer_percentiles(values: Sequence, groups: Optional[Sequence] = None, *,
+                     lower_better: bool = False) -> list[Optional[int]]:
+    """各値がピア集合の何 % 以上に勝るか（0〜100 の整数、値が無ければ None）。
+
+    高いほど良い指標は「自分以下の件数 / 有効件数」、低いほど良い指標は「自分以上の件数 /
+    有効件数」。同値はまとめて上側に数える（rank(method="max")）。groups を渡すとグループ内で、
+    省略すると全体で比べる。"""
+    v = _as_float(values)
+    if lower_better:
+        v = -v
+    s = pd.Series(v)
+    if groups is None:
+        rank = s.rank(method="max")
+        count = float(s.count())
+        pct = rank / count * 100 if count else rank
+    else:
+        g = pd.Series(list(groups), dtype=object)
+        grouped = s.groupby(g, sort=False)
+        pct = grouped.rank(method="max") / grouped.transform("count") * 100
+    return [None if p != p else int(round(p)) for p in pct.tolist()]
+
+
+def align_closes(closes: Mapping, length: int = 253) -> tuple[list, np.ndarray]:
+    """銘柄ごとの終値系列を末尾（直近の足）で揃えた (codes, 配列[length, 銘柄数]) にする。
+
+    履歴が length 本に満たない銘柄は先頭側を NaN で埋める。iloc[-k] がどの列でも
+    「その銘柄の k 本前」になるので、銘柄ごとの位置参照をそのまま一括計算に置き換えられる。"""
+    codes = list(closes.keys())
+    panel = np.full((length, len(codes)), np.nan)
+    for j, code in enumerate(codes):
+        arr = np.asarray(closes[code], dtype=float)[-length:]
+        if len(arr):
+            panel[length - len(arr):, j] = arr
+    return codes, panel
+
+
+def relative_strength_blended_panel(closes: Mapping, periods=_RS_PERIODS) -> dict:
+    """relative_strength_blended（複数期間リターンの加重平均）を全銘柄ぶん一括で計算する。
+
+    closes: {code: 終値の系列（古い→新しい）}。期間ぶんの履歴が無い・基準値が 0 以下の期間は
+    その銘柄だけスキップし、取れた期間で加重平均する。1 期間も取れなければ結果に含めない。"""
+    if not closes:
+        return {}
+    longest = max(p for p, _w in periods) + 1
+    codes, panel = align_closes(closes, longest)
+    new = panel[-1]
+    num = np.zeros(len(codes))
+    den = np.zeros(len(codes))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, w in periods:
+            old = panel[-p - 1]
+            use = (old > 0) & ~np.isnan(new)
+            num += np.where(use, w * (new / old - 1.0), 0.0)
+            den += np.where(use, w, 0.0)
+        rs = num / den
+    return {code: float(rs[j]) for j, code in enumerate(codes) if den[j] > 0}
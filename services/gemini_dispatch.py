@@ -0,0 +1,191 @@
+"""Gemini への generate_content 呼び出しをモデル系統ごとのスケジューラで払い出す。
+
+チャット（/chat）・スクリーナーの定性分析・リンクの一括タグ付け・日次整理・ニュース・週次レビュー・
+Gmail 要約はそれぞれ勝手に Gemini を呼んでいて、バッチが走っている最中にチャットすると
+429 を受けたり待たされたりしていた（should_throttle_heavy_tasks は月額コストしか見ない）。ここでは
+main.py の使用量フックの一番内側で、すべての呼び出しを
+
+- モデル系統（pro / flash / flash-lite）ごとの rate_limiter.RequestScheduler に並ばせる
+  （RPM・TPM のトークンバケットと同時実行数。TPM は contents の文字数から見積もって差し引き、
+  応答の usage_metadata で精算する）
+- レーンは呼び出し文脈の request_lane（既定は interactive）。定時ジョブは routine、
+  一括処理（スクリーナー・リンク補完・Gmail 要約）は background で並ぶ。
+  対話レーン用に同時実行枠とトークンを reserve 個ずつ残すので、バッチ中もチャットは待たない
+- 429 / 503 を受けたら Retry-After（retryDelay）を尊重してレートを落とし、並び直して再試行する
+
+待ち行列の長さ・待ち時間は /api/gemini_dispatch_stats で見られる。
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Awaitable, Callable
+
+from services.rate_limiter import (
+    LANE_INTERACTIVE,
+    RequestScheduler,
+    current_lane,
+    is_overloaded_error,
+    is_rate_limit_error,
+    retry_after_of,
+)
+
+# モデル系統ごとの上限（RPM・TPM は Gemini API の有料 Tier 1 相当を少し控えめに）。
+# 環境変数 GEMINI_<系統>_RPM / _TPM / _CONCURRENCY で上書きできる（例: GEMINI_PRO_RPM=300）
+_FAMILY_LIMITS: dict[str, dict[str, int]] = {
+    "pro": {"rpm": 120, "tpm": 1_500_000, "concurrency": 6},
+    "flash": {"rpm": 800, "tpm": 900_000, "concurrency": 10},
+    "flash-lite": {"rpm": 2000, "tpm": 3_000_000, "concurrency": 10},
+}
+_RESERVE = 2             # 対話レーン専用に残す同時実行枠・トークン
+_RETRIES = {LANE_INTERACTIVE: 2}
+_DEFAULT_RETRIES = 4
+_IMAGE_TOKENS = 258      # 画像 1 枚あたりの入力トークン（Gemini の既定解像度）
+_DEFAULT_OUT_TOKENS = 1024
+
+
+def model_family(model: str) -> str:
+    name = (model or "").lower()
+    if "flash-lite" in name:
+        return "flash-lite"
+    if "flash" in name:
+        return "flash"
+    return "pro"
+
+
+def estimate_tokens(contents: Any, config: Any = None) -> int:
+    """TPM バケット用の見積もり（入力の文字数 / 2 ＋ 画像 ＋ 出力の既定値）。"""
+    chars = 0
+    images = 0
+
+    def walk(obj):
+        nonlocal chars, images
+        if obj is None:
+            return
+        if isinstance(obj, str):
+            chars += len(obj)
+        elif isinstance(obj, (bytes, bytearray)):
+            images += 1
+        elif isinstance(obj, (list, tuple)):
+            for v in obj:
+                walk(v)
+        elif isinstance(obj, dict):
+            for v in obj.values():
+                walk(v)
+        else:
+            text = getattr(obj, "text", None)
+            if isinstance(text, str):
+                chars += len(text)
+            if getattr(obj, "inline_data", None) is not None or getattr(obj, "file_data", None) is not None:
+                images += 1
+            parts = getattr(obj, "parts", None)
+            if parts:
+                walk(parts)
+
+    walk(contents)
+    if config is not None:
+        walk(getattr(config, "system_instruction", None))
+    out_tokens = int(getattr(config, "max_output_tokens", 0) or _DEFAULT_OUT_TOKENS)
+    return chars // 2 + images * _IMAGE_TOKENS + out_tokens
+
+
+def _limit(family: str, key: str) -> int:
+    env = os.getenv(f"GEMINI_{family.upper().replace('-', '_')}_{key.upper()}")
+    try:
+        return int(env) if env else _FAMILY_LIMITS[family][key]
+    except ValueError:
+        return _FAMILY_LIMITS[family][key]
+
+
+class GeminiDispatcher:
+    def __init__(self):
+        self._schedulers: dict[str, RequestScheduler] = {}
+        self.stats_counters = {"retries": 0, "rate_limited": 0, "overloaded": 0}
+
+    def scheduler_for(self, model: str) -> RequestScheduler:
+        family = model_family(model)
+        sched = self._schedulers.get(family)
+        if sched is None:
+            rpm = _limit(family, "rpm")
+            sched = RequestScheduler(
+                f"gemini_{family}",
+                rate=rpm / 60.0,
+                burst=max(_RESERVE + 2, rpm // 20),
+                max_concurrent=_limit(family, "concurrency"),
+                tpm=_limit(family, "tpm"),
+                reserve=_RESERVE,
+            )
+            self._schedulers[family] = sched
+        return sched
+
+    async def generate(self, call: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Any:
+        """call(*args, **kwargs)（generate_content）をスケジューラ越しに呼ぶ。429/503 は待って再試行。"""
+        model = str(kwargs.get("model") or (args[0] if args else "") or "")
+        sched = self.scheduler_for(model)
+        lane = current_lane()
+        cost = estimate_tokens(kwargs.get("contents"), kwargs.get("config"))
+        retries = _RETRIES.get(lane, _DEFAULT_RETRIES)
+        attempt = 0
+        while True:
+            async with sched.slot(lane, cost):
+                try:
+                    response = await call(*args, **kwargs)
+                except Exception as e:
+                    rate_limited = is_rate_limit_error(e)
+                    if not (rate_limited or is_overloaded_error(e)) or attempt >= retries:
+                        raise
+                    self.stats_counters["rate_limited" if rate_limited else "overloaded"] += 1
+                    self.stats_counters["retries"] += 1
+                    sched.penalize(retry_after_of(e))
+                    attempt += 1
+                    logging.info(f"gemini_dispatch: {model} ({lane}) を再試行 {attempt}/{retries}: {e}")
+                    continue
+            sched.reward()
+            meta = getattr(response, "usage_metadata", None)
+            used = int(getattr(meta, "total_token_count", 0) or 0)
+            if used:
+                sched.charge(used - cost)
+            return response
+
+    async def stream(self, call: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict):
+        """generate_content_stream 用。ストリームを読み終えるまで枠を占有し、チャンクをそのまま流す。
+        429/503 の再試行は最初のチャンクより前に失敗したときだけ（途中まで流した応答はやり直せない）。"""
+        model = str(kwargs.get("model") or (args[0] if args else "") or "")
+        sched = self.scheduler_for(model)
+        lane = current_lane()
+        cost = estimate_tokens(kwargs.get("contents"), kwargs.get("config"))
+        retries = _RETRIES.get(lane, _DEFAULT_RETRIES)
+        attempt = 0
+        while True:
+            used = 0
+            started = False
+            async with sched.slot(lane, cost):
+                try:
+                    async for chunk in await call(*args, **kwargs):
+                        started = True
+                        meta = getattr(chunk, "usage_metadata", None)
+                        used = int(getattr(meta, "total_token_count", 0) or 0) or used
+                        yield chunk
+                except Exception as e:
+                    rate_limited = is_rate_limit_error(e)
+                    if started or not (rate_limited or is_overloaded_error(e)) or attempt >= retries:
+                        raise
+                    self.stats_counters["rate_limited" if rate_limited else "overloaded"] += 1
+                    self.stats_counters["retries"] += 1
+                    sched.penalize(retry_after_of(e))
+                    attempt += 1
+                    logging.info(f"gemini_dispatch: {model} ({lane}) のストリームを再試行 {attempt}/{retries}: {e}")
+                    continue
+            sched.reward()
+            if used:
+                sched.charge(used - cost)
+            return
+
+    def stats(self) -> dict:
+        return {
+            "schedulers": {family: s.stats() for family, s in self._schedulers.items()},
+            **self.stats_counters,
+        }
+
+
+gemini_dispatcher = GeminiDispatcher()
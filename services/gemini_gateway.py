@@ -0,0 +1,244 @@
+"""Gemini 呼び出しの応答キャッシュと、同じ要求の同時実行のまとめ（機能ごとにオプトイン）。
+
+リンクのタグ付け・食事/支出のテキスト解析・時間帯要約・ニュースのダイジェスト・定期メッセージなどは、
+短い間に同じプロンプトで generate_content を呼ぶことが多い（再試行・二重トリガー・同じリンクの
+再登録など）。ここでは main.py の使用量フック（_install_gemini_usage_tracker）の内側で
+
+- gemini_cache(feature) の中で呼ばれた要求だけを対象に、(モデル, contents, config) の
+  ハッシュをキーにして応答をメモリ（LRU）と SQLite（gemini_response_cache）に FEATURE_TTL_SEC 保存する
+- 同じキーの要求が実行中なら、新たに送らずその結果を待つ
+- キャッシュから返した分は Gemini を呼ばないので record_api_usage にも計上しない。
+  機能ごとのヒット数と節約できたトークン・金額は gemini_cache_stats に日別で残し、
+  コストダッシュボード（/api/cost_summary の cache）に出す
+
+    from services.gemini_gateway import gemini_cache
+    with gemini_cache("link_tags"):
+        resp = await bot.gemini_client.aio.models.generate_content(model=m, contents=prompt)
+
+関数を渡す tools など、内容をハッシュにできない要求はそのまま送る。同じ応答を二度使うと困る呼び出し元
+（定期メッセージの保存など）は、with の値（CacheScope）の reused を見て処理を飛ばせる。
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+# 機能ごとの保存期間（秒）。ここに無い機能は gemini_cache(feature, ttl_sec=...) で指定しない限り素通し
+FEATURE_TTL_SEC: dict[str, int] = {
+    "link_tags": 30 * 86400,       # stocked_links._generate_tags（タイトル＋概要が同じなら同じタグ）
+    "meal_text": 6 * 3600,         # meals.analyze_meal_text（プロンプトに時刻が入るので実質 1 時間単位）
+    "expense_text": 6 * 3600,      # expenses.analyze_expense_text
+    "period_summary": 7 * 86400,   # daily_organize の時間帯要約（同じ発言ログなら同じ要約）
+    "news_digest": 12 * 3600,      # 保有銘柄ニュースのダイジェスト
+    "routine_message": 15 * 60,    # PartnerCog の定期メッセージ（複数 Cog からの二重トリガー対策）
+}
+_MEMORY_MAX = 256
+
+
+class CacheScope:
+    """gemini_cache の with が返す。reused は直近の応答がキャッシュか実行中の要求の使い回しだったか。"""
+
+    def __init__(self, feature: str, ttl_sec: Optional[int] = None):
+        self.feature = feature
+        self.ttl_sec = ttl_sec
+        self.reused = False
+
+
+_current: contextvars.ContextVar[Optional[CacheScope]] = contextvars.ContextVar(
+    "gemini_cache_scope", default=None
+)
+
+
+@contextlib.contextmanager
+def gemini_cache(feature: str, ttl_sec: Optional[int] = None):
+    """この中の generate_content 呼び出しを feature としてキャッシュ対象にする。"""
+    scope = CacheScope(feature, ttl_sec)
+    token = _current.set(scope)
+    try:
+        yield scope
+    finally:
+        _current.reset(token)
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _canonical(obj: Any) -> Any:
+    """要求の中身を JSON にできる形へ揃える（pydantic の型は model_dump、bytes はハッシュ）。"""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, (bytes, bytearray)):
+        return {"__bytes__": hashlib.sha256(bytes(obj)).hexdigest()}
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if hasattr(obj, "model_dump"):
+        return _canonical(obj.model_dump(exclude_none=True))
+    raise _Uncacheable(type(obj).__name__)
+
+
+def request_key(model: str, contents: Any, config: Any) -> str:
+    payload = json.dumps(
+        [str(model or ""), _canonical(contents), _canonical(config)],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _usage_tokens(response: Any) -> tuple[int, int]:
+    meta = getattr(response, "usage_metadata", None)
+    in_tokens = int(getattr(meta, "prompt_token_count", 0) or 0)
+    out_tokens = int(getattr(meta, "candidates_token_count", 0) or 0)
+    if not in_tokens and not out_tokens:
+        out_tokens = int(getattr(meta, "total_token_count", 0) or 0)
+    return in_tokens, out_tokens
+
+
+def _cacheable_response(response: Any) -> bool:
+    """本文のある応答だけ保存する（ブロック・空応答は次回また問い合わせる）。"""
+    try:
+        return bool((response.text or "").strip())
+    except Exception:
+        return False
+
+
+def _dump_response(response: Any) -> Optional[str]:
+    try:
+        return json.dumps(response.model_dump(mode="json", exclude_none=True), ensure_ascii=False)
+    except Exception as e:
+        logging.debug(f"gemini_gateway: 応答を保存できない形式: {e}")
+        return None
+
+
+def _load_response(raw: str) -> Any:
+    from google.genai import types
+
+    return types.GenerateContentResponse.model_validate(json.loads(raw))
+
+
+class GeminiGateway:
+    def __init__(self, ttls: Optional[dict[str, int]] = None, memory_max: int = _MEMORY_MAX):
+        self.ttls = dict(FEATURE_TTL_SEC if ttls is None else ttls)
+        self.memory_max = memory_max
+        # key -> (expires_at, model, response)
+        self._memory: OrderedDict[str, tuple[float, str, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats: dict[str, dict[str, int]] = {}
+
+    async def generate(self, call: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Any:
+        """call(*args, **kwargs)（実際の generate_content）をキャッシュ越しに呼ぶ。"""
+        scope = _current.get()
+        if scope is None:
+            return await call(*args, **kwargs)
+        feature = scope.feature
+        ttl = int(self.ttls.get(feature, 0) if scope.ttl_sec is None else scope.ttl_sec)
+        scope.reused = False
+        if ttl <= 0:
+            return await call(*args, **kwargs)
+        model = str(kwargs.get("model") or (args[0] if args else "") or "")
+        try:
+            key = request_key(model, kwargs.get("contents"), kwargs.get("config"))
+        except _Uncacheable as e:
+            logging.debug(f"gemini_gateway: {feature} はキャッシュ対象外の要求 ({e})")
+            return await call(*args, **kwargs)
+
+        cached = await self._lookup(key)
+        if cached is not None:
+            cached_model, response = cached
+            self._count(feature, "hits", cached_model, response)
+            scope.reused = True
+            return response
+
+        task = self._inflight.get(key)
+        if task is None:
+            self._count(feature, "misses")
+            task = asyncio.ensure_future(self._fill(key, feature, ttl, model, call, args, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            self._count(feature, "coalesced")
+            scope.reused = True
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: str) -> Optional[tuple[str, Any]]:
+        now = time.time()
+        hit = self._memory.get(key)
+        if hit is not None:
+            expires_at, model, response = hit
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                return model, response
+            self._memory.pop(key, None)
+
+        from api.database import gemini_response_cache_get
+
+        try:
+            row = await gemini_response_cache_get(key, now)
+            if not row:
+                return None
+            response = _load_response(row["response"])
+        except Exception as e:
+            logging.debug(f"gemini_gateway: キャッシュ読み込み失敗: {e}")
+            return None
+        self._remember(key, row["expires_at"], row["model"], response)
+        return row["model"], response
+
+    async def _fill(self, key, feature, ttl, model, call, args, kwargs) -> Any:
+        from api.database import gemini_response_cache_put
+
+        response = await call(*args, **kwargs)
+        if not _cacheable_response(response):
+            return response
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, model, response)
+        raw = _dump_response(response)
+        if raw is not None:
+            in_tokens, out_tokens = _usage_tokens(response)
+            try:
+                await gemini_response_cache_put(key, feature, model, raw, in_tokens, out_tokens, expires_at)
+            except Exception as e:
+                logging.debug(f"gemini_gateway: キャッシュ保存失敗 {feature}: {e}")
+        return response
+
+    def _remember(self, key: str, expires_at: float, model: str, response: Any) -> None:
+        self._memory[key] = (expires_at, model, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max:
+            self._memory.popitem(last=False)
+
+    def _count(self, feature: str, field: str, model: str = "", response: Any = None) -> None:
+        """ヒット・ミス・まとめた件数を数え、日別の集計へ書き込む（節約分はキャッシュ元の使用量）。"""
+        counters = self.stats.setdefault(feature, {"hits": 0, "misses": 0, "coalesced": 0})
+        counters[field] += 1
+        in_tokens = out_tokens = 0
+        if field == "hits" and response is not None:
+            in_tokens, out_tokens = _usage_tokens(response)
+
+        from utils.async_utils import safe_create_task
+
+        safe_create_task(
+            self._record(feature, field, model, in_tokens, out_tokens), name="gemini-cache-stats"
+        )
+
+    @staticmethod
+    async def _record(feature: str, field: str, model: str, in_tokens: int, out_tokens: int) -> None:
+        from api.database import gemini_cache_stats_add
+        from services.cost_meter_service import usd_cost
+
+        try:
+            saved_usd = usd_cost(model, in_tokens, out_tokens) if (in_tokens or out_tokens) else 0.0
+            await gemini_cache_stats_add(feature, field, in_tokens, out_tokens, saved_usd)
+        except Exception as e:
+            logging.debug(f"gemini_gateway: 集計の記録に失敗 {feature}: {e}")
+
+
+gemini_gateway = GeminiGateway()
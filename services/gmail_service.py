@@ -5,12 +5,11 @@
 - 受信ごとに DB に保存し、AI 要約 + 重要度判定の結果をキャッシュ。
 - 重要度 high のみプッシュ通知を送る（low/medium は静かに DB 保存）。
 """
-import asyncio
 import base64
 import logging
 from typing import Optional
 
-from googleapiclient.discovery import build
+from utils.executors import GOOGLE_API, run_in
 
 
 def _decode_b64_url(data: str) -> str:
@@ -68,6 +67,7 @@ class GmailService:
     def get_service(self):
         if not self.creds:
             return None
+        from googleapiclient.discovery import build
         return build("gmail", "v1", credentials=self.creds)
 
     async def list_unread(self, max_results: int = 20, newer_than_days: int = 1) -> list[dict]:
@@ -77,7 +77,8 @@ class GmailService:
             return []
         try:
             query = f"is:unread newer_than:{newer_than_days}d -category:promotions -category:social"
-            res = await asyncio.to_thread(
+            res = await run_in(
+                GOOGLE_API,
                 lambda: service.users().messages().list(
                     userId="me", q=query, maxResults=max_results
                 ).execute()
@@ -108,7 +109,8 @@ class GmailService:
                 }
                 if page_token:
                     kwargs["pageToken"] = page_token
-                res = await asyncio.to_thread(
+                res = await run_in(
+                    GOOGLE_API,
                     lambda k=kwargs: service.users().messages().list(**k).execute()
                 )
                 for m in (res.get("messages") or []):
@@ -129,7 +131,8 @@ class GmailService:
         if not service:
             return None
         try:
-            msg = await asyncio.to_thread(
+            msg = await run_in(
+                GOOGLE_API,
                 lambda: service.users().messages().get(
                     userId="me", id=message_id, format="full"
                 ).execute()
@@ -156,7 +159,8 @@ class GmailService:
         if not service:
             return False
         try:
-            await asyncio.to_thread(
+            await run_in(
+                GOOGLE_API,
                 lambda: service.users().messages().modify(
                     userId="me", id=message_id,
                     body={"removeLabelIds": ["UNREAD"]},
@@ -173,7 +177,8 @@ class GmailService:
         if not service:
             return False
         try:
-            await asyncio.to_thread(
+            await run_in(
+                GOOGLE_API,
                 lambda: service.users().messages().trash(userId="me", id=message_id).execute()
             )
             return True
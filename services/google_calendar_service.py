@@ -1,45 +1,254 @@
+"""Google Calendar API のラッパー（ローカルイベントストア付き）。
+
+予定の読み取り（直近の予定・日付ごとの一覧・キーワード削除の検索）は SQLite の
+ストア（gcal_events）から返す。ストアは最初に一定期間（過去 _WINDOW_PAST_DAYS 日〜
+先 _WINDOW_FUTURE_DAYS 日）を全件取り込み、以後は syncToken で変更分だけ取り直す
+（_SYNC_FRESH_SEC 以内の再読込は API を叩かない）。syncToken が失効した（410 Gone）
+ときはストアを捨てて全件同期し直す。作成・更新・削除は API の応答をそのままストアへ
+書き込む。取り込み期間の外を問われたときだけ、従来どおり API へ直接問い合わせる。
+"""
 import asyncio
+import json
 import logging
 import datetime
-from googleapiclient.discovery import build
+import time
 
 from config import JST
+from utils.executors import GOOGLE_API, run_in
+
+# 読み取り時、最後の同期からこの秒数以内ならストアをそのまま返す
+_SYNC_FRESH_SEC = 120
+# 全件同期で取り込む期間（今日を起点に過去/未来の日数）
+_WINDOW_PAST_DAYS = 30
+_WINDOW_FUTURE_DAYS = 400
+# 取り込み済み期間の未来側がこれより短くなったら全件同期で期間を伸ばす
+_WINDOW_MIN_AHEAD_DAYS = 365
+
+
+def _event_bound(edge: dict) -> tuple[float, bool]:
+    """start/end（dateTime か date）を (epoch 秒, 終日か) にする。終日は JST の 0 時。"""
+    if edge.get("dateTime"):
+        dt = datetime.datetime.fromisoformat(edge["dateTime"].replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=JST)
+        return dt.timestamp(), False
+    d = datetime.datetime.strptime(edge["date"], "%Y-%m-%d").replace(tzinfo=JST)
+    return d.timestamp(), True
+
+
+def _store_row(event: dict) -> dict:
+    """API のイベントリソースを gcal_events の行に変換する。"""
+    start, all_day = _event_bound(event.get("start") or {})
+    end = _event_bound(event["end"])[0] if event.get("end") else start
+    return {
+        "event_id": event["id"],
+        "status": event.get("status", ""),
+        "summary": event.get("summary", ""),
+        "description": event.get("description", ""),
+        "location": event.get("location", ""),
+        "start_epoch": start,
+        "end_epoch": max(start, end),
+        "all_day": 1 if all_day else 0,
+        "raw": json.dumps(event, ensure_ascii=False),
+    }
+
+
+def _day_bounds(date_str: str) -> tuple[datetime.datetime, datetime.datetime]:
+    """'YYYY-MM-DD' の JST 0 時と翌日 0 時。"""
+    dt = datetime.datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=JST)
+    return dt, dt + datetime.timedelta(days=1)
+
+
+def _is_gone(exc: BaseException) -> bool:
+    """syncToken の失効（HTTP 410 Gone）か。"""
+    status = getattr(getattr(exc, "resp", None), "status", None)
+    try:
+        return int(status) == 410
+    except (TypeError, ValueError):
+        return False
 
 
 class GoogleCalendarService:
     def __init__(self, creds, calendar_id="primary"):
         self.creds = creds
         self.calendar_id = calendar_id
+        self._sync_lock = asyncio.Lock()
+        self._last_sync: float | None = None  # time.monotonic()
+        self._change_listeners: list = []
+
+    def add_change_listener(self, callback) -> None:
+        """ストアの内容が変わったときに呼ばれる（引数なしの同期関数）。先回り通知の再計画用。"""
+        self._change_listeners.append(callback)
+
+    def _notify_change(self) -> None:
+        for cb in list(self._change_listeners):
+            try:
+                cb()
+            except Exception as e:
+                logging.debug(f"calendar change listener error: {e}")
 
     def get_service(self):
         if self.creds:
+            from googleapiclient.discovery import build
             return build("calendar", "v3", credentials=self.creds)
         return None
 
+    # ---- ストアの同期 ----
+
+    async def _list_all(self, service, **kwargs) -> tuple[list[dict], str]:
+        """events().list をページ送りして (全件, nextSyncToken) を返す。"""
+        items: list[dict] = []
+        token = None
+        while True:
+            params = dict(kwargs, calendarId=self.calendar_id, singleEvents=True, maxResults=250)
+            if token:
+                params["pageToken"] = token
+            res = await run_in(GOOGLE_API, lambda: service.events().list(**params).execute())
+            items.extend(res.get("items", []))
+            token = res.get("nextPageToken")
+            if not token:
+                return items, res.get("nextSyncToken", "")
+
+    async def _full_sync(self, service) -> None:
+        """取り込み期間を全件取り直し、ストアを置き換える。"""
+        from api.database import gcal_apply
+
+        today = datetime.datetime.now(JST).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - datetime.timedelta(days=_WINDOW_PAST_DAYS)
+        end = today + datetime.timedelta(days=_WINDOW_FUTURE_DAYS)
+        items, sync_token = await self._list_all(
+            service, timeMin=start.isoformat(), timeMax=end.isoformat(), showDeleted=False,
+        )
+        rows = []
+        for ev in items:
+            try:
+                rows.append(_store_row(ev))
+            except Exception as e:
+                logging.debug(f"カレンダー予定の変換に失敗: {ev.get('id')} {e}")
+        await gcal_apply(self.calendar_id, rows, replace=True, sync_token=sync_token,
+                         window=(start.timestamp(), end.timestamp()))
+        self._notify_change()
+
+    async def _delta_sync(self, service, sync_token: str) -> None:
+        """前回の syncToken 以降の変更だけ取り込む。キャンセル済みはストアから消す。"""
+        from api.database import gcal_apply
+
+        items, next_token = await self._list_all(service, syncToken=sync_token)
+        upserts, deletes = [], []
+        for ev in items:
+            if ev.get("status") == "cancelled":
+                deletes.append(ev["id"])
+                continue
+            try:
+                upserts.append(_store_row(ev))
+            except Exception as e:
+                logging.debug(f"カレンダー予定の変換に失敗: {ev.get('id')} {e}")
+        await gcal_apply(self.calendar_id, upserts, deletes, sync_token=next_token or sync_token)
+        if upserts or deletes:
+            self._notify_change()
+
+    async def _sync(self, service) -> None:
+        from api.database import gcal_clear, gcal_sync_state
+
+        state = await gcal_sync_state(self.calendar_id)
+        horizon = time.time() + _WINDOW_MIN_AHEAD_DAYS * 86400
+        if not state or not state.get("sync_token") or (state.get("window_end") or 0) < horizon:
+            await self._full_sync(service)
+            return
+        try:
+            await self._delta_sync(service, state["sync_token"])
+        except Exception as e:
+            if not _is_gone(e):
+                raise
+            logging.info("カレンダーの syncToken が失効したため全件同期し直します")
+            await gcal_clear(self.calendar_id)
+            await self._full_sync(service)
+
+    async def _ensure_fresh(self, service) -> bool:
+        """ストアが古ければ同期する（同時の同期は 1 本にまとめる）。
+
+        ストアを使える（同期済み）なら True。同期に失敗しても手持ちがあれば使う。"""
+        from api.database import gcal_sync_state
+
+        async with self._sync_lock:
+            if self._last_sync is None or time.monotonic() - self._last_sync >= _SYNC_FRESH_SEC:
+                try:
+                    await self._sync(service)
+                    self._last_sync = time.monotonic()
+                except Exception as e:
+                    logging.warning(f"カレンダーストア同期エラー: {e}")
+        try:
+            return await gcal_sync_state(self.calendar_id) is not None
+        except Exception as e:
+            logging.debug(f"gcal_sync 読み込みエラー: {e}")
+            return False
+
+    async def _events_between(self, service, time_min: datetime.datetime,
+                              time_max: datetime.datetime) -> list[dict]:
+        """[time_min, time_max) と重なる予定（API のイベントリソース）を開始順に返す。
+
+        取り込み期間内ならストアから、外ならその範囲だけ API に直接問い合わせる。"""
+        from api.database import gcal_query, gcal_sync_state
+
+        if await self._ensure_fresh(service):
+            state = await gcal_sync_state(self.calendar_id) or {}
+            lo, hi = time_min.timestamp(), time_max.timestamp()
+            if (state.get("window_start") or 0) <= lo and hi <= (state.get("window_end") or 0):
+                return await gcal_query(self.calendar_id, lo, hi)
+        events_result = await run_in(
+            GOOGLE_API,
+            lambda: (
+                service.events()
+                .list(
+                    calendarId=self.calendar_id,
+                    timeMin=time_min.isoformat(),
+                    timeMax=time_max.isoformat(),
+                    singleEvents=True,
+                    orderBy="startTime",
+                )
+                .execute()
+            )
+        )
+        return events_result.get("items", [])
+
+    async def remember_event(self, event: dict = None, deleted_id: str = None) -> None:
+        """API で作成・更新・削除した予定をストアへ即時反映する（失敗したら次回同期に任せる）。"""
+        from api.database import gcal_apply
+        try:
+            if event and event.get("id"):
+                if event.get("status") == "cancelled":
+                    await gcal_apply(self.calendar_id, [], [event["id"]])
+                else:
+                    await gcal_apply(self.calendar_id, [_store_row(event)])
+            if deleted_id:
+                await gcal_apply(self.calendar_id, [], [deleted_id])
+        except Exception as e:
+            logging.debug(f"カレンダーストア書き込みエラー: {e}")
+            self._last_sync = None  # 次の読み取りで差分同期させる
+            return
+        self._notify_change()
+
+    async def get_events_between(self, time_min: datetime.datetime, time_max: datetime.datetime) -> list[dict]:
+        """[time_min, time_max) と重なる予定（API のイベントリソース）を開始順に返す。失敗時は空。"""
+        service = self.get_service()
+        if not service:
+            return []
+        try:
+            return await self._events_between(service, time_min, time_max)
+        except Exception as e:
+            logging.error(f"Calendar Fetch Error: {e}")
+            return []
+
+    # ---- 公開 API ----
+
     async def get_upcoming_events(self, minutes=15):
         service = self.get_service()
         if not service:
             return []
 
         now = datetime.datetime.now(JST)
-        time_min = now.isoformat()
-        time_max = (now + datetime.timedelta(minutes=minutes)).isoformat()
-
         try:
-            events_result = await asyncio.to_thread(
-                lambda: (
-                    service.events()
-                    .list(
-                        calendarId=self.calendar_id,
-                        timeMin=time_min,
-                        timeMax=time_max,
-                        singleEvents=True,
-                        orderBy="startTime",
-                    )
-                    .execute()
-                )
-            )
-            return events_result.get("items", [])
+            return await self._events_between(service, now, now + datetime.timedelta(minutes=minutes))
         except Exception as e:
             logging.error(f"Calendar Fetch Error: {e}")
             return []
@@ -50,24 +259,7 @@ class GoogleCalendarService:
             return "エラー: カレンダーに接続できません。"
 
         try:
-            dt = datetime.datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=JST)
-            time_min = dt.replace(hour=0, minute=0, second=0).isoformat()
-            time_max = dt.replace(hour=23, minute=59, second=59).isoformat()
-
-            events_result = await asyncio.to_thread(
-                lambda: (
-                    service.events()
-                    .list(
-                        calendarId=self.calendar_id,
-                        timeMin=time_min,
-                        timeMax=time_max,
-                        singleEvents=True,
-                        orderBy="startTime",
-                    )
-                    .execute()
-                )
-            )
-            events = events_result.get("items", [])
+            events = await self._events_between(service, *_day_bounds(date_str))
 
             if not events:
                 return f"{date_str} の予定は特にないみたいだよ。"
@@ -156,13 +348,15 @@ class GoogleCalendarService:
             }
 
         try:
-            event = await asyncio.to_thread(
+            event = await run_in(
+                GOOGLE_API,
                 lambda: (
                     service.events()
                     .insert(calendarId=self.calendar_id, body=event_body)
                     .execute()
                 )
             )
+            await self.remember_event(event)
             return f"予定を作成したよ！: {event.get('htmlLink')}"
         except Exception as e:
             logging.error(f"Calendar Create Error: {e}")
@@ -176,7 +370,8 @@ class GoogleCalendarService:
 
         try:
             # 現在のイベントを取得
-            event = await asyncio.to_thread(
+            event = await run_in(
+                GOOGLE_API,
                 lambda: service.events().get(calendarId=self.calendar_id, eventId=event_id).execute()
             )
 
@@ -188,9 +383,11 @@ class GoogleCalendarService:
                 event["start"] = {"dateTime": self._format_iso_time(start_time), "timeZone": "Asia/Tokyo"}
                 event["end"] = {"dateTime": self._format_iso_time(end_time), "timeZone": "Asia/Tokyo"}
 
-            updated_event = await asyncio.to_thread(
+            updated_event = await run_in(
+                GOOGLE_API,
                 lambda: service.events().update(calendarId=self.calendar_id, eventId=event_id, body=event).execute()
             )
+            await self.remember_event(updated_event)
             return f"予定「{updated_event.get('summary')}」を更新したよ！"
         except Exception as e:
             logging.error(f"Calendar Update Error: {e}")
@@ -203,24 +400,7 @@ class GoogleCalendarService:
             return []
 
         try:
-            dt = datetime.datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=JST)
-            time_min = dt.replace(hour=0, minute=0, second=0).isoformat()
-            time_max = dt.replace(hour=23, minute=59, second=59).isoformat()
-
-            events_result = await asyncio.to_thread(
-                lambda: (
-                    service.events()
-                    .list(
-                        calendarId=self.calendar_id,
-                        timeMin=time_min,
-                        timeMax=time_max,
-                        singleEvents=True,
-                        orderBy="startTime",
-                    )
-                    .execute()
-                )
-            )
-            items = events_result.get("items", [])
+            items = await self._events_between(service, *_day_bounds(date_str))
             
             result = []
             for item in items:
@@ -249,13 +429,15 @@ class GoogleCalendarService:
             return "カレンダーに接続できませんでした。"
 
         try:
-            await asyncio.to_thread(
+            await run_in(
+                GOOGLE_API,
                 lambda: (
                     service.events()
                     .delete(calendarId=self.calendar_id, eventId=event_id)
                     .execute()
                 )
             )
+            await self.remember_event(deleted_id=event_id)
             return "カレンダーから予定を削除しました。"
         except Exception as e:
             logging.error(f"Calendar Delete Error: {e}")
@@ -268,26 +450,12 @@ class GoogleCalendarService:
             return "カレンダーに接続できませんでした。"
 
         try:
-            # 指定日の予定を検索
-            dt = datetime.datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=JST)
-            time_min = dt.replace(hour=0, minute=0, second=0).isoformat()
-            time_max = dt.replace(hour=23, minute=59, second=59).isoformat()
-
-            events_result = await asyncio.to_thread(
-                lambda: (
-                    service.events()
-                    .list(
-                        calendarId=self.calendar_id,
-                        timeMin=time_min,
-                        timeMax=time_max,
-                        q=keyword,
-                        singleEvents=True,
-                        orderBy="startTime",
-                    )
-                    .execute()
-                )
-            )
-            events = events_result.get("items", [])
+            # 指定日の予定からキーワード（タイトル・説明・場所）に一致するものを探す
+            kw = str(keyword or "").lower()
+            events = [
+                ev for ev in await self._events_between(service, *_day_bounds(date_str))
+                if kw in " ".join(str(ev.get(k, "")) for k in ("summary", "description", "location")).lower()
+            ]
 
             if not events:
                 return f"{date_str} に「{keyword}」を含む予定は見つからなかったため、削除できませんでした。"
@@ -297,13 +465,15 @@ class GoogleCalendarService:
             event_id = target_event["id"]
             summary = target_event.get("summary", "(タイトルなし)")
 
-            await asyncio.to_thread(
+            await run_in(
+                GOOGLE_API,
                 lambda: (
                     service.events()
                     .delete(calendarId=self.calendar_id, eventId=event_id)
                     .execute()
                 )
             )
+            await self.remember_event(deleted_id=event_id)
 
             return f"カレンダーから予定「{summary}」を削除したよ！"
         except Exception as e:
@@ -1,6 +1,5 @@
 import os
 import io
-import asyncio
 import logging
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
@@ -8,12 +7,16 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
 
 from config import TOKEN_FILE, SCOPES
+from utils.executors import GOOGLE_API, run_in
 
 
 class GoogleDriveService:
     def __init__(self, folder_id):
         self.folder_id = folder_id
         self.creds = None
+        # デイリーノート索引（services/note_index.py）用: DailyNotes フォルダと日付ファイルの ID
+        self._daily_folder_ids: set[str] = set()
+        self._daily_note_ids: dict[str, str] = {}
         self._load_credentials()
 
     def _load_credentials(self):
@@ -43,17 +46,46 @@ class GoogleDriveService:
             return build("drive", "v3", credentials=self.creds)
         return None
 
-    async def find_file(self, service, parent_id, name):
+    def _remember(self, parent_id, name, file_id):
+        if not file_id:
+            return
+        from services.note_index import DAILY_FOLDER, note_date_from_name
+
+        if name == DAILY_FOLDER:
+            self._daily_folder_ids.add(file_id)
+        elif parent_id in self._daily_folder_ids:
+            note_date = note_date_from_name(name)
+            if note_date:
+                self._daily_note_ids[file_id] = note_date
+
+    async def _index_note(self, file_id, content, modified_time=""):
+        """デイリーノートの読み書きを索引に反映する（失敗しても本処理には影響させない）。"""
+        note_date = self._daily_note_ids.get(file_id)
+        if not note_date or not content:
+            return
+        try:
+            from services.note_index import index_note
+            await index_note(note_date, content, file_id=file_id, modified_time=modified_time or "")
+        except Exception as e:
+            logging.debug(f"DriveService: note index update failed ({note_date}): {e}")
+
+    async def find_file(self, service, parent_id, name, strict=False):
+        """strict=True なら API エラーを投げる（既定は None＝見つからない扱い）。"""
         if not parent_id:
             return None
         query = f"'{parent_id}' in parents and name = '{name}' and trashed = false"
         try:
-            results = await asyncio.to_thread(
+            results = await run_in(
+                GOOGLE_API,
                 lambda: service.files().list(q=query, fields="files(id)").execute()
             )
             files = results.get("files", [])
-            return files[0]["id"] if files else None
+            file_id = files[0]["id"] if files else None
+            self._remember(parent_id, name, file_id)
+            return file_id
         except Exception:
+            if strict:
+                raise
             return None
 
     async def create_folder(self, service, parent_id, name):
@@ -64,9 +96,11 @@ class GoogleDriveService:
             "parents": [parent_id],
             "mimeType": "application/vnd.google-apps.folder",
         }
-        file = await asyncio.to_thread(
+        file = await run_in(
+            GOOGLE_API,
             lambda: service.files().create(body=file_metadata, fields="id").execute()
         )
+        self._remember(parent_id, name, file.get("id"))
         return file.get("id")
 
     # mime_type を引数で受け取れるように拡張（HabitのJSON保存用）
@@ -79,26 +113,34 @@ class GoogleDriveService:
         media = MediaIoBaseUpload(
             io.BytesIO(content.encode("utf-8")), mimetype=mime_type, resumable=True
         )
-        file = await asyncio.to_thread(
+        file = await run_in(
+            GOOGLE_API,
             lambda: (
                 service.files()
-                .create(body=file_metadata, media_body=media, fields="id")
+                .create(body=file_metadata, media_body=media, fields="id, modifiedTime")
                 .execute()
             )
         )
+        self._remember(parent_id, name, file.get("id"))
+        await self._index_note(file.get("id"), content, file.get("modifiedTime"))
         return file.get("id")
 
     async def update_text(self, service, file_id, content, mime_type="text/markdown"):
         media = MediaIoBaseUpload(
             io.BytesIO(content.encode("utf-8")), mimetype=mime_type, resumable=True
         )
-        await asyncio.to_thread(
-            lambda: service.files().update(fileId=file_id, media_body=media).execute()
+        file = await run_in(
+            GOOGLE_API,
+            lambda: service.files().update(
+                fileId=file_id, media_body=media, fields="id, modifiedTime"
+            ).execute()
         )
+        await self._index_note(file_id, content, (file or {}).get("modifiedTime"))
 
     async def delete_file(self, service, file_id):
         """ファイルをゴミ箱へ移動（trashed=True）。完全削除ではないので復元可能。"""
-        await asyncio.to_thread(
+        await run_in(
+            GOOGLE_API,
             lambda: service.files().update(
                 fileId=file_id, body={"trashed": True}
             ).execute()
@@ -114,7 +156,8 @@ class GoogleDriveService:
         media = MediaIoBaseUpload(
             io.FileIO(local_path, "rb"), mimetype=mime_type, resumable=True
         )
-        file = await asyncio.to_thread(
+        file = await run_in(
+            GOOGLE_API,
             lambda: (
                 service.files()
                 .create(body=file_metadata, media_body=media, fields="id")
@@ -130,21 +173,27 @@ class GoogleDriveService:
         media = MediaIoBaseUpload(
             io.FileIO(local_path, "rb"), mimetype=mime_type, resumable=True
         )
-        await asyncio.to_thread(
+        await run_in(
+            GOOGLE_API,
             lambda: service.files().update(fileId=file_id, media_body=media).execute()
         )
 
-    async def read_text_file(self, service, file_id):
+    async def read_text_file(self, service, file_id, strict=False):
+        """strict=True なら読み込みエラーを投げる（既定は空文字を返す）。"""
         try:
             request = service.files().get_media(fileId=file_id)
             fh = io.BytesIO()
             downloader = MediaIoBaseDownload(fh, request)
             done = False
             while not done:
-                _, done = await asyncio.to_thread(downloader.next_chunk)
-            return fh.getvalue().decode("utf-8")
+                _, done = await run_in(GOOGLE_API, downloader.next_chunk)
+            content = fh.getvalue().decode("utf-8")
         except Exception:
+            if strict:
+                raise
             return ""
+        await self._index_note(file_id, content)
+        return content
 
     async def search_markdown_files(self, keywords, limit=3):
         service = self.get_service()
@@ -152,7 +201,8 @@ class GoogleDriveService:
             return "Drive接続エラー"
         query = f"fullText contains '{keywords}' and mimeType = 'text/markdown' and trashed = false"
         try:
-            results = await asyncio.to_thread(
+            results = await run_in(
+                GOOGLE_API,
                 lambda: (
                     service.files()
                     .list(q=query, pageSize=limit, fields="files(id, name)")
@@ -180,7 +230,7 @@ class GoogleDriveService:
             downloader = MediaIoBaseDownload(fh, request)
             done = False
             while not done:
-                _, done = await asyncio.to_thread(downloader.next_chunk)
+                _, done = await run_in(GOOGLE_API, downloader.next_chunk)
             return fh.getvalue()
         except Exception as e:
             logging.error(f"DriveService: download_bytes error: {e}")
@@ -190,11 +240,11 @@ class GoogleDriveService:
         """指定したIDのファイルをローカルにダウンロードする（PDF読み込み用）"""
         try:
             request = service.files().get_media(fileId=file_id)
-            fh = io.FileIO(local_path, "wb")
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                _, done = await asyncio.to_thread(downloader.next_chunk)
+            with io.FileIO(local_path, "wb") as fh:
+                downloader = MediaIoBaseDownload(fh, request)
+                done = False
+                while not done:
+                    _, done = await run_in(GOOGLE_API, downloader.next_chunk)
             return True
         except Exception as e:
             logging.error(f"DriveService: Download error: {e}")
@@ -1,16 +1,71 @@
+"""Google Tasks API のラッパー（ローカルミラー付き）。
+
+読み取り（未完了一覧・今日の完了・キーワード検索・締切走査）は SQLite のミラー
+（gtasks_items）から返す。ミラーはリストごとに `updatedMin` で差分だけ取り直し
+（_SYNC_FRESH_SEC 以内の再読込は API を叩かない）、追加・完了・更新・削除・移動は
+API の応答をそのままミラーへ書き込む（write-through）。他端末での削除やパージの
+取りこぼしは reconcile()（全件照合）で解消する。リスト名→ID もキャッシュする。
+"""
 import logging
 import asyncio
 import datetime
-from googleapiclient.discovery import build
+import time
+from utils.executors import GOOGLE_API, run_in
+
+# 読み取り時、最後の同期からこの秒数以内ならミラーをそのまま返す
+_SYNC_FRESH_SEC = 60
+# 差分同期を続けてよい最長間隔。これを超えたら全件照合に切り替える
+_RECONCILE_SEC = 6 * 3600
+# updatedMin は端末間の時計ずれを見込んで少し遡る（重複は upsert で吸収される）
+_UPDATED_MIN_SKEW = datetime.timedelta(minutes=5)
+
+
+def _mirror_row(t: dict) -> dict:
+    """API のタスクリソースを gtasks_items の行に変換する。"""
+    return {
+        "task_id": t["id"],
+        "title": t.get("title", ""),
+        "notes": t.get("notes", ""),
+        "status": t.get("status", "needsAction"),
+        "due": t.get("due", ""),
+        "completed": t.get("completed", ""),
+        "parent": t.get("parent", ""),
+        "position": t.get("position", ""),
+        "hidden": 1 if t.get("hidden") else 0,
+        "updated": t.get("updated", ""),
+    }
+
+
+def _parse_ts(s: str):
+    try:
+        return datetime.datetime.fromisoformat(str(s).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
 
 
 class GoogleTasksService:
     def __init__(self, creds):
         self.creds = creds
+        self._list_ids: dict[str, str] = {}  # リスト名（小文字）→ ID
+        self._sync_locks: dict[str, asyncio.Lock] = {}
+        self._last_sync: dict[str, float] = {}  # list_id → time.monotonic()
+        self._change_listeners: list = []
+
+    def add_change_listener(self, callback) -> None:
+        """ミラーの内容が変わったときに呼ばれる（引数なしの同期関数）。先回り通知の再計画用。"""
+        self._change_listeners.append(callback)
+
+    def _notify_change(self) -> None:
+        for cb in list(self._change_listeners):
+            try:
+                cb()
+            except Exception as e:
+                logging.debug(f"tasks change listener error: {e}")
 
     def get_service(self):
         if self.creds:
             try:
+                from googleapiclient.discovery import build
                 return build("tasks", "v1", credentials=self.creds)
             except Exception as e:
                 logging.error(f"Tasks API Auth Error: {e}")
@@ -20,40 +75,165 @@ class GoogleTasksService:
         """指定された名前のリストIDを取得する。なければデフォルトを返す"""
         if not list_name:
             return "@default"
-        loop = asyncio.get_running_loop()
+        key = list_name.lower()
+        if key in self._list_ids:
+            return self._list_ids[key]
+        from api.database import gtasks_list_put, gtasks_lists_all
         try:
-            res = await loop.run_in_executor(
-                None, lambda: service.tasklists().list().execute()
-            )
-            for item in res.get("items", []):
-                if list_name.lower() == item["title"].lower():
-                    return item["id"]
-            # 見つからなかった場合は新規作成する
-            res = await loop.run_in_executor(
-                None,
-                lambda: service.tasklists().insert(body={"title": list_name}).execute(),
+            for row in await gtasks_lists_all():
+                if row.get("title"):
+                    self._list_ids.setdefault(row["title"].lower(), row["list_id"])
+        except Exception as e:
+            logging.debug(f"gtasks_lists 読み込みエラー: {e}")
+        if key in self._list_ids:
+            return self._list_ids[key]
+        try:
+            res = await run_in(
+                GOOGLE_API, lambda: service.tasklists().list().execute()
             )
-            return res.get("id", "@default")
+            found = {item["title"]: item["id"] for item in res.get("items", [])}
+            if not any(t.lower() == key for t in found):
+                # 見つからなかった場合は新規作成する
+                res = await run_in(
+                    GOOGLE_API,
+                    lambda: service.tasklists().insert(body={"title": list_name}).execute(),
+                )
+                if not res.get("id"):
+                    return "@default"
+                found[list_name] = res["id"]
         except Exception as e:
             logging.error(f"Tasklist ID fetch error: {e}")
             return "@default"
+        for title, list_id in found.items():
+            self._list_ids[title.lower()] = list_id
+            try:
+                await gtasks_list_put(list_id, title)
+            except Exception as e:
+                logging.debug(f"gtasks_lists 保存エラー: {e}")
+        return self._list_ids[key]
+
+    # ---- ミラーの同期 ----
+
+    async def _list_all(self, service, **kwargs) -> list[dict]:
+        """tasks().list をページ送りして全件返す。"""
+        items: list[dict] = []
+        token = None
+        while True:
+            params = dict(kwargs, maxResults=100)
+            if token:
+                params["pageToken"] = token
+            res = await run_in(
+                GOOGLE_API, lambda: service.tasks().list(**params).execute()
+            )
+            items.extend(res.get("items", []))
+            token = res.get("nextPageToken")
+            if not token:
+                return items
+
+    async def _sync_list(self, service, list_id: str, *, full: bool = False) -> None:
+        """1 リストをミラーへ同期する。前回の同期時刻があれば updatedMin で差分だけ取る。"""
+        from api.database import gtasks_apply, gtasks_lists_all
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        meta = next((r for r in await gtasks_lists_all() if r["list_id"] == list_id), None) or {}
+        synced_at = _parse_ts(meta.get("synced_at"))
+        full_at = _parse_ts(meta.get("full_synced_at"))
+        if not full and (synced_at is None or full_at is None
+                         or (now - full_at).total_seconds() > _RECONCILE_SEC):
+            full = True
+
+        if full:
+            items = await self._list_all(service, tasklist=list_id, showCompleted=True, showHidden=True)
+            await gtasks_apply(list_id, [_mirror_row(t) for t in items], replace=True,
+                               synced_at=now.isoformat())
+            self._notify_change()
+        else:
+            updated_min = (synced_at - _UPDATED_MIN_SKEW).isoformat()
+            items = await self._list_all(
+                service, tasklist=list_id, showCompleted=True, showHidden=True,
+                showDeleted=True, updatedMin=updated_min,
+            )
+            await gtasks_apply(
+                list_id,
+                [_mirror_row(t) for t in items if not t.get("deleted")],
+                [t["id"] for t in items if t.get("deleted")],
+                synced_at=now.isoformat(),
+            )
+            if items:
+                self._notify_change()
+        self._last_sync[list_id] = time.monotonic()
+
+    async def _ensure_fresh(self, service, list_id: str) -> None:
+        """ミラーが古ければ差分同期する（同じリストの同期は 1 本にまとめる）。失敗時は手持ちで続行。"""
+        lock = self._sync_locks.setdefault(list_id, asyncio.Lock())
+        async with lock:
+            last = self._last_sync.get(list_id)
+            if last is not None and time.monotonic() - last < _SYNC_FRESH_SEC:
+                return
+            try:
+                await self._sync_list(service, list_id)
+            except Exception as e:
+                logging.warning(f"Tasks ミラー同期エラー ({list_id}): {e}")
+
+    async def _mirrored(self, list_name: str = None, status: str = None, keyword: str = ""):
+        """(service, list_id, ミラーの行) を返す。API に繋がらなければ service は None。"""
+        from api.database import gtasks_query
 
-    async def get_uncompleted_tasks(self, list_name: str = None):
         service = self.get_service()
         if not service:
-            return "Tasks APIに接続できませんでした。"
+            return None, None, []
+        list_id = await self._get_tasklist_id(service, list_name)
+        await self._ensure_fresh(service, list_id)
+        return service, list_id, await gtasks_query(list_id, status=status, keyword=keyword)
+
+    async def _write_through(self, list_id: str, task: dict = None, deleted_id: str = None) -> None:
+        from api.database import gtasks_apply
         try:
-            list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(
-                None,
-                lambda: (
-                    service.tasks()
-                    .list(tasklist=list_id, showCompleted=False)
-                    .execute()
-                ),
-            )
-            items = res.get("items", [])
+            if task and task.get("id"):
+                await gtasks_apply(list_id, [_mirror_row(task)])
+            if deleted_id:
+                await gtasks_apply(list_id, [], [deleted_id])
+        except Exception as e:
+            logging.debug(f"Tasks ミラー書き込みエラー: {e}")
+            self._last_sync.pop(list_id, None)  # 次の読み取りで差分同期させる
+            return
+        self._notify_change()
+
+    async def reconcile(self, list_names: list = None) -> int:
+        """キャッシュ済みの全リスト（または指定リスト）を全件照合し、削除・パージを反映する。"""
+        from api.database import gtasks_lists_all
+
+        service = self.get_service()
+        if not service:
+            return 0
+        if list_names:
+            list_ids = [await self._get_tasklist_id(service, n) for n in list_names]
+        else:
+            list_ids = [r["list_id"] for r in await gtasks_lists_all()]
+        done = 0
+        for list_id in dict.fromkeys(list_ids):
+            lock = self._sync_locks.setdefault(list_id, asyncio.Lock())
+            async with lock:
+                try:
+                    await self._sync_list(service, list_id, full=True)
+                    done += 1
+                except Exception as e:
+                    logging.warning(f"Tasks 全件照合エラー ({list_id}): {e}")
+        return done
+
+    async def find_tasks(self, keyword: str = "", list_name: str = None, status: str = None) -> list[dict]:
+        """ミラーからタイトルに keyword を含むタスクを返す（status で未完了/完了を絞れる）。"""
+        _service, _list_id, rows = await self._mirrored(list_name, status=status, keyword=keyword)
+        return [{"id": r["task_id"], **{k: v for k, v in r.items() if k not in ("task_id", "list_id")}}
+                for r in rows]
+
+    # ---- 公開 API ----
+
+    async def get_uncompleted_tasks(self, list_name: str = None):
+        try:
+            service, _list_id, items = await self._mirrored(list_name, status="needsAction")
+            if not service:
+                return "Tasks APIに接続できませんでした。"
             if not items:
                 return f"「{list_name or 'デフォルト'}」リストに未完了のタスクはありません。"
 
@@ -83,126 +263,79 @@ class GoogleTasksService:
             return "Tasks APIに接続できませんでした。"
         try:
             list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
             body = {"title": title, "notes": notes}
             normalized_due = self._normalize_due(due)
             if normalized_due:
                 body["due"] = normalized_due
-            await loop.run_in_executor(
-                None,
+            created = await run_in(
+                GOOGLE_API,
                 lambda: service.tasks().insert(tasklist=list_id, body=body).execute(),
             )
+            await self._write_through(list_id, created)
             return f"リスト「{list_name or 'デフォルト'}」にタスク「{title}」を追加したよ！"
         except Exception as e:
             return f"タスクの追加に失敗しました: {e}"
 
     async def complete_task_by_keyword(self, keyword: str, list_name: str = None):
-        service = self.get_service()
-        if not service:
-            return "Tasks APIに接続できませんでした。"
         try:
-            list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(
-                None,
-                lambda: (
-                    service.tasks()
-                    .list(tasklist=list_id, showCompleted=False)
-                    .execute()
-                ),
-            )
-            items = res.get("items", [])
-
-            target_task = next(
-                (t for t in items if keyword.lower() in t["title"].lower()), None
-            )
+            service, list_id, items = await self._mirrored(list_name, status="needsAction", keyword=keyword)
+            if not service:
+                return "Tasks APIに接続できませんでした。"
+            target_task = items[0] if items else None
             if not target_task:
                 return f"「{keyword}」を含む未完了タスクがリスト「{list_name or 'デフォルト'}」に見つからなかったよ。"
 
-            await loop.run_in_executor(
-                None,
+            patched = await run_in(
+                GOOGLE_API,
                 lambda: (
                     service.tasks()
                     .patch(
                         tasklist=list_id,
-                        task=target_task["id"],
+                        task=target_task["task_id"],
                         body={"status": "completed"},
                     )
                     .execute()
                 ),
             )
+            await self._write_through(list_id, patched)
             return f"タスク「{target_task['title']}」を完了にしたよ！お疲れ様！"
         except Exception as e:
             return f"タスクの完了処理に失敗しました: {e}"
 
     async def delete_task_by_keyword(self, keyword: str, list_name: str = None):
-        service = self.get_service()
-        if not service:
-            return "Tasks APIに接続できませんでした。"
         try:
-            list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(
-                None,
-                lambda: service.tasks().list(tasklist=list_id, showCompleted=False).execute(),
-            )
-            items = res.get("items", [])
-
-            target_task = next(
-                (t for t in items if keyword.lower() in t["title"].lower()), None
-            )
+            service, list_id, items = await self._mirrored(list_name, status="needsAction", keyword=keyword)
+            if not service:
+                return "Tasks APIに接続できませんでした。"
+            target_task = items[0] if items else None
             if not target_task:
                 return f"「{keyword}」を含む未完了タスクがリスト「{list_name or 'デフォルト'}」に見つかりませんでした。"
 
-            await loop.run_in_executor(
-                None,
-                lambda: service.tasks().delete(tasklist=list_id, task=target_task["id"]).execute(),
+            await run_in(
+                GOOGLE_API,
+                lambda: service.tasks().delete(tasklist=list_id, task=target_task["task_id"]).execute(),
             )
+            await self._write_through(list_id, deleted_id=target_task["task_id"])
             return f"タスク「{target_task['title']}」を削除しました。"
         except Exception as e:
             return f"タスクの削除処理に失敗しました: {e}"
 
     async def get_completed_tasks_today(self, list_name: str = "習慣"):
         """今日完了になったタスク（カレンダー上でチェックされたもの）を取得する"""
-        service = self.get_service()
-        if not service:
-            return []
         try:
-            list_id = await self._get_tasklist_id(service, list_name)
+            service, list_id, items = await self._mirrored(list_name, status="completed")
+            if not service:
+                return []
             if list_id == "@default" and list_name == "習慣":
                 return []  # 防御的処理
 
             jst = datetime.timezone(datetime.timedelta(hours=9))
-            now = datetime.datetime.now(jst)
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            updated_min = today_start.isoformat()
-
-            loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(
-                None,
-                lambda: (
-                    service.tasks()
-                    .list(
-                        tasklist=list_id,
-                        showCompleted=True,
-                        showHidden=True,
-                        updatedMin=updated_min,
-                    )
-                    .execute()
-                ),
-            )
-
+            today = datetime.datetime.now(jst).date()
             completed_titles = []
-            for t in res.get("items", []):
-                if t.get("status") == "completed" and "completed" in t:
-                    try:
-                        comp_time = datetime.datetime.fromisoformat(
-                            t["completed"].replace("Z", "+00:00")
-                        )
-                        if comp_time.astimezone(jst).date() == now.date():
-                            completed_titles.append(t["title"])
-                    except Exception:
-                        pass
+            for t in items:
+                comp_time = _parse_ts(t.get("completed"))
+                if comp_time and comp_time.astimezone(jst).date() == today:
+                    completed_titles.append(t["title"])
             return completed_titles
         except Exception as e:
             logging.error(f"get_completed_tasks_today error: {e}")
@@ -215,11 +348,11 @@ class GoogleTasksService:
             return "Tasks APIに接続できませんでした。"
         try:
             list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
-            await loop.run_in_executor(
-                None,
+            await run_in(
+                GOOGLE_API,
                 lambda: service.tasks().delete(tasklist=list_id, task=task_id).execute(),
             )
+            await self._write_through(list_id, deleted_id=task_id)
             return "タスクを削除しました。"
         except Exception as e:
             return f"タスクの削除に失敗しました: {e}"
@@ -231,11 +364,10 @@ class GoogleTasksService:
             return "Tasks APIに接続できませんでした。"
         try:
             list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
 
             # 現在の状態を取得
-            task = await loop.run_in_executor(
-                None,
+            task = await run_in(
+                GOOGLE_API,
                 lambda: service.tasks().get(tasklist=list_id, task=task_id).execute(),
             )
 
@@ -252,10 +384,11 @@ class GoogleTasksService:
             elif completed is False:
                 task["status"] = "needsAction"
 
-            await loop.run_in_executor(
-                None,
+            updated = await run_in(
+                GOOGLE_API,
                 lambda: service.tasks().update(tasklist=list_id, task=task_id, body=task).execute(),
             )
+            await self._write_through(list_id, updated)
             return f"タスク「{task['title']}」を更新しました。"
         except Exception as e:
             return f"タスクの更新に失敗しました: {e}"
@@ -263,26 +396,18 @@ class GoogleTasksService:
     async def get_raw_tasks(self, list_name: str = None):
         """未完了タスクのパッチ用データをリストで取得する。due/parent/position を含む。
         Google Tasks の position（ユーザーが並び替えたユーザー指定順）でソートする。"""
-        service = self.get_service()
-        if not service: return []
         try:
-            list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(
-                None,
-                lambda: service.tasks().list(tasklist=list_id, showCompleted=False).execute(),
-            )
-            items = res.get("items", [])
-            # position は文字列ソート可能な形式で並び順を保持する。
-            items = sorted(items, key=lambda t: (t.get("parent", ""), t.get("position", "")))
+            service, _list_id, items = await self._mirrored(list_name, status="needsAction")
+            if not service:
+                return []
             return [
                 {
-                    "id": t["id"],
+                    "id": t["task_id"],
                     "title": t["title"],
-                    "notes": t.get("notes", ""),
-                    "due": t.get("due", ""),
-                    "parent": t.get("parent", ""),
-                    "position": t.get("position", ""),
+                    "notes": t.get("notes") or "",
+                    "due": t.get("due") or "",
+                    "parent": t.get("parent") or "",
+                    "position": t.get("position") or "",
                 }
                 for t in items
             ]
@@ -291,29 +416,21 @@ class GoogleTasksService:
 
     async def reset_completed_tasks(self, list_name: str = "習慣"):
         """完了済みタスクをすべて needsAction にリセットする（翌日用）"""
-        service = self.get_service()
-        if not service:
-            return
         try:
-            list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(
-                None,
-                lambda: service.tasks().list(
-                    tasklist=list_id, showCompleted=True, showHidden=True
-                ).execute(),
-            )
-            for t in res.get("items", []):
-                if t.get("status") == "completed":
-                    task_id = t["id"]
-                    await loop.run_in_executor(
-                        None,
-                        lambda tid=task_id: service.tasks().patch(
-                            tasklist=list_id,
-                            task=tid,
-                            body={"status": "needsAction"},
-                        ).execute(),
-                    )
+            service, list_id, items = await self._mirrored(list_name, status="completed")
+            if not service:
+                return
+            for t in items:
+                task_id = t["task_id"]
+                patched = await run_in(
+                    GOOGLE_API,
+                    lambda tid=task_id: service.tasks().patch(
+                        tasklist=list_id,
+                        task=tid,
+                        body={"status": "needsAction"},
+                    ).execute(),
+                )
+                await self._write_through(list_id, patched)
         except Exception as e:
             logging.error(f"reset_completed_tasks error: {e}")
 
@@ -325,17 +442,16 @@ class GoogleTasksService:
             return "Tasks APIに接続できませんでした。"
         try:
             list_id = await self._get_tasklist_id(service, list_name)
-            loop = asyncio.get_running_loop()
             kwargs = {"tasklist": list_id, "task": task_id}
             if previous_task_id:
                 kwargs["previous"] = previous_task_id
             if parent:
                 kwargs["parent"] = parent
-            await loop.run_in_executor(
-                None,
+            moved = await run_in(
+                GOOGLE_API,
                 lambda: service.tasks().move(**kwargs).execute(),
             )
+            await self._write_through(list_id, moved)
             return "タスクを移動しました。"
         except Exception as e:
             return f"タスクの移動に失敗しました: {e}"
-
@@ -0,0 +1,305 @@
+"""銘柄ごとのテクニカル指標の「逐次状態」。
+
+スクリーナー・出口判定・ポジション診断は毎回 420 日分の履歴から 200日MA・52週高値・
+ATR・RSI を計算し直していたが、日足は 1 日 1 本しか増えない。そこで指標の途中状態
+（移動平均の累積和、RSI の Wilder 平滑値、ローリング高値/安値の単調デック、出来高平均）を
+銘柄ごとに SQLite (`indicator_state` テーブル) へ永続化し、新しい足が追記されたときは
+O(1) で 1 本ずつ前進させる。過去の足が改訂された（分割・配当の遡及調整など）ときだけ
+全履歴から作り直す。
+
+計算式は TechnicalSignals（pandas のバッチ計算）と同一で、値は浮動小数の誤差範囲で一致する:
+  - SMA: rolling(n, min_periods=n).mean()
+  - ATR: TR の rolling(14, min_periods=7).mean()（TechnicalSignals.atr と同じ単純平均）
+  - RSI: ewm(alpha=1/14, adjust=False, min_periods=14)（Wilder 平滑）
+  - 高値/安値: 直近 n 本の max/min（本数不足時は全期間）
+pandas に依存しない純 Python 実装（状態の前進・JSON 化とも）。
+"""
+from __future__ import annotations
+
+import json
+import math
+from collections import deque
+from typing import Iterable, Optional
+
+# 状態のスキーマ版。フィールド構成を変えたら上げる（旧版は作り直し対象になる）。
+STATE_VERSION = 1
+
+_SMA_WINDOWS = (25, 50, 75, 200)
+_ATR_N = 14
+_ATR_MIN_PERIODS = max(1, _ATR_N // 2)
+_RSI_N = 14
+_HIGH_WINDOWS = (22, 60, 252)
+_LOW_WINDOWS = (252,)
+_VOL_SHORT = 5
+_VOL_LONG = 20
+# relative_strength_blended の最長期間（252立会日前の終値）を引けるだけ終値を保持する
+_RS_PERIODS = ((63, 2.0), (126, 1.0), (189, 1.0), (252, 1.0))
+_CLOSE_WINDOW = 253
+# 全ウィンドウが埋まる本数。これ以上あれば、どこから数え始めた履歴でもバッチ計算と一致する。
+FULL_WINDOW = _CLOSE_WINDOW
+# 累積和の丸め誤差が溜まらないよう、この本数ごとにウィンドウから和を取り直す
+_RESUM_EVERY = 256
+
+
+class _MonotonicWindow:
+    """直近 window 本のローリング max（sign=-1 で min）を O(1) 償却で保持する単調デック。"""
+
+    def __init__(self, window: int, sign: int = 1):
+        self.window = window
+        self.sign = sign
+        self._dq: deque = deque()  # (位置, 値)。値は sign 倍で単調減少
+
+    def push(self, idx: int, value: float) -> None:
+        v = value * self.sign
+        while self._dq and self._dq[-1][1] <= v:
+            self._dq.pop()
+        self._dq.append((idx, v))
+        while self._dq[0][0] <= idx - self.window:
+            self._dq.popleft()
+
+    def value(self) -> Optional[float]:
+        return self._dq[0][1] * self.sign if self._dq else None
+
+    def to_list(self) -> list:
+        return [[i, v] for i, v in self._dq]
+
+    @classmethod
+    def from_list(cls, window: int, sign: int, items: list) -> "_MonotonicWindow":
+        w = cls(window, sign)
+        w._dq = deque((int(i), float(v)) for i, v in items or [])
+        return w
+
+
+def _num(v) -> Optional[float]:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+class IndicatorState:
+    """1 銘柄ぶんの逐次指標状態。update() で 1 本ずつ前進し、snapshot() で現在値を返す。"""
+
+    def __init__(self):
+        self.last_date = ""
+        self.bars = 0
+        self.closes: deque = deque(maxlen=_CLOSE_WINDOW)
+        self.sma_sums = {n: 0.0 for n in _SMA_WINDOWS}
+        self.prev_close: Optional[float] = None
+        self.tr: deque = deque(maxlen=_ATR_N)
+        self.tr_sum = 0.0
+        self.rsi_gain: Optional[float] = None
+        self.rsi_loss: Optional[float] = None
+        self.rsi_count = 0
+        self.last_volume = 0.0
+        self.volumes: deque = deque(maxlen=_VOL_LONG)
+        self.turnovers: deque = deque(maxlen=_VOL_LONG)
+        self.highs = {n: _MonotonicWindow(n, 1) for n in _HIGH_WINDOWS}
+        self.lows = {n: _MonotonicWindow(n, -1) for n in _LOW_WINDOWS}
+
+    # ---- 前進 ----
+
+    def update(self, row: dict) -> None:
+        """日付昇順で 1 本追加する。row は {date, open, high, low, close, volume}。
+
+        OHLC が欠損した足は pandas 側で NaN になり窓計算の結果が変わるため、状態を
+        リセットしてその次の足から数え直す（FULL_WINDOW 本たまれば再びバッチと一致）。"""
+        high, low, close = _num(row.get("high")), _num(row.get("low")), _num(row.get("close"))
+        date = str(row.get("date") or "")[:10]
+        if high is None or low is None or close is None:
+            self.__init__()
+            self.last_date = date
+            return
+        volume = _num(row.get("volume")) or 0.0
+        idx = self.bars
+
+        # SMA: 窓から外れる終値を引き、新しい終値を足す
+        held = len(self.closes)
+        for n in _SMA_WINDOWS:
+            if held >= n:
+                self.sma_sums[n] -= self.closes[-n]
+            self.sma_sums[n] += close
+        self.closes.append(close)
+
+        # ATR（TR の単純移動平均）。先頭足は前日終値が無いので高安差のみ。
+        if self.prev_close is None:
+            tr = abs(high - low)
+        else:
+            tr = max(abs(high - low), abs(high - self.prev_close), abs(low - self.prev_close))
+        if len(self.tr) == _ATR_N:
+            self.tr_sum -= self.tr[0]
+        self.tr.append(tr)
+        self.tr_sum += tr
+
+        # RSI（Wilder 平滑 = ewm(alpha=1/n, adjust=False)。初回の差分がそのまま初期値）
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if self.rsi_gain is None:
+                self.rsi_gain, self.rsi_loss = gain, loss
+            else:
+                a = 1.0 / _RSI_N
+                self.rsi_gain += a * (gain - self.rsi_gain)
+                self.rsi_loss += a * (loss - self.rsi_loss)
+            self.rsi_count += 1
+
+        for w in self.highs.values():
+            w.push(idx, high)
+        for w in self.lows.values():
+            w.push(idx, low)
+
+        self.volumes.append(volume)
+        self.turnovers.append(volume * close)
+        self.last_volume = volume
+
+        self.prev_close = close
+        self.bars += 1
+        self.last_date = date
+        if self.bars % _RESUM_EVERY == 0:
+            self._resum()
+
+    def extend(self, rows: Iterable[dict]) -> "IndicatorState":
+        for r in rows:
+            self.update(r)
+        return self
+
+    def _resum(self) -> None:
+        closes = list(self.closes)
+        for n in _SMA_WINDOWS:
+            self.sma_sums[n] = math.fsum(closes[-n:])
+        self.tr_sum = math.fsum(self.tr)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "IndicatorState":
+        """日付昇順の OHLCV 行から状態を作り直す（履歴改訂時の再構築用）。"""
+        return cls().extend(rows)
+
+    # ---- 参照 ----
+
+    def snapshot(self) -> dict:
+        """現在の指標値を dict で返す。本数不足で定義できない値は None。"""
+        closes = list(self.closes)
+        n = len(closes)
+        out: dict = {
+            "version": STATE_VERSION,
+            "as_of": self.last_date,
+            "bars": self.bars,
+            "close": closes[-1] if n else None,
+            "prev_close": closes[-2] if n >= 2 else (closes[-1] if n else None),
+            "volume": self.last_volume,
+        }
+        for w in _SMA_WINDOWS:
+            out[f"sma{w}"] = (self.sma_sums[w] / w) if n >= w else None
+        out[f"atr{_ATR_N}"] = (self.tr_sum / len(self.tr)) if len(self.tr) >= _ATR_MIN_PERIODS else None
+        rsi = None
+        if self.rsi_count >= _RSI_N and self.rsi_loss:
+            rsi = 100 - 100 / (1 + self.rsi_gain / self.rsi_loss)
+        out[f"rsi{_RSI_N}"] = rsi
+        for w, mw in self.highs.items():
+            out[f"high_{w}"] = mw.value()
+        for w, mw in self.lows.items():
+            out[f"low_{w}"] = mw.value()
+        vols = list(self.volumes)
+        out[f"vol_avg{_VOL_SHORT}"] = (sum(vols[-_VOL_SHORT:]) / _VOL_SHORT) if len(vols) >= _VOL_SHORT else None
+        out[f"vol_avg{_VOL_LONG}"] = (sum(vols) / _VOL_LONG) if len(vols) >= _VOL_LONG else None
+        # assess_liquidity と同じく、本数が足りなければ取れた分だけで平均する
+        out["turnover_avg20"] = (sum(self.turnovers) / len(self.turnovers)) if self.turnovers else None
+        out["rs_blended"] = self._rs_blended(closes)
+        return out
+
+    @staticmethod
+    def _rs_blended(closes: list) -> Optional[float]:
+        """screener_engine.relative_strength_blended と同じ加重リターン。"""
+        n = len(closes)
+        if not n:
+            return None
+        new = closes[-1]
+        num = den = 0.0
+        for p, w in _RS_PERIODS:
+            if n <= p:
+                continue
+            old = closes[-p - 1]
+            if old <= 0:
+                continue
+            num += w * (new / old - 1.0)
+            den += w
+        return (num / den) if den > 0 else None
+
+    # ---- 永続化 ----
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "v": STATE_VERSION,
+            "last_date": self.last_date,
+            "bars": self.bars,
+            "closes": list(self.closes),
+            "sma_sums": {str(k): v for k, v in self.sma_sums.items()},
+            "prev_close": self.prev_close,
+            "tr": list(self.tr),
+            "tr_sum": self.tr_sum,
+            "rsi": [self.rsi_gain, self.rsi_loss, self.rsi_count],
+            "last_volume": self.last_volume,
+            "volumes": list(self.volumes),
+            "turnovers": list(self.turnovers),
+            "highs": {str(k): w.to_list() for k, w in self.highs.items()},
+            "lows": {str(k): w.to_list() for k, w in self.lows.items()},
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: str) -> Optional["IndicatorState"]:
+        """to_json の逆。版違い・破損時は None（呼び出し側で作り直す）。"""
+        try:
+            d = json.loads(raw)
+            if d.get("v") != STATE_VERSION:
+                return None
+            st = cls()
+            st.last_date = d["last_date"]
+            st.bars = int(d["bars"])
+            st.closes = deque((float(x) for x in d["closes"]), maxlen=_CLOSE_WINDOW)
+            st.sma_sums = {n: float(d["sma_sums"][str(n)]) for n in _SMA_WINDOWS}
+            st.prev_close = d["prev_close"]
+            st.tr = deque((float(x) for x in d["tr"]), maxlen=_ATR_N)
+            st.tr_sum = float(d["tr_sum"])
+            st.rsi_gain, st.rsi_loss, st.rsi_count = d["rsi"][0], d["rsi"][1], int(d["rsi"][2])
+            st.last_volume = float(d.get("last_volume") or 0.0)
+            st.volumes = deque((float(x) for x in d["volumes"]), maxlen=_VOL_LONG)
+            st.turnovers = deque((float(x) for x in d["turnovers"]), maxlen=_VOL_LONG)
+            st.highs = {n: _MonotonicWindow.from_list(n, 1, d["highs"][str(n)]) for n in _HIGH_WINDOWS}
+            st.lows = {n: _MonotonicWindow.from_list(n, -1, d["lows"][str(n)]) for n in _LOW_WINDOWS}
+            return st
+        except (ValueError, TypeError, KeyError, IndexError):
+            return None
+
+
+def snapshot_matches(snapshot: Optional[dict], df) -> bool:
+    """snapshot が df（get_ohlcv の戻り値）と同じ履歴から計算されたとみなせるか。
+
+    最終日が一致し、かつ「状態の本数 == df の本数」か「双方が全ウィンドウを埋める本数以上」
+    のときだけ True。df が tail で切り詰められている（状態の方が長い）場合は、52週高値などが
+    バッチ計算と食い違うため使わない。"""
+    if not snapshot or df is None or snapshot.get("version") != STATE_VERSION:
+        return False
+    try:
+        n = len(df)
+        ts = df.index[-1]
+        last = ts.strftime("%Y-%m-%d") if hasattr(ts, "strftime") else str(ts)[:10]
+    except Exception:
+        return False
+    if snapshot.get("as_of") != last:
+        return False
+    bars = int(snapshot.get("bars") or 0)
+    return bars == n or (bars >= FULL_WINDOW and n >= FULL_WINDOW)
+
+
+def rows_differ(old: dict, new: dict) -> bool:
+    """既存行と新規行が「改訂」とみなせるほど違うか（浮動小数の往復誤差は無視）。"""
+    for k in ("open", "high", "low", "close"):
+        a, b = _num(old.get(k)), _num(new.get(k))
+        if a is None or b is None:
+            if (a is None) != (b is None):
+                return True
+            continue
+        if not math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9):
+            return True
+    return (_num(old.get("volume")) or 0) != (_num(new.get("volume")) or 0)
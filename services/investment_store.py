@@ -0,0 +1,137 @@
+"""投資データ（保有・ロット・取引・日記・アラート）の SQLite 正本と、Drive への遅延書き出し。
+
+従来は Investment/ 以下の holdings.json・transactions.jsonl・journal_index.json・rules.json・
+alert_log.jsonl が正本で、portfolio_add や日記追加のたびにファイル全体をダウンロードして
+アップロードし直していた（JSONL の 1 行追記でも全体を書き直し）。ここでは
+
+- 正本は api/database.py の inv_* テーブル。更新はローカルの書き込みだけで終わる
+- 変更した項目のキー（"holdings" / "transactions" / "journal_index" / "journal:<filename>" /
+  "alert_rules" / "alert_log"）を inv_export_dirty に印付けし、_DEBOUNCE_SEC まとめてから
+  writer（InvestmentCog が登録）で Drive のファイルを丸ごと書き出す（Obsidian 用の写し）。
+  印は DB にあるので、書き出し前に落ちても次の起動で書き出す
+- 初回だけ Drive の既存ファイルを取り込む（importer。app_settings の取り込み済みフラグで 1 回）。
+  取り込みが成功するまでは書き出さず、変更も受け付けない（InvestmentCog が ready() の結果で断る）。
+  読めなかった Drive 側を、空の表や取り込み前に足した行だけで上書きしないため
+
+    from services.investment_store import investment_store
+    if not await investment_store.ready():       # 取り込み済みでなければ取り込む
+        return {"ok": False, "error": ...}       # 取り込めるまで変更は断る
+    await investment_store.mark("holdings")      # 書き出しを予約
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+_DEBOUNCE_SEC = 20.0
+_IMPORTED_KEY = "investment_store.imported"
+
+
+class InvestmentStore:
+    def __init__(self, debounce_sec: float = _DEBOUNCE_SEC):
+        self.debounce_sec = debounce_sec
+        self._writer: Optional[Callable[[str], Awaitable[bool]]] = None
+        self._importer: Optional[Callable[[], Awaitable[bool]]] = None
+        self._imported = False
+        self._import_lock: Optional[asyncio.Lock] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"marked": 0, "exported": 0, "export_errors": 0}
+
+    def attach(
+        self,
+        writer: Callable[[str], Awaitable[bool]],
+        importer: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> None:
+        """writer(key) は key の内容を Drive に書き出して成否を返す。importer() は初回取り込み（成否）。"""
+        self._writer = writer
+        self._importer = importer
+
+    async def ready(self) -> bool:
+        """初回取り込みが済んでいなければ行い、取り込み済みかを返す。Drive に繋がらず失敗したら次回また試す。
+
+        False の間は変更を受け付けないこと（手元に行ができた表は取り込みが飛ばされ、
+        書き出しで Drive 側のデータを上書きしてしまう）。"""
+        if self._imported:
+            return True
+        if self._import_lock is None:
+            self._import_lock = asyncio.Lock()
+        async with self._import_lock:
+            if self._imported:
+                return True
+            from api.database import get_app_setting, set_app_setting
+
+            if await get_app_setting(_IMPORTED_KEY, "") == "1":
+                self._imported = True
+                return True
+            if self._importer is None:
+                return False
+            try:
+                ok = await self._importer()
+            except Exception as e:
+                logging.error(f"InvestmentStore: Drive からの取り込みに失敗: {e}", exc_info=True)
+                ok = False
+            if ok:
+                await set_app_setting(_IMPORTED_KEY, "1")
+                self._imported = True
+                logging.info("InvestmentStore: Drive の投資データを SQLite に取り込みました")
+            return self._imported
+
+    async def mark(self, *keys: str) -> None:
+        """keys の書き出しを予約する（_DEBOUNCE_SEC 後にまとめて書き出す）。"""
+        from api.database import inv_export_mark
+
+        await inv_export_mark(list(keys))
+        self.stats["marked"] += len(keys)
+        self._schedule()
+
+    def _schedule(self, delay: Optional[float] = None) -> None:
+        if self._timer is not None and not self._timer.cancelled():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        def _fire():
+            self._timer = None
+            from utils.async_utils import safe_create_task
+            safe_create_task(self.flush(), name="investment-store-export")
+
+        self._timer = loop.call_later(self.debounce_sec if delay is None else delay, _fire)
+
+    async def flush(self) -> int:
+        """予約済みの項目を書き出す。書き出した件数を返す。失敗した項目は予約し直す。"""
+        if self._writer is None:
+            return 0
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        from api.database import inv_export_mark, inv_export_take
+
+        async with self._flush_lock:
+            if not await self.ready():
+                # Drive の既存データを取り込めていないうちは書き出さない（空の表で上書きしてしまう）。
+                # 予約は DB に残したまま、取り込めた後の flush で書き出す
+                self._schedule(max(self.debounce_sec, 300.0))
+                return 0
+            keys = await inv_export_take()
+            failed = []
+            for key in keys:
+                try:
+                    ok = await self._writer(key)
+                except Exception as e:
+                    logging.warning(f"InvestmentStore: {key} の書き出しに失敗: {e}")
+                    ok = False
+                if ok:
+                    self.stats["exported"] += 1
+                else:
+                    self.stats["export_errors"] += 1
+                    failed.append(key)
+            if failed:
+                await inv_export_mark(failed)
+                self._schedule(max(self.debounce_sec, 300.0))  # Drive 不調時は間隔を空ける
+            return len(keys) - len(failed)
+
+
+investment_store = InvestmentStore()
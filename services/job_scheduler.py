@@ -0,0 +1,317 @@
+"""定時ジョブ（マネージャー連絡・自動同期）の中央スケジューラ。
+
+従来は各 Cog が `tasks.loop(minutes=1)` を持ち、毎分起きては schedule_resolver.is_due
+で app_settings を読んで「今この分か」を判定していた（20 本以上 × 毎分の起床と DB 読み）。
+ここでは
+
+- 各 Cog は起動時に register(key, coro_func, ...) でジョブを登録するだけ
+- 時刻・曜日は SCHEDULE_CATALOG（無ければ登録時の既定値）から決め、次回実行時刻を
+  直接計算して 1 本のループが次の時刻まで眠る
+- ON/OFF（schedule.<key>.enabled）は一度だけまとめて読んでメモリに持ち、設定変更時に
+  invalidate_settings() で捨てる
+- 実行履歴は scheduled_job_runs に残し、再起動後は「最後に処理した枠」以降で
+  catch_up_sec 以内に過ぎた枠を取りこぼしとして実行する（同じ枠は二度走らせない）
+- jitter_sec で枠の時刻から 0〜jitter_sec 秒ずらして起動し、同時実行数は
+  SCHEDULER_MAX_CONCURRENT（既定 3）で抑える
+
+ループの起動・停止は cogs/scheduler_cog.py。
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from config import JST
+from services.schedule_resolver import _DOW_MAP, _catalog_lookup
+
+_DEFAULT_CATCH_UP_SEC = 30 * 60
+_MAX_SLEEP_SEC = 3600.0  # 壁時計のずれ（スリープ復帰など）に備えた最大の眠り
+_RUN_HISTORY_DAYS = 90
+
+
+@dataclass
+class ScheduledJob:
+    key: str
+    func: Callable[[], Awaitable]
+    time: str
+    dow: str
+    days: Optional[tuple] = None  # カタログの曜日に加えて絞り込む曜日（0=月）
+    jitter_sec: int = 0
+    catch_up_sec: int = _DEFAULT_CATCH_UP_SEC
+    next_slot: Optional[datetime.datetime] = None
+    fire_at: Optional[datetime.datetime] = None
+    last_slot: Optional[datetime.datetime] = None
+    running: bool = False
+    task: Optional[asyncio.Task] = None
+
+    def day_ok(self, day: datetime.date) -> bool:
+        wd = day.weekday()
+        if self.days is not None and wd not in self.days:
+            return False
+        if self.dow == "daily":
+            return True
+        if self.dow == "weekday":
+            return wd < 5
+        target = _DOW_MAP.get(self.dow)
+        return target is None or wd == target
+
+    def slot_on(self, day: datetime.date) -> datetime.datetime:
+        h, m = map(int, self.time.split(":", 1))
+        return datetime.datetime(day.year, day.month, day.day, h, m, tzinfo=JST)
+
+    def prev_slot(self, now: datetime.datetime) -> Optional[datetime.datetime]:
+        """now 以前で直近の実行枠。"""
+        for i in range(8):
+            day = now.date() - datetime.timedelta(days=i)
+            slot = self.slot_on(day)
+            if slot <= now and self.day_ok(day):
+                return slot
+        return None
+
+    def next_slot_after(self, now: datetime.datetime) -> Optional[datetime.datetime]:
+        """now より後で最初の実行枠。"""
+        for i in range(9):
+            day = now.date() + datetime.timedelta(days=i)
+            slot = self.slot_on(day)
+            if slot > now and self.day_ok(day):
+                return slot
+        return None
+
+
+class JobScheduler:
+    def __init__(self, max_concurrent: int = 3):
+        self.max_concurrent = max_concurrent
+        self._jobs: dict[str, ScheduledJob] = {}
+        self._enabled: Optional[dict[str, bool]] = None
+        self._last_slots: Optional[dict[str, str]] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"wakeups": 0, "settings_loads": 0, "runs": 0, "errors": 0, "skipped": 0}
+
+    # ---- 登録 ----
+
+    def register(
+        self,
+        key: str,
+        func: Callable[[], Awaitable],
+        *,
+        default_time: str = "00:00",
+        default_dow: str = "daily",
+        days: Optional[tuple] = None,
+        jitter_sec: int = 0,
+        catch_up_sec: int = _DEFAULT_CATCH_UP_SEC,
+    ) -> None:
+        """ジョブを登録する。時刻・曜日はカタログを正とし、無いキーだけ default_* を使う。"""
+        row = _catalog_lookup(key)
+        job = ScheduledJob(
+            key=key,
+            func=func,
+            time=row["time"] if row else default_time,
+            dow=row["dow"] if row else default_dow,
+            days=tuple(days) if days else None,
+            jitter_sec=int(jitter_sec),
+            catch_up_sec=int(catch_up_sec),
+        )
+        old = self._jobs.get(key)
+        if old is not None:
+            job.last_slot = old.last_slot
+        self._jobs[key] = job
+        self._poke()
+
+    def unregister(self, key: str) -> None:
+        job = self._jobs.pop(key, None)
+        if job is not None and job.task is not None and not job.task.done():
+            job.task.cancel()
+        self._poke()
+
+    # ---- ON/OFF 設定（メモリキャッシュ） ----
+
+    def invalidate_settings(self) -> None:
+        """schedule.*.enabled を変更したら呼ぶ。次に参照したときに読み直す。"""
+        self._enabled = None
+        self._poke()
+
+    async def enabled_flags(self) -> dict[str, bool]:
+        if self._enabled is None:
+            from api.database import get_app_settings_prefix
+
+            raw = await get_app_settings_prefix("schedule.")
+            self._enabled = {
+                k[len("schedule."):-len(".enabled")]: v == "1"
+                for k, v in raw.items() if k.endswith(".enabled")
+            }
+            self.stats["settings_loads"] += 1
+        return self._enabled
+
+    async def is_enabled(self, key: str) -> bool:
+        return (await self.enabled_flags()).get(key, True)
+
+    # ---- 参照 ----
+
+    def next_runs(self) -> dict[str, dict]:
+        """ジョブごとの次回実行枠（設定画面・確認用）。"""
+        return {
+            job.key: {
+                "time": job.time,
+                "dow": job.dow,
+                "next_run": job.next_slot.isoformat() if job.next_slot else None,
+                "last_slot": job.last_slot.isoformat() if job.last_slot else None,
+                "running": job.running,
+            }
+            for job in self._jobs.values()
+        }
+
+    # ---- 起動・停止 ----
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            from utils.async_utils import safe_create_task
+            self._wake = asyncio.Event()
+            self._sem = asyncio.Semaphore(self.max_concurrent)
+            self._task = safe_create_task(self._run(), name="job-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    # ---- 本体 ----
+
+    def _poke(self) -> None:
+        for job in self._jobs.values():
+            job.fire_at = None  # 次の周回で組み直す
+        if self._wake is not None:
+            self._wake.set()
+
+    def _plan(self, job: ScheduledJob, now: datetime.datetime) -> None:
+        if job.last_slot is None and self._last_slots and job.key in self._last_slots:
+            try:
+                job.last_slot = datetime.datetime.fromisoformat(self._last_slots[job.key])
+            except ValueError:
+                pass
+        prev = job.prev_slot(now)
+        if (
+            prev is not None
+            and (job.last_slot is None or prev > job.last_slot)
+            and (now - prev).total_seconds() <= job.catch_up_sec
+        ):
+            slot = prev  # 取りこぼした枠（再起動中に過ぎた）を今から実行する
+        else:
+            slot = job.next_slot_after(now)
+        job.next_slot = slot
+        if slot is None:
+            job.fire_at = now + datetime.timedelta(days=7)
+            return
+        jitter = random.uniform(0, job.jitter_sec) if job.jitter_sec else 0.0
+        job.fire_at = max(slot + datetime.timedelta(seconds=jitter), now)
+
+    async def _record(self, job: ScheduledJob, slot: datetime.datetime, status: str) -> None:
+        self.stats["skipped"] += 1
+        try:
+            from api.database import job_run_start
+            await job_run_start(job.key, slot.isoformat(), status=status)
+        except Exception as e:
+            logging.debug(f"job_scheduler: 実行履歴の保存に失敗 ({job.key}): {e}")
+
+    async def _dispatch(self, job: ScheduledJob, now: datetime.datetime) -> None:
+        slot = job.next_slot
+        job.fire_at = None
+        if slot is None:
+            return
+        job.last_slot = slot
+        if not await self.is_enabled(job.key):
+            await self._record(job, slot, "disabled")
+            return
+        if job.running:
+            await self._record(job, slot, "overlap")
+            return
+        if (now - slot).total_seconds() > job.catch_up_sec + job.jitter_sec + 60:
+            # イベントループが長く止まっていた等で、枠から大きく遅れた
+            await self._record(job, slot, "missed")
+            return
+        from utils.async_utils import safe_create_task
+        job.running = True
+        job.task = safe_create_task(self._execute(job, slot), name=f"job-{job.key}")
+
+    async def _execute(self, job: ScheduledJob, slot: datetime.datetime) -> None:
+        from api.database import job_run_finish, job_run_start
+
+        async with self._sem:
+            started = time.monotonic()
+            run_id = None
+            try:
+                run_id = await job_run_start(job.key, slot.isoformat())
+            except Exception as e:
+                logging.debug(f"job_scheduler: 実行履歴の保存に失敗 ({job.key}): {e}")
+            status, error = "ok", ""
+            self.stats["runs"] += 1
+            from services.rate_limiter import LANE_ROUTINE, request_lane
+            try:
+                # 定時ジョブの外部呼び出し（Gemini など）は routine レーンで並ぶ（対話を優先）
+                with request_lane(LANE_ROUTINE):
+                    await job.func()
+            except asyncio.CancelledError:
+                status = "cancelled"
+                raise
+            except Exception as e:
+                status, error = "error", str(e)
+                self.stats["errors"] += 1
+                logging.error(f"定時ジョブ {job.key} でエラー: {e}", exc_info=True)
+            finally:
+                job.running = False
+                if run_id is not None:
+                    try:
+                        await job_run_finish(
+                            run_id, status, error, int((time.monotonic() - started) * 1000)
+                        )
+                    except Exception as e:
+                        logging.debug(f"job_scheduler: 実行履歴の更新に失敗 ({job.key}): {e}")
+
+    async def _run(self) -> None:
+        from api.database import job_run_last_slots, job_runs_prune
+
+        try:
+            await job_runs_prune(_RUN_HISTORY_DAYS)
+            self._last_slots = await job_run_last_slots()
+        except Exception as e:
+            logging.warning(f"job_scheduler: 実行履歴の読み込みに失敗: {e}")
+            self._last_slots = {}
+
+        while True:
+            self.stats["wakeups"] += 1
+            self._wake.clear()
+            now = datetime.datetime.now(JST)
+            for job in list(self._jobs.values()):
+                if job.fire_at is None:
+                    self._plan(job, now)
+            for job in list(self._jobs.values()):
+                if job.fire_at is not None and job.fire_at <= now:
+                    try:
+                        await self._dispatch(job, now)
+                    except Exception as e:
+                        logging.error(f"job_scheduler: {job.key} の起動に失敗: {e}", exc_info=True)
+            if any(job.fire_at is None for job in self._jobs.values()):
+                continue
+
+            fire_times = [job.fire_at for job in self._jobs.values()]
+            delay = _MAX_SLEEP_SEC
+            if fire_times:
+                delay = min(delay, max(0.0, (min(fire_times) - now).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+scheduler = JobScheduler(max_concurrent=max(1, int(os.getenv("SCHEDULER_MAX_CONCURRENT", "3") or 3)))
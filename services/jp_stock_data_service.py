@@ -16,6 +16,8 @@ from pathlib import Path
 from typing import Optional
 
 from config import JST
+from services.rate_limiter import RequestScheduler, is_rate_limit_error
+from utils.executors import MARKET_DATA
 
 
 _PROVIDER_SINGLETON: Optional["StockDataProvider"] = None
@@ -72,6 +74,69 @@ async def _fetch_us_sp500_to_csv(path: Path) -> bool:
     return False
 
 
+# ファンダ項目ごとの型と鮮度（日数）。0 は「JST 同日のみ有効」。
+# 価格に連動する指標（PER・時価総額など）は場中に動くので当日限り、決算由来の指標は
+# 決算期まで変わらないので数日、銘柄属性（名前・業種）は月単位で使い回す。
+FUNDAMENTAL_FIELDS: dict[str, tuple[str, int]] = {
+    "market_cap_jpy": ("num", 0),
+    "per": ("num", 0),
+    "forward_per": ("num", 0),
+    "pbr": ("num", 0),
+    "peg": ("num", 0),
+    "dividend_yield": ("num", 0),
+    "current_price": ("num", 0),
+    "roe": ("num", 7),
+    "operating_margin": ("num", 7),
+    "profit_margin": ("num", 7),
+    "revenue": ("num", 7),
+    "shares_outstanding": ("num", 7),
+    "revenue_growth": ("num", 7),
+    "earnings_growth": ("num", 7),
+    "earnings_quarterly_growth": ("num", 7),
+    "next_earnings_ts": ("int", 1),
+    "currency": ("text", 30),
+    "name": ("text", 30),
+    "sector": ("text", 30),
+    "industry": ("text", 30),
+    "_derived_fields": ("json", 7),
+}
+
+
+def _field_is_fresh(fetched_at: str, ttl_days: int, now: datetime.datetime) -> bool:
+    try:
+        ts = datetime.datetime.fromisoformat(fetched_at)
+    except (TypeError, ValueError):
+        return False
+    if ttl_days <= 0:
+        return ts.astimezone(JST).date() == now.date()
+    return (now - ts).days <= ttl_days
+
+
+def _decode_field(kind: str, cell: dict):
+    if kind in ("num", "int"):
+        v = cell.get("num")
+        return int(v) if (kind == "int" and v is not None) else v
+    text = cell.get("text")
+    if kind == "json":
+        import json
+        try:
+            return json.loads(text) if text else None
+        except (TypeError, ValueError):
+            return None
+    return text
+
+
+def _encode_field(kind: str, value, fetched_at: str) -> dict:
+    if kind in ("num", "int"):
+        num = _safe_float(value)
+        return {"num": num, "text": None, "fetched_at": fetched_at}
+    if kind == "json":
+        import json
+        return {"num": None, "text": json.dumps(value, ensure_ascii=False) if value is not None else None,
+                "fetched_at": fetched_at}
+    return {"num": None, "text": str(value) if value is not None else None, "fetched_at": fetched_at}
+
+
 class StockDataProvider(ABC):
     """株価データ取得の抽象基底クラス。"""
 
@@ -114,7 +179,7 @@ class StockDataProvider(ABC):
             logging.error("pandas 未インストール。requirements.txt を確認してください")
             return None
 
-        from api.database import get_ohlcv_latest_date, get_ohlcv_range, upsert_ohlcv_rows
+        from api.database import get_ohlcv_latest_date, get_ohlcv_range
 
         now_jst = datetime.datetime.now(JST)
         today = now_jst.date()
@@ -149,24 +214,9 @@ class StockDataProvider(ABC):
                 pass
 
         if need_remote:
-            df_remote = await self.fetch_ohlcv_remote(code, days=days)
-            if df_remote is not None and len(df_remote) > 0:
-                rows = []
-                for ts, row in df_remote.iterrows():
-                    try:
-                        date_str = ts.strftime("%Y-%m-%d") if hasattr(ts, "strftime") else str(ts)[:10]
-                        rows.append({
-                            "date": date_str,
-                            "open": _safe_float(row.get("Open")),
-                            "high": _safe_float(row.get("High")),
-                            "low": _safe_float(row.get("Low")),
-                            "close": _safe_float(row.get("Close")),
-                            "volume": _safe_int(row.get("Volume")),
-                        })
-                    except Exception:
-                        continue
-                if rows:
-                    await upsert_ohlcv_rows(code, rows)
+            # 複数スタイル・複数ユニバースが同じ銘柄・同じ期間を同時に要求しても、取得は 1 回にまとめる
+            # （期間が違えば取り直す範囲も違うので、短い取得の結果を長い要求に渡さない）
+            await self._single_flight(("ohlcv", code, days), lambda: self._refresh_ohlcv(code, days))
 
         cached = await get_ohlcv_range(code, start_date=start_date)
         if not cached:
@@ -180,6 +230,165 @@ class StockDataProvider(ABC):
         })
         return df.tail(days)
 
+    async def _refresh_ohlcv(self, code: str, days: int) -> None:
+        """リモートから OHLCV を取り直して stock_ohlcv に upsert する。"""
+        from api.database import upsert_ohlcv_rows
+
+        df_remote = await self.fetch_ohlcv_remote(code, days=days)
+        if df_remote is None or len(df_remote) == 0:
+            return
+        rows = []
+        for ts, row in df_remote.iterrows():
+            try:
+                date_str = ts.strftime("%Y-%m-%d") if hasattr(ts, "strftime") else str(ts)[:10]
+                rows.append({
+                    "date": date_str,
+                    "open": _safe_float(row.get("Open")),
+                    "high": _safe_float(row.get("High")),
+                    "low": _safe_float(row.get("Low")),
+                    "close": _safe_float(row.get("Close")),
+                    "volume": _safe_int(row.get("Volume")),
+                })
+            except Exception:
+                continue
+        if rows:
+            await upsert_ohlcv_rows(code, rows)
+            self._notify_price(code)
+
+    # ---- 価格更新の通知・直近値 ----
+
+    def add_price_listener(self, callback) -> None:
+        """OHLCV の取り直しや直近値の更新があったとき callback(code) を呼ぶ（アラート評価用）。"""
+        listeners: list = self.__dict__.setdefault("_price_listeners", [])
+        if callback not in listeners:
+            listeners.append(callback)
+
+    def _notify_price(self, code: str) -> None:
+        for callback in list(self.__dict__.get("_price_listeners", [])):
+            try:
+                callback(code)
+            except Exception as e:
+                logging.debug(f"price listener error ({code}): {e}")
+
+    def latest_quote(self, code: str) -> Optional[tuple[float, float]]:
+        """get_last_price で取得済みの (価格, 取得時刻 epoch)。取得していなければ None（通信しない）。"""
+        return self.__dict__.get("_quotes", {}).get(code)
+
+    async def fetch_last_price_remote(self, code: str) -> Optional[float]:
+        """リモートから直近値（場中の現在値）を取得する。既定は未対応。"""
+        return None
+
+    async def get_last_price(self, code: str, max_age_sec: float = 60.0) -> Optional[float]:
+        """直近値を返す。max_age_sec 以内に取得済みならそれを使い、同じ銘柄の同時要求は 1 回にまとめる。"""
+        import time
+
+        quotes: dict = self.__dict__.setdefault("_quotes", {})
+        cached = quotes.get(code)
+        if cached and time.time() - cached[1] <= max_age_sec:
+            return cached[0]
+
+        async def _load():
+            price = _safe_float(await self.fetch_last_price_remote(code))
+            if price is not None and price > 0:
+                prev = quotes.get(code)
+                quotes[code] = (price, time.time())
+                if not prev or prev[0] != price:
+                    self._notify_price(code)
+                return price
+            return cached[0] if cached else None
+
+        return await self._single_flight(("quote", code), _load)
+
+    async def _single_flight(self, key, factory):
+        """同じ key の処理が進行中ならその完了を待って結果を共有し、無ければ factory() を始める。
+
+        待っている側がキャンセルされても処理自体は止めない（他の待ち手がいるため）。"""
+        inflight: dict = self.__dict__.setdefault("_inflight", {})
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            inflight[key] = task
+            task.add_done_callback(lambda _t: inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def get_fundamentals_snapshot(self, code: str) -> Optional[dict]:
+        """ファンダを fundamentals_snapshot（項目別の鮮度つき）経由で取得する。
+
+        全項目が鮮度内（価格連動の指標は JST 同日に取得済み）ならリモートへ行かずに返す。
+        そうでなければ get_fundamentals で取り直し、今回欠損した項目は鮮度内の旧値で補う。
+        同じ日のうちは（12:00 でも 16:15 でも）同じ値を共有するので、場中の PER 変動で
+        評価が食い違わない。取得失敗（空 dict）は保存せず、旧値も無ければ None を返す。
+        同じ銘柄への同時要求は 1 回の取得にまとめる。"""
+        return await self._single_flight(("fundamentals", code), lambda: self._load_fundamentals_snapshot(code))
+
+    async def _load_fundamentals_snapshot(self, code: str) -> Optional[dict]:
+        from api.database import fundamentals_snapshot_get, fundamentals_snapshot_put
+
+        now = datetime.datetime.now(JST)
+        try:
+            cells = await fundamentals_snapshot_get(code)
+        except Exception as e:
+            logging.debug(f"fundamentals_snapshot 読み込みエラー {code}: {e}")
+            cells = {}
+
+        def _assemble(src: dict) -> dict:
+            out = {k: _decode_field(kind, src[k]) for k, (kind, _ttl) in FUNDAMENTAL_FIELDS.items() if k in src}
+            stamps = [src[k]["fetched_at"] for k, (_kind, ttl) in FUNDAMENTAL_FIELDS.items()
+                      if ttl <= 0 and k in src]
+            out["fetched_at"] = max(stamps) if stamps else None
+            if out.get("_derived_fields") is None:
+                out.pop("_derived_fields", None)
+            return out
+
+        if cells and all(
+            k in cells and _field_is_fresh(cells[k]["fetched_at"], ttl, now)
+            for k, (_kind, ttl) in FUNDAMENTAL_FIELDS.items() if k != "_derived_fields"
+        ):
+            return _assemble(cells)
+
+        try:
+            live = await self.get_fundamentals(code)
+        except Exception as e:
+            logging.debug(f"ファンダ取得エラー {code}: {e}")
+            live = None
+        if not live:
+            # 一時失敗は固定しない。鮮度内の旧値があればそれだけ返す。
+            fresh = {k: c for k, c in cells.items()
+                     if k in FUNDAMENTAL_FIELDS and _field_is_fresh(c["fetched_at"], FUNDAMENTAL_FIELDS[k][1], now)}
+            return _assemble(fresh) if fresh else None
+
+        stamp = now.isoformat()
+        merged: dict = {}
+        for k, (kind, ttl) in FUNDAMENTAL_FIELDS.items():
+            v = live.get(k)
+            old = cells.get(k)
+            had_value = bool(old) and (old.get("num") is not None or old.get("text") is not None)
+            if v is None and had_value and _field_is_fresh(old["fetched_at"], ttl, now):
+                merged[k] = old  # 今回欠損した項目は、鮮度内の旧値を取得時刻ごと引き継ぐ
+                continue
+            merged[k] = _encode_field(kind, v, stamp)
+        try:
+            await fundamentals_snapshot_put(code, merged)
+        except Exception as e:
+            logging.debug(f"fundamentals_snapshot 保存エラー {code}: {e}")
+        return _assemble(merged)
+
+    def request_stats(self) -> dict:
+        """リモート呼び出しの流量統計（スケジューラを持つプロバイダのみ）。"""
+        return {}
+
+    async def get_indicators(self, code: str) -> Optional[dict]:
+        """OHLCV キャッシュと一緒に逐次更新される指標スナップショットを返す。
+
+        200日MA・52週高値・ATR・RSI 等を履歴から計算し直さずに済む。get_ohlcv の後に呼び、
+        indicator_state.snapshot_matches(snapshot, df) で同じ履歴かを確かめてから使うこと。"""
+        from api.database import get_indicator_snapshot
+        try:
+            return await get_indicator_snapshot(code)
+        except Exception as e:
+            logging.debug(f"指標スナップショット取得エラー {code}: {e}")
+            return None
+
     async def get_universe(self, name: str = "topix500") -> list[dict]:
         """ユニバース（銘柄一覧）を CSV から読み込む。
 
@@ -241,11 +450,29 @@ class StockDataProvider(ABC):
 
 
 class YFinanceProvider(StockDataProvider):
-    """yfinance ベースのプロバイダ。"""
+    """yfinance ベースのプロバイダ。
+
+    OHLCV・ファンダ・PER 履歴の全リクエストを市場別（JP/US）の RequestScheduler
+    （トークンバケット＋同時実行上限＋優先レーン）に通す。429 を受けるとその市場の
+    レートを下げて待ち直すので、バッチ走査中でも対話の要求（interactive レーン）が先に通る。
+    """
+
+    def __init__(self, max_concurrent: int = 5, rate_per_sec: float = 5.0, burst: int = 5):
+        # 日本株（.T）と米国株は市場ごとに独立したスケジューラを持つ。日米のユニバースを
+        # 同時に走査しても互いの待ち行列・429 バックオフに巻き込まれない。
+        self._schedulers = {
+            mkt: RequestScheduler(
+                f"yfinance-{mkt}", rate=rate_per_sec, burst=burst, max_concurrent=max_concurrent,
+                executor=MARKET_DATA,
+            )
+            for mkt in ("JP", "US")
+        }
 
-    def __init__(self, max_concurrent: int = 5, sleep_per_call: float = 0.2):
-        self._sem = asyncio.Semaphore(max_concurrent)
-        self._sleep = sleep_per_call
+    def request_stats(self) -> dict:
+        return {mkt: s.stats() for mkt, s in self._schedulers.items()}
+
+    def _scheduler_for(self, ticker: str) -> RequestScheduler:
+        return self._schedulers["JP" if ticker.endswith(".T") else "US"]
 
     @staticmethod
     def _to_yf_ticker(code: str) -> str:
@@ -257,6 +484,17 @@ class YFinanceProvider(StockDataProvider):
             return f"{c}.T"
         return c
 
+    async def _call(self, func, ticker: str, what: str, default=None):
+        """func（同期・1 リクエスト）を ticker の市場のスケジューラ経由で実行する。
+
+        func 内の例外のうちレート制限だけは投げ直させ、スケジューラに再試行させる。
+        再試行を使い切った・その他の失敗は default を返す。"""
+        try:
+            return await self._scheduler_for(ticker).call(func)
+        except Exception as e:
+            logging.debug(f"yfinance {what} error: {e}")
+            return default
+
     async def fetch_ohlcv_remote(self, code: str, days: int = 300):
         try:
             import yfinance as yf  # type: ignore
@@ -266,113 +504,123 @@ class YFinanceProvider(StockDataProvider):
         ticker = self._to_yf_ticker(code)
         period = f"{max(days, 60)}d" if days <= 730 else "max"
 
-        async with self._sem:
-            await asyncio.sleep(self._sleep)
-
-            def _fetch():
-                try:
-                    t = yf.Ticker(ticker)
-                    # auto_adjust=True で分割・配当を遡及調整した OHLC を取得する。
-                    # こうしないと過去データが歪み、チャート（調整済み表示）と
-                    # スクリーニング判定（無調整）が食い違う原因になる。
-                    df = t.history(period=period, auto_adjust=True)
-                    return df
-                except Exception as e:
-                    logging.debug(f"yfinance fetch_ohlcv_remote error for {ticker}: {e}")
-                    return None
+        def _fetch():
+            t = yf.Ticker(ticker)
+            # auto_adjust=True で分割・配当を遡及調整した OHLC を取得する。
+            # こうしないと過去データが歪み、チャート（調整済み表示）と
+            # スクリーニング判定（無調整）が食い違う原因になる。
+            return t.history(period=period, auto_adjust=True)
 
-            df = await asyncio.to_thread(_fetch)
-            if df is None or len(df) == 0:
-                return None
-            keep = [c for c in ["Open", "High", "Low", "Close", "Volume"] if c in df.columns]
-            df = df[keep].copy()
-            return df
+        df = await self._call(_fetch, ticker, f"fetch_ohlcv_remote {ticker}")
+        if df is None or len(df) == 0:
+            return None
+        keep = [c for c in ["Open", "High", "Low", "Close", "Volume"] if c in df.columns]
+        df = df[keep].copy()
+        return df
 
-    async def get_fundamentals(self, code: str) -> dict:
+    async def fetch_last_price_remote(self, code: str) -> Optional[float]:
         try:
             import yfinance as yf  # type: ignore
         except ImportError:
-            return {}
+            return None
         ticker = self._to_yf_ticker(code)
 
-        async with self._sem:
-            await asyncio.sleep(self._sleep)
+        def _fetch():
+            return getattr(yf.Ticker(ticker).fast_info, "last_price", None)
 
-            def _fetch():
-                try:
-                    t = yf.Ticker(ticker)
-                    info = t.info or {}
-                    return info
-                except Exception as e:
-                    logging.debug(f"yfinance get_fundamentals error for {ticker}: {e}")
-                    return {}
-
-            info = await asyncio.to_thread(_fetch)
-            if not info:
-                return {}
-
-            result = {
-                "market_cap_jpy": info.get("marketCap"),
-                "per": info.get("trailingPE"),
-                "forward_per": info.get("forwardPE"),
-                "pbr": info.get("priceToBook"),
-                "peg": info.get("pegRatio"),
-                "roe": info.get("returnOnEquity"),
-                "operating_margin": info.get("operatingMargins"),
-                "profit_margin": info.get("profitMargins"),
-                "revenue": info.get("totalRevenue"),
-                "shares_outstanding": info.get("sharesOutstanding"),
-                "revenue_growth": info.get("revenueGrowth"),
-                "earnings_growth": info.get("earningsGrowth"),
-                "earnings_quarterly_growth": info.get("earningsQuarterlyGrowth"),
-                "next_earnings_ts": info.get("earningsTimestamp"),
-                "dividend_yield": info.get("dividendYield"),
-                "current_price": info.get("currentPrice") or info.get("regularMarketPrice"),
-                "currency": info.get("currency", "JPY"),
-                "name": info.get("longName") or info.get("shortName"),
-                "sector": info.get("sector"),
-                "industry": info.get("industry"),
-                "fetched_at": datetime.datetime.now(JST).isoformat(),
-            }
-
-            # yfinance の .info は日本株でゲート中核指標（成長率・営業利益率・ROE）が欠損
-            # しがち。不足している場合だけ財務諸表から派生補完する（US/取得済みなら追加I/Oなし）。
-            if any(result.get(k) is None for k in
-                   ("revenue_growth", "earnings_growth", "operating_margin", "roe")):
+        return await self._call(_fetch, ticker, f"last_price {ticker}")
+
+    async def _fetch_info(self, ticker: str) -> dict:
+        import yfinance as yf  # type: ignore
+
+        def _fetch():
+            return yf.Ticker(ticker).info or {}
+
+        return await self._call(_fetch, ticker, f"info {ticker}", default={}) or {}
+
+    async def _fetch_statement(self, ticker: str, attrs: tuple[str, ...]):
+        """財務諸表（DataFrame）を attrs の順に試して最初の非空を返す。取れなければ None。"""
+        import yfinance as yf  # type: ignore
+
+        def _fetch():
+            t = yf.Ticker(ticker)
+            for attr in attrs:
                 try:
-                    derived = await asyncio.to_thread(self._derive_fundamentals, ticker)
-                    filled = []
-                    for k, v in (derived or {}).items():
-                        if result.get(k) is None and v is not None:
-                            result[k] = v
-                            filled.append(k)
-                    if filled:
-                        result["_derived_fields"] = filled
+                    s = getattr(t, attr, None)
                 except Exception as e:
-                    logging.debug(f"get_fundamentals 派生補完エラー {ticker}: {e}")
+                    if is_rate_limit_error(e):
+                        raise
+                    continue
+                if s is not None and not s.empty:
+                    return s
+            return None
 
-            return result
+        return await self._call(_fetch, ticker, f"{attrs[0]} {ticker}")
 
-    def _derive_fundamentals(self, ticker: str) -> dict:
-        """yfinance の財務諸表（年次）から、.info に欠けがちな成長率・営業利益率・ROE を
-        近似計算する。新しい期が先頭列の yfinance 仕様に従い、最新期と前期で算出。同期処理。"""
+    async def get_fundamentals(self, code: str) -> dict:
         try:
-            import yfinance as yf  # type: ignore
+            import yfinance  # type: ignore  # noqa: F401
         except ImportError:
             return {}
+        ticker = self._to_yf_ticker(code)
+
+        info = await self._fetch_info(ticker)
+        if not info:
+            return {}
+
+        result = {
+            "market_cap_jpy": info.get("marketCap"),
+            "per": info.get("trailingPE"),
+            "forward_per": info.get("forwardPE"),
+            "pbr": info.get("priceToBook"),
+            "peg": info.get("pegRatio"),
+            "roe": info.get("returnOnEquity"),
+            "operating_margin": info.get("operatingMargins"),
+            "profit_margin": info.get("profitMargins"),
+            "revenue": info.get("totalRevenue"),
+            "shares_outstanding": info.get("sharesOutstanding"),
+            "revenue_growth": info.get("revenueGrowth"),
+            "earnings_growth": info.get("earningsGrowth"),
+            "earnings_quarterly_growth": info.get("earningsQuarterlyGrowth"),
+            "next_earnings_ts": info.get("earningsTimestamp"),
+            "dividend_yield": info.get("dividendYield"),
+            "current_price": info.get("currentPrice") or info.get("regularMarketPrice"),
+            "currency": info.get("currency", "JPY"),
+            "name": info.get("longName") or info.get("shortName"),
+            "sector": info.get("sector"),
+            "industry": info.get("industry"),
+            "fetched_at": datetime.datetime.now(JST).isoformat(),
+        }
+
+        # yfinance の .info は日本株でゲート中核指標（成長率・営業利益率・ROE）が欠損
+        # しがち。不足している場合だけ財務諸表から派生補完する（US/取得済みなら追加I/Oなし）。
+        # 損益計算書と貸借対照表は別リクエストなので並行して取りに行く。
+        if any(result.get(k) is None for k in
+               ("revenue_growth", "earnings_growth", "operating_margin", "roe")):
+            try:
+                inc, bs = await asyncio.gather(
+                    self._fetch_statement(ticker, ("income_stmt", "financials")),
+                    self._fetch_statement(ticker, ("balance_sheet",)),
+                )
+                derived = self._derive_fundamentals(inc, bs)
+                filled = []
+                for k, v in (derived or {}).items():
+                    if result.get(k) is None and v is not None:
+                        result[k] = v
+                        filled.append(k)
+                if filled:
+                    result["_derived_fields"] = filled
+            except Exception as e:
+                logging.debug(f"get_fundamentals 派生補完エラー {ticker}: {e}")
+
+        return result
+
+    @staticmethod
+    def _derive_fundamentals(inc, bs) -> dict:
+        """yfinance の財務諸表（年次）から、.info に欠けがちな成長率・営業利益率・ROE を
+        近似計算する。新しい期が先頭列の yfinance 仕様に従い、最新期と前期で算出。純粋関数。"""
         out: dict = {}
         try:
-            t = yf.Ticker(ticker)
-            inc = None
-            for attr in ("income_stmt", "financials"):
-                try:
-                    s = getattr(t, attr, None)
-                    if s is not None and not s.empty:
-                        inc = s
-                        break
-                except Exception:
-                    continue
-
             def _row(df, *names):
                 if df is None:
                     return None
@@ -393,19 +641,12 @@ class YFinanceProvider(StockDataProvider):
             if ni and len(ni) >= 2 and ni[1] != 0:
                 out["earnings_growth"] = (ni[0] - ni[1]) / abs(ni[1])
 
-            bs = None
-            try:
-                b = getattr(t, "balance_sheet", None)
-                if b is not None and not b.empty:
-                    bs = b
-            except Exception:
-                bs = None
             eq = _row(bs, "Stockholders Equity", "Total Stockholder Equity",
                       "Common Stock Equity", "Total Equity Gross Minority Interest")
             if ni and eq and eq[0] > 0:
                 out["roe"] = ni[0] / eq[0]
         except Exception as e:
-            logging.debug(f"_derive_fundamentals error {ticker}: {e}")
+            logging.debug(f"_derive_fundamentals error: {e}")
         return out
 
     async def get_per_history(self, code: str, years: int = 6) -> dict:
@@ -415,78 +656,70 @@ class YFinanceProvider(StockDataProvider):
             return {"ok": False}
         ticker = self._to_yf_ticker(code)
 
-        async with self._sem:
-            await asyncio.sleep(self._sleep)
+        def _fetch_hist():
+            return yf.Ticker(ticker).history(period=f"{years + 1}y", interval="1mo")
 
-            def _fetch():
-                try:
-                    t = yf.Ticker(ticker)
-                    # --- 年次EPS（複数APIをフォールバック）---
-                    stmt = None
-                    for attr in ("income_stmt", "financials"):
+        # 年次EPS（損益計算書）・年末株価（月足）・現在PER/発行株数（info）は独立した
+        # リクエストなので並行して取得する。
+        stmt, hist, info = await asyncio.gather(
+            self._fetch_statement(ticker, ("income_stmt", "financials")),
+            self._call(_fetch_hist, ticker, f"per_history {ticker}"),
+            self._fetch_info(ticker),
+        )
+        try:
+            if stmt is None:
+                return {"ok": False}
+            eps_by_year: dict[int, float] = {}
+            for row in ("Diluted EPS", "Basic EPS"):
+                if row in stmt.index:
+                    for col, val in stmt.loc[row].items():
                         try:
-                            s = getattr(t, attr, None)
-                            if s is not None and not s.empty:
-                                stmt = s
-                                break
+                            y = int(col.year)
+                            v = float(val)
+                            if v == v:
+                                eps_by_year[y] = v
                         except Exception:
                             continue
-                    if stmt is None:
-                        return {"ok": False}
-                    eps_by_year: dict[int, float] = {}
-                    for row in ("Diluted EPS", "Basic EPS"):
-                        if row in stmt.index:
-                            for col, val in stmt.loc[row].items():
-                                try:
-                                    y = int(col.year)
-                                    v = float(val)
-                                    if v == v:
-                                        eps_by_year[y] = v
-                                except Exception:
-                                    continue
-                            if eps_by_year:
-                                break
-                    if not eps_by_year and "Net Income" in stmt.index:
+                    if eps_by_year:
+                        break
+            if not eps_by_year and "Net Income" in stmt.index:
+                try:
+                    sh = float((info or {}).get("sharesOutstanding") or 0)
+                except Exception:
+                    sh = 0.0
+                if sh and sh > 0:
+                    for col, val in stmt.loc["Net Income"].items():
                         try:
-                            sh = float((t.info or {}).get("sharesOutstanding") or 0)
+                            y = int(col.year)
+                            v = float(val) / sh
+                            if v == v:
+                                eps_by_year[y] = v
                         except Exception:
-                            sh = 0.0
-                        if sh and sh > 0:
-                            for col, val in stmt.loc["Net Income"].items():
-                                try:
-                                    y = int(col.year)
-                                    v = float(val) / sh
-                                    if v == v:
-                                        eps_by_year[y] = v
-                                except Exception:
-                                    continue
-                    if not eps_by_year:
-                        return {"ok": False}
-                    # --- 年末株価 ---
-                    hist = t.history(period=f"{years + 1}y", interval="1mo")
-                    if hist is None or hist.empty:
-                        return {"ok": False}
-                    closes = hist["Close"]
-                    history = []
-                    for y, eps in sorted(eps_by_year.items()):
-                        if eps <= 0:
-                            continue
-                        yr_rows = closes[closes.index.year == y]
-                        if len(yr_rows) == 0:
                             continue
-                        price = float(yr_rows.iloc[-1])
-                        per = price / eps
-                        if per > 0:
-                            history.append({"year": int(y), "eps": round(eps, 2), "per": round(per, 1)})
-                    if len(history) < 3:
-                        return {"ok": False}
-                    cur = (t.info or {}).get("trailingPE")
-                    return {"ok": True, "history": history, "current_per": cur}
-                except Exception as e:
-                    logging.debug(f"yfinance get_per_history error for {ticker}: {e}")
-                    return {"ok": False}
-
-            return await asyncio.to_thread(_fetch)
+            if not eps_by_year:
+                return {"ok": False}
+            # --- 年末株価 ---
+            if hist is None or hist.empty:
+                return {"ok": False}
+            closes = hist["Close"]
+            history = []
+            for y, eps in sorted(eps_by_year.items()):
+                if eps <= 0:
+                    continue
+                yr_rows = closes[closes.index.year == y]
+                if len(yr_rows) == 0:
+                    continue
+                price = float(yr_rows.iloc[-1])
+                per = price / eps
+                if per > 0:
+                    history.append({"year": int(y), "eps": round(eps, 2), "per": round(per, 1)})
+            if len(history) < 3:
+                return {"ok": False}
+            cur = (info or {}).get("trailingPE")
+            return {"ok": True, "history": history, "current_per": cur}
+        except Exception as e:
+            logging.debug(f"yfinance get_per_history error for {ticker}: {e}")
+            return {"ok": False}
 
 
 class JQuantsProvider(StockDataProvider):
@@ -0,0 +1,293 @@
+"""ストックリンクの一括補完（AI タグ付け・サムネイル取得）ジョブ。
+
+従来の /links/auto_tag_all は未タグのリンクを 1 件ずつ Gemini に投げ、サムネイルも
+1 件ずつ OGP / Google Books / Places を取りに行っていたため、数百件だと HTTP が数分
+ブロックされていた。ここでは
+
+- タグ: _TAG_BATCH 件ずつ 1 回の構造化出力（JSON スキーマ指定）プロンプトでまとめて付ける
+- サムネイル: 共有の aiohttp セッション上で _FETCH_CONCURRENCY 並列に取得し、結果は
+  URL 単位で link_url_cache に残す（同じ URL・再実行では取り直さない）
+- 進捗: link_enrich_jobs に未処理の link_id を持ち、job_id でポーリングできる。
+  再起動で中断されたジョブは LinkEnrichCog が起動時に残りから再開する
+
+ジョブの起動・再開は cogs/link_enrich_cog.py、エンドポイントは api/routers/stocked_links.py。
+"""
+import asyncio
+import json
+import logging
+import re
+
+from services.rate_limiter import LANE_BACKGROUND, in_lane
+
+_TAG_BATCH = 25
+_TAG_CONCURRENCY = 2
+_FETCH_CONCURRENCY = 6
+_URL_CACHE_DAYS = 30
+_FLUSH_EVERY = 10  # サムネイルはこの件数ごとに進捗を保存する
+
+JOB_KINDS = ("tags", "thumbnails", "all")
+_GENERIC_MAP_TITLES = ("Google Maps", "Google Maps Location", "Untitled")
+
+
+def normalize_tags(parts) -> str:
+    """AI が返したタグ候補を整形して最大 3 個のカンマ区切りにする。"""
+    if isinstance(parts, str):
+        parts = re.split(r"[,、\n]", parts)
+    cleaned = [str(p).strip(" 　#・-・") for p in parts or [] if str(p).strip()]
+    return ",".join([p for p in cleaned if p and len(p) <= 12][:3])
+
+
+def _type_hint(link_type: str) -> str:
+    return {"recipe": "料理レシピ", "web": "ウェブ記事", "book": "書籍",
+            "map": "場所・店", "youtube": "動画"}.get(link_type, "リンク")
+
+
+async def generate_tags_batch(gemini_client, links: list[dict]) -> dict:
+    """複数リンクのタグを 1 回の Gemini 呼び出しでまとめて生成する。{link_id: "a,b"}。"""
+    if not gemini_client or not links:
+        return {}
+    from google.genai import types as _gt
+    from services.gemini_model_resolver import resolve_gemini_model
+
+    items = [
+        {"id": lk["id"], "種別": _type_hint(lk.get("type") or ""), "タイトル": lk.get("title") or "",
+         **({"概要": (lk.get("summary") or "")[:200]} if lk.get("summary") else {})}
+        for lk in links
+    ]
+    prompt = (
+        "次の各リンクを後から探しやすく分類するための短いタグを、それぞれ1〜3個付けてください。\n"
+        "・各タグは2〜6文字程度の名詞。記号・絵文字・番号は付けない\n"
+        "・レシピなら『和食/洋食/中華/麺類/作り置き/お菓子/鶏肉』等のジャンルや主材料\n"
+        "・入力の id をそのまま返すこと\n\n"
+        + json.dumps(items, ensure_ascii=False)
+    )
+    schema = _gt.Schema(
+        type="ARRAY",
+        items=_gt.Schema(
+            type="OBJECT",
+            properties={
+                "id": _gt.Schema(type="INTEGER"),
+                "tags": _gt.Schema(type="ARRAY", items=_gt.Schema(type="STRING")),
+            },
+            required=["id", "tags"],
+        ),
+    )
+    model = await resolve_gemini_model("link_auto_tag", default_pro=False)
+    resp = await gemini_client.aio.models.generate_content(
+        model=model,
+        contents=prompt,
+        config=_gt.GenerateContentConfig(response_mime_type="application/json", response_schema=schema),
+    )
+    data = json.loads(resp.text or "[]")
+    wanted = {lk["id"] for lk in links}
+    out = {}
+    for row in data if isinstance(data, list) else []:
+        try:
+            link_id = int(row.get("id"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        tags = normalize_tags(row.get("tags"))
+        if link_id in wanted and tags:
+            out[link_id] = tags
+    return out
+
+
+async def fetch_link_thumbnail(lk: dict, session=None) -> str:
+    """リンク種別に応じた最適な方法でサムネイル画像URLを取得する。
+    書籍は Google Books、マップは Google Places、それ以外は OGP画像。
+    種別固有の取得に失敗したら OGP画像にフォールバックする。"""
+    from api.routes import fetch_book_cover, fetch_og_image, fetch_place_photo, _extract_youtube_id
+
+    url = lk.get("url") or ""
+    ltype = lk.get("type") or "web"
+    title = (lk.get("title") or "").strip()
+
+    # YouTube は動画サムネをフロントで使うのでサーバー取得は不要
+    if _extract_youtube_id(url):
+        return ""
+
+    if ltype == "book":
+        img = await fetch_book_cover(title, session=session)
+        if img:
+            return img
+        return await fetch_og_image(url, session)
+    if ltype == "map":
+        # タイトルが場所名（fetch_maps_info 由来）。汎用名なら URL から場所名を引き直す。
+        query = title
+        if not query or query in _GENERIC_MAP_TITLES:
+            try:
+                from web_parser import fetch_maps_info
+                place_name, _ = await fetch_maps_info(url)
+                if place_name and place_name != "Google Maps Location":
+                    query = place_name
+            except Exception:
+                pass
+        img = await fetch_place_photo(query, session)
+        if img:
+            return img
+        return await fetch_og_image(url, session)
+    return await fetch_og_image(url, session)
+
+
+def _cache_key(lk: dict) -> str:
+    """URL キャッシュのキー。書籍・マップはタイトルでも引き先が変わるので含める。"""
+    ltype = lk.get("type") or "web"
+    if ltype in ("book", "map"):
+        return f"{ltype}|{(lk.get('title') or '').strip()}|{lk.get('url') or ''}"
+    return lk.get("url") or ""
+
+
+async def thumbnail_for_link(lk: dict, refresh: bool = False, session=None) -> str:
+    """URL キャッシュを見てからサムネイルを取得する（refresh=True で取り直す）。失敗時は空。"""
+    from api.database import link_url_cache_get_many, link_url_cache_put
+
+    key = _cache_key(lk)
+    if key and not refresh:
+        try:
+            cached = (await link_url_cache_get_many([key], _URL_CACHE_DAYS)).get(key)
+            if cached is not None:
+                return "" if cached == "__none__" else cached
+        except Exception as e:
+            logging.debug(f"link_url_cache 読み込みエラー: {e}")
+    img = await fetch_link_thumbnail(lk, session)
+    if key:
+        try:
+            await link_url_cache_put(key, img or "__none__")
+        except Exception as e:
+            logging.debug(f"link_url_cache 保存エラー: {e}")
+    return img
+
+
+def pending_for(kind: str, links: list[dict], link_ids=None, overwrite: bool = False,
+                refresh: bool = False) -> dict:
+    """ジョブの処理対象（{"tags": [...], "thumbnails": [...]}）を決める。
+
+    タグは未タグ（overwrite なら全件）、サムネイルは未取得（refresh なら全件）のリンク。"""
+    if link_ids:
+        wanted = {int(i) for i in link_ids}
+        links = [lk for lk in links if lk["id"] in wanted]
+    pending = {"tags": [], "thumbnails": []}
+    for lk in links:
+        if kind in ("tags", "all") and (overwrite or not (lk.get("tags") or "").strip()):
+            pending["tags"].append(lk["id"])
+        if kind in ("thumbnails", "all") and (refresh or not (lk.get("thumbnail") or "").strip()):
+            pending["thumbnails"].append(lk["id"])
+    return pending
+
+
+@in_lane(LANE_BACKGROUND)
+async def run_job(job_id: str, gemini_client) -> None:
+    """ジョブを残り（pending）から最後まで処理する。起動直後・再起動後の再開の両方で使う。
+
+    中断（キャンセル）時は進捗だけ保存して running のまま残し、次回起動時に再開させる。"""
+    from api.database import (
+        get_all_links, link_enrich_job_get, link_enrich_job_update, set_link_tags, set_link_thumbnail,
+    )
+
+    job = await link_enrich_job_get(job_id)
+    if not job or job["status"] not in ("queued", "running"):
+        return
+    opts = job.get("options") or {}
+    pending = {k: list(job["pending"].get(k) or []) for k in ("tags", "thumbnails")}
+    counts = {"tagged": int(job.get("tagged") or 0), "thumbnails": int(job.get("thumbnails") or 0)}
+    total = int(job.get("progress_total") or 0)
+    lock = asyncio.Lock()
+
+    async def flush(**extra):
+        async with lock:
+            snapshot = {k: list(v) for k, v in pending.items()}
+            remaining = sum(len(v) for v in snapshot.values())
+            await link_enrich_job_update(
+                job_id, pending=snapshot, progress_current=total - remaining, **counts, **extra
+            )
+
+    links = {lk["id"]: lk for lk in await get_all_links()}
+    for k in pending:
+        pending[k] = [i for i in pending[k] if i in links]  # 途中で削除されたリンクは除く
+    await flush(status="running")
+
+    async def tag_stage():
+        ids = list(pending["tags"])
+        if ids and not gemini_client:
+            logging.warning(f"link enrich {job_id}: Gemini 未設定のためタグ付けを省略します")
+            pending["tags"].clear()
+            return
+        if not opts.get("overwrite"):
+            # 再開時、前回の実行で付いたものは飛ばす
+            fresh = {lk["id"]: lk for lk in await get_all_links()}
+            skip = [i for i in ids if (fresh.get(i, {}).get("tags") or "").strip()]
+            for i in skip:
+                pending["tags"].remove(i)
+            ids = [i for i in ids if i not in skip]
+        sem = asyncio.Semaphore(_TAG_CONCURRENCY)
+
+        async def one_batch(batch):
+            async with sem:
+                try:
+                    result = await generate_tags_batch(gemini_client, [links[i] for i in batch])
+                except Exception as e:
+                    logging.warning(f"link enrich {job_id}: タグ生成エラー ({len(batch)}件): {e}")
+                    result = {}
+                for i in batch:
+                    if result.get(i):
+                        await set_link_tags(i, result[i])
+                        counts["tagged"] += 1
+                    if i in pending["tags"]:
+                        pending["tags"].remove(i)
+                await flush()
+
+        await asyncio.gather(*(one_batch(ids[n:n + _TAG_BATCH]) for n in range(0, len(ids), _TAG_BATCH)))
+
+    async def thumbnail_stage():
+        import aiohttp
+        from api.database import link_url_cache_get_many
+
+        ids = list(pending["thumbnails"])
+        if not ids:
+            return
+        refresh = bool(opts.get("refresh"))
+        by_key: dict[str, list[int]] = {}
+        for i in ids:
+            by_key.setdefault(_cache_key(links[i]), []).append(i)
+        cached = {} if refresh else await link_url_cache_get_many([k for k in by_key if k], _URL_CACHE_DAYS)
+        sem = asyncio.Semaphore(_FETCH_CONCURRENCY)
+        done = 0
+        connector = aiohttp.TCPConnector(limit=_FETCH_CONCURRENCY * 2, limit_per_host=3)
+        async with aiohttp.ClientSession(connector=connector) as session:
+
+            async def one_key(key, group):
+                nonlocal done
+                if key in cached:
+                    img = "" if cached[key] == "__none__" else cached[key]
+                else:
+                    async with sem:
+                        img = await thumbnail_for_link(links[group[0]], refresh=True, session=session)
+                for i in group:
+                    await set_link_thumbnail(i, img or "__none__")
+                    if img:
+                        counts["thumbnails"] += 1
+                    pending["thumbnails"].remove(i)
+                    done += 1
+                    if done % _FLUSH_EVERY == 0:
+                        await flush()
+
+            await asyncio.gather(*(one_key(k, g) for k, g in by_key.items()))
+
+    try:
+        results = await asyncio.gather(tag_stage(), thumbnail_stage(), return_exceptions=True)
+    except asyncio.CancelledError:
+        try:
+            await asyncio.shield(flush())
+        except Exception:
+            pass
+        raise
+    errors = [r for r in results if isinstance(r, BaseException)]
+    for err in errors:
+        logging.error(f"link enrich {job_id} failed: {err}", exc_info=err)
+    if errors:
+        await flush(status="error", error="; ".join(str(e) for e in errors))
+        return
+    await flush(status="done")
+    logging.info(
+        f"link enrich {job_id} 完了: タグ {counts['tagged']}件・サムネイル {counts['thumbnails']}件 / {total}件"
+    )
@@ -0,0 +1,205 @@
+"""保有銘柄ニュースの取得パイプライン（営業日キャッシュ・並列取得・見出しハッシュでの重複判定）。
+
+従来の朝のニュース配信は保有銘柄を 1 件ずつ Gemini（検索つき）に問い合わせ、2 秒ずつ待っていた。
+同じ日に PWA の /investment/news_sentiment で同じ銘柄を開くと、また同じ調査をしていた。ここでは
+
+- レポートは (銘柄, 営業日, プロンプト版) ごとに news_reports へ 1 件保存し、同じ営業日はそれを返す
+  （週末は直前の金曜扱い。プロンプトを書き換えたら版が変わって取り直す）
+- 同じ銘柄の同時要求は 1 回の取得にまとめる
+- Gemini への問い合わせは共有のトークンバケット（rate_limiter.RequestScheduler）で流量を揃え、
+  朝のバッチ（routine レーン）より対話（interactive レーン）を先に通す
+- 前回との差分は行の文字列比較ではなく、見出しを正規化したハッシュ（news_items）で判定する
+
+    from services.news_pipeline import news_pipeline
+    entry = await news_pipeline.get_report(code, fetch)          # fetch: async () -> (report, saved_as)
+    new_lines = await news_pipeline.new_items(code, entry["report"])
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import re
+from typing import Awaitable, Callable, Optional
+
+from config import JST
+from services.rate_limiter import RequestScheduler, current_lane, request_lane
+
+# 見出し行・本文行の判定に使わない定型行（「該当ニュースなし」など）
+_EMPTY_ITEM_RE = re.compile(r"該当ニュースなし|ニュースは(ありません|無し|なし)|一切無")
+_SOURCE_RE = re.compile(r"\s*[—–-]+\s*出典[:：].*$")
+_FIRST_REPORT_RE = re.compile(r"^\[(初報[^\]]*|初報日不明)\]\s*")
+
+# 検索つき Gemini の流量（平均 0.5 回/秒・同時 4 件まで）。429 を受けたら自動で絞る
+_gemini_news = RequestScheduler("gemini_news", rate=0.5, burst=3, max_concurrent=4)
+
+
+def trading_day(now: Optional[datetime.datetime] = None) -> str:
+    """キャッシュのキーにする営業日（JST）。土日は直前の金曜にまとめる。"""
+    d = (now or datetime.datetime.now(JST)).date()
+    while d.weekday() >= 5:
+        d -= datetime.timedelta(days=1)
+    return d.isoformat()
+
+
+def prompt_version(template: str) -> str:
+    return hashlib.sha1(template.encode("utf-8")).hexdigest()[:8]
+
+
+def normalize_headline(line: str) -> str:
+    """ニュース行の比較用正規化キー。
+    - 行頭の箇条書き記号・番号・初報日タグ、末尾の出典を除去
+    - 日付（YYYY-MM-DD, M/D 等）・URL・空白を除去して、同一トピックを同一視
+    """
+    s = line.strip()
+    s = re.sub(r"^[-*・●◯○■□▶▷>]+\s*", "", s)
+    s = re.sub(r"^\d+[\.\)、]\s*", "", s)
+    s = _FIRST_REPORT_RE.sub("", s)
+    s = _SOURCE_RE.sub("", s)
+    s = re.sub(r"\(\s*出典[^\)]*\)", "", s)
+    s = re.sub(r"https?://\S+", "", s)
+    s = re.sub(r"\d{4}[-/年]\d{1,2}[-/月]\d{1,2}日?", "", s)
+    s = re.sub(r"\d{1,2}/\d{1,2}", "", s)
+    s = re.sub(r"\s+", "", s)
+    return s.lower()
+
+
+def parse_items(report: str) -> list[dict]:
+    """レポートを項目に分ける。[{"hash", "headline", "section", "line"}]（見出し行・定型行は除く）。"""
+    items: list[dict] = []
+    seen: set[str] = set()
+    section = ""
+    for raw in (report or "").splitlines():
+        line = raw.rstrip()
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("#"):
+            section = line.strip()
+            continue
+        if _EMPTY_ITEM_RE.search(line):
+            continue
+        key = normalize_headline(line)
+        if not key:
+            continue
+        h = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        if h in seen:
+            continue
+        seen.add(h)
+        headline = _SOURCE_RE.sub("", _FIRST_REPORT_RE.sub("", line.strip().lstrip("-*・ ").strip()))
+        items.append({"hash": h, "headline": headline[:300], "section": section, "line": line})
+    return items
+
+
+class NewsPipeline:
+    def __init__(self, scheduler: RequestScheduler = _gemini_news):
+        self.scheduler = scheduler
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.stats = {"cache_hits": 0, "fetches": 0, "errors": 0}
+
+    async def get_report(
+        self,
+        code: str,
+        fetch: Callable[[], Awaitable[tuple[str, str]]],
+        version: str = "",
+        market: str = "",
+        refresh: bool = False,
+        lane: Optional[str] = None,
+    ) -> Optional[dict]:
+        """営業日キャッシュから (銘柄) のレポートを返す。無ければ fetch() で取得して保存する。
+
+        戻り値: {"report", "saved_as", "trading_day", "cached"}。取得に失敗したら None。"""
+        from api.database import news_report_get
+
+        day = trading_day()
+        if not refresh:
+            try:
+                row = await news_report_get(code, day, version)
+            except Exception as e:
+                logging.debug(f"news_pipeline: キャッシュ読み込み失敗 {code}: {e}")
+                row = None
+            if row:
+                self.stats["cache_hits"] += 1
+                return {"report": row["report"], "saved_as": row["saved_as"], "trading_day": day, "cached": True}
+
+        key = (code, day, version)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(code, day, version, market, fetch, lane))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, code, day, version, market, fetch, lane) -> Optional[dict]:
+        from api.database import news_report_put
+
+        async with self.scheduler.slot(lane):
+            try:
+                with request_lane(lane or current_lane()):
+                    report, saved_as = await fetch()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"news_pipeline: 取得に失敗 {code}: {e}")
+                return None
+        self.stats["fetches"] += 1
+        report = (report or "").strip()
+        if not report:
+            return None
+        try:
+            await news_report_put(code, day, version, market, report, saved_as or "")
+        except Exception as e:
+            logging.debug(f"news_pipeline: キャッシュ保存失敗 {code}: {e}")
+        return {"report": report, "saved_as": saved_as or "", "trading_day": day, "cached": False}
+
+    async def new_items(self, code: str, report: str, seed_report: str = "") -> list[str]:
+        """report のうち、前の営業日までに見ておらず、前の日までに配信してもいない項目の行だけを返す
+        （直前の見出し行は文脈として残す）。週末は金曜のレポートがそのまま返るので、配信日で重複を防ぐ。
+
+        seed_report は移行用: この銘柄の項目がまだ 1 件も記録されていなければ、前回分として先に登録する。"""
+        from api.database import news_items_count, news_items_record
+
+        day = trading_day()
+        items = parse_items(report)
+        if seed_report:
+            try:
+                if await news_items_count(code) == 0:
+                    prev_day = (datetime.date.fromisoformat(day) - datetime.timedelta(days=1)).isoformat()
+                    await news_items_record(code, parse_items(seed_report), prev_day)
+            except Exception as e:
+                logging.debug(f"news_pipeline: 旧レポートの登録に失敗 {code}: {e}")
+        today = datetime.datetime.now(JST).date().isoformat()
+        known = await news_items_record(code, items, day, notified_on=today)
+
+        out: list[str] = []
+        last_section = None
+        for it in items:
+            if it["hash"] in known:
+                continue
+            if it["section"] and it["section"] != last_section:
+                out.append(it["section"])
+                last_section = it["section"]
+            out.append(it["line"])
+        return out
+
+    async def collect(
+        self,
+        codes: list[str],
+        fetch_for: Callable[[str], Callable[[], Awaitable[tuple[str, str]]]],
+        version: str = "",
+        market_for: Callable[[str], str] = lambda _c: "",
+        lane: Optional[str] = None,
+    ) -> dict[str, Optional[dict]]:
+        """複数銘柄のレポートを並列に集める（流量は scheduler が揃える）。{code: entry or None}"""
+        async def one(code):
+            try:
+                return code, await self.get_report(
+                    code, fetch_for(code), version=version, market=market_for(code), lane=lane
+                )
+            except Exception as e:
+                logging.error(f"news_pipeline: {code} の処理に失敗: {e}")
+                return code, None
+
+        return dict(await asyncio.gather(*(one(c) for c in codes)))
+
+
+news_pipeline = NewsPipeline()
@@ -0,0 +1,176 @@
+"""デイリーノート（DailyNotes/YYYY-MM-DD.md）の見出し索引。
+
+週次レビューや「過去の今日」は、日付ごとに find_file → read_text_file を直列に繰り返して
+から正規表現で `## 見出し` を切り出していた（期間に比例して Drive 往復が増える）。
+ここではノートを `## ` 見出し単位に分けて note_sections に持ち、期間×見出しを 1 クエリで
+引けるようにする。索引は
+
+- GoogleDriveService がデイリーノートを書き込み・読み込みしたとき（index_note）
+- DailyNotes フォルダの差分同期（sync_daily_notes: modifiedTime が前回より新しいものだけ読む）
+
+で更新する。同期ワーカー（sync_worker.py）など別プロセスからの書き込みは差分同期で拾う。
+初回の同期は直近 _INITIAL_WINDOW_DAYS 日に更新されたノートだけを取り込む。
+"""
+import asyncio
+import datetime
+import hashlib
+import logging
+import re
+import time
+
+from config import JST
+
+DAILY_FOLDER = "DailyNotes"
+_NOTE_NAME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.md$")
+_SYNC_MARKER = "note_index.synced_at"
+_SYNC_FRESH_SEC = 600
+_INITIAL_WINDOW_DAYS = 400
+_READ_CONCURRENCY = 4
+
+_last_sync: float | None = None  # time.monotonic()。None は未同期（起動直後・mark_stale 後）
+_sync_lock: asyncio.Lock | None = None
+
+
+def note_date_from_name(name: str) -> str | None:
+    m = _NOTE_NAME_RE.match(name or "")
+    return m.group(1) if m else None
+
+
+def split_sections(content: str) -> list[tuple[str, str]]:
+    """`## ` 見出しごとに (見出し行, 本文) へ分ける。最初の見出しより前（タイトル等）は捨てる。"""
+    sections = []
+    heading, buf = None, []
+    for line in (content or "").splitlines():
+        if line.startswith("## "):
+            if heading is not None:
+                sections.append((heading, "\n".join(buf).strip()))
+            heading, buf = line.strip(), []
+        elif heading is not None:
+            buf.append(line)
+    if heading is not None:
+        sections.append((heading, "\n".join(buf).strip()))
+    return sections
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+async def index_note(note_date: str, content: str, *, file_id: str = "", modified_time: str = "") -> bool:
+    """1 日分のノートを索引する。内容が前回と同じなら何もしない（変わったら True）。"""
+    from api.database import note_index_get, note_index_put, note_index_touch
+
+    note_hash = _hash(content or "")
+    current = await note_index_get(note_date)
+    if current and current["note_hash"] == note_hash:
+        if (file_id and file_id != current["file_id"]) or (
+            modified_time and modified_time != current["modified_time"]
+        ):
+            await note_index_touch(note_date, file_id=file_id, modified_time=modified_time)
+        return False
+    sections = [(h, b, _hash(f"{h}\n{b}")) for h, b in split_sections(content)]
+    await note_index_put(note_date, note_hash, sections, file_id=file_id, modified_time=modified_time)
+    return True
+
+
+def mark_stale() -> None:
+    """外部でノートが書き換わった可能性があるとき、次の参照で差分同期させる。"""
+    global _last_sync
+    _last_sync = None
+
+
+def _synced_within(max_age_sec: float) -> bool:
+    # 0.0 を「未同期」にすると、起動から max_age_sec 経っていないホストでは初回同期が飛ばされる
+    return _last_sync is not None and time.monotonic() - _last_sync < max_age_sec
+
+
+async def _list_changed(drive_service, service, folder_id: str, since: str) -> list[dict]:
+    from utils.executors import GOOGLE_API, run_in
+
+    query = f"'{folder_id}' in parents and trashed = false"
+    query += f" and modifiedTime > '{since}'"
+    files, token = [], None
+    while True:
+        res = await run_in(
+            GOOGLE_API,
+            lambda: service.files().list(
+                q=query, pageSize=1000, pageToken=token,
+                fields="nextPageToken, files(id, name, modifiedTime)",
+            ).execute()
+        )
+        files.extend(res.get("files", []))
+        token = res.get("nextPageToken")
+        if not token:
+            return files
+
+
+async def sync_daily_notes(drive_service, max_age_sec: float = _SYNC_FRESH_SEC) -> int:
+    """前回の同期以降に Drive 側で更新されたデイリーノートだけを読み直して索引する。
+
+    max_age_sec 以内に同期済みなら何もしない。読み直して内容が変わったノート数を返す。"""
+    global _last_sync, _sync_lock
+    if not drive_service or _synced_within(max_age_sec):
+        return 0
+    if _sync_lock is None:
+        _sync_lock = asyncio.Lock()
+    async with _sync_lock:
+        if _synced_within(max_age_sec):
+            return 0
+        from api.database import get_app_setting, note_index_modified_times, set_app_setting
+
+        service = drive_service.get_service()
+        if not service:
+            return 0
+        folder_id = await drive_service.find_file(service, drive_service.folder_id, DAILY_FOLDER)
+        if not folder_id:
+            return 0
+        since = await get_app_setting(_SYNC_MARKER, "")
+        if not since:
+            start = datetime.datetime.now(JST) - datetime.timedelta(days=_INITIAL_WINDOW_DAYS)
+            since = start.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        files = await _list_changed(drive_service, service, folder_id, since)
+        known = await note_index_modified_times()
+        targets = [
+            (note_date_from_name(f.get("name")), f) for f in files
+            if note_date_from_name(f.get("name")) and known.get(note_date_from_name(f.get("name"))) != f.get("modifiedTime")
+        ]
+        sem = asyncio.Semaphore(_READ_CONCURRENCY)
+        failed = False
+
+        async def one(note_date, f):
+            nonlocal failed
+            async with sem:
+                content = await drive_service.read_text_file(service, f["id"])
+            if not content:
+                failed = True  # 読めなかったものは次回また拾うため、同期位置を進めない
+                return False
+            return await index_note(note_date, content, file_id=f["id"], modified_time=f["modifiedTime"])
+
+        results = await asyncio.gather(*(one(d, f) for d, f in targets))
+        newest = max([since] + [f.get("modifiedTime") or "" for f in files])
+        if not failed and newest != since:
+            await set_app_setting(_SYNC_MARKER, newest)
+        _last_sync = time.monotonic()
+        changed = sum(1 for r in results if r)
+        if changed:
+            logging.info(f"note_index: {changed} 件のデイリーノートを索引しました")
+        return changed
+
+
+async def get_sections(
+    start_date: str, end_date: str, headings: list[str] | None = None, drive_service=None
+) -> dict[str, list[tuple[str, str]]]:
+    """期間 [start_date, end_date]（YYYY-MM-DD）の見出しを {日付: [(見出し, 本文), ...]} で返す。
+
+    drive_service を渡すと、先に差分同期（_SYNC_FRESH_SEC 以内なら省略）してから引く。"""
+    from api.database import note_sections_range
+
+    if drive_service is not None:
+        try:
+            await sync_daily_notes(drive_service)
+        except Exception as e:
+            logging.warning(f"note_index: 差分同期に失敗（索引の内容で続行）: {e}")
+    out: dict[str, list[tuple[str, str]]] = {}
+    for row in await note_sections_range(start_date, end_date, headings):
+        out.setdefault(row["note_date"], []).append((row["heading"], row["body"]))
+    return out
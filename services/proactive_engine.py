@@ -0,0 +1,181 @@
+"""先回り通知（プロアクティブ通知）のトリガーを 1 本のタイマーヒープで管理するエンジン。
+
+従来は 15 分ごとのループで毎回カレンダー・タスク・習慣を読み直し、「25〜35 分後」の
+ような幅のある窓に入ったものだけを拾っていた。ここではソース（カレンダー・タスク・
+習慣など）ごとに
+
+  load()            : キャッシュ済みのソースデータを読む（ローカルストア/DB）
+  plan(data, now)   : データから Trigger（発火時刻・期限・重複防止キー）を組み立てる
+
+を登録し、エンジンは全ソースのトリガーを発火時刻順のヒープに積んで、次の発火時刻まで
+眠る。ソースの再計画は「データが変わったとき」だけ行う:
+
+  - invalidate(name) で即時に読み直す（ストアへの書き込み・同期の通知から呼ぶ）
+  - 外部で変わったものを拾うため、ソースごとの refresh_sec でも読み直す
+  - 読み直した結果の指紋（fingerprint）が前回と同じなら計画はそのまま
+
+発火は fire(trigger) コールバックに任せる（重複防止キーの記録・静かな時間帯の判定・
+メッセージ生成は呼び出し側）。期限（expires_at）を過ぎたトリガーは発火しない。
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from config import JST
+
+
+@dataclass
+class Trigger:
+    key: str  # 重複防止キー（proactive_alerts_sent と共通）
+    kind: str
+    fire_at: datetime.datetime
+    expires_at: datetime.datetime
+    payload: dict = field(default_factory=dict)
+    source: str = ""
+
+
+@dataclass
+class _Source:
+    name: str
+    load: Callable[[], Awaitable[Any]]
+    plan: Callable[[Any, datetime.datetime], list]
+    refresh_sec: float
+    fingerprint: str = ""
+    dirty: bool = True
+    next_refresh: Optional[datetime.datetime] = None
+    keys: set = field(default_factory=set)
+
+
+def _fingerprint(data) -> str:
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ProactiveEngine:
+    def __init__(self, fire: Callable[[Trigger], Awaitable[None]], *, name: str = "proactive"):
+        self.name = name
+        self._fire = fire
+        self._sources: dict[str, _Source] = {}
+        self._triggers: dict[str, Trigger] = {}
+        self._heap: list = []  # (fire_at, seq, key)
+        self._seq = itertools.count()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"loads": 0, "replans": 0, "fired": 0, "expired": 0}
+
+    # ---- 登録・通知 ----
+
+    def add_source(self, name: str, load, plan, refresh_sec: float) -> None:
+        self._sources[name] = _Source(name, load, plan, float(refresh_sec))
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """ソース（省略時は全ソース）を次の周回で読み直させる。イベントループ上から呼ぶこと。"""
+        for src in self._sources.values():
+            if name is None or src.name == name:
+                src.dirty = True
+        if self._wake is not None:
+            self._wake.set()
+
+    def upcoming(self, limit: int = 20) -> list[dict]:
+        """予定済みのトリガー（発火時刻順）。デバッグ・確認用。"""
+        items = sorted(self._triggers.values(), key=lambda t: t.fire_at)[:limit]
+        return [{"key": t.key, "kind": t.kind, "fire_at": t.fire_at.isoformat(),
+                 "expires_at": t.expires_at.isoformat()} for t in items]
+
+    # ---- 起動・停止 ----
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            from utils.async_utils import safe_create_task
+            self._wake = asyncio.Event()
+            self._task = safe_create_task(self._run(), name=f"{self.name}-engine")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    # ---- 本体 ----
+
+    async def _refresh(self, src: _Source, now: datetime.datetime) -> None:
+        src.dirty = False
+        src.next_refresh = now + datetime.timedelta(seconds=src.refresh_sec)
+        try:
+            data = await src.load()
+        except Exception as e:
+            logging.warning(f"[{self.name}] ソース {src.name} の読み込みに失敗: {e}")
+            return
+        self.stats["loads"] += 1
+        fp = _fingerprint(data)
+        if fp == src.fingerprint:
+            return
+        try:
+            planned = [t for t in src.plan(data, now) if t.expires_at > now]
+        except Exception as e:
+            logging.error(f"[{self.name}] ソース {src.name} の計画に失敗: {e}", exc_info=True)
+            return
+        src.fingerprint = fp
+        self.stats["replans"] += 1
+        new_keys = set()
+        for t in planned:
+            t.source = src.name
+            new_keys.add(t.key)
+            old = self._triggers.get(t.key)
+            self._triggers[t.key] = t
+            if old is None or old.fire_at != t.fire_at:
+                heapq.heappush(self._heap, (t.fire_at, next(self._seq), t.key))
+        for key in src.keys - new_keys:
+            self._triggers.pop(key, None)  # ヒープ上の古い項目は取り出し時に捨てる
+        src.keys = new_keys
+
+    async def _fire_due(self, now: datetime.datetime) -> None:
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _seq, key = heapq.heappop(self._heap)
+            t = self._triggers.get(key)
+            if t is None or t.fire_at != fire_at:
+                continue  # 再計画で消えた/時刻が変わった
+            del self._triggers[key]
+            src = self._sources.get(t.source)
+            if src is not None:
+                src.keys.discard(key)
+            if now >= t.expires_at:
+                self.stats["expired"] += 1
+                continue
+            self.stats["fired"] += 1
+            try:
+                await self._fire(t)
+            except Exception as e:
+                logging.error(f"[{self.name}] {t.kind} ({t.key}) の発火に失敗: {e}", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.datetime.now(JST)
+            for src in self._sources.values():
+                if src.dirty or src.next_refresh is None or now >= src.next_refresh:
+                    await self._refresh(src, now)
+            now = datetime.datetime.now(JST)
+            await self._fire_due(now)
+
+            wake_at = [src.next_refresh for src in self._sources.values() if src.next_refresh]
+            if self._heap:
+                wake_at.append(self._heap[0][0])
+            delay = max(0.0, (min(wake_at) - now).total_seconds()) if wake_at else 3600.0
+            self._wake.clear()
+            if any(src.dirty for src in self._sources.values()):
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,219 @@
+"""Gemini のコンテキストキャッシュ（cachedContents）で、毎回同じ長いプレフィックスを送らないようにする。
+
+PartnerCog の会話・定期メッセージはシステムプロンプト（取扱説明書を含めて数千トークン）を、
+投資の銘柄審査は投資憲法を、呼び出しのたびに送り直していた。ここでは
+
+- system_instruction・tools・tool_config を「固定プレフィックス」として、(モデル, プレフィックス, label) の
+  ハッシュをキーに API 側へキャッシュを作り、その名前（cachedContents/...）を使い回す
+- 名前はメモリと SQLite（gemini_context_caches）に期限つきで持ち、期限が近づいたら延長する。
+  取扱説明書や憲法を書き換えるとハッシュが変わるので新しく作り、同じ label の古いキャッシュは消す
+- 短すぎる（最小トークン数に届かない）プレフィックスや作成に失敗したものは普通に送る
+- キャッシュが API 側で消えていた場合は、元のプレフィックスで送り直す（generate / stream）
+
+    from services.prompt_cache import prompt_cache
+    config = await prompt_cache.config(client, model, "partner_chat", system_prompt, tools=tools)
+    resp = await client.aio.models.generate_content(model=model, contents=contents, config=config)
+
+プレフィックスに現在時刻などの毎回変わる値を入れるとキャッシュにならないので、
+そうした値は contents 側（最新のユーザーメッセージ）に入れること（prompts.current_time_note）。
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+_TTL_SEC = 3600
+_RENEW_MARGIN_SEC = 300
+# これより短い system_instruction はキャッシュの最小トークン数（flash 1024 / pro 2048〜4096）に
+# 届かないことが多いので、作らずにそのまま送る
+_MIN_CHARS = 3000
+_RETRY_AFTER_FAIL_SEC = 6 * 3600
+_PREFIX_FIELDS = ("tools", "tool_config")
+
+
+def _is_cache_error(e: Exception) -> bool:
+    msg = str(e).lower()
+    return "cachedcontent" in msg or "cached content" in msg or "cached_content" in msg
+
+
+class PromptCache:
+    def __init__(self):
+        self._handles: dict[str, tuple[str, float]] = {}   # key -> (name, expires_at)
+        self._sources: dict[str, dict] = {}                # name -> プレフィックス（送り直し用）
+        self._failed: dict[str, float] = {}                # key -> 次に作成を試す時刻
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats = {"reused": 0, "created": 0, "extended": 0, "fallbacks": 0, "errors": 0}
+
+    async def config(self, client, model: str, label: str, system_instruction: str, **kwargs):
+        """キャッシュが使えれば cached_content を、使えなければ system_instruction 等をそのまま入れた
+        GenerateContentConfig を返す。kwargs のうち tools / tool_config はプレフィックス側に入る。"""
+        from google.genai import types
+
+        prefix = {"system_instruction": system_instruction}
+        for field in _PREFIX_FIELDS:
+            value = kwargs.pop(field, None)
+            if value is not None:
+                prefix[field] = value
+        name = await self.handle(client, model, label, prefix)
+        if name:
+            return types.GenerateContentConfig(cached_content=name, **kwargs)
+        return types.GenerateContentConfig(**prefix, **kwargs)
+
+    def uncached_config(self, config):
+        """cached_content を使う config を、元のプレフィックスを直接入れた config に戻す（モデルを変えるとき用）。"""
+        name = getattr(config, "cached_content", None)
+        prefix = self._sources.get(name) if name else None
+        if prefix is None:
+            return config
+        return config.model_copy(update={"cached_content": None, **prefix})
+
+    async def handle(self, client, model: str, label: str, prefix: dict) -> Optional[str]:
+        """プレフィックスのキャッシュ名を返す。使えなければ None。"""
+        if client is None or len(prefix.get("system_instruction") or "") < _MIN_CHARS:
+            return None
+        from services.gemini_gateway import request_key
+
+        try:
+            key = request_key(model, prefix, label)
+        except Exception:
+            return None
+        now = time.time()
+        if self._failed.get(key, 0) > now:
+            return None
+        hit = self._handles.get(key)
+        if hit and hit[1] - _RENEW_MARGIN_SEC > now:
+            self.stats["reused"] += 1
+            return hit[0]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._obtain(client, model, label, key, prefix))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _obtain(self, client, model: str, label: str, key: str, prefix: dict) -> Optional[str]:
+        from google.genai import types
+        from api.database import gemini_context_cache_get, gemini_context_cache_put
+
+        now = time.time()
+        hit = self._handles.get(key)
+        if hit is None:
+            try:
+                row = await gemini_context_cache_get(key, now + _RENEW_MARGIN_SEC)
+            except Exception as e:
+                logging.debug(f"prompt_cache: 読み込み失敗 {label}: {e}")
+                row = None
+            if row:
+                self._handles[key] = (row["name"], row["expires_at"])
+                self._sources[row["name"]] = prefix
+                self.stats["reused"] += 1
+                return row["name"]
+
+        name = token_count = None
+        if hit is not None:
+            # 期限が近い: 延長する（消えていたら作り直す）
+            try:
+                await client.aio.caches.update(
+                    name=hit[0], config=types.UpdateCachedContentConfig(ttl=f"{_TTL_SEC}s")
+                )
+                name = hit[0]
+                self.stats["extended"] += 1
+            except Exception as e:
+                logging.debug(f"prompt_cache: 延長できないので作り直す {label}: {e}")
+                self._forget_local(hit[0])
+        if name is None:
+            try:
+                cached = await client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(display_name=label, ttl=f"{_TTL_SEC}s", **prefix),
+                )
+            except Exception as e:
+                self.stats["errors"] += 1
+                self._failed[key] = now + _RETRY_AFTER_FAIL_SEC
+                logging.info(f"prompt_cache: {label} のキャッシュを作れないため通常送信にする: {e}")
+                return None
+            name = cached.name
+            meta = getattr(cached, "usage_metadata", None)
+            token_count = int(getattr(meta, "total_token_count", 0) or 0)
+            self.stats["created"] += 1
+            logging.info(f"prompt_cache: {label} ({model}) のキャッシュを作成 {name} ({token_count} tokens)")
+
+        expires_at = time.time() + _TTL_SEC
+        self._handles[key] = (name, expires_at)
+        self._sources[name] = prefix
+        try:
+            stale = await gemini_context_cache_put(key, label, model, name, token_count or 0, expires_at)
+        except Exception as e:
+            logging.debug(f"prompt_cache: 保存失敗 {label}: {e}")
+            stale = []
+        for old in stale:
+            if old == name:
+                continue
+            self._forget_local(old)
+            try:
+                await client.aio.caches.delete(name=old)
+            except Exception as e:
+                logging.debug(f"prompt_cache: 古いキャッシュの削除に失敗 {old}: {e}")
+        return name
+
+    def _forget_local(self, name: str) -> None:
+        for key, (n, _exp) in list(self._handles.items()):
+            if n == name:
+                self._handles.pop(key, None)
+        self._sources.pop(name, None)
+
+    async def generate(self, call: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Any:
+        """call(*args, **kwargs) を送り、キャッシュが API 側で見つからないエラーなら元のプレフィックスで送り直す。"""
+        config = kwargs.get("config")
+        name = getattr(config, "cached_content", None)
+        if not name:
+            return await call(*args, **kwargs)
+        try:
+            return await call(*args, **kwargs)
+        except Exception as e:
+            prefix = self._sources.get(name)
+            if prefix is None or not _is_cache_error(e):
+                raise
+            self.stats["fallbacks"] += 1
+            logging.warning(f"prompt_cache: キャッシュ {name} が使えないため通常送信で再試行: {e}")
+            retry_config = config.model_copy(update={"cached_content": None, **prefix})
+            self._forget_local(name)
+            try:
+                from api.database import gemini_context_cache_delete
+                await gemini_context_cache_delete(name)
+            except Exception as db_err:
+                logging.debug(f"prompt_cache: 削除失敗 {name}: {db_err}")
+            return await call(*args, **{**kwargs, "config": retry_config})
+
+    async def stream(self, call: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict):
+        """generate のストリーム版。await call(...) のチャンクを流し、最初のチャンクより前に
+        キャッシュが見つからないエラーになったら元のプレフィックスで送り直す。"""
+        config = kwargs.get("config")
+        name = getattr(config, "cached_content", None)
+        started = False
+        try:
+            async for chunk in await call(*args, **kwargs):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            prefix = self._sources.get(name) if name else None
+            if started or prefix is None or not _is_cache_error(e):
+                raise
+            self.stats["fallbacks"] += 1
+            logging.warning(f"prompt_cache: キャッシュ {name} が使えないため通常送信で再試行: {e}")
+            retry_config = config.model_copy(update={"cached_content": None, **prefix})
+            self._forget_local(name)
+            try:
+                from api.database import gemini_context_cache_delete
+                await gemini_context_cache_delete(name)
+            except Exception as db_err:
+                logging.debug(f"prompt_cache: 削除失敗 {name}: {db_err}")
+        async for chunk in await call(*args, **{**kwargs, "config": retry_config}):
+            yield chunk
+
+
+prompt_cache = PromptCache()
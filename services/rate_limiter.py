@@ -0,0 +1,349 @@
+"""外部 API 呼び出し用のトークンバケット＋優先レーン付きリクエストスケジューラ。
+
+yfinance の OHLCV・ファンダ・PER 履歴のように、同じ提供元へ向かう呼び出しを
+1 つのスケジューラで共有して流量を揃える。
+
+- トークンバケット: 平均 rate 回/秒、瞬間最大 burst 回まで。固定 sleep の代わり。
+- 同時実行数の上限: max_concurrent（セマフォ相当）。
+- 優先レーン: 待ち行列は (レーン優先度, 到着順) のヒープ。対話（interactive）の
+  要求は、先に並んでいるバックグラウンド（background）の要求より先にトークンを得る。
+- 適応バックオフ: 429 等を受けたら penalize() でレートを半減し、Retry-After（無ければ
+  指数バックオフ）の間は払い出しを止める。成功が続けば徐々に元のレートへ戻す。
+- 任意で tpm（1 分あたりのトークン数）のバケットも持てる。acquire(cost=見積もり) で差し引き、
+  実際の使用量が分かったら charge() で差分を精算する（Gemini の TPM 制限用）。
+- reserve を指定すると、同時実行枠とトークンのうち reserve 個を対話レーン専用に残す。
+  大きなバッチが走っていても、対話の要求はすぐ払い出される。
+
+レーンは contextvars で呼び出し文脈に載せる（`with request_lane("background"):`）。
+asyncio.gather で作られるタスクにも引き継がれるので、バッチ処理の入口で 1 回指定すればよい。
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import math
+import re
+import time
+from collections import deque
+from typing import Optional
+
+from utils.executors import run_in
+
+LANE_INTERACTIVE = "interactive"
+LANE_ROUTINE = "routine"
+LANE_BACKGROUND = "background"
+_LANE_PRIORITY = {LANE_INTERACTIVE: 0, LANE_ROUTINE: 1, LANE_BACKGROUND: 2}
+
+_current_lane: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "request_lane", default=LANE_INTERACTIVE
+)
+
+
+def current_lane() -> str:
+    return _current_lane.get()
+
+
+@contextlib.contextmanager
+def request_lane(lane: str):
+    """この文脈（と、ここから生成されるタスク）の外部呼び出しを lane で並ばせる。"""
+    token = _current_lane.set(lane if lane in _LANE_PRIORITY else LANE_INTERACTIVE)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def in_lane(lane: str):
+    """async 関数をまるごと lane で実行するデコレータ（バッチ処理の入口に付ける）。"""
+    def deco(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with request_lane(lane):
+                return await func(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+class RateLimited(Exception):
+    """提供元からレート制限（HTTP 429 等）を受けたことを表す。retry_after は秒（不明なら None）。"""
+
+    def __init__(self, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_codes(exc: BaseException) -> set:
+    """例外が持つ HTTP ステータス・gRPC ステータス（genai の APIError は code=429 / status="RESOURCE_EXHAUSTED"、
+    requests / httpx の例外は response.status_code）。"""
+    out = set()
+    for obj in (exc, getattr(exc, "response", None)):
+        if obj is None:
+            continue
+        for attr in ("status", "status_code", "code"):
+            value = getattr(obj, attr, None)
+            if isinstance(value, (int, str)) and value != "":
+                out.add(value)
+    return out
+
+
+def _status_in_message(code: int, msg: str) -> bool:
+    """メッセージ中に単独の数字として code があるか。"$4293.T" のような銘柄コードや、
+    "(1050300)" のようなトークン数の一部は数えない。"""
+    return re.search(rf"(?<![\w.$]){code}(?!\w|\.\w)", msg) is not None
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """例外がレート制限由来か（yfinance の YFRateLimitError・HTTP 429・RESOURCE_EXHAUSTED 等）。"""
+    if isinstance(exc, RateLimited):
+        return True
+    name = type(exc).__name__
+    if "RateLimit" in name or "TooManyRequests" in name:
+        return True
+    if _status_codes(exc) & {429, "429", "RESOURCE_EXHAUSTED"}:
+        return True
+    msg = str(exc)
+    return (
+        "Too Many Requests" in msg or "Rate limited" in msg or "RESOURCE_EXHAUSTED" in msg
+        or _status_in_message(429, msg)
+    )
+
+
+def is_overloaded_error(exc: BaseException) -> bool:
+    """提供元が一時的に過負荷（HTTP 503 / UNAVAILABLE）か。レート制限と同様に待って再試行してよい。"""
+    if _status_codes(exc) & {503, "503", "UNAVAILABLE"}:
+        return True
+    msg = str(exc)
+    # "input token count (1050300) exceeds…" のような 400 を過負荷扱いしない（数字は単独のときだけ）
+    return re.search(r"\bUNAVAILABLE\b", msg) is not None or _status_in_message(503, msg)
+
+
+_RETRY_DELAY_RE = re.compile(r"""retry[_ ]?(?:delay|after|in)["']?\s*[:=]?\s*["']?(\d+(?:\.\d+)?)\s*s""", re.IGNORECASE)
+
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """例外から再試行までの秒数を取り出す（retry_after 属性・Retry-After ヘッダ・本文の retryDelay）。"""
+    value = getattr(exc, "retry_after", None)
+    if value:
+        return float(value)
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            header = headers.get("Retry-After") or headers.get("retry-after")
+            if header:
+                return float(header)
+        except (TypeError, ValueError):
+            pass
+    m = _RETRY_DELAY_RE.search(str(exc))
+    return float(m.group(1)) if m else None
+
+
+class RequestScheduler:
+    """トークンバケット＋同時実行上限＋優先レーンでリクエストの払い出しを制御する。"""
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrent: int,
+                 min_rate: Optional[float] = None, executor: Optional[str] = None,
+                 tpm: Optional[int] = None, reserve: int = 0):
+        self.name = name
+        self.executor = executor  # utils.executors のプール名（None なら既定のスレッドプール）
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate else max(0.1, rate / 16)
+        self.burst = max(1, int(burst))
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._tokens = float(self.burst)
+        # TPM バケット（満タンは 1 分ぶん。None なら制限しない）
+        self.tpm = int(tpm) if tpm else None
+        self._budget = float(self.tpm or 0)
+        # 対話レーン専用に残す同時実行枠・トークン数
+        self.reserve = max(0, min(int(reserve), self.max_concurrent - 1, self.burst - 1))
+        self._last_refill = time.monotonic()
+        self._inflight = 0
+        self._paused_until = 0.0
+        self._strikes = 0
+        self._waiters: list = []  # heap: (priority, seq, future, lane, cost)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stats = {
+            lane: {"granted": 0, "wait_total": 0.0, "wait_max": 0.0} for lane in _LANE_PRIORITY
+        }
+        self._recent_waits = {lane: deque(maxlen=200) for lane in _LANE_PRIORITY}
+        self._throttled = 0
+
+    # ---- 払い出し ----
+
+    @contextlib.asynccontextmanager
+    async def slot(self, lane: Optional[str] = None, cost: int = 0):
+        """トークンと同時実行枠を 1 つ確保する。ブロック内でリクエストを 1 回行うこと。
+        cost は TPM バケットから差し引く見積もりトークン数（tpm 未設定なら無視）。"""
+        await self.acquire(lane, cost)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, lane: Optional[str] = None, cost: int = 0) -> None:
+        lane = lane or current_lane()
+        prio = _LANE_PRIORITY.get(lane, 0)
+        cost = min(max(0, int(cost or 0)), self.tpm) if self.tpm else 0
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        queued_at = time.monotonic()
+        heapq.heappush(self._waiters, (prio, next(self._seq), fut, lane, cost))
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 払い出し直後にキャンセルされた: 枠を返す
+                self.release()
+            raise
+        waited = time.monotonic() - queued_at
+        st = self._stats.setdefault(lane, {"granted": 0, "wait_total": 0.0, "wait_max": 0.0})
+        st["granted"] += 1
+        st["wait_total"] += waited
+        st["wait_max"] = max(st["wait_max"], waited)
+        self._recent_waits.setdefault(lane, deque(maxlen=200)).append(waited)
+
+    def release(self) -> None:
+        self._inflight = max(0, self._inflight - 1)
+        self._dispatch()
+
+    def charge(self, tokens: int) -> None:
+        """実際の使用トークン数と見積もりの差分を TPM バケットに精算する（正なら追加で差し引く）。"""
+        if self.tpm and tokens:
+            self._budget = max(-float(self.tpm), min(float(self.tpm), self._budget - tokens))
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        if self.tpm:
+            self._budget = min(float(self.tpm), self._budget + elapsed * self.tpm / 60.0)
+        self._last_refill = now
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        delay = None
+        while self._waiters:
+            prio, _seq, fut, _lane, cost = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)  # キャンセル済み
+                continue
+            # 対話以外のレーンは reserve 分の枠とトークンを残して払い出す
+            held = self.reserve if prio > 0 else 0
+            if self._inflight >= self.max_concurrent - held:
+                break  # 枠が空けば release() から呼び直される
+            if now < self._paused_until:
+                delay = self._paused_until - now
+                break
+            if self._tokens < 1.0 + held:
+                delay = (1.0 + held - self._tokens) / self.rate if self.rate > 0 else 1.0
+                break
+            if self.tpm and self._budget < cost:
+                delay = (cost - self._budget) / (self.tpm / 60.0)
+                break
+            heapq.heappop(self._waiters)
+            self._tokens -= 1.0
+            self._budget -= cost
+            self._inflight += 1
+            fut.set_result(None)
+        if delay is not None:
+            # トークン不足/一時停止中: 次に払い出せる時刻に起き直す
+            self._schedule(max(0.005, delay))
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None and not self._timer.cancelled():
+            return
+        loop = asyncio.get_running_loop()
+
+        def _fire():
+            self._timer = None
+            self._dispatch()
+
+        self._timer = loop.call_later(delay, _fire)
+
+    # ---- 適応バックオフ ----
+
+    def penalize(self, retry_after: Optional[float] = None) -> float:
+        """レート制限を受けた。レートを半減し、一定時間払い出しを止める。停止秒数を返す。"""
+        self._strikes += 1
+        self._throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        pause = float(retry_after) if retry_after else min(60.0, 2.0 ** self._strikes)
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        self._tokens = 0.0
+        logging.warning(
+            f"[{self.name}] レート制限を検知: {pause:.1f}秒停止し、レートを {self.rate:.2f}/秒 に下げます"
+        )
+        return pause
+
+    def reward(self) -> None:
+        """成功応答。連続成功でレートを元の値へ少しずつ戻す。"""
+        if self._strikes:
+            self._strikes = max(0, self._strikes - 1)
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate * 1.1)
+
+    # ---- 計測 ----
+
+    def stats(self) -> dict:
+        queued_by_lane: dict[str, int] = {}
+        for w in self._waiters:
+            if not w[2].done():
+                queued_by_lane[w[3]] = queued_by_lane.get(w[3], 0) + 1
+        lanes = {}
+        for lane, st in self._stats.items():
+            g = st["granted"]
+            recent = sorted(self._recent_waits.get(lane) or ())
+            lanes[lane] = {
+                "granted": g,
+                "queued": queued_by_lane.get(lane, 0),
+                "avg_wait_ms": round(st["wait_total"] / g * 1000, 1) if g else 0.0,
+                # nearest-rank（ceil(0.95n) 番目）。切り捨てると標本が少ないとき実際より小さく出る
+                "p95_wait_ms": round(recent[math.ceil(0.95 * len(recent)) - 1] * 1000, 1) if recent else 0.0,
+                "max_wait_ms": round(st["wait_max"] * 1000, 1),
+            }
+        out = {
+            "name": self.name,
+            "rate": round(self.rate, 3),
+            "base_rate": self.base_rate,
+            "inflight": self._inflight,
+            "max_concurrent": self.max_concurrent,
+            "queued": sum(queued_by_lane.values()),
+            "throttled": self._throttled,
+            "paused_sec": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "lanes": lanes,
+        }
+        if self.tpm:
+            out["tpm"] = self.tpm
+            out["tpm_available"] = int(self._budget)
+        return out
+
+    async def call(self, func, *args, retries: int = 3, lane: Optional[str] = None):
+        """同期関数 func をスレッドで実行する（トークン取得・429 時の再試行込み）。
+        executor を指定したスケジューラはそのプールで実行する。
+
+        func がレート制限の例外を投げたら penalize して最大 retries 回まで並び直す。
+        それ以外の例外はそのまま呼び出し元へ伝える。"""
+        attempt = 0
+        while True:
+            async with self.slot(lane):
+                try:
+                    if self.executor:
+                        result = await run_in(self.executor, func, *args)
+                    else:
+                        result = await asyncio.to_thread(func, *args)
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt >= retries:
+                        raise
+                    self.penalize(getattr(e, "retry_after", None))
+                    attempt += 1
+                    continue
+            self.reward()
+            return result
@@ -0,0 +1,95 @@
+"""銘柄リサーチ結果のキャッシュ（スナップショット・審査・同業比較・配当・決算・CEO 検証）。
+
+InvestmentCog の run_stock_snapshot などは、呼ぶたびに Gemini（検索つき）へ問い合わせていた。
+PWA で同じボタンを続けて押したり、Discord とアプリで同じ銘柄を見たりすると、そのたびに
+数十秒と課金がかかっていた。ここでは結果を research_artifacts に
+
+    (種別, 銘柄, 営業日, プロンプト版, 追加パラメータ)
+
+で 1 件保存し、同じ営業日はそれを即座に返す（refresh=True で取り直し）。プロンプト版には
+プロンプトのテンプレートと、結果を左右する入力（投資憲法など）のハッシュを入れるので、
+書き換えれば自動で取り直しになる。同じキーの同時要求は 1 回の取得にまとめる。
+失敗（ok が真でない結果）は保存しない。
+
+    from services.research_cache import research_cache, version_of
+    result = await research_cache.get_or_run("snapshot", code, version_of(PROMPT_STOCK_SNAPSHOT), runner)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from typing import Awaitable, Callable
+
+from services.news_pipeline import trading_day
+
+
+def version_of(*parts: str) -> str:
+    """プロンプトのテンプレートや入力からキャッシュの版を作る（どれかが変われば別の版）。"""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:10]
+
+
+class ResearchCache:
+    def __init__(self):
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    async def get_or_run(
+        self,
+        kind: str,
+        code: str,
+        version: str,
+        runner: Callable[[], Awaitable[dict]],
+        refresh: bool = False,
+        params_key: str = "",
+    ) -> dict:
+        """キャッシュがあればその結果（"cached": True, "as_of" 付き）を、無ければ runner() の結果を返す。"""
+        from api.database import research_artifact_get
+
+        day = trading_day()
+        if not refresh:
+            try:
+                row = await research_artifact_get(kind, code, day, version, params_key)
+            except Exception as e:
+                logging.debug(f"research_cache: 読み込み失敗 {kind}/{code}: {e}")
+                row = None
+            if row:
+                self.stats["hits"] += 1
+                return {**row["payload"], "cached": True, "as_of": row["created_at"]}
+
+        key = (kind, code, day, version, params_key)
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(self._run(key, runner))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return dict(await asyncio.shield(task))
+
+    async def remember(self, kind: str, code: str, version: str, payload: dict, params_key: str = "") -> None:
+        """今日の結果を書き換える（カレンダー登録済みの印を付けるなど）。"""
+        from api.database import research_artifact_put
+
+        payload = {k: v for k, v in payload.items() if k not in ("cached", "as_of")}
+        await research_artifact_put(kind, code, trading_day(), version, payload, params_key)
+
+    async def _run(self, key: tuple, runner: Callable[[], Awaitable[dict]]) -> dict:
+        from api.database import research_artifact_put
+
+        kind, code, day, version, params_key = key
+        result = await runner()
+        if result.get("ok"):
+            try:
+                await research_artifact_put(kind, code, day, version, result, params_key)
+            except Exception as e:
+                logging.debug(f"research_cache: 保存失敗 {kind}/{code}: {e}")
+        return {**result, "cached": False}
+
+
+research_cache = ResearchCache()
@@ -2,15 +2,13 @@
 
 時刻と曜日は SCHEDULE_CATALOG に固定。ユーザーが設定画面で変更できるのは
 ON/OFF のみ。`schedule.<task_key>.enabled` を app_settings から読む。
+実行タイミングの計算とジョブの起動は services/job_scheduler.py が受け持つ。
 """
 from __future__ import annotations
 
-import datetime
 import logging
 from typing import Optional
 
-from config import JST
-
 
 # 設定画面に出すスケジュール一覧。
 # category: "manager" = マネージャーがユーザーに連絡するタスク（重複しない時刻に固定）
@@ -60,62 +58,16 @@ def _catalog_lookup(task_key: str) -> Optional[dict]:
     return None
 
 
-async def is_due(
-    task_key: str,
-    default_time: str,
-    default_dow: str,
-    last_run_date: Optional[datetime.date],
-) -> tuple[bool, datetime.date]:
-    """カタログ固定値と enabled フラグから「今この分に実行すべきか」を判定する。
+async def is_enabled(task_key: str) -> bool:
+    """ON/OFF 状態のみを問い合わせる（@tasks.loop(time=...) 系から使う）。
 
-    時刻・曜日はカタログを正とし、DB の値は無視する（設定UIから編集不可）。
-    後方互換のため引数 default_time / default_dow は残しているが、カタログ
-    が無い場合のフォールバックとしてのみ使う。
-    """
-    today = datetime.datetime.now(JST).date()
+    値は job_scheduler のメモリキャッシュから返す（設定変更時に invalidate される）。"""
     try:
-        from api.database import get_app_setting
+        from services.job_scheduler import scheduler
+        return await scheduler.is_enabled(task_key)
     except Exception as e:
-        logging.debug(f"schedule_resolver: db import failed: {e}")
-        return False, last_run_date or today
-
-    enabled = await get_app_setting(f"schedule.{task_key}.enabled", "1")
-    if enabled != "1":
-        return False, last_run_date
-
-    if last_run_date == today:
-        return False, last_run_date
-
-    row = _catalog_lookup(task_key)
-    time_str = row["time"] if row else default_time
-    dow = row["dow"] if row else default_dow
-
-    try:
-        h, m = map(int, time_str.split(":", 1))
-    except Exception:
-        h, m = map(int, default_time.split(":", 1))
-
-    now = datetime.datetime.now(JST)
-
-    if dow != "daily":
-        target_weekday = _DOW_MAP.get(dow)
-        if target_weekday is not None and now.weekday() != target_weekday:
-            return False, last_run_date
-
-    if now.hour != h or now.minute != m:
-        return False, last_run_date
-
-    return True, today
-
-
-async def is_enabled(task_key: str) -> bool:
-    """ON/OFF 状態のみを問い合わせる（@tasks.loop(time=...) 系から使う）。"""
-    try:
-        from api.database import get_app_setting
-    except Exception:
+        logging.debug(f"schedule_resolver: enabled flag lookup failed: {e}")
         return True
-    val = await get_app_setting(f"schedule.{task_key}.enabled", "1")
-    return val == "1"
 
 
 def get_catalog() -> list[dict]:
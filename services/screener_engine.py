@@ -14,6 +14,8 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Any, Callable, Iterable, Optional
 
+from services.indicator_state import snapshot_matches
+
 
 # --- テクニカル指標群 (pandas/numpy のみで計算) ---
 
@@ -2069,15 +2071,6 @@ def signal_lens(active_labels, by_signal_map, *, min_total: int = 3) -> dict:
 _RELVAL_METRICS = ("per", "pbr", "psr")  # 低いほど割安（バリュエーション指標）
 
 
-def _median(vals):
-    s = sorted(v for v in vals if v is not None)
-    n = len(s)
-    if n == 0:
-        return None
-    mid = n // 2
-    return s[mid] if n % 2 else (s[mid - 1] + s[mid]) / 2.0
-
-
 def relative_strength_return(df, lookback: int = 120) -> Optional[float]:
     """直近 lookback 立会日の素朴なトータルリターン（RSレーティングの素点）。
     クロスセクション・モメンタム（=上昇銘柄選定で最も実証的なファクター）の入力。決定論的。"""
@@ -2160,20 +2153,10 @@ def compute_rs_ratings(returns_by_code: dict, *, min_n: int = 5) -> dict:
     """ユニバース内の lookback リターン分布から O'Neil 流 RS レーティング(1〜99)を付与する。
     分布内のパーセンタイル順位を 1〜99 に写像（99＝最も強い相対モメンタム）。決定論的。
 
-    returns_by_code: {code: lookbackリターン(float)}。標本が min_n 未満なら {} を返す。"""
-    items = [(c, r) for c, r in (returns_by_code or {}).items()
-             if isinstance(r, (int, float)) and r == r]
-    n = len(items)
-    if n < min_n:
-        return {}
-    items.sort(key=lambda x: x[1])
-    if n == 1:
-        return {items[0][0]: 50}
-    ratings: dict[str, int] = {}
-    for rank, (code, _) in enumerate(items):
-        pct = rank / (n - 1)  # 0.0(最弱)〜1.0(最強)
-        ratings[code] = int(round(1 + pct * 98))
-    return ratings
+    returns_by_code: {code: lookbackリターン(float)}。標本が min_n 未満なら {} を返す。
+    計算は services.cross_section（ソート 1 回の O(n log n)）。"""
+    from services.cross_section import rs_ratings
+    return rs_ratings(returns_by_code, min_n=min_n)
 
 
 def compute_sector_medians(records, *, min_n: int = 5) -> dict:
@@ -2182,30 +2165,10 @@ def compute_sector_medians(records, *, min_n: int = 5) -> dict:
 
     records: [{"sector", "per", "pbr", "psr", "roe", "operating_margin"}, ...]
     バリュエーション指標(per/pbr/psr)は正値のみ採用（赤字・債務超過の外れ値を除外）。
-    各セクター・各指標で有効値が min_n 未満なら中央値を出さない（標本不足）。"""
-    by_sector: dict[str, dict] = {}
-    for r in records or []:
-        sec = (r.get("sector") or "").strip()
-        if not sec:
-            continue
-        b = by_sector.setdefault(sec, {"per": [], "pbr": [], "psr": [], "roe": [], "operating_margin": []})
-        for m in _RELVAL_METRICS:
-            v = r.get(m)
-            if isinstance(v, (int, float)) and v > 0:
-                b[m].append(float(v))
-        for m in ("roe", "operating_margin"):
-            v = r.get(m)
-            if isinstance(v, (int, float)):
-                b[m].append(float(v))
-    out: dict[str, dict] = {}
-    for sec, b in by_sector.items():
-        med = {}
-        n_val = max(len(b["per"]), len(b["pbr"]), len(b["psr"]))
-        for m, vals in b.items():
-            med[m] = _median(vals) if len(vals) >= min_n else None
-        med["n"] = n_val
-        out[sec] = med
-    return out
+    各セクター・各指標で有効値が min_n 未満なら中央値を出さない（標本不足）。
+    計算は services.cross_section（指標ごとにソート 1 回）。"""
+    from services.cross_section import sector_medians
+    return sector_medians(records, min_n=min_n)
 
 
 def evaluate_relative_valuation(fundamentals, sector_med, *,
@@ -2608,6 +2571,14 @@ def compute_position_size(
     }
 
 
+def _indicator_sma(ind: dict, close, n: int, fin) -> Optional[float]:
+    """逐次スナップショットに n 日MA があればそれを、無ければ close から計算した値を返す。"""
+    key = f"sma{n}"
+    if key in ind:
+        return fin(ind.get(key))
+    return fin(TechnicalSignals.sma(close, n).iloc[-1]) if len(close) >= n else None
+
+
 def evaluate_exit_signals(
     df,
     *,
@@ -2618,6 +2589,7 @@ def evaluate_exit_signals(
     atr_n: int = 14,
     sma_mid: int = 75,
     sma_slow: int = 200,
+    indicators: Optional[dict] = None,
 ) -> dict:
     """保有銘柄の出口（損切り・トレイリング）を統一判定する決定論的な「出口層」。
 
@@ -2627,6 +2599,8 @@ def evaluate_exit_signals(
       - 75日/200日MA 割れ（中期トレンド転換）
 
     保有後の手仕舞いに特化（入口判定は analyze_position 側）。OHLCV のみ。
+    indicators（provider.get_indicators の逐次スナップショット）が df と同じ履歴なら、
+    ATR・高値・MA を履歴から計算し直さずにそれを使う。
     """
     import math
 
@@ -2648,17 +2622,19 @@ def evaluate_exit_signals(
     if last_close is None or last_close <= 0:
         return {"ok": False, "error": "価格データが欠損しています"}
 
-    atr_series = TechnicalSignals.atr(high, low, close, n=atr_n)
-    last_atr = None
-    for k in range(1, min(6, n) + 1):
-        last_atr = _fin(atr_series.iloc[-k])
-        if last_atr:
-            break
+    ind = indicators if snapshot_matches(indicators, df) else {}
+    last_atr = _fin(ind.get(f"atr{atr_n}"))
+    if not last_atr:
+        atr_series = TechnicalSignals.atr(high, low, close, n=atr_n)
+        for k in range(1, min(6, n) + 1):
+            last_atr = _fin(atr_series.iloc[-k])
+            if last_atr:
+                break
 
-    hh = _fin(high.tail(trail_n).max())
+    hh = _fin(ind.get(f"high_{trail_n}")) or _fin(high.tail(trail_n).max())
     trailing_stop = (hh - trail_atr * last_atr) if (hh and last_atr) else None
-    sma_m = _fin(TechnicalSignals.sma(close, sma_mid).iloc[-1]) if n >= sma_mid else None
-    sma_s = _fin(TechnicalSignals.sma(close, sma_slow).iloc[-1]) if n >= sma_slow else None
+    sma_m = _indicator_sma(ind, close, sma_mid, _fin)
+    sma_s = _indicator_sma(ind, close, sma_slow, _fin)
 
     hard_stop_price = None
     if avg_cost:
@@ -2742,6 +2718,7 @@ def analyze_position(
     sma_fast: int = 25,
     sma_mid: int = 75,
     sma_slow: int = 200,
+    indicators: Optional[dict] = None,
 ) -> dict:
     """1 銘柄について「テクニカルのトレンド状態 × ファンダの健全性」を決定論的に評価し、
     継続保有 / 縮小 / 売却（保有銘柄）または 新規買い / 見送り（候補）の判定を返す。
@@ -2752,6 +2729,8 @@ def analyze_position(
       ファンダ悪化」で手仕舞う —— という順張り×ファンダのセオリーを実装する。
       過去の値動きから出した利確目標(analyze_breakout_projection)は、ここでは
       「ストップ位置・到達余地の参考値」であって機械的な売りトリガーではない。
+
+    indicators が df と同じ履歴の逐次スナップショットなら、MA・ATR・高値はそこから読む。
     """
     import math
 
@@ -2774,25 +2753,28 @@ def analyze_position(
     if last_close is None or last_close <= 0:
         return {"ok": False, "error": "価格データが欠損しています"}
 
-    sma_f = _fin(TechnicalSignals.sma(close, sma_fast).iloc[-1]) if n >= sma_fast else None
-    sma_m = _fin(TechnicalSignals.sma(close, sma_mid).iloc[-1]) if n >= sma_mid else None
-    sma_s = _fin(TechnicalSignals.sma(close, sma_slow).iloc[-1]) if n >= sma_slow else None
-
-    atr_series = TechnicalSignals.atr(high, low, close, n=14)
-    last_atr = None
-    for k in range(1, min(6, n) + 1):
-        last_atr = _fin(atr_series.iloc[-k])
-        if last_atr:
-            break
+    ind = indicators if snapshot_matches(indicators, df) else {}
+    sma_f = _indicator_sma(ind, close, sma_fast, _fin)
+    sma_m = _indicator_sma(ind, close, sma_mid, _fin)
+    sma_s = _indicator_sma(ind, close, sma_slow, _fin)
+
+    last_atr = _fin(ind.get("atr14"))
+    if not last_atr:
+        atr_series = TechnicalSignals.atr(high, low, close, n=14)
+        for k in range(1, min(6, n) + 1):
+            last_atr = _fin(atr_series.iloc[-k])
+            if last_atr:
+                break
 
     # トレイリングストップ: シャンデリア・エグジット（直近22日高値 − 3ATR）
-    hh22 = _fin(high.tail(22).max())
+    hh22 = _fin(ind.get("high_22")) or _fin(high.tail(22).max())
     trailing_stop = (hh22 - 3 * last_atr) if (hh22 and last_atr) else None
     below_stop = bool(trailing_stop and last_close < trailing_stop)
 
-    hh60 = _fin(high.tail(60).max())
+    hh60 = _fin(ind.get("high_60")) or _fin(high.tail(60).max())
     drawdown = ((last_close - hh60) / hh60) if (hh60 and hh60 > 0) else 0.0
-    high252 = _fin(high.tail(252).max()) if n >= 252 else _fin(high.max())
+    high252 = (_fin(ind.get("high_252"))
+               or (_fin(high.tail(252).max()) if n >= 252 else _fin(high.max())))
     gap52 = ((high252 - last_close) / high252) if (high252 and high252 > 0) else 0.0
 
     above_fast = bool(sma_f and last_close > sma_f)
@@ -2996,7 +2978,7 @@ def compute_relative_metrics(results: list[dict]) -> list[dict]:
     「比較してはじめて意味が出る」（決算分析の地図 宝石5）を、バッチ内の
     銘柄同士のクロスセクション比較として近似する。
     """
-    from collections import defaultdict
+    from services.cross_section import peer_percentiles
 
     ok = [r for r in results if r.get("ok") and r.get("metrics")]
     if len(ok) < 2:
@@ -3004,36 +2986,27 @@ def compute_relative_metrics(results: list[dict]) -> list[dict]:
             r.setdefault("blended_score", r.get("score"))
         return results
 
-    by_sector: dict[str, list[dict]] = defaultdict(list)
-    for r in ok:
-        by_sector[(r.get("sector") or "").strip()].append(r)
-
-    def _peer_set(r):
-        sec = (r.get("sector") or "").strip()
-        grp = by_sector.get(sec, [])
-        if sec and len(grp) >= 3:
-            return grp, "セクター内", sec
-        return ok, "全体", ""
-
-    def _values(group, key):
-        return [g["metrics"].get(key) for g in group if g["metrics"].get(key) is not None]
-
-    def _pctl(vals, x, lower_better):
-        if not vals:
-            return None
-        if lower_better:
-            cnt = sum(1 for v in vals if v >= x)
+    # ピア集合: そのセクターに3社以上いればセクター内、いなければ全体。
+    # 百分位は指標ごとに「全体」「セクター内」をそれぞれ rank で一括計算して使い分ける。
+    sectors = [(r.get("sector") or "").strip() for r in ok]
+    sector_n: dict[str, int] = {}
+    for sec in sectors:
+        sector_n[sec] = sector_n.get(sec, 0) + 1
+    in_sector = [bool(sec) and sector_n[sec] >= 3 for sec in sectors]
+    pct_by_key: dict[str, list] = {}
+    for key, lb, _label in _RELATIVE_METRICS:
+        vals = [r["metrics"].get(key) for r in ok]
+        overall = peer_percentiles(vals, lower_better=lb)
+        within = peer_percentiles(vals, sectors, lower_better=lb)
+        pct_by_key[key] = [w if use_sec else o for w, o, use_sec in zip(within, overall, in_sector)]
+
+    for i, r in enumerate(ok):
+        sec = sectors[i]
+        if in_sector[i]:
+            glabel, peer_n = "セクター内", sector_n[sec]
         else:
-            cnt = sum(1 for v in vals if v <= x)
-        return round(cnt / len(vals) * 100)
-
-    for r in ok:
-        group, glabel, sec = _peer_set(r)
-        m = r["metrics"]
-        pers: dict[str, Optional[int]] = {}
-        for key, lb, _label in _RELATIVE_METRICS:
-            x = m.get(key)
-            pers[key] = _pctl(_values(group, key), x, lb) if x is not None else None
+            glabel, peer_n, sec = "全体", len(ok), ""
+        pers: dict[str, Optional[int]] = {key: pct_by_key[key][i] for key, _lb, _label in _RELATIVE_METRICS}
         avail = [v for v in pers.values() if v is not None]
         rel_score = round(sum(avail) / len(avail), 1) if avail else None
 
@@ -3048,7 +3021,7 @@ def compute_relative_metrics(results: list[dict]) -> list[dict]:
         r["relative"] = {
             "group": glabel,
             "group_name": sec,
-            "peer_n": len(group),
+            "peer_n": peer_n,
             "percentiles": pers,
             "score": rel_score,
             "highlights": highlights,
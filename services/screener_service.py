@@ -9,10 +9,13 @@ import asyncio
 import datetime
 import json
 import logging
+import time
 from typing import Optional
 
 from config import JST
+from services.indicator_state import snapshot_matches
 from services.jp_stock_data_service import StockDataProvider, get_provider
+from services.rate_limiter import LANE_BACKGROUND, in_lane
 from services.screener_engine import (
     ScreeningResult,
     StyleStrategy,
@@ -21,7 +24,6 @@ from services.screener_engine import (
     compute_sector_medians,
     evaluate_relative_valuation,
     assess_cyclical_regime,
-    relative_strength_blended,
     compute_rs_ratings,
     select_with_sector_cap,
     evaluate_earnings_proximity,
@@ -79,6 +81,65 @@ class ScreenerService:
     async def list_universes(self) -> list[str]:
         return await self.provider.list_universes()
 
+    @in_lane(LANE_BACKGROUND)
+    async def warm_universes(
+        self, universe_names: list[str], styles: Optional[list[str]] = None, days: int = 420,
+    ) -> dict:
+        """複数ユニバースの和集合を 1 銘柄 1 回ずつ先読みする（日次候補生成の前段）。
+
+        us_mega ⊂ us_sp500 のように重なるユニバースを続けて走査しても、価格（stock_ohlcv）と
+        ファンダ（fundamentals_snapshot）はここで温めたキャッシュを共有する。日本株と米国株は
+        プロバイダの市場別スケジューラで並行に取得する。ファンダは styles に要ファンダの
+        手法があるときだけ取る（styles=None は全手法）。
+
+        Returns:
+            {"codes": 和集合の銘柄数, "by_market": {"JP": n, "US": n}, "failed": n, "elapsed_sec": 秒}
+        """
+        started = time.monotonic()
+        codes: dict[str, None] = {}  # 挿入順を保った和集合
+        for name in universe_names:
+            try:
+                items = await self.provider.get_universe(name)
+            except Exception as e:
+                logging.warning(f"warm_universes ユニバース読み込み失敗({name}): {e}")
+                continue
+            for it in items:
+                codes.setdefault(it["code"], None)
+
+        style_names = styles if styles is not None else [s["name"] for s in list_strategies()]
+        need_fund = any(getattr(get_strategy(s), "needs_fundamentals", False) for s in style_names)
+
+        by_market: dict[str, list[str]] = {"JP": [], "US": []}
+        for code in codes:
+            by_market["JP" if str(code).isdigit() else "US"].append(code)
+        failed = 0
+
+        async def _warm_market(market_codes: list[str]):
+            sem = asyncio.Semaphore(8)
+
+            async def _warm(code: str):
+                nonlocal failed
+                async with sem:
+                    try:
+                        df = await self.provider.get_ohlcv(code, days=days)
+                        if df is not None and need_fund:
+                            await self.provider.get_fundamentals_snapshot(code)
+                    except Exception as e:
+                        logging.debug(f"warm_universes 取得エラー {code}: {e}")
+                        df = None
+                    if df is None:
+                        failed += 1
+
+            await asyncio.gather(*(_warm(c) for c in market_codes))
+
+        await asyncio.gather(*(_warm_market(v) for v in by_market.values()))
+        return {
+            "codes": len(codes),
+            "by_market": {k: len(v) for k, v in by_market.items()},
+            "failed": failed,
+            "elapsed_sec": round(time.monotonic() - started, 1),
+        }
+
     # 景気敏感プロキシ（外部マクロ）：銅・原油・半導体。シクリカルの谷→反転の裏取りに使う。
     _CYCLICAL_PROXIES = [("HG=F", "銅"), ("CL=F", "原油"), ("SOXX", "半導体")]
 
@@ -96,6 +157,7 @@ class ScreenerService:
                 proxies.append({"name": label, "df": df})
         return assess_cyclical_regime(proxies)
 
+    @in_lane(LANE_BACKGROUND)
     async def run_screening(
         self,
         style: str,
@@ -144,9 +206,9 @@ class ScreenerService:
         needs_fundamentals = bool(getattr(strategy, "needs_fundamentals", False))
         results: list[ScreeningResult] = []
 
-        # ファンダ要らないスタイルは並列度を上げる
-        max_concurrent = 8 if not needs_fundamentals else 4
-        sem = asyncio.Semaphore(max_concurrent)
+        # リモート呼び出しの流量はプロバイダ側のスケジューラ（トークンバケット）が律速する。
+        # ここの上限は DB 接続と DataFrame 計算を抑えるためのもの。
+        sem = asyncio.Semaphore(8)
 
         # near-miss 候補も収集して、0件時のフォールバックに使う
         near_miss_results: list[ScreeningResult] = []
@@ -154,6 +216,7 @@ class ScreenerService:
         fund_by_code: dict[str, dict] = {}
         # 相対的強さ(RS)用：走査銘柄の直近リターンを集めてユニバース内の相対順位を作る
         rs_ret_by_code: dict[str, float] = {}
+        rs_close_by_code: dict = {}
 
         async def _process(item: dict):
             code = item["code"]
@@ -170,6 +233,10 @@ class ScreenerService:
                     return None, None
                 if df is None:
                     return None, None
+                # 逐次更新済みの指標（RS・売買代金）があれば、履歴からの再計算を省く
+                ind = await self.provider.get_indicators(code)
+                if not snapshot_matches(ind, df):
+                    ind = None
                 # 薄商い銘柄は約定困難＋偽ブレイクの温床なので、発見段階で除外する
                 # （市場別の最低売買代金フロア。真に取引困難な水準のみ落とす緩めの閾値）。
                 mkt = "JP" if str(code).isdigit() else "US"
@@ -182,20 +249,27 @@ class ScreenerService:
                 px_floor = 100.0 if mkt == "JP" else 1.0  # JP 100円未満・US $1未満は除外
                 if last_px and last_px < px_floor:
                     return None, None
-                liq = assess_liquidity(df, mkt)
-                turnover = liq.get("avg_turnover") if liq.get("ok") else None
+                if ind is not None and ind.get("turnover_avg20") is not None and len(df) >= 5:
+                    turnover = ind["turnover_avg20"]
+                else:
+                    liq = assess_liquidity(df, mkt)
+                    turnover = liq.get("avg_turnover") if liq.get("ok") else None
                 liq_floor = 5e7 if mkt == "JP" else 5e5  # JP 5千万円/日・US 50万ドル/日
                 if turnover is not None and turnover < liq_floor:
                     return None, None
                 # RS（相対モメンタム）の素点を集める（全走査銘柄が母集団）。
                 # 単一120日ではなく複数期間（直近四半期を重め）の加重リターンで頑健化。
-                rs_ret = relative_strength_blended(df)
-                if rs_ret is not None:
-                    rs_ret_by_code[code] = rs_ret
+                # 逐次状態が無い銘柄は終値だけ控えておき、走査後に全銘柄まとめて計算する。
+                if ind is not None:
+                    if ind.get("rs_blended") is not None:
+                        rs_ret_by_code[code] = ind["rs_blended"]
+                else:
+                    rs_close_by_code[code] = df["Close"].to_numpy(dtype=float)[-253:]
                 fundamentals = None
                 if needs_fundamentals:
+                    # 項目別の鮮度つきスナップショット経由（同日の他スタイル・他ユニバースと共有）
                     try:
-                        fundamentals = await self.provider.get_fundamentals(code)
+                        fundamentals = await self.provider.get_fundamentals_snapshot(code)
                     except Exception as e:
                         logging.debug(f"ファンダ取得エラー {code}: {e}")
                         fundamentals = None
@@ -239,6 +313,9 @@ class ScreenerService:
         # RS（相対的強さ）レーティングをユニバース内順位から付与し、選定スコアに合成する。
         # 上昇銘柄選定で最も実証的なファクター（クロスセクション・モメンタム）を、
         # 同点時のタイブレークではなく順位そのものに効かせる。
+        # pandas/NumPy を使うので、起動時ではなく最初のスキャンで読み込む
+        from services.cross_section import relative_strength_blended_panel
+        rs_ret_by_code.update(relative_strength_blended_panel(rs_close_by_code))
         rs_ratings = compute_rs_ratings(rs_ret_by_code)
         for r in results + near_miss_results:
             rating = rs_ratings.get(r.code) if rs_ratings else None
@@ -662,6 +739,7 @@ class ScreenerService:
                      f"戦略 {strat:+.1f}% vs buy&hold {bh:+.1f}%（超過 {strat - bh:+.1f}%）。"),
         }
 
+    @in_lane(LANE_BACKGROUND)
     async def backtest_rotation(self, codes: list, days: int = 750,
                                rebalance_days: int = 20, top_k: int = 5,
                                lookback: int = 60) -> dict:
@@ -687,6 +765,7 @@ class ScreenerService:
                     "error": "各市場で3銘柄以上の価格データが必要です（日米は別々に検証します）"}
         return {"ok": True, "by_market": by_market, "combined": self._blend_backtests(ran)}
 
+    @in_lane(LANE_BACKGROUND)
     async def backtest_universe(self, universe_name: str = "topix500", days: int = 750,
                                 rebalance_days: int = 20, top_k: int = 10,
                                 lookback: int = 60, max_codes: int = 300) -> dict:
@@ -727,30 +806,13 @@ class ScreenerService:
         yfinance の get_fundamentals は毎回ライブ取得で、PER(trailingPE) は場中の
         現在値で変動する。そのため 12:00（場中）と 16:15（引け後）で別々に取得すると
         同じ銘柄でもファンダ・ゲートの合否が反転し、通知の評価が食い違う。
-        当日の初回取得結果を _research_cache に保存し、その日のうちは（12:00 でも 16:15 でも
-        手動の一括診断でも）同じスナップショットを共有することで評価を一致させる。
-        日付が変われば自動的に再取得される。"""
-        today = datetime.datetime.now(JST).strftime("%Y-%m-%d")
-        try:
-            cached = await _research_cache_get("yffund", code)
-            if cached and cached.get("snapshot_date") == today and cached.get("data") is not None:
-                return cached["data"]
-        except Exception:
-            pass
+        provider.get_fundamentals_snapshot（項目別の鮮度つきテーブル）を通すことで、
+        その日のうちは同じスナップショットを共有して評価を一致させる。"""
         try:
-            fundamentals = await self.provider.get_fundamentals(code)
+            return await self.provider.get_fundamentals_snapshot(code)
         except Exception as e:
             logging.debug(f"advise ファンダ取得エラー {code}: {e}")
-            fundamentals = None
-        # 非空（＝有効に取得できた）スナップショットのみ当日キャッシュとして確定する。
-        # 空 dict は yfinance の一時失敗の可能性が高く、固定すると一日中失敗を引きずるため保存しない。
-        if fundamentals:
-            try:
-                await _research_cache_set("yffund", code,
-                                          {"snapshot_date": today, "data": fundamentals})
-            except Exception:
-                pass
-        return fundamentals
+            return None
 
     async def advise_portfolio(
         self,
@@ -853,12 +915,14 @@ class ScreenerService:
                 # ファンダは「当日スナップショット」を使う（12:00 と 16:15 で同じ値を共有し、
                 # 場中の PER 変動でファンダ評価が食い違うのを防ぐ）。
                 fundamentals = await self._get_fundamentals_daily(code)
+                indicators = await self.provider.get_indicators(code)
                 try:
                     res = analyze_position(
                         df, fundamentals,
                         avg_cost=item.get("avg_cost") if held else None,
                         held=held,
                         financials=financials_by_code.get(code),
+                        indicators=indicators,
                     )
                 except Exception as e:
                     logging.debug(f"advise analyze_position エラー {code}: {e}")
@@ -916,7 +980,8 @@ class ScreenerService:
                 if held and res.get("ok"):
                     try:
                         ex = evaluate_exit_signals(
-                            df, avg_cost=item.get("avg_cost"), hard_stop_pct=hard_stop_pct)
+                            df, avg_cost=item.get("avg_cost"), hard_stop_pct=hard_stop_pct,
+                            indicators=indicators)
                     except Exception as e:
                         logging.debug(f"advise exit判定エラー {code}: {e}")
                         ex = None
@@ -1460,11 +1525,13 @@ class ScreenerService:
                 fundamentals = await self.provider.get_fundamentals(code)
             except Exception:
                 fundamentals = None
+            indicators = await self.provider.get_indicators(code)
             try:
                 res = analyze_position(
                     df, fundamentals,
                     avg_cost=(price if is_exit else None),
                     held=is_exit,
+                    indicators=indicators,
                 )
             except Exception as e:
                 logging.debug(f"record_trade_decision analyze_position エラー {code}: {e}")
@@ -1510,126 +1577,158 @@ class ScreenerService:
         })
         return {"ok": True, "id": rid, "snapshot": bool(signals)}
 
+    @staticmethod
+    def _forward_closes(df, decided_dates: list, horizons: list[int]):
+        """1 銘柄の終値系列に対し、複数の判断日の「判断日以降の最初の終値」と
+        「そこから n 本後の終値」（届いていなければ NaN）を一括で引く。
+
+        Returns: (基準終値[判断数], 先行終値[判断数, 期日数])。系列が無い判断は基準も NaN。"""
+        import numpy as np
+        import pandas as pd  # type: ignore
+
+        k = len(decided_dates)
+        base = np.full(k, np.nan)
+        fwd = np.full((k, len(horizons)), np.nan)
+        if df is None or getattr(df, "empty", True):
+            return base, fwd
+        close = df["Close"].to_numpy(dtype=float)
+        start = df.index.searchsorted(pd.to_datetime(decided_dates), side="left")
+        has = start < len(close)
+        base[has] = close[start[has]]
+        for j, n in enumerate(horizons):
+            idx = start + n
+            ok = idx < len(close)
+            fwd[ok, j] = close[idx[ok]]
+        return base, fwd
+
+    @in_lane(LANE_BACKGROUND)
     async def verify_due_decisions(self, force: bool = False) -> dict:
         """検証期日（20/60営業日）を過ぎた判断を答え合わせし、結果を保存する。
 
         各判断について「その後のリターン − 同期間のベンチマーク超過」を算出する。
         買い/保有は超過プラスで「正解」、売り/縮小は超過マイナス（＝売って正解）で
-        「正解」とする（符号を反転）。force=True で既存チェックポイントも再計算。"""
+        「正解」とする（符号を反転）。force=True で既存チェックポイントも再計算。
+
+        判断を銘柄ごとにまとめ、価格履歴は銘柄・ベンチマークとも 1 回だけ読む。同じ銘柄の
+        判断は先行リターンを配列で一括計算し、結果は 1 トランザクションで書き戻す。"""
         import datetime as _dt
-        import pandas as pd  # type: ignore
-        from api.database import (
-            decision_review_list_pending, decision_review_update_checkpoints,
-        )
+        import math
+        from api.database import decision_review_apply_verifications, decision_review_list_pending
 
         pending = await decision_review_list_pending()
         if not pending:
             return {"ok": True, "checked": 0, "updated": 0, "results": []}
 
-        # ベンチマークは市場ごとにまとめて1回だけ取得
-        markets = {p.get("market") or "JP" for p in pending}
-        bench_df: dict[str, tuple] = {}
-        for mk in markets:
-            sym = self._BENCHMARKS.get(mk, "^N225")
-            try:
-                bench_df[mk] = (sym, await self.provider.get_ohlcv(sym, days=500))
-            except Exception as e:
-                logging.debug(f"verify ベンチマーク取得エラー {sym}: {e}")
-                bench_df[mk] = (sym, None)
-
         def _parse_date(s):
             try:
                 return _dt.date.fromisoformat(str(s)[:10])
             except (ValueError, TypeError):
                 return None
 
-        def _series_after(d, date):
-            """date 以降の取引日に限定した Close 系列を返す（なければ None）。"""
-            if d is None or getattr(d, "empty", True):
-                return None
+        by_code: dict[str, list[tuple[dict, _dt.date]]] = {}
+        for p in pending:
+            code = str(p.get("code") or "")
+            decided = _parse_date(p.get("decided_at"))
+            if code and decided:
+                by_code.setdefault(code, []).append((p, decided))
+        if not by_code:
+            return {"ok": True, "checked": len(pending), "updated": 0, "results": []}
+
+        # 最も古い判断日から最長の期日まで届く本数を読む（既定の 500 本で足りなければ延ばす）
+        today = datetime.datetime.now(JST).date()
+        oldest = min(d for items in by_code.values() for _p, d in items)
+        days = max(500, (today - oldest).days + 30)
+        horizons = [n for _key, n in self._REVIEW_HORIZONS]
+
+        # ベンチマークは市場ごとにまとめて1回だけ取得
+        markets = {p.get("market") or "JP" for items in by_code.values() for p, _d in items}
+        bench_df: dict[str, object] = {}
+        for mk in markets:
+            sym = self._BENCHMARKS.get(mk, "^N225")
             try:
-                after = d[d.index >= pd.Timestamp(date)]
-            except Exception:
-                return None
-            return after if len(after) > 0 else None
+                bench_df[mk] = await self.provider.get_ohlcv(sym, days=days)
+            except Exception as e:
+                logging.debug(f"verify ベンチマーク取得エラー {sym}: {e}")
+                bench_df[mk] = None
+
+        def _f(v):
+            return None if v is None or (isinstance(v, float) and math.isnan(v)) else float(v)
 
-        updated = 0
-        results: list[dict] = []
         sem = asyncio.Semaphore(4)
+        writes: list[dict] = []
+        results: list[dict] = []
 
-        async def _verify(p: dict):
-            nonlocal updated
-            code = str(p.get("code") or "")
-            decided = _parse_date(p.get("decided_at"))
-            if not code or not decided:
-                return
+        async def _verify_code(code: str, items: list[tuple[dict, _dt.date]]):
             async with sem:
                 try:
-                    df = await self.provider.get_ohlcv(code, days=500)
+                    df = await self.provider.get_ohlcv(code, days=days)
                 except Exception as e:
                     logging.debug(f"verify OHLCV取得エラー {code}: {e}")
                     df = None
-            after = _series_after(df, decided)
-            if after is None:
-                return
-            base_price = p.get("price_at_decision")
-            if not base_price or base_price <= 0:
-                base_price = float(after["Close"].iloc[0])
-            if not base_price or base_price <= 0:
-                return
-
-            mk = p.get("market") or "JP"
-            _sym, bdf = bench_df.get(mk, (None, None))
-            b_after = _series_after(bdf, decided)
-            b_base = float(b_after["Close"].iloc[0]) if b_after is not None else None
-
-            ta = (p.get("trade_action") or "").lower()
-            ra = (p.get("rec_action") or "").upper()
-            is_exit = ta == "sell" or ra in ("SELL", "TRIM")
-
-            checkpoints = dict(p.get("checkpoints") or {})
-            changed = False
-            for key, n in self._REVIEW_HORIZONS:
-                if key in checkpoints and not force:
+            dates = [d for _p, d in items]
+            base_close, fwd = self._forward_closes(df, dates, horizons)
+            bench = {mk: self._forward_closes(bench_df.get(mk), dates, horizons) for mk in
+                     {p.get("market") or "JP" for p, _d in items}}
+            verified_at = _dt.datetime.now(JST).isoformat()
+
+            for i, (p, _decided) in enumerate(items):
+                if _f(base_close[i]) is None:
+                    continue  # 判断日以降の足がまだ無い
+                base_price = p.get("price_at_decision")
+                if not base_price or base_price <= 0:
+                    base_price = float(base_close[i])
+                if not base_price or base_price <= 0:
                     continue
-                if len(after) <= n:
-                    continue  # まだ期日に達していない
-                fwd_price = float(after["Close"].iloc[n])
-                ret = (fwd_price - base_price) / base_price * 100
-                bench_ret = None
-                if b_base and b_after is not None and len(b_after) > n:
-                    bench_ret = (float(b_after["Close"].iloc[n]) - b_base) / b_base * 100
-                excess = (ret - bench_ret) if bench_ret is not None else None
-                # 売却/縮小は「売って正解＝その後下げた/劣後した」を正解にするため符号反転
-                base_metric = excess if excess is not None else ret
-                signed = -base_metric if is_exit else base_metric
-                if signed > self._REVIEW_DEADBAND_PCT:
-                    outcome = "正解"
-                elif signed < -self._REVIEW_DEADBAND_PCT:
-                    outcome = "不正解"
-                else:
-                    outcome = "引分"
-                checkpoints[key] = {
-                    "return_pct": round(ret, 1),
-                    "benchmark_return_pct": round(bench_ret, 1) if bench_ret is not None else None,
-                    "excess_pct": round(excess, 1) if excess is not None else None,
-                    "outcome": outcome,
-                    "verified_at": _dt.datetime.now(JST).isoformat(),
-                }
-                changed = True
-
-            if changed:
-                status = ("verified"
-                          if all(k in checkpoints for k, _ in self._REVIEW_HORIZONS)
-                          else "partial")
-                await decision_review_update_checkpoints(p["id"], checkpoints, status)
-                updated += 1
-                results.append({
-                    "id": p["id"], "code": code, "name": p.get("name"),
-                    "trade_action": ta, "status": status, "checkpoints": checkpoints,
-                })
-
-        await asyncio.gather(*[_verify(p) for p in pending])
+                b_base_arr, b_fwd = bench[p.get("market") or "JP"]
+                b_base = _f(b_base_arr[i])
+
+                ta = (p.get("trade_action") or "").lower()
+                ra = (p.get("rec_action") or "").upper()
+                is_exit = ta == "sell" or ra in ("SELL", "TRIM")
+
+                checkpoints = dict(p.get("checkpoints") or {})
+                changed = False
+                for j, (key, _n) in enumerate(self._REVIEW_HORIZONS):
+                    if key in checkpoints and not force:
+                        continue
+                    fwd_price = _f(fwd[i, j])
+                    if fwd_price is None:
+                        continue  # まだ期日に達していない
+                    ret = (fwd_price - base_price) / base_price * 100
+                    b_fwd_price = _f(b_fwd[i, j])
+                    bench_ret = ((b_fwd_price - b_base) / b_base * 100
+                                 if b_base and b_fwd_price is not None else None)
+                    excess = (ret - bench_ret) if bench_ret is not None else None
+                    # 売却/縮小は「売って正解＝その後下げた/劣後した」を正解にするため符号反転
+                    base_metric = excess if excess is not None else ret
+                    signed = -base_metric if is_exit else base_metric
+                    if signed > self._REVIEW_DEADBAND_PCT:
+                        outcome = "正解"
+                    elif signed < -self._REVIEW_DEADBAND_PCT:
+                        outcome = "不正解"
+                    else:
+                        outcome = "引分"
+                    checkpoints[key] = {
+                        "return_pct": round(ret, 1),
+                        "benchmark_return_pct": round(bench_ret, 1) if bench_ret is not None else None,
+                        "excess_pct": round(excess, 1) if excess is not None else None,
+                        "outcome": outcome,
+                        "verified_at": verified_at,
+                    }
+                    changed = True
+
+                if changed:
+                    status = ("verified"
+                              if all(k in checkpoints for k, _ in self._REVIEW_HORIZONS)
+                              else "partial")
+                    writes.append({"review": p, "checkpoints": checkpoints, "status": status})
+                    results.append({
+                        "id": p["id"], "code": code, "name": p.get("name"),
+                        "trade_action": ta, "status": status, "checkpoints": checkpoints,
+                    })
+
+        await asyncio.gather(*[_verify_code(c, items) for c, items in by_code.items()])
+        updated = await decision_review_apply_verifications(writes)
         return {"ok": True, "checked": len(pending), "updated": updated, "results": results}
 
     async def decision_review_report(self, horizon: str = "d60", auto_verify: bool = True) -> dict:
@@ -1637,7 +1736,7 @@ class ScreenerService:
         的中率を返す。次回スクリーニング/一括診断で候補の信頼度として併記するための学習結果。
 
         auto_verify=True なら集計前に期日到来分を答え合わせしてから集計する。"""
-        from api.database import decision_review_list
+        from api.database import decision_outcome_aggregate
 
         if auto_verify:
             try:
@@ -1647,107 +1746,35 @@ class ScreenerService:
 
         if horizon not in ("d20", "d60"):
             horizon = "d60"
-        rows = await decision_review_list(limit=1000)
-
-        def _cp(r):
-            cp = (r.get("checkpoints") or {}).get(horizon)
-            return cp if (cp and cp.get("outcome")) else None
-
-        verified = [r for r in rows if _cp(r)]
+        # 答え合わせ結果は decision_outcomes（期日ごとの索引付き）を SQL で集計する
+        agg = await decision_outcome_aggregate(horizon, self._REVIEW_DEADBAND_PCT)
 
-        def _aggregate(key_fn):
-            buckets: dict[str, dict] = {}
-            for r in verified:
-                k = key_fn(r)
-                if not k:
-                    continue
-                cp = _cp(r)
-                b = buckets.setdefault(k, {"total": 0, "win": 0, "lose": 0, "draw": 0,
-                                           "sum_excess": 0.0, "n_excess": 0})
-                b["total"] += 1
-                o = cp.get("outcome")
-                if o == "正解":
-                    b["win"] += 1
-                elif o == "不正解":
-                    b["lose"] += 1
-                else:
-                    b["draw"] += 1
-                ex = cp.get("excess_pct")
-                if ex is not None:
-                    b["sum_excess"] += ex
-                    b["n_excess"] += 1
+        def _ranked(buckets: list[dict], with_draw: bool = True) -> list[dict]:
             out = []
-            for k, b in buckets.items():
-                decisive = b["win"] + b["lose"]
-                out.append({
-                    "key": k, "total": b["total"], "win": b["win"],
-                    "lose": b["lose"], "draw": b["draw"],
-                    "hit_rate": round(b["win"] / decisive * 100, 1) if decisive else None,
-                    "avg_excess_pct": round(b["sum_excess"] / b["n_excess"], 1) if b["n_excess"] else None,
-                })
+            for b in buckets:
+                win, lose = b["win"] or 0, b["lose"] or 0
+                decisive = win + lose
+                row = {"key": b["key"], "total": b["total"], "win": win, "lose": lose}
+                if with_draw:
+                    row["draw"] = b["draw"] or 0
+                row["hit_rate"] = round(win / decisive * 100, 1) if decisive else None
+                if with_draw:
+                    row["avg_excess_pct"] = (round(b["sum_excess"] / b["n_excess"], 1)
+                                             if b["n_excess"] else None)
+                out.append(row)
             out.sort(key=lambda x: (x["hit_rate"] if x["hit_rate"] is not None else -1, x["total"]),
                      reverse=True)
             return out
 
-        by_trend = _aggregate(lambda r: r.get("trend_state"))
-        by_action = _aggregate(lambda r: r.get("rec_action"))
-        by_style = _aggregate(lambda r: r.get("style"))
-
+        by_trend = _ranked(agg["by_trend"])
+        by_action = _ranked(agg["by_action"])
+        by_style = _ranked(agg["by_style"])
         # シグナル別（スナップショット時に True だったカテゴリフラグごとの的中率）
-        sig_buckets: dict[str, dict] = {}
-        for r in verified:
-            cp = _cp(r)
-            for s in (r.get("signals") or []):
-                if s.get("value") is True:
-                    k = s.get("label") or s.get("key")
-                    b = sig_buckets.setdefault(k, {"total": 0, "win": 0, "lose": 0})
-                    b["total"] += 1
-                    if cp.get("outcome") == "正解":
-                        b["win"] += 1
-                    elif cp.get("outcome") == "不正解":
-                        b["lose"] += 1
-        by_signal = []
-        for k, b in sig_buckets.items():
-            decisive = b["win"] + b["lose"]
-            by_signal.append({
-                "key": k, "total": b["total"], "win": b["win"], "lose": b["lose"],
-                "hit_rate": round(b["win"] / decisive * 100, 1) if decisive else None,
-            })
-        by_signal.sort(key=lambda x: (x["hit_rate"] if x["hit_rate"] is not None else -1, x["total"]),
-                       reverse=True)
+        by_signal = _ranked(agg["by_signal"], with_draw=False)
 
         # --- 相場に翻弄されない判定の裏付け：生リターン vs 市場超過 ＆ 売買の付加価値 ---
-        def _signed_outcome(val, is_exit):
-            if val is None:
-                return None
-            s = -val if is_exit else val
-            if s > self._REVIEW_DEADBAND_PCT:
-                return "正解"
-            if s < -self._REVIEW_DEADBAND_PCT:
-                return "不正解"
-            return "引分"
-
-        raw_win = raw_lose = ex_win = ex_lose = 0
-        exit_excess_vals: list[float] = []
-        for r in verified:
-            cp = _cp(r)
-            ta = (r.get("trade_action") or "").lower()
-            ra = (r.get("rec_action") or "").upper()
-            is_exit = ta == "sell" or ra in ("SELL", "TRIM")
-            ro = _signed_outcome(cp.get("return_pct"), is_exit)
-            if ro == "正解":
-                raw_win += 1
-            elif ro == "不正解":
-                raw_lose += 1
-            if cp.get("excess_pct") is not None:
-                eo = _signed_outcome(cp.get("excess_pct"), is_exit)
-                if eo == "正解":
-                    ex_win += 1
-                elif eo == "不正解":
-                    ex_lose += 1
-                if is_exit:
-                    exit_excess_vals.append(cp["excess_pct"])
-
+        raw_win, raw_lose = agg["raw"]["win"], agg["raw"]["lose"]
+        ex_win, ex_lose = agg["excess"]["win"], agg["excess"]["lose"]
         raw_hit = round(raw_win / (raw_win + raw_lose) * 100, 1) if (raw_win + raw_lose) else None
         excess_hit = round(ex_win / (ex_win + ex_lose) * 100, 1) if (ex_win + ex_lose) else None
         market_beta_note = None
@@ -1760,8 +1787,8 @@ class ScreenerService:
 
         # 売買の付加価値：売り判断のあと、その銘柄が市場をどれだけ上回ったか（平均）。
         # 正＝売った後も市場に勝っていた＝「握っていた方が得だった」傾向。
-        avg_exit_excess = (round(sum(exit_excess_vals) / len(exit_excess_vals), 1)
-                           if exit_excess_vals else None)
+        exit_n = agg["exit_excess"]["n"]
+        avg_exit_excess = round(agg["exit_excess"]["sum"] / exit_n, 1) if exit_n else None
         tv_msg = None
         over_trading = False
         if avg_exit_excess is not None:
@@ -1776,7 +1803,7 @@ class ScreenerService:
             else:
                 tv_msg = "売却後の市場超過はほぼ中立。売買による付加価値は今のところ小さいです。"
         trading_value_add = {
-            "exit_decisions": len(exit_excess_vals),
+            "exit_decisions": exit_n,
             "avg_excess_after_exit_pct": avg_exit_excess,
             "over_trading": over_trading,
             "message": tv_msg,
@@ -1789,12 +1816,13 @@ class ScreenerService:
             "という考え方は概ね正しく、本機能はこの前提で設計されています。"
         )
 
-        total = len(verified)
-        wins = sum(1 for r in verified if _cp(r).get("outcome") == "正解")
-        loses = sum(1 for r in verified if _cp(r).get("outcome") == "不正解")
+        overall = agg["overall"]
+        total = overall["total"] or 0
+        wins, loses = overall["win"] or 0, overall["lose"] or 0
         decisive = wins + loses
         overall_hit = round(wins / decisive * 100, 1) if decisive else None
-        pending_count = sum(1 for r in rows if r.get("status") in ("open", "partial"))
+        pending_count = agg["pending"]
+        recorded_count = agg["recorded"]
 
         if total:
             summary = (f"検証済み{total}件（{horizon}・{'約1ヶ月後' if horizon == 'd20' else '約3ヶ月後'}）："
@@ -1802,14 +1830,14 @@ class ScreenerService:
                        f"勝敗ベースの的中率 {overall_hit}%。検証待ち{pending_count}件。")
         else:
             summary = ("まだ検証済みの判断がありません。売買から約1〜3ヶ月後に自動で答え合わせされます。"
-                       f"（記録済み{len(rows)}件・検証待ち{pending_count}件）")
+                       f"（記録済み{recorded_count}件・検証待ち{pending_count}件）")
 
         return {
             "ok": True,
             "horizon": horizon,
             "verified_count": total,
             "pending_count": pending_count,
-            "recorded_count": len(rows),
+            "recorded_count": recorded_count,
             "overall_hit_rate": overall_hit,
             "raw_hit_rate": raw_hit,
             "excess_hit_rate": excess_hit,
@@ -1827,6 +1855,7 @@ class ScreenerService:
     # スタイル横断フィルタ：既存候補を別スタイルで再評価する
     # =========================================================
 
+    @in_lane(LANE_BACKGROUND)
     async def apply_secondary_style(
         self,
         candidates: list[dict],
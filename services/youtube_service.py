@@ -7,14 +7,13 @@
 - 新着動画の検知は各チャンネルの公式 RSS（`feeds/videos.xml?channel_id=...`）で行う。
   API クォータを消費せず、`feedparser` でパースできる。
 """
-import asyncio
 import logging
 
 import aiohttp
 import feedparser
-from googleapiclient.discovery import build
 
 from config import TIMEOUT_HTTP_DEFAULT
+from utils.executors import FILE_IO, GOOGLE_API, PARSING, run_in
 
 RSS_URL = "https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
 
@@ -40,7 +39,7 @@ async def fetch_transcript_text(video_id: str) -> str:
             return ""
 
     try:
-        return await asyncio.to_thread(_fetch)
+        return await run_in(FILE_IO, _fetch)
     except Exception as e:
         logging.debug(f"transcript thread failed ({video_id}): {e}")
         return ""
@@ -144,6 +143,7 @@ class YouTubeService:
     def get_service(self):
         if not self.creds:
             return None
+        from googleapiclient.discovery import build
         return build("youtube", "v3", credentials=self.creds)
 
     async def list_subscriptions(self) -> list[dict]:
@@ -158,7 +158,8 @@ class YouTubeService:
         page_token = None
         try:
             while True:
-                res = await asyncio.to_thread(
+                res = await run_in(
+                    GOOGLE_API,
                     lambda pt=page_token: service.subscriptions().list(
                         part="snippet", mine=True, maxResults=50, pageToken=pt,
                         order="alphabetical",
@@ -197,7 +198,7 @@ class YouTubeService:
         if not text:
             return []
         try:
-            feed = await asyncio.to_thread(feedparser.parse, text)
+            feed = await run_in(PARSING, feedparser.parse, text)
         except Exception as e:
             logging.debug(f"YouTube RSS parse failed ({channel_id}): {e}")
             return []
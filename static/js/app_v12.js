@@ -224,6 +224,61 @@ async function apiFetch(path, options = {}) {
     return res.json();
 }
 
+// /api/chat_stream（Server-Sent Events）を読み、イベントごとに handlers を呼ぶ。
+// handlers.delta(text) / handlers.tool(name, status) を途中で呼び、done イベントの中身
+// （/api/chat と同じ ChatResponse）を返す。ストリームに対応していない環境では /api/chat にフォールバックする。
+async function streamChat(body, { signal, delta, tool } = {}) {
+    const res = await fetch(`${API_BASE}/api/chat_stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-Api-Key': apiKey, 'Accept': 'text/event-stream' },
+        body: JSON.stringify(body),
+        signal,
+    });
+    if (res.status === 401) {
+        localStorage.removeItem('secretary_api_key');
+        apiKey = '';
+        showScreen('login-screen');
+        throw new Error('Unauthorized');
+    }
+    if (res.status === 404 || !res.body || !res.body.getReader) {
+        return apiFetch('/api/chat', { method: 'POST', body: JSON.stringify(body), signal });
+    }
+    if (!res.ok) {
+        let detail = '';
+        try { detail = (await res.json()).detail || ''; } catch {}
+        const err = new Error(`API Error: ${res.status}`);
+        err.status = res.status;
+        err.detail = typeof detail === 'string' ? detail : JSON.stringify(detail);
+        throw err;
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = '';
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buf.indexOf('\n\n')) >= 0) {
+            const frame = buf.slice(0, sep);
+            buf = buf.slice(sep + 2);
+            const dataLine = frame.split('\n').filter(l => l.startsWith('data:')).map(l => l.slice(5).trim()).join('\n');
+            if (!dataLine) continue;  // ": ping" などのコメント行
+            let ev;
+            try { ev = JSON.parse(dataLine); } catch { continue; }
+            if (ev.type === 'delta') { if (delta) delta(ev.text || ''); }
+            else if (ev.type === 'tool') { if (tool) tool(ev.name, ev.status); }
+            else if (ev.type === 'done') return ev;
+            else if (ev.type === 'error') {
+                const err = new Error(ev.detail || 'stream error');
+                err.detail = ev.detail || '';
+                throw err;
+            }
+        }
+    }
+    throw new Error('stream ended without result');
+}
+
 const loginForm = $('#login-form');
 if (loginForm) {
     loginForm.addEventListener('submit', async (e) => {
@@ -595,6 +650,14 @@ window.loadCostMeter = async () => {
             </div>
         `).join('');
 
+        const cacheRows = (s.cache || []).map(c => `
+            <div style="display:flex;justify-content:space-between;gap:6px;font-size:0.82rem;padding:2px 0;border-bottom:1px solid var(--border-glass);">
+                <span style="overflow:hidden;text-overflow:ellipsis;white-space:nowrap;">${escapeHtml(c.feature)}</span>
+                <span style="color:var(--text-muted);font-size:0.76rem;">${c.hits + c.coalesced}/${c.requests} 件 (${(c.hit_rate * 100).toFixed(0)}%)</span>
+                <span style="color:var(--text-primary);font-weight:600;">-¥${c.saved_jpy.toFixed(1)}</span>
+            </div>
+        `).join('');
+
         const daysBars = (s.by_day || []).slice(-7).map(d => `
             <div style="display:flex;justify-content:space-between;font-size:0.76rem;color:var(--text-muted);padding:1px 0;">
                 <span>${escapeHtml(d.date.slice(5))}</span>
@@ -613,7 +676,7 @@ window.loadCostMeter = async () => {
                     <div style="background:${barColor};height:100%;width:${ratio}%;transition:width 0.3s;"></div>
                 </div>
                 <div style="font-size:0.72rem;color:var(--text-muted);margin-top:4px;">
-                    入力 ${(s.this_month_in_tokens / 1000).toFixed(1)}k tokens / 出力 ${(s.this_month_out_tokens / 1000).toFixed(1)}k tokens
+                    入力 ${(s.this_month_in_tokens / 1000).toFixed(1)}k tokens${s.this_month_cached_tokens ? `（うちキャッシュ ${(s.this_month_cached_tokens / 1000).toFixed(1)}k）` : ''} / 出力 ${(s.this_month_out_tokens / 1000).toFixed(1)}k tokens
                     ${infra > 0 ? ` ・ インフラ固定費 ¥${infra.toFixed(0)} を加えると合計 ¥${(monthlyTotal + infra).toFixed(0)}` : ''}
                 </div>
             </div>
@@ -621,6 +684,10 @@ window.loadCostMeter = async () => {
             <div style="font-size:0.78rem;font-weight:700;color:var(--text-secondary);margin-top:14px;margin-bottom:4px;">📊 モデル別（直近30日）</div>
             ${topModels || '<div class="loading-placeholder">記録なし。</div>'}
 
+            ${cacheRows ? `
+            <div style="font-size:0.78rem;font-weight:700;color:var(--text-secondary);margin-top:14px;margin-bottom:4px;">♻️ 応答キャッシュ（直近30日・機能別ヒット率）</div>
+            ${cacheRows}` : ''}
+
             <div style="font-size:0.78rem;font-weight:700;color:var(--text-secondary);margin-top:14px;margin-bottom:4px;">📅 直近7日</div>
             ${daysBars || '<div class="loading-placeholder">記録なし。</div>'}
 
@@ -817,12 +884,22 @@ if (chatForm) {
         sendBtn.classList.remove('active');
 
         _chatAbortCtrl = new AbortController();
+        // 返信は届いた分から仮の吹き出しに流し込み、完了したら通常の吹き出し（ボタン付き）に置き換える
+        const streamEl = appendStreamingMsg();
         try {
-            const data = await apiFetch('/api/chat', {
-                method: 'POST',
-                body: JSON.stringify({ message: msg, reply_to_id: replyTo, english_mode: _isEnglishMode, search_mode: _isSearchMode, client_msg_id: clientMsgId }),
-                signal: _chatAbortCtrl.signal,
-            });
+            let streamed = '';
+            const data = await streamChat(
+                { message: msg, reply_to_id: replyTo, english_mode: _isEnglishMode, search_mode: _isSearchMode, client_msg_id: clientMsgId },
+                {
+                    signal: _chatAbortCtrl.signal,
+                    delta: (text) => { streamed += text; streamEl.setText(streamed); },
+                    tool: (name, status) => {
+                        if (status === 'start') { streamed = ''; streamEl.setText(''); }
+                        streamEl.setStatus(status === 'start' ? describeToolProgress(name) : '');
+                    },
+                },
+            );
+            streamEl.remove();
             if (userEl && data.user_message_id) userEl.dataset.msgId = String(data.user_message_id);
 
             // ENモード: 翻訳テキストを表示
@@ -839,6 +916,7 @@ if (chatForm) {
             // AI応答後にダッシュボードをリロードして反映させる
             if (typeof loadDashboard === 'function') loadDashboard();
         } catch (err) {
+            streamEl.remove();
             if (err.name !== 'AbortError') {
                 appendMsg('assistant', 'すみません、エラーが発生しました。');
             }
@@ -876,6 +954,54 @@ if (messageInput) {
     });
 }
 
+// ストリーム受信中の仮の吹き出し。ACTION などのマーカーは完了後の appendMsg で描画するので、ここでは隠す
+function appendStreamingMsg() {
+    const noop = { setText() {}, setStatus() {}, remove() {} };
+    if (!chatMessages) return noop;
+    const prevEl = chatMessages.lastElementChild;
+    const grouped = !!(prevEl && prevEl.classList && prevEl.classList.contains('message') && prevEl.classList.contains('assistant'));
+    const div = document.createElement('div');
+    div.className = 'message assistant streaming' + (grouped ? ' grouped' : '');
+    div.innerHTML = `${MGR_AVATAR_SVG}
+        <div class="msg-content">
+            ${grouped ? '' : '<div class="msg-name">マネージャー</div>'}
+            <div class="msg-line">
+                <div class="msg-bubble"><span class="msg-stream-text"></span><div class="msg-stream-status">…</div>${grouped ? '' : '<span class="msg-tail"></span>'}</div>
+            </div>
+        </div>`;
+    chatMessages.appendChild(div);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+    const textEl = div.querySelector('.msg-stream-text');
+    const statusEl = div.querySelector('.msg-stream-status');
+    return {
+        setText(text) {
+            const visible = String(text || '')
+                .replace(/\[(?:ACTION|QUESTIONS):[^\]]*\]?/g, '')
+                .trim();
+            textEl.innerHTML = escapeHtml(visible).replace(/\n/g, '<br>');
+            if (visible) statusEl.textContent = '';
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        },
+        setStatus(label) {
+            statusEl.textContent = label || '';
+        },
+        remove() { div.remove(); },
+    };
+}
+
+// ツール実行中に仮の吹き出しへ出す文言
+function describeToolProgress(name) {
+    const labels = {
+        check_schedule: '📅 予定を確認中…',
+        check_tasks: '✅ タスクを確認中…',
+        get_mit_status: '🎯 MITを確認中…',
+        search_memory: '🔎 メモを検索中…',
+        list_habits: '🔁 習慣を確認中…',
+        log_journal_entry: '📝 記録を準備中…',
+    };
+    return labels[name] || '🔧 処理中…';
+}
+
 function appendMsg(role, content, isoTimestamp = null, opts = {}) {
     if (!chatMessages) return null;
     const now = isoTimestamp ? new Date(isoTimestamp) : new Date();
@@ -0,0 +1,167 @@
+"""services.cross_section（ベクトル化）と従来の Python 実装の一致確認＋規模別ベンチマーク。
+
+実行:
+    python tools/bench_cross_section.py               # 500 / 1000 / 2000 / 5000 銘柄
+    python tools/bench_cross_section.py 500 20000     # 銘柄数を指定
+
+合成ユニバース（33 業種・欠損/負値/同値を含む）で、RS レーティング・セクター中央値・
+同業比の百分位・複数期間 RS 素点を両実装で計算し、結果が一致することを確かめてから
+所要時間を並べる。不一致があれば終了コード 1。
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from services.cross_section import (  # noqa: E402
+    peer_percentiles, relative_strength_blended_panel, rs_ratings, sector_medians,
+)
+from services.screener_engine import relative_strength_blended  # noqa: E402
+
+SIZES = (500, 1000, 2000, 5000)
+
+
+# ---- 従来実装（置き換え前の screener_engine のロジックをそのまま残した参照版） ----
+
+def _legacy_rs_ratings(returns_by_code: dict, min_n: int = 5) -> dict:
+    items = [(c, r) for c, r in returns_by_code.items() if isinstance(r, (int, float)) and r == r]
+    n = len(items)
+    if n < min_n:
+        return {}
+    items.sort(key=lambda x: x[1])
+    if n == 1:
+        return {items[0][0]: 50}
+    return {code: int(round(1 + rank / (n - 1) * 98)) for rank, (code, _) in enumerate(items)}
+
+
+def _legacy_median(vals):
+    s = sorted(vals)
+    n = len(s)
+    if n == 0:
+        return None
+    mid = n // 2
+    return s[mid] if n % 2 else (s[mid - 1] + s[mid]) / 2.0
+
+
+def _legacy_sector_medians(records, min_n: int = 5) -> dict:
+    by_sector: dict[str, dict] = {}
+    for r in records:
+        sec = (r.get("sector") or "").strip()
+        if not sec:
+            continue
+        b = by_sector.setdefault(sec, {"per": [], "pbr": [], "psr": [], "roe": [], "operating_margin": []})
+        for m in ("per", "pbr", "psr"):
+            v = r.get(m)
+            if isinstance(v, (int, float)) and v > 0:
+                b[m].append(float(v))
+        for m in ("roe", "operating_margin"):
+            v = r.get(m)
+            if isinstance(v, (int, float)):
+                b[m].append(float(v))
+    out = {}
+    for sec, b in by_sector.items():
+        med = {m: (_legacy_median(vals) if len(vals) >= min_n else None) for m, vals in b.items()}
+        med["n"] = max(len(b["per"]), len(b["pbr"]), len(b["psr"]))
+        out[sec] = med
+    return out
+
+
+def _legacy_percentiles(values, groups, lower_better):
+    """候補ごとにピア集合を走査する O(n²) 版（compute_relative_metrics の旧 _pctl）。"""
+    out = []
+    for i, x in enumerate(values):
+        if x is None:
+            out.append(None)
+            continue
+        peers = [v for v, g in zip(values, groups) if g == groups[i] and v is not None]
+        cnt = sum(1 for v in peers if (v >= x if lower_better else v <= x))
+        out.append(round(cnt / len(peers) * 100))
+    return out
+
+
+# ---- 合成データ ----
+
+def _universe(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    codes = [f"{1000 + i}" for i in range(n)]
+    sectors = [f"業種{k:02d}" for k in rng.integers(0, 33, n)]
+
+    def _col(loc, scale, missing=0.1, decimals=2):
+        v = np.round(rng.normal(loc, scale, n), decimals)  # 丸めで同値を作る
+        return [None if m else float(x) for x, m in zip(v, rng.random(n) < missing)]
+
+    per, pbr, roe = _col(15, 8), _col(1.2, 0.8), _col(8, 6)
+    records = [{"sector": s, "per": a, "pbr": b, "psr": c, "roe": d, "operating_margin": e}
+               for s, a, b, c, d, e in zip(sectors, per, pbr, _col(1.5, 1.0), roe, _col(10, 7))]
+    returns = dict(zip(codes, _col(0.05, 0.3, decimals=3)))
+    closes = {}
+    for c in codes:
+        length = int(rng.integers(40, 300))
+        closes[c] = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    return codes, sectors, records, returns, per, closes
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def run(n: int) -> tuple[list[str], dict]:
+    codes, sectors, records, returns, per, closes = _universe(n)
+    errors: list[str] = []
+    times: dict[str, tuple[float, float]] = {}
+
+    a, ta = _timed(_legacy_rs_ratings, returns)
+    b, tb = _timed(rs_ratings, returns)
+    times["rs_ratings"] = (ta, tb)
+    if a != b:
+        errors.append(f"n={n} rs_ratings 不一致")
+
+    a, ta = _timed(_legacy_sector_medians, records)
+    b, tb = _timed(sector_medians, records)
+    times["sector_medians"] = (ta, tb)
+    for sec, med in a.items():
+        for k, v in med.items():
+            w = b.get(sec, {}).get(k)
+            if (v is None) != (w is None) or (v is not None and abs(v - w) > 1e-9):
+                errors.append(f"n={n} sector_medians {sec}.{k}: legacy={v} vectorized={w}")
+
+    a, ta = _timed(_legacy_percentiles, per, sectors, True)
+    b, tb = _timed(lambda: peer_percentiles(per, sectors, lower_better=True))
+    times["peer_percentiles"] = (ta, tb)
+    if a != b:
+        errors.append(f"n={n} peer_percentiles 不一致")
+
+    a, ta = _timed(lambda: {c: relative_strength_blended(pd.DataFrame({"Close": s})) for c, s in closes.items()})
+    a = {c: v for c, v in a.items() if v is not None}
+    b, tb = _timed(relative_strength_blended_panel, closes)
+    times["rs_blended"] = (ta, tb)
+    if a.keys() != b.keys() or any(abs(a[c] - b[c]) > 1e-12 for c in a):
+        errors.append(f"n={n} rs_blended 不一致")
+    return errors, times
+
+
+def main(argv: list[str]) -> int:
+    sizes = [int(x) for x in argv] or list(SIZES)
+    errors: list[str] = []
+    print(f"{'n':>6} {'指標':<18} {'従来(ms)':>10} {'一括(ms)':>10} {'倍率':>7}")
+    for n in sizes:
+        errs, times = run(n)
+        errors += errs
+        for name, (ta, tb) in times.items():
+            print(f"{n:>6} {name:<18} {ta * 1000:>10.1f} {tb * 1000:>10.1f} {ta / tb if tb else 0:>6.1f}x")
+    for e in errors:
+        print(e)
+    print(f"不一致 {len(errors)} 件")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
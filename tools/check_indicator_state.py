@@ -0,0 +1,87 @@
+"""indicator_state（逐次指標）が TechnicalSignals のバッチ計算と一致するかを検証する。
+
+実行:
+    python tools/check_indicator_state.py            # キャッシュ済みの全銘柄
+    python tools/check_indicator_state.py 7203 AAPL  # 指定銘柄のみ
+
+chat_history.db の stock_ohlcv から各銘柄の履歴を読み、1 本ずつ逐次前進させた状態
+（JSON 往復を挟む）と、pandas で全履歴から計算した値を比較する。不一致があれば終了コード 1。
+"""
+from __future__ import annotations
+
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pandas as pd  # noqa: E402
+
+from services.indicator_state import IndicatorState  # noqa: E402
+from services.screener_engine import TechnicalSignals, relative_strength_blended  # noqa: E402
+
+DB_PATH = Path(__file__).parent.parent / "chat_history.db"
+REL_TOL = 1e-8
+
+
+def _batch(df: pd.DataFrame) -> dict:
+    close, high, low = df["Close"], df["High"], df["Low"]
+    out = {f"sma{n}": TechnicalSignals.sma(close, n).iloc[-1] for n in (25, 50, 75, 200)}
+    out["atr14"] = TechnicalSignals.atr(high, low, close, 14).iloc[-1]
+    out["rsi14"] = TechnicalSignals.rsi(close, 14).iloc[-1]
+    for w in (22, 60, 252):
+        out[f"high_{w}"] = high.tail(w).max()
+    out["low_252"] = low.tail(252).min()
+    out["rs_blended"] = relative_strength_blended(df)
+    return {k: (None if v is None or v != v else float(v)) for k, v in out.items()}
+
+
+def check(con: sqlite3.Connection, code: str) -> list[str]:
+    rows = [
+        dict(zip(("date", "open", "high", "low", "close", "volume"), r))
+        for r in con.execute(
+            "SELECT date, open, high, low, close, volume FROM stock_ohlcv WHERE code = ? ORDER BY date",
+            (code,),
+        )
+    ]
+    if not rows or any(r["close"] is None or r["high"] is None or r["low"] is None for r in rows):
+        return []
+    state = IndicatorState()
+    for i, r in enumerate(rows):
+        state.update(r)
+        if i % 50 == 0:
+            state = IndicatorState.from_json(state.to_json())
+    snap = state.snapshot()
+    df = pd.DataFrame(rows).set_index("date").rename(columns=str.capitalize)
+    errors = []
+    for key, expected in _batch(df).items():
+        got = snap.get(key)
+        if expected is None or got is None:
+            if (expected is None) != (got is None):
+                errors.append(f"{code} {key}: state={got} batch={expected}")
+            continue
+        if abs(got - expected) > REL_TOL * max(1.0, abs(expected)):
+            errors.append(f"{code} {key}: state={got} batch={expected}")
+    return errors
+
+
+def main(argv: list[str]) -> int:
+    if not DB_PATH.exists():
+        print(f"DB not found: {DB_PATH}")
+        return 1
+    con = sqlite3.connect(str(DB_PATH))
+    try:
+        codes = argv or [r[0] for r in con.execute("SELECT DISTINCT code FROM stock_ohlcv")]
+        errors: list[str] = []
+        for code in codes:
+            errors += check(con, code)
+    finally:
+        con.close()
+    for e in errors:
+        print(e)
+    print(f"{len(codes)} 銘柄を検証: 不一致 {len(errors)} 件")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+"""ブロッキング I/O 用の名前付きスレッドプール。
+
+`asyncio.to_thread` / `run_in_executor(None, ...)` は既定のスレッドプール 1 つを全員で
+共有するため、スクリーナーの一括更新が yfinance の遅い呼び出しでプールを埋めると、
+Drive への書き込みやチャット経路の Google API 呼び出しまで待たされていた。ここでは
+I/O の種類ごとに別サイズのプールを持ち、呼び出し側は自分のレーン（プール名）を宣言する。
+
+    from utils.executors import GOOGLE_API, run_in
+    result = await run_in(GOOGLE_API, lambda: service.files().list(...).execute())
+
+- google_api  : Drive / Calendar / Tasks / Gmail / YouTube の googleapiclient 呼び出し
+- market_data : yfinance など市場データの取得（services/rate_limiter.py 経由）
+- parsing     : feedparser・HTML/JSON の重いパースなど CPU 寄りの処理
+- web_push    : Web Push の送信（購読ごとに並列で送る）
+- file_io     : ローカルファイルなど、その他の同期 I/O
+
+各プールの大きさは環境変数 EXECUTOR_<NAME>_WORKERS で上書きできる。
+executor_stats() でプールごとの実行中・待ち件数と待ち時間を返す。
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+GOOGLE_API = "google_api"
+MARKET_DATA = "market_data"
+PARSING = "parsing"
+FILE_IO = "file_io"
+WEB_PUSH = "web_push"
+
+_DEFAULT_WORKERS = {GOOGLE_API: 8, MARKET_DATA: 8, PARSING: 4, FILE_IO: 4, WEB_PUSH: 8}
+
+
+class _Pool:
+    """ThreadPoolExecutor と、その待ち行列・待ち時間の計測値。"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"pool-{name}")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.running = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    def wrap(self, func, queued_at: float):
+        def _run():
+            started = time.monotonic()
+            waited = started - queued_at
+            with self._lock:
+                self.running += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            try:
+                return func()
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.run_total += time.monotonic() - started
+        return _run
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed
+            started = done + self.running
+            return {
+                "workers": self.workers,
+                "running": self.running,
+                "queued": self.submitted - started,
+                "submitted": self.submitted,
+                "avg_wait_ms": round(self.wait_total / started * 1000, 1) if started else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 1),
+                "avg_run_ms": round(self.run_total / done * 1000, 1) if done else 0.0,
+            }
+
+
+_pools: dict[str, _Pool] = {}
+_pools_lock = threading.Lock()
+
+
+def _workers_for(name: str) -> int:
+    raw = os.getenv(f"EXECUTOR_{name.upper()}_WORKERS", "")
+    try:
+        return max(1, int(raw)) if raw else _DEFAULT_WORKERS.get(name, 4)
+    except ValueError:
+        logging.warning(f"EXECUTOR_{name.upper()}_WORKERS の値が不正です: {raw!r}")
+        return _DEFAULT_WORKERS.get(name, 4)
+
+
+def _pool(name: str) -> _Pool:
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = _Pool(name, _workers_for(name))
+    return pool
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """名前付きプールの ThreadPoolExecutor（loop.run_in_executor に直接渡したい場合用）。"""
+    return _pool(name).executor
+
+
+async def run_in(name: str, func, *args, **kwargs):
+    """同期関数 func を名前付きプール name で実行して結果を待つ（asyncio.to_thread の置き換え）。"""
+    pool = _pool(name)
+    call = functools.partial(func, *args, **kwargs) if args or kwargs else func
+    with pool._lock:
+        pool.submitted += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool.executor, pool.wrap(call, time.monotonic()))
+
+
+def executor_stats() -> dict:
+    """プールごとの実行中・待ち件数、平均/最大待ち時間、平均実行時間。"""
+    return {name: pool.stats() for name, pool in list(_pools.items())}
+
+
+def shutdown_executors(wait: bool = False) -> None:
+    for pool in list(_pools.values()):
+        pool.executor.shutdown(wait=wait, cancel_futures=True)
+    _pools.clear()
@@ -0,0 +1,128 @@
+"""起動処理のフェーズ計測と、準備が済むまで API を待たせる関門（readiness gate）。
+
+デプロイ後やクラッシュ後の再起動では、ルーター 38 本と Cog の import、Drive からの DB 復元、
+Cog の読み込みが終わるまでポートが開かず、PWA も Bot も長く使えなかった。main.py は
+
+- uvicorn を先に起動してポートを開け（静的ファイル・Service Worker はすぐ返る）
+- ルーターと Cog の依存モジュールの import をスレッドで進めながら、DB 復元を並行して行い
+- DB の準備・Cog の読み込みが終わったら mark_ready("api") で関門を開ける
+
+という順で立ち上がる。/api/* への要求は api/__init__.py のミドルウェアが関門の前で待たせる
+（_READY_WAIT_SEC を過ぎたら 503 と Retry-After を返す）。require() で宣言されていない段階は
+待たないので、main.py を通さずに app を使う場合（スクリプト・テスト）は関門が無いのと同じ。
+
+各フェーズの所要時間は phase() で測り、report() で返す。起動完了時にログへ出し、
+startup_runs テーブルにも残すので、/api/startup_report で前回までの起動と比べられる。
+
+    from utils.startup import startup
+    with startup.phase("db"):
+        await init_db()
+    startup.mark_ready("api")
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import logging
+import time
+from typing import Optional
+
+_READY_WAIT_SEC = 60.0
+_SLOWEST_DETAILS = 8
+
+
+class StartupProfile:
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self.started_wall = datetime.datetime.now().isoformat(timespec="seconds")
+        self.phases: dict[str, dict] = {}
+        self.details: dict[str, dict[str, float]] = {}
+        self.ready_at: dict[str, float] = {}
+        self._required: set[str] = set()
+        self._events: dict[str, asyncio.Event] = {}
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    # ---- フェーズ計測 ----
+
+    def record(self, name: str, start: float, end: float, error: str = "") -> None:
+        entry = {
+            "start_sec": round(start - self.started_at, 3),
+            "duration_sec": round(end - start, 3),
+        }
+        if error:
+            entry["error"] = error
+        self.phases[name] = entry
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.record(name, start, time.monotonic(), error=type(e).__name__)
+            raise
+        self.record(name, start, time.monotonic())
+
+    def detail(self, phase: str, key: str, seconds: float) -> None:
+        """フェーズ内の内訳（ルーター・Cog ごとの所要時間など）。"""
+        self.details.setdefault(phase, {})[key] = round(seconds, 3)
+
+    # ---- 関門 ----
+
+    def require(self, *stages: str) -> None:
+        """stages が mark_ready されるまで、wait_ready はその段階を待つようになる。"""
+        self._required.update(stages)
+
+    def _event(self, stage: str) -> asyncio.Event:
+        event = self._events.get(stage)
+        if event is None:
+            event = self._events[stage] = asyncio.Event()
+        return event
+
+    def mark_ready(self, stage: str) -> None:
+        self.ready_at.setdefault(stage, round(self.elapsed(), 3))
+        self._event(stage).set()
+
+    def is_ready(self, stage: str) -> bool:
+        return stage not in self._required or stage in self.ready_at
+
+    async def wait_ready(self, stage: str, timeout: float = _READY_WAIT_SEC) -> bool:
+        """stage の準備ができるまで待つ。timeout 秒で諦めたら False。"""
+        if self.is_ready(stage):
+            return True
+        try:
+            await asyncio.wait_for(self._event(stage).wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # ---- 報告 ----
+
+    def report(self) -> dict:
+        slowest = {
+            phase: dict(sorted(items.items(), key=lambda kv: kv[1], reverse=True)[:_SLOWEST_DETAILS])
+            for phase, items in self.details.items()
+        }
+        return {
+            "started_at": self.started_wall,
+            "elapsed_sec": round(self.elapsed(), 3),
+            "phases": dict(sorted(self.phases.items(), key=lambda kv: kv[1]["start_sec"])),
+            "ready": dict(self.ready_at),
+            "pending": sorted(s for s in self._required if s not in self.ready_at),
+            "slowest": slowest,
+        }
+
+    def log_report(self) -> dict:
+        report = self.report()
+        parts = [f"{name}={p['duration_sec']:.2f}s" for name, p in report["phases"].items()]
+        logging.info(f"[startup] 起動完了 {report['elapsed_sec']:.2f}s: " + ", ".join(parts))
+        for phase, items in report["slowest"].items():
+            top = ", ".join(f"{k}={v:.2f}s" for k, v in list(items.items())[:3])
+            logging.info(f"[startup]   {phase} の上位: {top}")
+        return report
+
+
+startup = StartupProfile()
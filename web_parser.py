@@ -12,10 +12,23 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 LOCAL_BROWSER_DIR = os.path.join(PROJECT_ROOT, ".playwright_browsers")
 os.environ["PLAYWRIGHT_BROWSERS_PATH"] = LOCAL_BROWSER_DIR
 
-# Chromium 起動は瞬間的に 100〜200MB 消費する。低メモリ環境（Render 512MB 等）で
-# 同期処理とユーザー操作の Chromium が同時に立ち上がると OOM で落ちるため、
-# ブラウザ起動を 1 つずつに直列化する。
-_BROWSER_LOCK = asyncio.Lock()
+_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+# 静的 HTML だけで本文が取れたとみなす最小文字数（これ未満ならブラウザで描画し直す）
+_STATIC_MIN_TEXT = 400
+_STATIC_MAX_BYTES = 3 * 1024 * 1024
+# JavaScript 必須ページの典型的な文言（静的 HTML にこれがあればブラウザへ回す）
+_JS_REQUIRED_MARKERS = (
+    "enable javascript",
+    "javascriptを有効",
+    "javascript を有効",
+    "javascript is disabled",
+    "please turn on javascript",
+)
+# 静的取得では中身が返ってこない（ボット判定・SPA）ことが分かっているドメイン
+_BROWSER_ONLY_DOMAINS = ("amazon.co.jp", "amazon.com", "amzn.to", "x.com", "twitter.com", "instagram.com")
 
 
 async def _ensure_browser_installed():
@@ -39,66 +52,62 @@ async def _ensure_browser_installed():
             pass
 
 
-async def parse_url_with_readability(url: str) -> tuple[str | None, str | None]:
-    """
-    Playwrightを使ってブラウザ経由でページを取得し、JavaScript実行後のHTMLから
-    readabilityとmarkdownifyでタイトルと本文を抽出する。
-    """
-    try:
-        await _ensure_browser_installed()
-
-        # playwright は重い依存なので使用時に遅延 import（起動時の常駐メモリを抑える）
-        from playwright.async_api import async_playwright
-
-        # Chromium の同時起動を防ぐ（OOM 対策）。1 つずつ起動・解析・クローズする。
-        async with _BROWSER_LOCK:
-            async with async_playwright() as p:
-                # メモリ不足対策の起動引数。低メモリ環境向けに描画/プロセスを絞る。
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        "--no-sandbox",
-                        "--disable-setuid-sandbox",
-                        "--disable-dev-shm-usage",
-                        "--single-process",
-                        "--no-zygote",
-                        "--disable-gpu",
-                        "--disable-extensions",
-                        "--disable-background-networking",
-                    ],
-                )
+def _extract(html: str, page_title: str | None = None) -> tuple[str, str]:
+    """readability で本文を抜き出して Markdown にする（CPU 処理なので PARSING プールで呼ぶ）。"""
+    doc = Document(html)
+    title = page_title if page_title else doc.title()
+    return title, md(doc.summary(), heading_style="ATX")
 
-                # try...finally で囲み、エラーが起きても確実にブラウザを閉じる
-                try:
-                    context = await browser.new_context(
-                        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                    )
-                    page = await context.new_page()
 
-                    # ページ遷移のタイムアウトは45秒
-                    await page.goto(url, timeout=45000, wait_until="domcontentloaded")
+async def _fetch_static(url: str) -> str | None:
+    """ブラウザを使わずに HTML を取得する。HTML 以外・失敗時は None。"""
+    headers = {
+        "User-Agent": _UA,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
+    }
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                url, headers=headers, timeout=aiohttp.ClientTimeout(total=15), allow_redirects=True
+            ) as response:
+                if response.status != 200:
+                    return None
+                if "html" not in (response.headers.get("Content-Type") or "").lower():
+                    return None
+                body = await response.content.read(_STATIC_MAX_BYTES)
+                return body.decode(response.charset or "utf-8", errors="replace")
+    except Exception as e:
+        logging.debug(f"静的取得に失敗（ブラウザで再取得）: {url} -> {e}")
+        return None
 
-                    try:
-                        await page.wait_for_load_state("networkidle", timeout=5000)
-                    except Exception:
-                        pass
 
-                    content_html = await page.content()
-                    page_title = await page.title()
+def _static_is_enough(html: str, markdown_content: str) -> bool:
+    if len(re.sub(r"\s+", "", markdown_content or "")) < _STATIC_MIN_TEXT:
+        return False
+    lowered = html[:20000].lower()
+    return not any(m in lowered for m in _JS_REQUIRED_MARKERS)
 
-                finally:
-                    # どんな状況（タイムアウトなど）でも確実にブラウザを閉じる
-                    await browser.close()
 
-        # readabilityで本文抽出
-        doc = Document(content_html)
-        title = page_title if page_title else doc.title()
-        summary_html = doc.summary()
+async def parse_url_with_readability(url: str) -> tuple[str | None, str | None]:
+    """
+    ページを取得し、readabilityとmarkdownifyでタイトルと本文を抽出する。
+    まず普通の HTTP で取得し、静的 HTML で本文が十分取れればそれを使う。取れなければ
+    常駐ブラウザ（services/browser_pool.py）で JavaScript 実行後の HTML を取得する。
+    """
+    from utils.executors import PARSING, run_in
 
-        # HTMLをMarkdownに変換
-        markdown_content = md(summary_html, heading_style="ATX")
+    try:
+        if not any(d in url for d in _BROWSER_ONLY_DOMAINS):
+            html = await _fetch_static(url)
+            if html:
+                title, markdown_content = await run_in(PARSING, _extract, html)
+                if title and _static_is_enough(html, markdown_content):
+                    return title, markdown_content
 
-        return title, markdown_content
+        from services.browser_pool import browser_pool
+        page_title, content_html = await browser_pool.fetch_html(url, timeout_ms=45000)
+        return await run_in(PARSING, _extract, content_html, page_title)
 
     except Exception as e:
         logging.error(f"PlaywrightによるURL解析エラー: {url} -> {e}")
@@ -110,12 +119,14 @@ async def fetch_maps_info(url: str) -> tuple[str, str]:
     try:
         async with aiohttp.ClientSession() as session:
             headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                "User-Agent": _UA,
                 "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
             }
             # allow_redirects=True is default in aiohttp
+            # 必要なのはリダイレクト後の URL だけなので、本文は読まずに閉じる
             async with session.get(url, headers=headers, timeout=15) as response:
                 final_url = str(response.url)
+                response.release()
 
                 # パターン: https://www.google.com/maps/place/○○○/...
                 match = re.search(r"/place/([^/]+)", final_url)